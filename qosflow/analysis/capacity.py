@@ -0,0 +1,340 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import math
+import time
+from collections.abc import Callable, Sequence
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+from qosflow.common.config import (
+    AbortRuleConfig,
+    CapacitySearchConfig,
+    LoadGenConfig,
+    QoSFlowConfig,
+    SLOConfig,
+)
+from qosflow.common.io import ensure_dir, iter_jsonl
+from qosflow.common.schema import PromptRecord
+from qosflow.common.trace_parquet import read_parquet_traces
+from qosflow.loadgen.arrivals import with_mean_rate
+from qosflow.loadgen.runner import run_load
+from qosflow.loadgen.tenants import with_total_rate
+from qosflow.loadgen.tokens import open_loadgen_prompts
+from qosflow.metrics.latency import UNSERVED_OUTCOMES
+
+
+@dataclass(frozen=True)
+class CapacityStep:
+    rate_rps: float
+    requests: int
+    p95_ms: float
+    p99_ms: float
+    p95_upper_ms: float
+    p99_upper_ms: float
+    error_rate: float
+    error_rate_upper: float
+    passed: bool
+    confident: bool
+    aborted: bool = False
+    phase: str = "ramp"
+
+
+@dataclass(frozen=True)
+class CapacityReport:
+    """Search outcome; `max_rate_rps` is the best point estimate, `max_rate_confident_rps` the
+    highest rate whose SLO also held at the upper confidence bounds."""
+
+    max_rate_rps: float
+    max_rate_confident_rps: float
+    bracket_low_rps: float
+    bracket_high_rps: float | None
+    confidence: float
+    elapsed_s: float
+    steps: list[CapacityStep] = field(default_factory=list)
+
+
+def quantile_upper_bound(sorted_values: np.ndarray, q: float, confidence: float) -> float:
+    """Distribution-free one-sided upper confidence bound for the q-quantile.
+
+    Uses the order statistic x_(k) with the smallest k such that P(Binomial(n, q) < k) >=
+    `confidence`; returns inf when there are too few samples to bound the quantile.
+    """
+    n = len(sorted_values)
+    if n == 0:
+        return math.inf
+    k = int(stats.binom.ppf(confidence, n, q)) + 1
+    if k > n:
+        return math.inf
+    return float(sorted_values[k - 1])
+
+
+def error_rate_upper_bound(failed: int, total: int, confidence: float) -> float:
+    """One-sided Clopper-Pearson upper bound on the failure probability."""
+    if total == 0 or failed >= total:
+        return 1.0
+    return float(stats.beta.ppf(confidence, failed + 1, total - failed))
+
+
+def _nearest_rank(sorted_values: np.ndarray, q: float) -> float:
+    if len(sorted_values) == 0:
+        return 0.0
+    return float(sorted_values[int(round((len(sorted_values) - 1) * q))])
+
+
+def evaluate_step(
+    rate_rps: float,
+    latencies_ms: Sequence[float],
+    failed: int,
+    slo: SLOConfig,
+    *,
+    unserved: int = 0,
+    confidence: float = 0.95,
+    aborted: bool = False,
+    phase: str = "ramp",
+) -> CapacityStep:
+    """Check one steady-state window against the SLO, both as point estimates and at bounds.
+
+    `unserved` arrivals (dropped or expired by the backlog) count as failures and as latency
+    misses: they enter the sample with infinite latency.
+    """
+    values = np.sort(
+        np.concatenate([np.asarray(latencies_ms, dtype=float), np.full(unserved, math.inf)])
+    )
+    total = len(values)
+    p95, p99 = _nearest_rank(values, 0.95), _nearest_rank(values, 0.99)
+    p95_upper = quantile_upper_bound(values, 0.95, confidence)
+    p99_upper = quantile_upper_bound(values, 0.99, confidence)
+    failed += unserved
+    error_rate = failed / total if total else 1.0
+    error_upper = error_rate_upper_bound(failed, total, confidence)
+
+    def meets(p95_ms: float, p99_ms: float, errors: float) -> bool:
+        return (
+            total > 0
+            and (slo.p95_ms is None or p95_ms <= slo.p95_ms)
+            and (slo.p99_ms is None or p99_ms <= slo.p99_ms)
+            and (slo.error_rate is None or errors <= slo.error_rate)
+        )
+
+    passed = not aborted and meets(p95, p99, error_rate)
+    return CapacityStep(
+        rate_rps=rate_rps,
+        requests=total,
+        p95_ms=p95,
+        p99_ms=p99,
+        p95_upper_ms=p95_upper,
+        p99_upper_ms=p99_upper,
+        error_rate=error_rate,
+        error_rate_upper=error_upper,
+        passed=passed,
+        confident=passed and meets(p95_upper, p99_upper, error_upper),
+        aborted=aborted,
+        phase=phase,
+    )
+
+
+def search_capacity(
+    evaluate: Callable[[float, str], CapacityStep],
+    config: CapacitySearchConfig,
+) -> CapacityReport:
+    """Ramp the rate by `growth` until the SLO fails, then bisect the last bracket.
+
+    Stops once the bracket is narrower than `rel_tolerance` of its upper end, `max_rps` is
+    reached, or `max_steps` windows have run.
+    """
+    if config.start_rps <= 0 or config.growth <= 1.0:
+        raise ValueError("capacity search needs start_rps > 0 and growth > 1")
+    started = time.monotonic()
+    steps: list[CapacityStep] = []
+    low, high = 0.0, None
+    rate = config.start_rps
+
+    while len(steps) < config.max_steps:
+        if config.max_rps is not None:
+            rate = min(rate, config.max_rps)
+        step = evaluate(rate, "ramp")
+        steps.append(step)
+        if not step.passed:
+            high = rate
+            break
+        low = rate
+        if config.max_rps is not None and rate >= config.max_rps:
+            break
+        rate *= config.growth
+
+    while high is not None and len(steps) < config.max_steps:
+        if high - low <= config.rel_tolerance * high:
+            break
+        rate = (low + high) / 2.0
+        step = evaluate(rate, "bisect")
+        steps.append(step)
+        if step.passed:
+            low = rate
+        else:
+            high = rate
+
+    confident_rates = [step.rate_rps for step in steps if step.confident]
+    return CapacityReport(
+        max_rate_rps=low,
+        max_rate_confident_rps=max(confident_rates, default=0.0),
+        bracket_low_rps=low,
+        bracket_high_rps=high,
+        confidence=config.confidence,
+        elapsed_s=time.monotonic() - started,
+        steps=steps,
+    )
+
+
+def _step_loadgen(
+    base: LoadGenConfig,
+    config: CapacitySearchConfig,
+    rate_rps: float,
+) -> LoadGenConfig:
+    update: dict[str, Any] = {
+        "mode": "open",
+        "arrival_rate_rps": rate_rps,
+        "warmup_s": config.step_warmup_s,
+        "duration_s": config.step_duration_s,
+    }
+    if base.arrival is not None:
+        update["arrival"] = with_mean_rate(base.arrival, rate_rps)
+    if base.tenants:
+        # Tenant runs ignore the top-level rate, so the step rate is split across the tenants.
+        update["tenants"] = with_total_rate(base.tenants, rate_rps)
+    if base.live.abort is None and (
+        config.slo.p99_ms is not None or config.slo.error_rate is not None
+    ):
+        # Clearly overloaded steps fail fast instead of running the whole window.
+        abort = AbortRuleConfig(
+            p99_ms=config.slo.p99_ms,
+            error_rate=config.slo.error_rate,
+            sustain_s=max(2.0, config.step_duration_s / 4.0),
+        )
+        update["live"] = base.live.model_copy(update={"abort": abort})
+    return base.model_copy(update=update)
+
+
+def _next_step_index(search_dir: Path) -> int:
+    """One past the highest existing `step=NN_*` index, so reused search dirs never collide."""
+    indices = [
+        int(index)
+        for path in search_dir.glob("step=*")
+        if (index := path.name.removeprefix("step=").partition("_")[0]).isdigit()
+    ]
+    return max(indices, default=-1) + 1
+
+
+def _step_samples(trace_path: Path) -> tuple[list[float], int, int]:
+    """Served latencies, failed count and unserved (dropped/expired) count of a step's traces.
+
+    Unserved rows carry the backlog wait rather than a response time, so they stay out of the
+    latency sample and are passed to `evaluate_step` as misses instead.
+    """
+    latencies: list[float] = []
+    failed = 0
+    unserved = 0
+    if trace_path.suffix == ".parquet":
+        for path in sorted(trace_path.parent.glob("trace*.parquet")):
+            frame = read_parquet_traces(path, columns=["total_ms", "system.error", "outcome"])
+            if "outcome" in frame:
+                skipped = frame["outcome"].isin(UNSERVED_OUTCOMES)
+                unserved += int(skipped.sum())
+                frame = frame[~skipped]
+            errors = frame["system.error"] if "system.error" in frame else pd.Series(dtype=object)
+            latencies.extend(frame["total_ms"].astype(float).tolist())
+            failed += int(errors.notna().sum())
+        return latencies, failed, unserved
+    for path in sorted(trace_path.parent.glob("trace*.jsonl*")):
+        for row in iter_jsonl(path):
+            if row.get("outcome") in UNSERVED_OUTCOMES:
+                unserved += 1
+                continue
+            latencies.append(float(row["total_ms"]))
+            failed += int(row.get("system", {}).get("error") is not None)
+    return latencies, failed, unserved
+
+
+def run_capacity_search(
+    *,
+    config_path: str | Path,
+    output_dir: str | Path | None = None,
+    search: CapacitySearchConfig | None = None,
+    prompts: Sequence[PromptRecord] | None = None,
+) -> CapacityReport:
+    """Search for the maximum SLO-compliant arrival rate and write `capacity.json`/`steps.csv`."""
+    base_cfg = QoSFlowConfig.from_yaml(config_path)
+    search_cfg = search or base_cfg.capacity
+    if search_cfg is None:
+        raise ValueError("capacity settings are required (config `capacity:` or search=)")
+    search_dir = ensure_dir(output_dir or Path(base_cfg.experiment.output_dir) / "capacity")
+    catalog = prompts
+    if catalog is None:
+        catalog = open_loadgen_prompts(
+            base_cfg.loadgen.prompt_source, base_cfg.loadgen.length_buckets, base_cfg.server
+        )
+
+    def evaluate(rate_rps: float, phase: str) -> CapacityStep:
+        step_idx = _next_step_index(search_dir)
+        token = f"step={step_idx:02d}_lambda={format(rate_rps, '.4g')}"
+        experiment_cfg = base_cfg.experiment.model_copy(
+            update={
+                "name": f"{base_cfg.experiment.name}-capacity-{step_idx:02d}",
+                "output_dir": ensure_dir(search_dir / token),
+            }
+        )
+        summary = asyncio.run(
+            run_load(
+                base_cfg.server,
+                _step_loadgen(base_cfg.loadgen, search_cfg, rate_rps),
+                experiment_cfg,
+                catalog,
+            )
+        )
+        latencies, failed, unserved = _step_samples(summary.trace_path)
+        step = evaluate_step(
+            rate_rps,
+            latencies,
+            failed,
+            search_cfg.slo,
+            unserved=unserved,
+            confidence=search_cfg.confidence,
+            aborted=summary.aborted,
+            phase=phase,
+        )
+        print(
+            f"capacity step={step_idx} phase={phase} rate_rps={rate_rps:.3f} "
+            f"n={step.requests} p95_ms={step.p95_ms:.1f} p99_ms={step.p99_ms:.1f} "
+            f"error_rate={step.error_rate:.4f} passed={step.passed}"
+        )
+        if search_cfg.cooldown_s > 0:
+            time.sleep(search_cfg.cooldown_s)
+        return step
+
+    report = search_capacity(evaluate, search_cfg)
+    pd.DataFrame([asdict(step) for step in report.steps]).to_csv(
+        search_dir / "steps.csv", index=False
+    )
+    payload = asdict(report)
+    payload.pop("steps")
+    payload["slo"] = search_cfg.slo.model_dump(mode="json")
+    with (search_dir / "capacity.json").open("w", encoding="utf-8") as handle:
+        json.dump(payload, handle, indent=2, sort_keys=True)
+    return report
+
+
+__all__ = [
+    "CapacityReport",
+    "CapacityStep",
+    "error_rate_upper_bound",
+    "evaluate_step",
+    "quantile_upper_bound",
+    "run_capacity_search",
+    "search_capacity",
+]
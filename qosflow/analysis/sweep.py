@@ -7,10 +7,12 @@ from typing import Any, Iterable
 
 import pandas as pd
 
-from qosflow.common.config import QoSFlowConfig
+from qosflow.common.config import ClosedLoopConfig, LoadGenConfig, QoSFlowConfig
 from qosflow.common.io import ensure_dir
-from qosflow.loadgen.prompts import load_prompts
+from qosflow.loadgen.arrivals import with_mean_rate
+from qosflow.loadgen.live import read_abort_reason
 from qosflow.loadgen.runner import run_load
+from qosflow.loadgen.tokens import open_loadgen_prompts
 from scripts.run_eval import run_eval
 
 
@@ -18,45 +20,98 @@ def _lambda_token(arrival_rate_rps: float) -> str:
     return format(float(arrival_rate_rps), "g")
 
 
-def _metrics_with_arrival(metrics: dict[str, Any], arrival_rate_rps: float) -> dict[str, Any]:
+def _metrics_with_point(metrics: dict[str, Any], point_columns: dict[str, Any]) -> dict[str, Any]:
     row = dict(metrics)
-    row["arrival_rate_rps"] = float(arrival_rate_rps)
+    row.update(point_columns)
     if "p95_latency" not in row and "latency_ms_p95" in row:
         row["p95_latency"] = row["latency_ms_p95"]
     return row
 
 
+def _sweep_points(
+    base_cfg: QoSFlowConfig,
+    arrival_rates: Iterable[float] | None,
+    users: Iterable[int] | None,
+) -> list[tuple[str, LoadGenConfig, dict[str, Any]]]:
+    """Return (dir token, loadgen config, summary columns) for each sweep point."""
+    if (arrival_rates is None) == (users is None):
+        raise ValueError("exactly one of arrival_rates or users must be provided")
+
+    points: list[tuple[str, LoadGenConfig, dict[str, Any]]] = []
+    if users is not None:
+        closed_loop = base_cfg.loadgen.closed_loop or ClosedLoopConfig(users=1)
+        for user_count in users:
+            loadgen_cfg = base_cfg.loadgen.model_copy(
+                update={
+                    "mode": "closed",
+                    "closed_loop": closed_loop.model_copy(update={"users": int(user_count)}),
+                }
+            )
+            points.append((f"users={int(user_count)}", loadgen_cfg, {"users": int(user_count)}))
+    else:
+        assert arrival_rates is not None
+        for rate in arrival_rates:
+            update: dict[str, Any] = {"arrival_rate_rps": float(rate)}
+            if base_cfg.loadgen.arrival is not None:
+                # Keep the configured burst/ramp shape, rescaled to this mean rate.
+                update["arrival"] = with_mean_rate(base_cfg.loadgen.arrival, float(rate))
+            loadgen_cfg = base_cfg.loadgen.model_copy(update=update)
+            points.append(
+                (f"lambda={_lambda_token(rate)}", loadgen_cfg, {"arrival_rate_rps": float(rate)})
+            )
+    if not points:
+        raise ValueError("sweep points must not be empty")
+    return points
+
+
+def _abort_reason(point_dir: Path) -> str | None:
+    for progress_path in sorted(point_dir.glob("traces/run_id=*/progress.jsonl")):
+        reason = read_abort_reason(progress_path)
+        if reason is not None:
+            return reason
+    return None
+
+
 def run_sweep(
     *,
     config_path: str | Path,
-    arrival_rates: Iterable[float],
+    arrival_rates: Iterable[float] | None = None,
+    users: Iterable[int] | None = None,
     output_dir: str | Path | None = None,
     resume: bool = True,
 ) -> pd.DataFrame:
+    """Run one load + eval per sweep point.
+
+    Open-loop sweeps vary `arrival_rate_rps`; closed-loop sweeps (`users=`) vary the number of
+    virtual users so throughput-vs-users curves can be compared with throughput-vs-rate.
+    Points stopped early by `loadgen.live.abort` are flagged in the `aborted` column.
+    """
     base_cfg = QoSFlowConfig.from_yaml(config_path)
-    rates = [float(rate) for rate in arrival_rates]
-    if not rates:
-        raise ValueError("arrival_rates must not be empty")
+    points = _sweep_points(
+        base_cfg,
+        [float(rate) for rate in arrival_rates] if arrival_rates is not None else None,
+        [int(count) for count in users] if users is not None else None,
+    )
 
     sweep_output_dir = ensure_dir(output_dir or base_cfg.experiment.output_dir)
-    prompts = load_prompts(base_cfg.loadgen.prompt_source)
+    prompts = open_loadgen_prompts(
+        base_cfg.loadgen.prompt_source, base_cfg.loadgen.length_buckets, base_cfg.server
+    )
 
     all_rows: list[dict[str, Any]] = []
 
-    for arrival_rate in rates:
-        token = _lambda_token(arrival_rate)
-        lambda_dir = ensure_dir(sweep_output_dir / f"lambda={token}")
-        metrics_path = lambda_dir / "eval" / "metrics.json"
+    for token, loadgen_cfg, point_columns in points:
+        point_dir = ensure_dir(sweep_output_dir / token)
+        metrics_path = point_dir / "eval" / "metrics.json"
 
         if resume and metrics_path.exists():
             with metrics_path.open("r", encoding="utf-8") as f:
                 metrics = dict(json.load(f))
         else:
-            loadgen_cfg = base_cfg.loadgen.model_copy(update={"arrival_rate_rps": arrival_rate})
             experiment_cfg = base_cfg.experiment.model_copy(
                 update={
-                    "name": f"{base_cfg.experiment.name}-lambda={token}",
-                    "output_dir": lambda_dir,
+                    "name": f"{base_cfg.experiment.name}-{token}",
+                    "output_dir": point_dir,
                 }
             )
 
@@ -69,12 +124,20 @@ def run_sweep(
                 )
             )
 
-            traces_glob = str(lambda_dir / "traces" / "run_id=*" / "trace.jsonl")
-            metrics, _ = run_eval(traces_glob=traces_glob, output_dir=lambda_dir)
+            # Soak runs rotate into trace-<segment> files; the wildcard picks those up too.
+            jsonl_only = loadgen_cfg.trace.format == "jsonl"
+            trace_name = "trace*.jsonl*" if jsonl_only else "trace*.parquet"
+            traces_glob = str(point_dir / "traces" / "run_id=*" / trace_name)
+            metrics, _ = run_eval(traces_glob=traces_glob, output_dir=point_dir)
 
-        all_rows.append(_metrics_with_arrival(metrics, arrival_rate))
+        abort_reason = _abort_reason(point_dir)
+        row = _metrics_with_point(metrics, point_columns)
+        row["aborted"] = abort_reason is not None
+        row["abort_reason"] = abort_reason
+        all_rows.append(row)
 
-    summary_df = pd.DataFrame(all_rows).sort_values("arrival_rate_rps").reset_index(drop=True)
+    sort_column = "users" if users is not None else "arrival_rate_rps"
+    summary_df = pd.DataFrame(all_rows).sort_values(sort_column).reset_index(drop=True)
     summary_path = sweep_output_dir / "summary.csv"
     summary_df.to_csv(summary_path, index=False)
     return summary_df
@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 import asyncio
+import json
 import random
 import time
 from collections.abc import Mapping
@@ -9,6 +10,11 @@ from typing import Any
 import httpx
 
 
+def encode_generate_body(prompt: str, params: Mapping[str, Any] | None = None) -> bytes:
+    """JSON body for `POST /generate`; callers sending the same prompt repeatedly can cache it."""
+    return json.dumps({"prompt": prompt, "params": dict(params or {})}).encode("utf-8")
+
+
 class AsyncLLMClient:
     def __init__(
         self,
@@ -33,15 +39,19 @@ class AsyncLLMClient:
         prompt: str,
         params: Mapping[str, Any] | None = None,
     ) -> tuple[str, dict[str, Any], int]:
-        payload = {"prompt": prompt, "params": dict(params or {})}
+        return await self.generate_encoded(encode_generate_body(prompt, params))
 
+    async def generate_encoded(self, encoded: bytes) -> tuple[str, dict[str, Any], int]:
+        """Like `generate`, for a body already produced by `encode_generate_body`."""
         if self._client is None:
             self._client = httpx.AsyncClient(base_url=self._base_url, timeout=self._timeout)
         started = time.perf_counter()
 
         attempt = 0
         while True:
-            response = await self._client.post("/generate", json=payload)
+            response = await self._client.post(
+                "/generate", content=encoded, headers={"content-type": "application/json"}
+            )
             status = response.status_code
 
             if status in (429, 503) and attempt < self._max_retries:
@@ -73,6 +83,15 @@ class AsyncLLMClient:
 
             return text, timings, status
 
+    async def server_time(self) -> tuple[int, int]:
+        """Return the server's (receive, send) wall-clock ns from `GET /time`."""
+        if self._client is None:
+            self._client = httpx.AsyncClient(base_url=self._base_url, timeout=self._timeout)
+        response = await self._client.get("/time")
+        response.raise_for_status()
+        body = response.json()
+        return int(body["ts_recv_ns"]), int(body["ts_send_ns"])
+
     async def aclose(self) -> None:
         if self._client is not None and self._owns_client:
             await self._client.aclose()
@@ -104,4 +123,4 @@ class LLMClient:
         return asyncio.run(self._async_client.generate(prompt, params=params))
 
 
-__all__ = ["AsyncLLMClient", "LLMClient"]
+__all__ = ["AsyncLLMClient", "LLMClient", "encode_generate_body"]
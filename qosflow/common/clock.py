@@ -0,0 +1,162 @@
+from __future__ import annotations
+
+import math
+import time
+from collections.abc import Awaitable, Callable, Sequence
+from dataclasses import asdict, dataclass
+from typing import Any
+
+import numpy as np
+
+# Returns the server's (receive, send) wall-clock timestamps in ns for one `/time` request.
+ServerTimeFetch = Callable[[], Awaitable[tuple[int, int]]]
+
+
+@dataclass(frozen=True)
+class ClockSample:
+    """One NTP-style exchange: client send `t0`, server receive `t1`, server send `t2`, client
+    receive `t3`, each on its own host's wall clock."""
+
+    t0_ns: int
+    t1_ns: int
+    t2_ns: int
+    t3_ns: int
+
+    @property
+    def offset_ns(self) -> float:
+        """Server clock minus client clock, assuming symmetric network delay."""
+        return ((self.t1_ns - self.t0_ns) + (self.t2_ns - self.t3_ns)) / 2.0
+
+    @property
+    def delay_ns(self) -> int:
+        """Round-trip network delay, excluding server processing time."""
+        return max(0, (self.t3_ns - self.t0_ns) - (self.t2_ns - self.t1_ns))
+
+
+@dataclass(frozen=True)
+class ClockEstimate:
+    """Offset from one probe burst. The true offset lies within `offset_ns ± uncertainty_ns`
+    (half the best round-trip delay) whatever the path asymmetry."""
+
+    at_ns: int
+    offset_ns: float
+    uncertainty_ns: float
+    delay_ns: int
+    samples: int
+    phase: str = "during"
+
+
+def estimate_offset(samples: Sequence[ClockSample], phase: str = "during") -> ClockEstimate:
+    """Combine a burst of exchanges NTP-style: trust only the lowest-delay ones.
+
+    Queueing only ever adds delay, so the samples with the smallest round trip carry the least
+    asymmetry error; the estimate is the median offset of the fastest quarter.
+    """
+    if not samples:
+        raise ValueError("at least one clock sample is required")
+    ranked = sorted(samples, key=lambda sample: sample.delay_ns)
+    best = ranked[: max(1, math.ceil(len(ranked) / 4))]
+    fastest = best[0]
+    return ClockEstimate(
+        at_ns=(fastest.t0_ns + fastest.t3_ns) // 2,
+        offset_ns=float(np.median([sample.offset_ns for sample in best])),
+        uncertainty_ns=fastest.delay_ns / 2.0,
+        delay_ns=fastest.delay_ns,
+        samples=len(samples),
+        phase=phase,
+    )
+
+
+async def probe_clock(
+    fetch: ServerTimeFetch,
+    *,
+    samples: int = 8,
+    phase: str = "during",
+    clock: Callable[[], int] = time.time_ns,
+) -> ClockEstimate:
+    """Run `samples` sequential `/time` exchanges and estimate the offset from them."""
+    exchanges: list[ClockSample] = []
+    for _ in range(max(1, samples)):
+        t0 = clock()
+        t1, t2 = await fetch()
+        t3 = clock()
+        exchanges.append(ClockSample(t0, t1, t2, t3))
+    return estimate_offset(exchanges, phase)
+
+
+class ClockModel:
+    """Offset (and drift, once probes span some time) between the server and client clocks.
+
+    Estimates are weighted by their inverse uncertainty in a linear fit of offset against client
+    time; with a single estimate the offset is taken as constant. `offset_at` is safe to call from
+    other threads while estimates are being added.
+    """
+
+    def __init__(self, estimates: Sequence[ClockEstimate] = ()) -> None:
+        self._estimates: tuple[ClockEstimate, ...] = ()
+        self._fit: tuple[float, float, int] | None = None
+        for estimate in estimates:
+            self.add(estimate)
+
+    @property
+    def estimates(self) -> tuple[ClockEstimate, ...]:
+        return self._estimates
+
+    def add(self, estimate: ClockEstimate) -> None:
+        estimates = (*self._estimates, estimate)
+        ref_ns = estimates[0].at_ns
+        if len(estimates) == 1:
+            fit = (0.0, estimate.offset_ns, ref_ns)
+        else:
+            x = np.array([item.at_ns - ref_ns for item in estimates], dtype=np.float64)
+            y = np.array([item.offset_ns for item in estimates], dtype=np.float64)
+            weights = 1.0 / np.maximum([item.uncertainty_ns for item in estimates], 1_000.0)
+            if np.ptp(x) < 1e9:
+                # Less than a second apart: drift is not observable, keep a weighted mean.
+                fit = (0.0, float(np.average(y, weights=weights)), ref_ns)
+            else:
+                slope, intercept = np.polyfit(x, y, 1, w=weights)
+                fit = (float(slope), float(intercept), ref_ns)
+        # Publish the fit before the estimates so readers never see a fit older than the list.
+        self._fit = fit
+        self._estimates = estimates
+
+    @property
+    def drift_ppm(self) -> float:
+        return self._fit[0] * 1e6 if self._fit is not None else 0.0
+
+    @property
+    def uncertainty_ns(self) -> float | None:
+        if not self._estimates:
+            return None
+        return min(estimate.uncertainty_ns for estimate in self._estimates)
+
+    def offset_at(self, client_ns: np.ndarray) -> np.ndarray | None:
+        """Server-minus-client offset (ns) at each client timestamp; None without estimates."""
+        fit = self._fit
+        if fit is None:
+            return None
+        slope, intercept, ref_ns = fit
+        return intercept + slope * (np.asarray(client_ns, dtype=np.float64) - ref_ns)
+
+    def to_dict(self) -> dict[str, Any]:
+        reference = (
+            self.offset_at(np.array([self._estimates[0].at_ns])) if self._estimates else None
+        )
+        return {
+            "offset_ns": float(reference[0]) if reference is not None else None,
+            "uncertainty_ns": self.uncertainty_ns,
+            "drift_ppm": self.drift_ppm,
+            "reference_ns": self._estimates[0].at_ns if self._estimates else None,
+            "estimates": [asdict(estimate) for estimate in self._estimates],
+        }
+
+
+__all__ = [
+    "ClockEstimate",
+    "ClockModel",
+    "ClockSample",
+    "ServerTimeFetch",
+    "estimate_offset",
+    "probe_clock",
+]
@@ -1,11 +1,11 @@
 from __future__ import annotations
 
 from pathlib import Path
-from typing import Literal
+from typing import Annotated, Literal, Union
 
-from pydantic import BaseModel, ConfigDict
+from pydantic import BaseModel, ConfigDict, Field, model_validator
 
-from qosflow.common.io import load_yaml
+from qosflow.common.io import Compression, load_yaml
 
 
 class StrictBaseModel(BaseModel):
@@ -25,6 +25,7 @@ class ServerConfig(StrictBaseModel):
     max_num_seqs: int
     max_num_batched_tokens: int
     scheduler_delay_ms: int
+    engine_stats_interval_s: float = 0.1
 
 
 class LoadMixConfig(StrictBaseModel):
@@ -33,6 +34,215 @@ class LoadMixConfig(StrictBaseModel):
     long: float
 
 
+class TraceSinkConfig(StrictBaseModel):
+    format: Literal["jsonl", "parquet", "both"] = "jsonl"
+    compression: Compression = "none"
+    row_group_size: int = 10_000
+    queue_size: int = 10_000
+    batch_size: int = 512
+    flush_interval_s: float = 1.0
+
+
+class PoissonArrivalConfig(StrictBaseModel):
+    kind: Literal["poisson"] = "poisson"
+    rate_rps: float
+
+
+class RenewalArrivalConfig(StrictBaseModel):
+    """Renewal process with gamma or Weibull inter-arrivals at a target coefficient of variation."""
+
+    kind: Literal["gamma", "weibull"]
+    rate_rps: float
+    cv: float = 1.0
+
+
+class MMPPStateConfig(StrictBaseModel):
+    rate_rps: float
+    mean_dwell_s: float
+
+
+class MMPPArrivalConfig(StrictBaseModel):
+    """Markov-modulated Poisson process; the chain jumps uniformly to one of the other states."""
+
+    kind: Literal["mmpp"] = "mmpp"
+    states: list[MMPPStateConfig]
+    initial_state: int = 0
+
+
+class RampArrivalConfig(StrictBaseModel):
+    kind: Literal["ramp"] = "ramp"
+    start_rps: float
+    end_rps: float
+    shape: Literal["linear", "step"] = "linear"
+    steps: int = 5
+    ramp_s: float | None = None
+
+
+class RateSegmentConfig(StrictBaseModel):
+    duration_s: float
+    rate_rps: float
+
+
+class PiecewiseArrivalConfig(StrictBaseModel):
+    """Piecewise-rate schedule; `repeat` tiles it over the run (e.g. a compressed diurnal day)."""
+
+    kind: Literal["piecewise"] = "piecewise"
+    segments: list[RateSegmentConfig]
+    repeat: bool = True
+    interpolate: bool = False
+
+
+ArrivalProcessConfig = Annotated[
+    Union[
+        PoissonArrivalConfig,
+        RenewalArrivalConfig,
+        MMPPArrivalConfig,
+        RampArrivalConfig,
+        PiecewiseArrivalConfig,
+    ],
+    Field(discriminator="kind"),
+]
+
+
+class ThinkTimeConfig(StrictBaseModel):
+    distribution: Literal["fixed", "exponential", "uniform", "lognormal"] = "exponential"
+    mean_s: float = 1.0
+    sigma: float = 1.0
+
+
+class ClosedLoopConfig(StrictBaseModel):
+    users: int
+    think_time: ThinkTimeConfig = Field(default_factory=ThinkTimeConfig)
+    session_length: int = 1
+    ramp_up_s: float = 0.0
+
+
+class ReplayConfig(StrictBaseModel):
+    """Reissue requests from a recorded trace/log at their relative `ts_start_ns` offsets."""
+
+    source: Path
+    speed: float = 1.0
+    prompt_substitution: Literal["none", "missing", "all"] = "none"
+
+
+class AbortRuleConfig(StrictBaseModel):
+    p99_ms: float | None = None
+    error_rate: float | None = None
+    sustain_s: float = 5.0
+    min_requests: int = 20
+
+
+class LiveStatsConfig(StrictBaseModel):
+    enabled: bool = True
+    interval_s: float = 1.0
+    window_s: float = 10.0
+    # Off for library callers (sweeps, capacity steps, tests); `scripts/run_load.py` turns it on.
+    console: bool = False
+    abort: AbortRuleConfig | None = None
+
+
+class SoakConfig(StrictBaseModel):
+    """Constant-memory settings for multi-hour runs."""
+
+    rotate_bytes: int | None = 256 * 1024 * 1024
+    rotate_s: float | None = 3600.0
+    checkpoint_interval_s: float = 60.0
+
+
+class ClockSyncConfig(StrictBaseModel):
+    """Probe the server's `/time` endpoint before, during (every `interval_s`) and after a run."""
+
+    enabled: bool = True
+    samples: int = 8
+    interval_s: float = 60.0
+
+
+class HostTelemetryConfig(StrictBaseModel):
+    """`/proc` process and host sampling on the GPU telemetry ticks; `server` also polls the
+    server's `GET /telemetry/host`."""
+
+    enabled: bool = True
+    server: bool = True
+    loop_lag_interval_s: float = 0.05
+
+
+class EngineTelemetryConfig(StrictBaseModel):
+    """Poll the server's `GET /telemetry/engine` (scheduler queues, KV-cache usage) on the GPU
+    telemetry ticks."""
+
+    enabled: bool = True
+
+
+class BacklogConfig(StrictBaseModel):
+    """What scheduled arrivals do when all `concurrency` slots are busy.
+
+    `unbounded` parks every arrival until a slot frees up. The other policies hold at most
+    `max_pending` arrivals: `drop_newest` rejects an arrival that finds the backlog full,
+    `drop_oldest` evicts the longest-waiting one to make room, and `deadline` additionally expires
+    arrivals that wait more than `deadline_ms` before being sent.
+    """
+
+    policy: Literal["unbounded", "drop_newest", "drop_oldest", "deadline"] = "unbounded"
+    max_pending: int = 1024
+    deadline_ms: float | None = None
+
+    @model_validator(mode="after")
+    def validate_policy(self) -> "BacklogConfig":
+        if self.max_pending <= 0:
+            raise ValueError("backlog max_pending must be > 0")
+        if self.policy == "deadline" and (self.deadline_ms is None or self.deadline_ms <= 0):
+            raise ValueError("backlog policy 'deadline' requires deadline_ms > 0")
+        return self
+
+
+class LengthBucketConfig(StrictBaseModel):
+    """How prompts are assigned to short/med/long buckets.
+
+    `unit: tokens` counts tokens with `tokenizer` (a Hugging Face name or a local tokenizer.json;
+    defaults to `server.model`); thresholds default to 160/480 chars or 64/256 tokens.
+    """
+
+    unit: Literal["chars", "tokens"] = "chars"
+    short_max: int | None = None
+    med_max: int | None = None
+    tokenizer: str | None = None
+    cache_path: Path | None = None
+    batch_size: int = 1024
+    workers: int = 4
+
+
+class OutputLengthConfig(StrictBaseModel):
+    """Distribution of per-request `max_new_tokens`.
+
+    `fixed` sends `mean_tokens`; `uniform` draws from [min_tokens, max_tokens]; `lognormal` has
+    mean `mean_tokens`; `expected` uses the catalog's `expected` length over `chars_per_token`.
+    `mean_tokens` (and the `uniform` upper bound) default to `server.max_new_tokens`;
+    `max_tokens`, when set, caps every draw.
+    """
+
+    distribution: Literal["fixed", "uniform", "lognormal", "expected"] = "fixed"
+    mean_tokens: int | None = None
+    sigma: float = 0.5
+    min_tokens: int = 1
+    max_tokens: int | None = None
+    chars_per_token: float = 4.0
+
+
+class TenantConfig(StrictBaseModel):
+    """One traffic class of a multi-tenant open-loop run.
+
+    Arrivals follow `arrival` (or Poisson at `arrival_rate_rps`); `max_new_tokens` defaults to
+    `server.max_new_tokens`. `slo_ms` is the per-request latency target used for attainment.
+    """
+
+    name: str
+    arrival_rate_rps: float = 0.0
+    arrival: ArrivalProcessConfig | None = None
+    mix: LoadMixConfig
+    max_new_tokens: int | None = None
+    slo_ms: float | None = None
+
+
 class LoadGenConfig(StrictBaseModel):
     arrival_rate_rps: float
     concurrency: int
@@ -42,6 +252,57 @@ class LoadGenConfig(StrictBaseModel):
     telemetry_interval_s: float = 0.5
     prompt_source: Path
     mix: LoadMixConfig
+    trace: TraceSinkConfig = Field(default_factory=TraceSinkConfig)
+    mode: Literal["open", "closed", "replay"] = "open"
+    closed_loop: ClosedLoopConfig | None = None
+    replay: ReplayConfig | None = None
+    arrival: ArrivalProcessConfig | None = None
+    seed: int | None = None
+    live: LiveStatsConfig = Field(default_factory=LiveStatsConfig)
+    soak: SoakConfig | None = None
+    length_buckets: LengthBucketConfig = Field(default_factory=LengthBucketConfig)
+    tenants: list[TenantConfig] = Field(default_factory=list)
+    clock_sync: ClockSyncConfig = Field(default_factory=ClockSyncConfig)
+    backlog: BacklogConfig = Field(default_factory=BacklogConfig)
+    host_telemetry: HostTelemetryConfig = Field(default_factory=HostTelemetryConfig)
+    engine_telemetry: EngineTelemetryConfig = Field(default_factory=EngineTelemetryConfig)
+    output_lengths: dict[Literal["default", "short", "med", "long"], OutputLengthConfig] = Field(
+        default_factory=dict
+    )
+
+    @model_validator(mode="after")
+    def validate_mode(self) -> "LoadGenConfig":
+        if self.mode == "closed" and self.closed_loop is None:
+            raise ValueError("closed_loop settings are required when mode is 'closed'")
+        if self.mode == "replay" and self.replay is None:
+            raise ValueError("replay settings are required when mode is 'replay'")
+        if self.tenants and self.mode != "open":
+            raise ValueError("tenants are only supported when mode is 'open'")
+        names = [tenant.name for tenant in self.tenants]
+        if len(set(names)) != len(names):
+            raise ValueError("tenant names must be unique")
+        return self
+
+
+class SLOConfig(StrictBaseModel):
+    p95_ms: float | None = None
+    p99_ms: float | None = None
+    error_rate: float | None = None
+
+
+class CapacitySearchConfig(StrictBaseModel):
+    """Exponential ramp then bisection over arrival rate against one running server."""
+
+    slo: SLOConfig
+    start_rps: float = 1.0
+    growth: float = 2.0
+    max_rps: float | None = None
+    step_warmup_s: int = 5
+    step_duration_s: int = 20
+    cooldown_s: float = 2.0
+    rel_tolerance: float = 0.05
+    max_steps: int = 20
+    confidence: float = 0.95
 
 
 class EvalConfig(StrictBaseModel):
@@ -59,6 +320,7 @@ class QoSFlowConfig(StrictBaseModel):
     loadgen: LoadGenConfig
     eval: EvalConfig
     experiment: ExperimentConfig
+    capacity: CapacitySearchConfig | None = None
 
     @classmethod
     def from_yaml(cls, path: str | Path) -> "QoSFlowConfig":
@@ -66,11 +328,35 @@ class QoSFlowConfig(StrictBaseModel):
 
 
 __all__ = [
+    "AbortRuleConfig",
+    "ArrivalProcessConfig",
+    "BacklogConfig",
+    "CapacitySearchConfig",
+    "ClockSyncConfig",
+    "ClosedLoopConfig",
+    "EngineTelemetryConfig",
     "EvalConfig",
     "ExperimentConfig",
+    "HostTelemetryConfig",
+    "LengthBucketConfig",
+    "LiveStatsConfig",
     "LoadGenConfig",
     "LoadMixConfig",
+    "MMPPArrivalConfig",
+    "MMPPStateConfig",
+    "OutputLengthConfig",
+    "PiecewiseArrivalConfig",
+    "PoissonArrivalConfig",
     "QoSFlowConfig",
+    "RampArrivalConfig",
+    "RateSegmentConfig",
+    "RenewalArrivalConfig",
+    "ReplayConfig",
+    "SLOConfig",
     "ServerConfig",
+    "SoakConfig",
+    "TenantConfig",
+    "ThinkTimeConfig",
+    "TraceSinkConfig",
     "load_yaml",
 ]
@@ -0,0 +1,158 @@
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Callable, Sequence
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+from qosflow.common.telemetry import RotatingCsvWriter, ServerRowPoller
+
+ENGINE_TELEMETRY_COLUMNS = [
+    "timestamp",
+    "num_running",
+    "num_waiting",
+    "num_preempted_total",
+    "gpu_kv_cache_usage",
+    "cpu_kv_cache_usage",
+    "num_waiting_max",
+    "gpu_kv_cache_usage_max",
+]
+
+
+def engine_telemetry_segment_path(run_dir: Path, segment: int) -> Path:
+    return run_dir / f"engine-telemetry-{segment:05d}.csv"
+
+
+@dataclass(frozen=True)
+class EngineStats:
+    """One read of the inference engine's scheduler: queue depths, the cumulative preemption
+    count and KV-cache block usage as a fraction of the cache. None where the engine does not
+    expose a field."""
+
+    num_running: int | None = None
+    num_waiting: int | None = None
+    num_preempted_total: int | None = None
+    gpu_kv_cache_usage: float | None = None
+    cpu_kv_cache_usage: float | None = None
+
+
+# Reads the current engine state; returns None while it is unavailable.
+EngineStatsSource = Callable[[], EngineStats | None]
+
+
+class FakeEngineStats:
+    """Scripted `EngineStatsSource` for running without an engine: returns `snapshots` in order
+    and then keeps repeating the last one."""
+
+    def __init__(self, snapshots: Sequence[EngineStats]) -> None:
+        if not snapshots:
+            raise ValueError("at least one snapshot is required")
+        self._snapshots = list(snapshots)
+        self._next = 0
+
+    def __call__(self) -> EngineStats:
+        snapshot = self._snapshots[min(self._next, len(self._snapshots) - 1)]
+        self._next += 1
+        return snapshot
+
+
+def _peak(current: float | None, value: float | None) -> float | None:
+    if value is None:
+        return current
+    return value if current is None else max(current, value)
+
+
+class EngineStatsSampler:
+    """Poll an `EngineStatsSource` every `interval_s` on the server's event loop.
+
+    `take` returns the latest read plus the peak waiting depth and GPU KV-cache usage since the
+    previous `take`, so bursts shorter than the client's polling interval are still visible.
+    """
+
+    def __init__(self, source: EngineStatsSource | None, interval_s: float = 0.1) -> None:
+        self.source = source
+        self.interval_s = interval_s
+        self._latest: EngineStats | None = None
+        self._waiting_max: float | None = None
+        self._kv_max: float | None = None
+
+    def sample(self) -> None:
+        if self.source is None:
+            return
+        try:
+            stats = self.source()
+        except Exception:  # noqa: BLE001
+            # Engine internals move between releases; a failed read is a gap, not a crash.
+            stats = None
+        if stats is None:
+            return
+        self._latest = stats
+        self._waiting_max = _peak(self._waiting_max, stats.num_waiting)
+        self._kv_max = _peak(self._kv_max, stats.gpu_kv_cache_usage)
+
+    async def run(self) -> None:
+        while True:
+            self.sample()
+            await asyncio.sleep(self.interval_s)
+
+    def take(self) -> dict[str, Any] | None:
+        latest = self._latest
+        if latest is None:
+            return None
+        row = {
+            "num_running": latest.num_running,
+            "num_waiting": latest.num_waiting,
+            "num_preempted_total": latest.num_preempted_total,
+            "gpu_kv_cache_usage": latest.gpu_kv_cache_usage,
+            "cpu_kv_cache_usage": latest.cpu_kv_cache_usage,
+            "num_waiting_max": self._waiting_max,
+            "gpu_kv_cache_usage_max": self._kv_max,
+        }
+        self._waiting_max = latest.num_waiting
+        self._kv_max = latest.gpu_kv_cache_usage
+        return row
+
+
+class EngineTelemetryRecorder:
+    """Write the server's `GET /telemetry/engine` row on each telemetry tick.
+
+    Called from the GPU sampler's thread with that tick's timestamp; the fetch itself runs on a
+    `ServerRowPoller` thread, so a slow server never delays GPU samples. Ticks where the server
+    has no engine stats yet write nothing; the first failed fetch stops polling for the rest of
+    the run. `rows` counts the rows written: the server samples the engine whether or not it is
+    busy, so zero rows means the engine does not report stats, not that it was idle.
+    """
+
+    def __init__(
+        self, stream: RotatingCsvWriter, server_url: str, *, timeout_s: float = 1.0
+    ) -> None:
+        self.stream = stream
+        self.rows = 0
+        self._server = ServerRowPoller(
+            server_url, "/telemetry/engine", self._write_row, timeout_s=timeout_s
+        )
+
+    def _write_row(self, timestamp: str, row: dict[str, Any]) -> None:
+        self.stream.write_row(
+            {key: row.get(key) for key in ENGINE_TELEMETRY_COLUMNS} | {"timestamp": timestamp}
+        )
+        self.rows += 1
+
+    def __call__(self, timestamp: str) -> None:
+        self._server.submit(timestamp)
+
+    def close(self) -> None:
+        self._server.close()
+        self.stream.close()
+
+
+__all__ = [
+    "ENGINE_TELEMETRY_COLUMNS",
+    "EngineStats",
+    "EngineStatsSampler",
+    "EngineStatsSource",
+    "EngineTelemetryRecorder",
+    "FakeEngineStats",
+    "engine_telemetry_segment_path",
+]
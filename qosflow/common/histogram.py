@@ -0,0 +1,244 @@
+from __future__ import annotations
+
+import math
+from collections.abc import Iterable
+from typing import Any
+
+import numpy as np
+
+_MIN_VALUE = 1e-3
+_MAX_VALUE = 1e8
+_RELATIVE_ERROR = 0.01
+
+
+class LatencyHistogram:
+    """Fixed-size log-bucketed histogram with mergeable counts.
+
+    Buckets grow geometrically by ``1 + 2 * relative_error`` between `min_value` and `max_value`,
+    so quantiles are within ~`relative_error` of the exact value while memory stays constant no
+    matter how many samples are recorded. Values outside the range are clamped to the end buckets.
+    """
+
+    def __init__(
+        self,
+        *,
+        min_value: float = _MIN_VALUE,
+        max_value: float = _MAX_VALUE,
+        relative_error: float = _RELATIVE_ERROR,
+    ) -> None:
+        if not 0 < min_value < max_value:
+            raise ValueError("need 0 < min_value < max_value")
+        if not 0 < relative_error < 1:
+            raise ValueError("relative_error must be in (0, 1)")
+        self.min_value = min_value
+        self.max_value = max_value
+        self.relative_error = relative_error
+        self._log_gamma = math.log1p(2.0 * relative_error)
+        n_buckets = int(math.ceil(math.log(max_value / min_value) / self._log_gamma)) + 1
+        self.counts = np.zeros(n_buckets, dtype=np.int64)
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def _index(self, value: float) -> int:
+        clamped = min(max(value, self.min_value), self.max_value)
+        return int(math.log(clamped / self.min_value) / self._log_gamma)
+
+    def _bucket_value(self, index: int) -> float:
+        # Geometric midpoint of the bucket keeps relative error symmetric.
+        return self.min_value * math.exp((index + 0.5) * self._log_gamma)
+
+    def record(self, value: float) -> None:
+        self.counts[self._index(value)] += 1
+        self.count += 1
+        self.total += value
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    def record_many(self, values: Iterable[float]) -> None:
+        array = np.asarray(list(values) if not isinstance(values, np.ndarray) else values, float)
+        if array.size == 0:
+            return
+        clamped = np.clip(array, self.min_value, self.max_value)
+        indexes = (np.log(clamped / self.min_value) / self._log_gamma).astype(np.int64)
+        self.counts += np.bincount(indexes, minlength=len(self.counts))
+        self.count += int(array.size)
+        self.total += float(array.sum())
+        self.min = min(self.min, float(array.min()))
+        self.max = max(self.max, float(array.max()))
+
+    def _check_compatible(self, other: LatencyHistogram) -> None:
+        if (other.min_value, other.max_value, other.relative_error) != (
+            self.min_value,
+            self.max_value,
+            self.relative_error,
+        ):
+            raise ValueError("cannot merge histograms with different bucket layouts")
+
+    def merge(self, other: LatencyHistogram) -> None:
+        self._check_compatible(other)
+        self.counts += other.counts
+        self.count += other.count
+        self.total += other.total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def copy(self) -> LatencyHistogram:
+        clone = LatencyHistogram(
+            min_value=self.min_value,
+            max_value=self.max_value,
+            relative_error=self.relative_error,
+        )
+        clone.merge(self)
+        return clone
+
+    def quantile(self, q: float) -> float:
+        if self.count == 0:
+            return 0.0
+        if q <= 0:
+            return self.min
+        if q >= 1:
+            return self.max
+        # Nearest-rank on the sorted order, matching the loadgen summary percentiles.
+        rank = round(q * (self.count - 1))
+        index = int(np.searchsorted(np.cumsum(self.counts), rank, side="right"))
+        return min(max(self._bucket_value(index), self.min), self.max)
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def to_dict(self) -> dict[str, Any]:
+        nonzero = np.flatnonzero(self.counts)
+        return {
+            "min_value": self.min_value,
+            "max_value": self.max_value,
+            "relative_error": self.relative_error,
+            "count": self.count,
+            "total": self.total,
+            "min": self.min if self.count else None,
+            "max": self.max if self.count else None,
+            "buckets": {str(int(idx)): int(self.counts[idx]) for idx in nonzero},
+        }
+
+    @classmethod
+    def from_dict(cls, payload: dict[str, Any]) -> LatencyHistogram:
+        hist = cls(
+            min_value=float(payload["min_value"]),
+            max_value=float(payload["max_value"]),
+            relative_error=float(payload["relative_error"]),
+        )
+        for idx, count in payload["buckets"].items():
+            hist.counts[int(idx)] = int(count)
+        hist.count = int(payload["count"])
+        hist.total = float(payload["total"])
+        if hist.count:
+            hist.min = float(payload["min"])
+            hist.max = float(payload["max"])
+        return hist
+
+
+class LatencyAccumulator:
+    """Exact samples up to `exact_limit`, then the fixed-size `LatencyHistogram`.
+
+    `exact_limit=None` keeps every sample (exact nearest-rank percentiles); `0` uses the histogram
+    from the first sample so memory stays constant.
+    """
+
+    def __init__(self, exact_limit: int | None = None) -> None:
+        self.exact_limit = exact_limit
+        self._values: list[float] | None = [] if exact_limit != 0 else None
+        self.histogram = LatencyHistogram()
+
+    @property
+    def exact(self) -> bool:
+        return self._values is not None
+
+    @property
+    def count(self) -> int:
+        return len(self._values) if self._values is not None else self.histogram.count
+
+    @property
+    def max(self) -> float:
+        if self._values is not None:
+            return max(self._values, default=0.0)
+        return self.histogram.max if self.histogram.count else 0.0
+
+    def add(self, value: float) -> None:
+        if self._values is None:
+            self.histogram.record(value)
+            return
+        self._values.append(value)
+        if self.exact_limit is not None and len(self._values) > self.exact_limit:
+            self.histogram.record_many(self._values)
+            self._values = None
+
+    def add_many(self, values: Iterable[float]) -> None:
+        if self._values is None:
+            self.histogram.record_many(values)
+            return
+        self._values.extend(float(value) for value in values)
+        if self.exact_limit is not None and len(self._values) > self.exact_limit:
+            self.histogram.record_many(self._values)
+            self._values = None
+
+    def quantile(self, q: float, *, interpolate: bool = False) -> float:
+        """Nearest-rank quantile; `interpolate` instead interpolates linearly between the exact
+        samples (as pandas does). Once on the histogram both return the bucket estimate."""
+        if self._values is None:
+            return self.histogram.quantile(q)
+        if not self._values:
+            return 0.0
+        if interpolate:
+            return float(np.quantile(self._values, q))
+        ordered = sorted(self._values)
+        idx = max(0, min(int(round((len(ordered) - 1) * q)), len(ordered) - 1))
+        return ordered[idx]
+
+    def to_histogram(self) -> LatencyHistogram:
+        if self._values is None:
+            return self.histogram.copy()
+        hist = LatencyHistogram()
+        hist.record_many(self._values)
+        return hist
+
+
+class RowSample:
+    """Uniform sample of at most `size` numeric rows from data that arrives in chunks.
+
+    Each row draws a random key and the `size` smallest keys are kept (bottom-k sampling). Keys
+    come from one seeded stream in row order, so the sample does not depend on how the rows were
+    chunked. `size=None` keeps every row.
+    """
+
+    def __init__(self, width: int, size: int | None = None, seed: int = 0) -> None:
+        self.width = width
+        self.size = size
+        self._rng = np.random.default_rng(seed)
+        self._keys = np.empty(0)
+        self._parts: list[np.ndarray] = []
+
+    def add(self, rows: np.ndarray) -> None:
+        rows = np.asarray(rows, dtype=float).reshape(-1, self.width)
+        if not len(rows):
+            return
+        self._parts.append(rows)
+        if self.size is None:
+            return
+        keys = np.concatenate([self._keys, self._rng.random(len(rows))])
+        if len(keys) > self.size:
+            stacked = np.concatenate(self._parts)
+            keep = np.sort(np.argpartition(keys, self.size)[: self.size])
+            keys = keys[keep]
+            self._parts = [stacked[keep]]
+        self._keys = keys
+
+    @property
+    def rows(self) -> np.ndarray:
+        if not self._parts:
+            return np.empty((0, self.width))
+        return np.concatenate(self._parts)
+
+
+__all__ = ["LatencyAccumulator", "LatencyHistogram", "RowSample"]
@@ -0,0 +1,232 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any
+
+from qosflow.common.telemetry import RotatingCsvWriter, ServerRowPoller
+
+HOST_TELEMETRY_COLUMNS = [
+    "timestamp",
+    "process",
+    "pid",
+    "cpu_pct",
+    "rss_mb",
+    "threads",
+    "ctx_voluntary_s",
+    "ctx_involuntary_s",
+    "loop_lag_ms",
+    "load_1m",
+    "net_rx_bytes_s",
+    "net_tx_bytes_s",
+]
+
+
+def host_telemetry_segment_path(run_dir: Path, segment: int) -> Path:
+    return run_dir / f"host-telemetry-{segment:05d}.csv"
+
+
+@dataclass(frozen=True)
+class ProcCounters:
+    """Cumulative `/proc` counters for one process plus host-wide load and NIC bytes."""
+
+    at_s: float
+    pid: int
+    cpu_ticks: int
+    rss_kb: int
+    threads: int
+    ctx_voluntary: int
+    ctx_involuntary: int
+    load_1m: float
+    net_rx_bytes: int
+    net_tx_bytes: int
+
+
+def _net_bytes(proc_root: Path) -> tuple[int, int]:
+    rx_total = tx_total = 0
+    lines = (proc_root / "net" / "dev").read_text(encoding="utf-8").splitlines()
+    for line in lines[2:]:
+        iface, _, counters = line.partition(":")
+        if iface.strip() == "lo":
+            continue
+        fields = counters.split()
+        if len(fields) >= 9:
+            rx_total += int(fields[0])
+            tx_total += int(fields[8])
+    return rx_total, tx_total
+
+
+def read_proc_counters(pid: int | str = "self", proc_root: Path = Path("/proc")) -> ProcCounters:
+    """Read one snapshot of the counters `HostSampler` turns into rates. Raises OSError
+    where `/proc` is unavailable."""
+    at_s = time.monotonic()
+    process_dir = proc_root / str(pid)
+    stat = (process_dir / "stat").read_text(encoding="utf-8")
+    # The command name may contain spaces and parentheses; fields resume after the last ')'.
+    fields = stat[stat.rindex(")") + 2 :].split()
+    status: dict[str, str] = {}
+    for line in (process_dir / "status").read_text(encoding="utf-8").splitlines():
+        key, _, value = line.partition(":")
+        status[key] = value.strip()
+    rx_bytes, tx_bytes = _net_bytes(proc_root)
+    return ProcCounters(
+        at_s=at_s,
+        pid=int(stat.split(maxsplit=1)[0]),
+        cpu_ticks=int(fields[11]) + int(fields[12]),
+        rss_kb=int(status.get("VmRSS", "0 kB").split()[0]),
+        threads=int(fields[17]),
+        ctx_voluntary=int(status.get("voluntary_ctxt_switches", "0")),
+        ctx_involuntary=int(status.get("nonvoluntary_ctxt_switches", "0")),
+        load_1m=float((proc_root / "loadavg").read_text(encoding="utf-8").split()[0]),
+        net_rx_bytes=rx_bytes,
+        net_tx_bytes=tx_bytes,
+    )
+
+
+class LoopLagMonitor:
+    """Measure event-loop lag as how late a periodic `asyncio.sleep` wakes up.
+
+    `run` must be scheduled on the loop being measured; `take_peak_ms` may be called from any
+    thread and returns the worst lag since the previous call.
+    """
+
+    def __init__(self, interval_s: float = 0.05) -> None:
+        self.interval_s = interval_s
+        self._peak_s: float | None = None
+
+    async def run(self) -> None:
+        while True:
+            started = time.monotonic()
+            await asyncio.sleep(self.interval_s)
+            lag_s = max(time.monotonic() - started - self.interval_s, 0.0)
+            peak_s = self._peak_s
+            self._peak_s = lag_s if peak_s is None else max(peak_s, lag_s)
+
+    def take_peak_ms(self) -> float | None:
+        peak_s, self._peak_s = self._peak_s, None
+        return peak_s * 1000.0 if peak_s is not None else None
+
+
+class HostSampler:
+    """Turn successive `/proc` snapshots of one process into a `HOST_TELEMETRY_COLUMNS` row.
+
+    Rates cover the time since the previous `sample` call, so the first row only carries the
+    instantaneous fields (RSS, threads, load).
+    """
+
+    def __init__(
+        self,
+        process: str,
+        *,
+        pid: int | str = "self",
+        proc_root: Path = Path("/proc"),
+        loop_lag: LoopLagMonitor | None = None,
+        clock_ticks: int | None = None,
+    ) -> None:
+        self.process = process
+        self.pid = pid
+        self.proc_root = proc_root
+        self.loop_lag = loop_lag
+        self._clock_ticks = clock_ticks or os.sysconf("SC_CLK_TCK")
+        self._previous: ProcCounters | None = None
+
+    def sample(self, timestamp: str | None = None) -> dict[str, Any] | None:
+        """Return one row, or None where `/proc` cannot be read."""
+        try:
+            current = read_proc_counters(self.pid, self.proc_root)
+        except (OSError, ValueError, IndexError):
+            return None
+        previous, self._previous = self._previous, current
+        row: dict[str, Any] = {
+            "timestamp": timestamp or datetime.now(tz=timezone.utc).isoformat(),
+            "process": self.process,
+            "pid": current.pid,
+            "cpu_pct": None,
+            "rss_mb": current.rss_kb / 1024.0,
+            "threads": current.threads,
+            "ctx_voluntary_s": None,
+            "ctx_involuntary_s": None,
+            "loop_lag_ms": self.loop_lag.take_peak_ms() if self.loop_lag is not None else None,
+            "load_1m": current.load_1m,
+            "net_rx_bytes_s": None,
+            "net_tx_bytes_s": None,
+        }
+        elapsed_s = current.at_s - previous.at_s if previous is not None else 0.0
+        if previous is not None and elapsed_s > 0:
+            cpu_s = (current.cpu_ticks - previous.cpu_ticks) / self._clock_ticks
+            row["cpu_pct"] = 100.0 * cpu_s / elapsed_s
+            row["ctx_voluntary_s"] = (current.ctx_voluntary - previous.ctx_voluntary) / elapsed_s
+            row["ctx_involuntary_s"] = (
+                current.ctx_involuntary - previous.ctx_involuntary
+            ) / elapsed_s
+            row["net_rx_bytes_s"] = (current.net_rx_bytes - previous.net_rx_bytes) / elapsed_s
+            row["net_tx_bytes_s"] = (current.net_tx_bytes - previous.net_tx_bytes) / elapsed_s
+        return row
+
+
+class HostTelemetryRecorder:
+    """Write host rows for the loadgen (and, optionally, the server) on each telemetry tick.
+
+    Called from the GPU sampler's thread with that tick's timestamp, so host and GPU rows line up
+    exactly. The local `/proc` read happens on that thread; the server's row comes from its
+    `GET /telemetry/host` on a `ServerRowPoller` thread and is stamped with the same tick. The
+    first failed fetch turns server sampling off for the rest of the run.
+    """
+
+    def __init__(
+        self,
+        stream: RotatingCsvWriter,
+        local: HostSampler,
+        *,
+        server_url: str | None = None,
+        timeout_s: float = 1.0,
+    ) -> None:
+        self.stream = stream
+        self.local = local
+        # Local and server rows arrive from different threads.
+        self._lock = threading.Lock()
+        self._server = (
+            ServerRowPoller(
+                server_url, "/telemetry/host", self._write_server_row, timeout_s=timeout_s
+            )
+            if server_url is not None
+            else None
+        )
+
+    def _write(self, row: dict[str, Any]) -> None:
+        with self._lock:
+            self.stream.write_row(row)
+
+    def _write_server_row(self, timestamp: str, server_row: dict[str, Any]) -> None:
+        self._write(
+            {key: server_row.get(key) for key in HOST_TELEMETRY_COLUMNS} | {"timestamp": timestamp}
+        )
+
+    def __call__(self, timestamp: str) -> None:
+        row = self.local.sample(timestamp)
+        if row is not None:
+            self._write(row)
+        if self._server is not None:
+            self._server.submit(timestamp)
+
+    def close(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            self._server = None
+        self.stream.close()
+
+
+__all__ = [
+    "HOST_TELEMETRY_COLUMNS",
+    "HostSampler",
+    "HostTelemetryRecorder",
+    "LoopLagMonitor",
+    "ProcCounters",
+    "host_telemetry_segment_path",
+    "read_proc_counters",
+]
@@ -1,11 +1,18 @@
 from __future__ import annotations
 
+import gzip
+import io
 import json
+import os
 from pathlib import Path
-from typing import Any, Iterable
+from typing import IO, Any, Iterable, Iterator, Literal
 
 import yaml
 
+Compression = Literal["none", "gzip", "zstd"]
+
+_COMPRESSION_SUFFIXES: dict[Compression, str] = {"none": "", "gzip": ".gz", "zstd": ".zst"}
+
 
 def load_yaml(path: str | Path) -> dict[str, Any]:
     with Path(path).open("r", encoding="utf-8") as f:
@@ -18,20 +25,69 @@ def ensure_dir(path: str | Path) -> Path:
     return directory
 
 
+def compression_suffix(compression: Compression) -> str:
+    return _COMPRESSION_SUFFIXES[compression]
+
+
+def _compression_for_path(path: Path) -> Compression:
+    if path.suffix == ".gz":
+        return "gzip"
+    if path.suffix == ".zst":
+        return "zstd"
+    return "none"
+
+
+def _zstandard() -> Any:
+    try:
+        import zstandard  # type: ignore
+    except ImportError as exc:
+        raise RuntimeError("zstd compression requires the 'zstandard' package") from exc
+    return zstandard
+
+
+def open_text(path: str | Path, mode: Literal["r", "w", "a"] = "r") -> IO[str]:
+    """Open a text file, transparently (de)compressing based on the `.gz`/`.zst` suffix."""
+    file_path = Path(path)
+    compression = _compression_for_path(file_path)
+    if compression == "gzip":
+        return io.TextIOWrapper(gzip.GzipFile(file_path, mode), encoding="utf-8")
+    if compression == "zstd":
+        zstandard = _zstandard()
+        if mode == "r":
+            raw: IO[bytes] = zstandard.ZstdDecompressor().stream_reader(file_path.open("rb"))
+        else:
+            raw = zstandard.ZstdCompressor().stream_writer(file_path.open(mode + "b"))
+        return io.TextIOWrapper(raw, encoding="utf-8")
+    return file_path.open(mode, encoding="utf-8")
+
+
 def write_jsonl(path: str | Path, rows: Iterable[dict[str, Any]]) -> None:
     output_path = Path(path)
     ensure_dir(output_path.parent)
-    with output_path.open("w", encoding="utf-8") as f:
+    with open_text(output_path, "w") as f:
         for row in rows:
             f.write(json.dumps(row, ensure_ascii=False) + "\n")
 
 
-def read_jsonl(path: str | Path) -> list[dict[str, Any]]:
-    rows: list[dict[str, Any]] = []
-    with Path(path).open("r", encoding="utf-8") as f:
+def iter_jsonl(path: str | Path) -> Iterator[dict[str, Any]]:
+    with open_text(path, "r") as f:
         for line in f:
             line = line.strip()
             if not line:
                 continue
-            rows.append(dict(json.loads(line)))
-    return rows
+            yield dict(json.loads(line))
+
+
+def read_jsonl(path: str | Path) -> list[dict[str, Any]]:
+    return list(iter_jsonl(path))
+
+
+def write_json_atomic(path: str | Path, payload: Any) -> None:
+    """Write JSON via a temp file + rename so readers never see a partial document."""
+    target = Path(path)
+    tmp_path = target.with_name(f".{target.name}.tmp")
+    with tmp_path.open("w", encoding="utf-8") as handle:
+        json.dump(payload, handle, indent=2, sort_keys=True)
+        handle.flush()
+        os.fsync(handle.fileno())
+    os.replace(tmp_path, target)
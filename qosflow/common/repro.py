@@ -5,7 +5,7 @@ import platform
 import random
 import subprocess
 import sys
-from datetime import UTC, datetime
+from datetime import datetime, timezone
 from importlib.metadata import PackageNotFoundError, version
 from pathlib import Path
 from typing import Any
@@ -88,7 +88,7 @@ def set_reproducible(seed: int) -> None:
 
 def write_manifest(path: Path, *, config: dict[str, Any]) -> None:
     payload = {
-        "timestamp": datetime.now(tz=UTC).isoformat(),
+        "timestamp": datetime.now(tz=timezone.utc).isoformat(),
         "git_sha": get_git_sha(),
         "config": config,
         "env_fingerprint": get_env_fingerprint(),
@@ -97,9 +97,17 @@ def write_manifest(path: Path, *, config: dict[str, Any]) -> None:
     path.write_text(json.dumps(payload, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
 
 
+def update_manifest(path: Path, **fields: Any) -> None:
+    """Add run-time results (known only after the run) to an existing manifest."""
+    payload = json.loads(path.read_text(encoding="utf-8"))
+    payload.update(fields)
+    path.write_text(json.dumps(payload, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+
+
 __all__ = [
     "get_env_fingerprint",
     "get_git_sha",
     "set_reproducible",
+    "update_manifest",
     "write_manifest",
 ]
@@ -15,6 +15,7 @@ class PromptRecord(StrictBaseModel):
     tags: list[str] = Field(default_factory=list)
     expected: str | None = None
     length_bucket: Literal["short", "med", "long"] | None = None
+    len_tokens: int | None = None
 
 
 class TraceParams(StrictBaseModel):
@@ -44,6 +45,7 @@ class TraceSystem(StrictBaseModel):
     network_rtt_ms: float | None = None
     server_queue_ms: float | None = None
     server_compute_ms: float | None = None
+    clock_offset_ns: int | None = None
 
 
 class TraceRecord(StrictBaseModel):
@@ -67,6 +69,10 @@ class TraceRecord(StrictBaseModel):
     prompt_len_chars: int
     output_len_chars: int
     output_text: str
+    prompt_len_tokens: int | None = None
+    tenant: str | None = None
+    slo_ms: float | None = None
+    outcome: Literal["completed", "failed", "dropped", "expired"] | None = None
 
     @model_validator(mode="after")
     def validate_timing(self) -> "TraceRecord":
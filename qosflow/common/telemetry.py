@@ -2,68 +2,313 @@ from __future__ import annotations
 
 import asyncio
 import csv
+import math
 import subprocess
-from datetime import UTC, datetime
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
 from pathlib import Path
-from typing import Any
+from typing import IO, Any, Callable
+
+import httpx
+
+# Long format: one row per visible device per tick, all sharing the tick's `timestamp`.
+TELEMETRY_COLUMNS = [
+    "timestamp",
+    "gpu_index",
+    "gpu_util",
+    "mem_util",
+    "mem_used_mb",
+    "mem_total_mb",
+    "power_w",
+    "temp_c",
+    "sm_clock_mhz",
+    "mem_clock_mhz",
+    "throttle_reasons",
+    "pcie_tx_mbps",
+    "pcie_rx_mbps",
+    "enc_util",
+    "dec_util",
+    "sample_lag_ms",
+]
+
+# nvidia-smi has no PCIe throughput or (on older drivers) encoder/decoder fields; those stay empty.
+_NVIDIA_SMI_QUERY = (
+    "index",
+    "utilization.gpu",
+    "utilization.memory",
+    "memory.used",
+    "memory.total",
+    "power.draw",
+    "temperature.gpu",
+    "clocks.sm",
+    "clocks.mem",
+    "clocks_throttle_reasons.active",
+)
+
+TelemetryRow = dict[str, float | int | str | None]
+
+
+def telemetry_segment_path(run_dir: Path, segment: int) -> Path:
+    return run_dir / f"telemetry-{segment:05d}.csv"
+
+
+class RotatingCsvWriter:
+    """Append rows to `path_for(index)`, starting a new file (with header) by size or age."""
+
+    def __init__(
+        self,
+        path_for: Callable[[int], Path],
+        fieldnames: list[str],
+        *,
+        rotate_bytes: int | None = None,
+        rotate_s: float | None = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._path_for = path_for
+        self.fieldnames = fieldnames
+        self.rotate_bytes = rotate_bytes
+        self.rotate_s = rotate_s
+        self._clock = clock
+        self.paths: list[Path] = []
+        self._handle: IO[str] | None = None
+        self._writer: csv.DictWriter[str] | None = None
+        self._opened_at = 0.0
+
+    def _open_next(self) -> None:
+        self.close()
+        path = self._path_for(len(self.paths))
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._handle = path.open("w", encoding="utf-8", newline="")
+        self._writer = csv.DictWriter(self._handle, fieldnames=self.fieldnames)
+        self._writer.writeheader()
+        self.paths.append(path)
+        self._opened_at = self._clock()
+
+    def _due(self) -> bool:
+        assert self._handle is not None
+        if self.rotate_s is not None and self._clock() - self._opened_at >= self.rotate_s:
+            return True
+        return self.rotate_bytes is not None and self._handle.tell() >= self.rotate_bytes
+
+    def write_row(self, row: dict[str, Any]) -> None:
+        if self._handle is None or self._due():
+            self._open_next()
+        assert self._writer is not None and self._handle is not None
+        self._writer.writerow(row)
+        # Rows are rare (one per sample) and must survive a crash, so flush each one.
+        self._handle.flush()
+
+    def close(self) -> None:
+        if self._handle is not None:
+            self._handle.close()
+            self._handle = None
+            self._writer = None
+
+
+class ServerRowPoller:
+    """Fetch one JSON row from the server's `path` per telemetry tick, on a dedicated thread.
+
+    `submit` only hands the tick's timestamp to the polling thread, so the GPU sampler never
+    waits on the network. A tick submitted while a fetch is in flight replaces any tick still
+    waiting (`skipped` counts them). Non-empty rows go to `on_row` with their tick's timestamp;
+    the first failed fetch stops polling for the rest of the run.
+    """
+
+    def __init__(
+        self,
+        server_url: str,
+        path: str,
+        on_row: Callable[[str, dict[str, Any]], None],
+        *,
+        timeout_s: float = 1.0,
+    ) -> None:
+        self.path = path
+        self.skipped = 0
+        self._on_row = on_row
+        self._client = httpx.Client(base_url=server_url, timeout=timeout_s)
+        self._wake = threading.Condition()
+        self._pending: str | None = None
+        self._closing = False
+        self._failed = False
+        self._thread = threading.Thread(
+            target=self._run, name=f"poll{path.replace('/', '-')}", daemon=True
+        )
+        self._thread.start()
+
+    def submit(self, timestamp: str) -> None:
+        with self._wake:
+            if self._closing or self._failed:
+                return
+            if self._pending is not None:
+                self.skipped += 1
+            self._pending = timestamp
+            self._wake.notify()
+
+    def _run(self) -> None:
+        while True:
+            with self._wake:
+                while self._pending is None and not self._closing:
+                    self._wake.wait()
+                # A tick submitted before `close` is still fetched.
+                if self._pending is None:
+                    return
+                timestamp, self._pending = self._pending, None
+            try:
+                response = self._client.get(self.path)
+                response.raise_for_status()
+                row = response.json()
+            except (httpx.HTTPError, ValueError):
+                with self._wake:
+                    self._failed = True
+                    self._pending = None
+                return
+            if row:
+                self._on_row(timestamp, row)
+
+    def close(self) -> None:
+        with self._wake:
+            self._closing = True
+            self._wake.notify()
+        self._thread.join()
+        self._client.close()
+
+
+@dataclass(frozen=True)
+class SamplerStats:
+    """How well the sampler kept its cadence: `overruns` counts ticks it had to skip."""
+
+    backend: str
+    samples: int
+    overruns: int
+    lag_ms_mean: float
+    lag_ms_max: float
 
 
 class NVMLSampler:
-    def __init__(self, telemetry_interval_s: float = 0.5, gpu_index: int = 0) -> None:
+    """Sample GPU telemetry for every visible device on an interval from a dedicated thread.
+
+    With pynvml the thread polls all devices on a fixed-rate schedule; otherwise it runs one
+    long-lived `nvidia-smi --loop-ms` child and parses its output line by line, so the event loop
+    never blocks on a sample. Rows are appended to `stream` as they arrive (or kept in memory for
+    `write_csv` when no stream is given). `sample_lag_ms` records how late each tick was.
+    `gpu_index` restricts sampling to one device.
+
+    `on_tick`, if given, is called on the sampler thread with each tick's timestamp so other
+    samplers can share it; without any GPU backend the thread keeps ticking for it alone.
+    """
+
+    def __init__(
+        self,
+        telemetry_interval_s: float = 0.5,
+        gpu_index: int | None = None,
+        stream: RotatingCsvWriter | None = None,
+        nvidia_smi: str = "nvidia-smi",
+        on_tick: Callable[[str], None] | None = None,
+    ) -> None:
         self.telemetry_interval_s = telemetry_interval_s
         self.gpu_index = gpu_index
-        self._samples: list[dict[str, float | str | None]] = []
-        self._task: asyncio.Task[None] | None = None
-        self._running = False
-        self._nvml_handle: Any | None = None
-        self._nvml = None
+        self.stream = stream
+        self.nvidia_smi = nvidia_smi
+        self.on_tick = on_tick
+        self._samples: list[TelemetryRow] = []
+        self._thread: threading.Thread | None = None
+        self._stop = threading.Event()
+        self._process: subprocess.Popen[str] | None = None
+        self._nvml_handles: list[tuple[int, Any]] = []
+        self._nvml: Any = None
+        self._count = 0
+        self._overruns = 0
+        self._lag_s_total = 0.0
+        self._lag_s_max = 0.0
         self._backend = self._init_backend()
 
     @property
-    def samples(self) -> list[dict[str, float | str | None]]:
+    def samples(self) -> list[TelemetryRow]:
         return list(self._samples)
 
+    @property
+    def stats(self) -> SamplerStats:
+        return SamplerStats(
+            backend=self._backend,
+            samples=self._count,
+            overruns=self._overruns,
+            lag_ms_mean=self._lag_s_total / self._count * 1000.0 if self._count else 0.0,
+            lag_ms_max=self._lag_s_max * 1000.0,
+        )
+
     def _init_backend(self) -> str:
         try:
             import pynvml  # type: ignore
 
             pynvml.nvmlInit()
+            indices = (
+                [self.gpu_index]
+                if self.gpu_index is not None
+                else range(pynvml.nvmlDeviceGetCount())
+            )
+            self._nvml_handles = [
+                (index, pynvml.nvmlDeviceGetHandleByIndex(index)) for index in indices
+            ]
             self._nvml = pynvml
-            self._nvml_handle = pynvml.nvmlDeviceGetHandleByIndex(self.gpu_index)
             return "pynvml"
         except Exception:  # noqa: BLE001
             self._nvml = None
-            self._nvml_handle = None
+            self._nvml_handles = []
             return "nvidia-smi"
 
-    def _sample_pynvml(self) -> dict[str, float | str | None]:
-        assert self._nvml is not None
-        assert self._nvml_handle is not None
-
-        util = self._nvml.nvmlDeviceGetUtilizationRates(self._nvml_handle)
-        mem = self._nvml.nvmlDeviceGetMemoryInfo(self._nvml_handle)
-        temp_c = float(
-            self._nvml.nvmlDeviceGetTemperature(
-                self._nvml_handle,
-                self._nvml.NVML_TEMPERATURE_GPU,
-            )
-        )
-        power_w: float | None = None
+    def _optional(self, read: Callable[[], Any], scale: float = 1.0) -> float | None:
+        # Extended counters are missing on many boards and drivers; a gap beats a dead sampler.
         try:
-            power_mw = self._nvml.nvmlDeviceGetPowerUsage(self._nvml_handle)
-            power_w = float(power_mw) / 1000.0
+            return float(read()) * scale
         except Exception:  # noqa: BLE001
-            power_w = None
+            return None
 
+    def _sample_device(self, index: int, handle: Any) -> TelemetryRow:
+        nvml = self._nvml
+        util = nvml.nvmlDeviceGetUtilizationRates(handle)
+        mem = nvml.nvmlDeviceGetMemoryInfo(handle)
+        throttle = getattr(
+            nvml,
+            "nvmlDeviceGetCurrentClocksThrottleReasons",
+            getattr(nvml, "nvmlDeviceGetCurrentClocksEventReasons", None),
+        )
+        throttle_reasons = (
+            self._optional(lambda: throttle(handle)) if throttle is not None else None
+        )
         return {
-            "timestamp": datetime.now(tz=UTC).isoformat(),
+            "gpu_index": index,
             "gpu_util": float(util.gpu),
+            "mem_util": float(util.memory),
             "mem_used_mb": float(mem.used) / (1024.0 * 1024.0),
             "mem_total_mb": float(mem.total) / (1024.0 * 1024.0),
-            "power_w": power_w,
-            "temp_c": temp_c,
+            "power_w": self._optional(lambda: nvml.nvmlDeviceGetPowerUsage(handle), 1 / 1000.0),
+            "temp_c": float(nvml.nvmlDeviceGetTemperature(handle, nvml.NVML_TEMPERATURE_GPU)),
+            "sm_clock_mhz": self._optional(
+                lambda: nvml.nvmlDeviceGetClockInfo(handle, nvml.NVML_CLOCK_SM)
+            ),
+            "mem_clock_mhz": self._optional(
+                lambda: nvml.nvmlDeviceGetClockInfo(handle, nvml.NVML_CLOCK_MEM)
+            ),
+            "throttle_reasons": int(throttle_reasons) if throttle_reasons is not None else None,
+            # NVML reports PCIe throughput in KB/s.
+            "pcie_tx_mbps": self._optional(
+                lambda: nvml.nvmlDeviceGetPcieThroughput(handle, nvml.NVML_PCIE_UTIL_TX_BYTES),
+                1 / 1000.0,
+            ),
+            "pcie_rx_mbps": self._optional(
+                lambda: nvml.nvmlDeviceGetPcieThroughput(handle, nvml.NVML_PCIE_UTIL_RX_BYTES),
+                1 / 1000.0,
+            ),
+            "enc_util": self._optional(lambda: nvml.nvmlDeviceGetEncoderUtilization(handle)[0]),
+            "dec_util": self._optional(lambda: nvml.nvmlDeviceGetDecoderUtilization(handle)[0]),
         }
 
+    def _sample_pynvml(self) -> list[TelemetryRow]:
+        assert self._nvml is not None
+        return [self._sample_device(index, handle) for index, handle in self._nvml_handles]
+
     def _to_float(self, value: str) -> float | None:
         cleaned = value.strip()
         if not cleaned or cleaned.lower() in {"n/a", "not supported", "[not supported]"}:
@@ -73,62 +318,144 @@ class NVMLSampler:
         except ValueError:
             return None
 
-    def _sample_nvidia_smi(self) -> dict[str, float | str | None] | None:
-        cmd = [
-            "nvidia-smi",
-            f"--id={self.gpu_index}",
-            "--query-gpu=utilization.gpu,memory.used,memory.total,power.draw,temperature.gpu",
-            "--format=csv,noheader,nounits",
-        ]
-        try:
-            result = subprocess.run(cmd, capture_output=True, check=True, text=True)
-        except Exception:  # noqa: BLE001
-            return None
-
-        line = result.stdout.strip().splitlines()[0] if result.stdout.strip() else ""
-        if not line:
+    def _parse_nvidia_smi(self, line: str) -> TelemetryRow | None:
+        parts = [part.strip() for part in line.strip().split(",")]
+        if len(parts) < len(_NVIDIA_SMI_QUERY):
             return None
-
-        parts = [part.strip() for part in line.split(",")]
-        if len(parts) < 5:
+        index = self._to_float(parts[0])
+        if index is None:
             return None
-
+        throttle = parts[9]
         return {
-            "timestamp": datetime.now(tz=UTC).isoformat(),
-            "gpu_util": self._to_float(parts[0]),
-            "mem_used_mb": self._to_float(parts[1]),
-            "mem_total_mb": self._to_float(parts[2]),
-            "power_w": self._to_float(parts[3]),
-            "temp_c": self._to_float(parts[4]),
+            "gpu_index": int(index),
+            "gpu_util": self._to_float(parts[1]),
+            "mem_util": self._to_float(parts[2]),
+            "mem_used_mb": self._to_float(parts[3]),
+            "mem_total_mb": self._to_float(parts[4]),
+            "power_w": self._to_float(parts[5]),
+            "temp_c": self._to_float(parts[6]),
+            "sm_clock_mhz": self._to_float(parts[7]),
+            "mem_clock_mhz": self._to_float(parts[8]),
+            "throttle_reasons": int(throttle, 16) if throttle.startswith("0x") else None,
+            "pcie_tx_mbps": None,
+            "pcie_rx_mbps": None,
+            "enc_util": None,
+            "dec_util": None,
         }
 
-    def _sample_once(self) -> dict[str, float | str | None] | None:
-        if self._backend == "pynvml" and self._nvml is not None:
+    def _begin_tick(self, lag_s: float, *, has_gpu: bool) -> str:
+        timestamp = datetime.now(tz=timezone.utc).isoformat()
+        if has_gpu:
+            self._count += 1
+            self._lag_s_total += lag_s
+            self._lag_s_max = max(self._lag_s_max, lag_s)
+        if self.on_tick is not None:
             try:
-                return self._sample_pynvml()
+                self.on_tick(timestamp)
             except Exception:  # noqa: BLE001
-                self._backend = "nvidia-smi"
+                pass
+        return timestamp
+
+    def _write(self, row: TelemetryRow, timestamp: str, lag_s: float) -> None:
+        row = {"timestamp": timestamp, **row, "sample_lag_ms": lag_s * 1000.0}
+        if self.stream is not None:
+            self.stream.write_row(row)
+        else:
+            self._samples.append(row)
 
-        return self._sample_nvidia_smi()
+    def _run_fixed_rate(self) -> None:
+        interval_s = self.telemetry_interval_s
+        due = time.monotonic()
+        while not self._stop.is_set():
+            lag_s = max(time.monotonic() - due, 0.0)
+            rows: list[TelemetryRow] = []
+            if self._backend == "pynvml":
+                try:
+                    rows = self._sample_pynvml()
+                except Exception:  # noqa: BLE001
+                    self._backend = "nvidia-smi"
+                    return
+            timestamp = self._begin_tick(lag_s, has_gpu=bool(rows))
+            for row in rows:
+                self._write(row, timestamp, lag_s)
+            due += interval_s
+            behind_s = time.monotonic() - due
+            if behind_s > 0:
+                # Sampling took longer than the interval: skip the missed ticks, don't burst.
+                missed = math.ceil(behind_s / interval_s)
+                self._overruns += missed
+                due += missed * interval_s
+            self._stop.wait(max(due - time.monotonic(), 0.0))
 
-    async def _run(self) -> None:
-        while self._running:
-            sample = self._sample_once()
-            if sample is not None:
-                self._samples.append(sample)
-            await asyncio.sleep(self.telemetry_interval_s)
+    def _run_nvidia_smi(self) -> None:
+        interval_s = self.telemetry_interval_s
+        cmd = [self.nvidia_smi]
+        if self.gpu_index is not None:
+            cmd.append(f"--id={self.gpu_index}")
+        cmd += [
+            f"--query-gpu={','.join(_NVIDIA_SMI_QUERY)}",
+            "--format=csv,noheader,nounits",
+            f"--loop-ms={max(1, round(interval_s * 1000))}",
+        ]
+        try:
+            process = subprocess.Popen(
+                cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True, bufsize=1
+            )
+        except OSError:
+            self._backend = "none"
+            return
+        self._process = process
+        if self._stop.is_set():
+            process.terminate()
+        assert process.stdout is not None
+        previous: float | None = None
+        last_index: int | None = None
+        timestamp = ""
+        lag_s = 0.0
+        for line in process.stdout:
+            row = self._parse_nvidia_smi(line)
+            if row is None:
+                continue
+            index = int(row["gpu_index"])  # type: ignore[arg-type]
+            # Each loop prints devices in ascending order; a repeated index starts the next tick.
+            if last_index is None or index <= last_index:
+                now = time.monotonic()
+                # nvidia-smi keeps its own cadence; lateness shows up as a longer gap.
+                lag_s = max(now - previous - interval_s, 0.0) if previous is not None else 0.0
+                self._overruns += int(lag_s // interval_s) if interval_s > 0 else 0
+                previous = now
+                timestamp = self._begin_tick(lag_s, has_gpu=True)
+            last_index = index
+            self._write(row, timestamp, lag_s)
+        process.wait()
+        if not self._stop.is_set():
+            # nvidia-smi exited on its own (no driver or GPU).
+            self._backend = "none"
+
+    def _run(self) -> None:
+        if self._backend == "pynvml":
+            self._run_fixed_rate()
+        if self._backend == "nvidia-smi" and not self._stop.is_set():
+            self._run_nvidia_smi()
+        if self._backend == "none" and self.on_tick is not None and not self._stop.is_set():
+            self._run_fixed_rate()
 
     def start(self) -> None:
-        if self._task is not None:
+        if self._thread is not None:
             return
-        self._running = True
-        self._task = asyncio.create_task(self._run())
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="nvml-sampler", daemon=True)
+        self._thread.start()
 
     async def stop(self) -> None:
-        self._running = False
-        if self._task is not None:
-            await self._task
-            self._task = None
+        self._stop.set()
+        if self._process is not None and self._process.poll() is None:
+            self._process.terminate()
+        if self._thread is not None:
+            await asyncio.to_thread(self._thread.join)
+            self._thread = None
+        if self.stream is not None:
+            self.stream.close()
         if self._nvml is not None:
             try:
                 self._nvml.nvmlShutdown()
@@ -138,19 +465,17 @@ class NVMLSampler:
     def write_csv(self, path: Path) -> None:
         path.parent.mkdir(parents=True, exist_ok=True)
         with path.open("w", encoding="utf-8", newline="") as handle:
-            writer = csv.DictWriter(
-                handle,
-                fieldnames=[
-                    "timestamp",
-                    "gpu_util",
-                    "mem_used_mb",
-                    "mem_total_mb",
-                    "power_w",
-                    "temp_c",
-                ],
-            )
+            writer = csv.DictWriter(handle, fieldnames=TELEMETRY_COLUMNS)
             writer.writeheader()
             writer.writerows(self._samples)
 
 
-__all__ = ["NVMLSampler"]
+__all__ = [
+    "NVMLSampler",
+    "RotatingCsvWriter",
+    "SamplerStats",
+    "ServerRowPoller",
+    "TELEMETRY_COLUMNS",
+    "TelemetryRow",
+    "telemetry_segment_path",
+]
@@ -0,0 +1,251 @@
+from __future__ import annotations
+
+import json
+import os
+import types
+from collections.abc import Callable, Iterable, Iterator, Mapping, Sequence
+from pathlib import Path
+from typing import Any, Literal, Union, get_args, get_origin
+
+from pydantic import BaseModel
+
+from qosflow.common.io import Compression, ensure_dir, iter_jsonl
+from qosflow.common.schema import TraceRecord
+
+ColumnKind = Literal["int", "float", "str", "bool", "json"]
+
+
+def _pyarrow() -> Any:
+    try:
+        import pyarrow  # type: ignore
+        import pyarrow.parquet  # type: ignore  # noqa: F401
+    except ImportError as exc:
+        raise RuntimeError("Parquet traces require the 'pyarrow' package") from exc
+    return pyarrow
+
+
+def _column_kind(annotation: Any) -> ColumnKind | type[BaseModel]:
+    origin = get_origin(annotation)
+    if origin in (Union, types.UnionType):
+        args = [arg for arg in get_args(annotation) if arg is not type(None)]
+        return _column_kind(args[0])
+    if origin is Literal:
+        return _column_kind(type(get_args(annotation)[0]))
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return annotation
+    if annotation is bool:
+        return "bool"
+    if annotation is int:
+        return "int"
+    if annotation is float:
+        return "float"
+    if annotation is str:
+        return "str"
+    return "json"
+
+
+def trace_columns(model: type[BaseModel] = TraceRecord, prefix: str = "") -> dict[str, ColumnKind]:
+    """Flattened `TraceRecord` columns, named like `pd.json_normalize` output (`system.error`)."""
+    columns: dict[str, ColumnKind] = {}
+    for name, field in model.model_fields.items():
+        kind = _column_kind(field.annotation)
+        if isinstance(kind, type):
+            columns.update(trace_columns(kind, prefix=f"{prefix}{name}."))
+        else:
+            columns[f"{prefix}{name}"] = kind
+    return columns
+
+
+TRACE_COLUMNS = trace_columns()
+_JSON_COLUMNS = frozenset(name for name, kind in TRACE_COLUMNS.items() if kind == "json")
+
+
+def flatten_trace_row(row: Mapping[str, Any], prefix: str = "") -> dict[str, Any]:
+    flat: dict[str, Any] = {}
+    for key, value in row.items():
+        name = f"{prefix}{key}"
+        if name in _JSON_COLUMNS:
+            flat[name] = None if value is None else json.dumps(value, ensure_ascii=False)
+        elif isinstance(value, Mapping):
+            flat.update(flatten_trace_row(value, prefix=f"{name}."))
+        else:
+            flat[name] = value
+    return flat
+
+
+def _arrow_schema(first_rows: Sequence[dict[str, Any]]) -> Any:
+    pa = _pyarrow()
+    kinds = {
+        "int": pa.int64(),
+        "float": pa.float64(),
+        "str": pa.string(),
+        "bool": pa.bool_(),
+        "json": pa.string(),
+    }
+    fields = [pa.field(name, kinds[kind]) for name, kind in TRACE_COLUMNS.items()]
+    # Keep extra columns found in legacy/annotated traces (e.g. `expected`).
+    extras: dict[str, list[Any]] = {}
+    for row in first_rows:
+        for name, value in row.items():
+            if name not in TRACE_COLUMNS:
+                extras.setdefault(name, []).append(value)
+    for name, values in extras.items():
+        inferred = pa.array(values).type
+        fields.append(pa.field(name, pa.string() if pa.types.is_null(inferred) else inferred))
+    return pa.schema(fields)
+
+
+class ParquetTraceSink:
+    """Write flattened trace rows to Parquet, one row group per `row_group_size` rows.
+
+    The schema is fixed by `TraceRecord` plus any extra keys seen in the first batch. Parquet
+    cannot expose a partial row group, so `flush` is a no-op and rows become readable once a row
+    group fills or the sink is closed.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        *,
+        compression: Compression = "none",
+        row_group_size: int = 10_000,
+    ) -> None:
+        if row_group_size <= 0:
+            raise ValueError("row_group_size must be > 0")
+        self.path = path
+        self.compression = compression
+        self.row_group_size = row_group_size
+        self._buffer: list[dict[str, Any]] = []
+        self._schema: Any | None = None
+        self._writer: Any | None = None
+
+    def open(self) -> None:
+        _pyarrow()
+        ensure_dir(self.path.parent)
+
+    def _write_row_group(self, rows: list[dict[str, Any]]) -> None:
+        pa = _pyarrow()
+        if self._schema is None:
+            self._schema = _arrow_schema(rows)
+        if self._writer is None:
+            self._writer = pa.parquet.ParquetWriter(
+                str(self.path), self._schema, compression=self.compression
+            )
+        self._writer.write_table(pa.Table.from_pylist(rows, schema=self._schema))
+
+    def write(self, batch: list[dict[str, Any]]) -> None:
+        self._buffer.extend(flatten_trace_row(row) for row in batch)
+        while len(self._buffer) >= self.row_group_size:
+            rows = self._buffer[: self.row_group_size]
+            del self._buffer[: self.row_group_size]
+            self._write_row_group(rows)
+
+    def flush(self) -> None:
+        return None
+
+    def close(self) -> None:
+        if self._buffer or self._writer is None:
+            self._write_row_group(self._buffer)
+            self._buffer = []
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+
+def parquet_trace_path(run_dir: Path, segment: int | None = None) -> Path:
+    if segment is None:
+        return run_dir / "trace.parquet"
+    return run_dir / f"trace-{segment:05d}.parquet"
+
+
+def read_parquet_traces(path: str | Path, columns: Iterable[str] | None = None) -> Any:
+    """Read a Parquet trace as a DataFrame, projecting to the requested columns that exist."""
+    pa = _pyarrow()
+    selected: list[str] | None = None
+    if columns is not None:
+        available = set(pa.parquet.read_schema(str(path)).names)
+        selected = [name for name in columns if name in available]
+    return pa.parquet.read_table(str(path), columns=selected).to_pandas()
+
+
+def iter_parquet_traces(
+    path: str | Path, columns: Iterable[str] | None = None, batch_rows: int = 50_000
+) -> Iterator[Any]:
+    """Read a Parquet trace as DataFrames of at most `batch_rows` rows, projected like
+    `read_parquet_traces`; only one batch is materialized at a time."""
+    pa = _pyarrow()
+    parquet_file = pa.parquet.ParquetFile(str(path))
+    selected: list[str] | None = None
+    if columns is not None:
+        available = set(parquet_file.schema_arrow.names)
+        selected = [name for name in columns if name in available]
+    for batch in parquet_file.iter_batches(batch_size=batch_rows, columns=selected):
+        yield batch.to_pandas()
+
+
+def rewrite_parquet_trace(path: str | Path, update: Callable[[list[dict[str, Any]]], None]) -> None:
+    """Rewrite a Parquet trace in place one row group at a time.
+
+    `update` edits each row group's flattened rows in place; the schema, row groups and
+    compression are kept, and the file is replaced only once the rewrite is complete.
+    """
+    pa = _pyarrow()
+    path = Path(path)
+    tmp_path = path.with_name(f".{path.name}.tmp")
+    with pa.parquet.ParquetFile(str(path)) as source:
+        metadata = source.metadata
+        codec = metadata.row_group(0).column(0).compression if metadata.num_row_groups else "NONE"
+        schema = source.schema_arrow
+        with pa.parquet.ParquetWriter(
+            str(tmp_path), schema, compression="none" if codec == "UNCOMPRESSED" else codec
+        ) as writer:
+            for idx in range(metadata.num_row_groups):
+                rows = source.read_row_group(idx).to_pylist()
+                update(rows)
+                writer.write_table(pa.Table.from_pylist(rows, schema=schema))
+    os.replace(tmp_path, path)
+
+
+def convert_jsonl_to_parquet(
+    src: str | Path,
+    dst: str | Path | None = None,
+    *,
+    compression: Compression = "zstd",
+    row_group_size: int = 10_000,
+) -> Path:
+    """Stream an existing `trace.jsonl[.gz|.zst]` into a Parquet file next to it.
+
+    The default destination keeps the source's stem, so each rotated `trace-NNNNN.jsonl`
+    segment becomes its own `trace-NNNNN.parquet`.
+    """
+    src_path = Path(src)
+    if dst is not None:
+        dst_path = Path(dst)
+    else:
+        stem = src_path.name.partition(".jsonl")[0]
+        dst_path = src_path.with_name(f"{stem}.parquet")
+    sink = ParquetTraceSink(dst_path, compression=compression, row_group_size=row_group_size)
+    sink.open()
+    batch: list[dict[str, Any]] = []
+    for row in iter_jsonl(src_path):
+        batch.append(row)
+        if len(batch) >= row_group_size:
+            sink.write(batch)
+            batch = []
+    if batch:
+        sink.write(batch)
+    sink.close()
+    return dst_path
+
+
+__all__ = [
+    "ParquetTraceSink",
+    "TRACE_COLUMNS",
+    "convert_jsonl_to_parquet",
+    "flatten_trace_row",
+    "iter_parquet_traces",
+    "parquet_trace_path",
+    "read_parquet_traces",
+    "rewrite_parquet_trace",
+    "trace_columns",
+]
@@ -0,0 +1,288 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import queue
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import IO, Any, Callable, Protocol, Sequence
+
+from qosflow.common.io import Compression, compression_suffix, ensure_dir, open_text
+
+_STOP = object()
+
+
+@dataclass(frozen=True)
+class TraceWriterStats:
+    rows_written: int
+    batches_written: int
+    flushes: int
+    backlog_max: int
+    producer_stalls: int
+    flush_ms_mean: float
+    flush_ms_max: float
+
+
+def trace_file_path(
+    run_dir: Path,
+    compression: Compression = "none",
+    segment: int | None = None,
+) -> Path:
+    stem = "trace" if segment is None else f"trace-{segment:05d}"
+    return run_dir / f"{stem}.jsonl{compression_suffix(compression)}"
+
+
+class TraceSink(Protocol):
+    path: Path
+
+    def open(self) -> None: ...
+
+    def write(self, batch: list[dict[str, Any]]) -> None: ...
+
+    def flush(self) -> None: ...
+
+    def close(self) -> None: ...
+
+
+class JsonlTraceSink:
+    def __init__(self, path: Path, compression: Compression = "none") -> None:
+        self.path = path
+        self.compression = compression
+        self._handle: IO[str] | None = None
+
+    def open(self) -> None:
+        ensure_dir(self.path.parent)
+        self._handle = open_text(self.path, "w")
+
+    def write(self, batch: list[dict[str, Any]]) -> None:
+        assert self._handle is not None
+        self._handle.write("".join(json.dumps(row, ensure_ascii=False) + "\n" for row in batch))
+
+    def flush(self) -> None:
+        if self._handle is not None:
+            self._handle.flush()
+
+    def close(self) -> None:
+        if self._handle is not None:
+            self._handle.close()
+            self._handle = None
+
+
+class RotatingTraceSink:
+    """Start a new segment from `factory(index)` once the current one is too large or too old.
+
+    Rotation is checked at flush time against the on-disk size, so segments may overshoot
+    `rotate_bytes` by up to one flush interval of rows.
+    """
+
+    def __init__(
+        self,
+        factory: Callable[[int], TraceSink],
+        *,
+        rotate_bytes: int | None = None,
+        rotate_s: float | None = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._factory = factory
+        self.rotate_bytes = rotate_bytes
+        self.rotate_s = rotate_s
+        self._clock = clock
+        self._current = factory(0)
+        self.path = self._current.path
+        self.paths: list[Path] = []
+        self._opened_at = 0.0
+        self._dirty = False
+
+    def _open_current(self) -> None:
+        self._current.open()
+        self.paths.append(self._current.path)
+        self._opened_at = self._clock()
+        self._dirty = False
+
+    def open(self) -> None:
+        self._open_current()
+
+    def write(self, batch: list[dict[str, Any]]) -> None:
+        self._current.write(batch)
+        self._dirty = True
+
+    def _due(self) -> bool:
+        if not self._dirty:
+            return False
+        if self.rotate_s is not None and self._clock() - self._opened_at >= self.rotate_s:
+            return True
+        path = self._current.path
+        return (
+            self.rotate_bytes is not None
+            and path.exists()
+            and path.stat().st_size >= self.rotate_bytes
+        )
+
+    def flush(self) -> None:
+        self._current.flush()
+        if self._due():
+            self._current.close()
+            self._current = self._factory(len(self.paths))
+            self._open_current()
+
+    def close(self) -> None:
+        self._current.close()
+
+
+class TraceWriter:
+    """Serialize trace rows to one or more sinks on a background thread.
+
+    Producers on the event loop only enqueue row dicts, or deferred encoders returning a list of
+    rows (`put_deferred`); encoding, buffered writes and periodic flushes happen on a dedicated
+    thread so serialization and file I/O stay off the measured request path.
+    """
+
+    def __init__(
+        self,
+        sinks: TraceSink | Sequence[TraceSink],
+        *,
+        queue_size: int = 10_000,
+        batch_size: int = 512,
+        flush_interval_s: float = 1.0,
+    ) -> None:
+        if queue_size <= 0:
+            raise ValueError("queue_size must be > 0")
+        if batch_size <= 0:
+            raise ValueError("batch_size must be > 0")
+        self.sinks: list[TraceSink] = list(sinks) if isinstance(sinks, Sequence) else [sinks]
+        if not self.sinks:
+            raise ValueError("at least one trace sink is required")
+        self.batch_size = batch_size
+        self.flush_interval_s = flush_interval_s
+        self._queue: queue.Queue[Any] = queue.Queue(maxsize=queue_size)
+        self._thread: threading.Thread | None = None
+        self._error: BaseException | None = None
+        self._rows_written = 0
+        self._batches_written = 0
+        self._flushes = 0
+        self._flush_ms_total = 0.0
+        self._flush_ms_max = 0.0
+        self._backlog_max = 0
+        self._producer_stalls = 0
+
+    @property
+    def backlog(self) -> int:
+        return self._queue.qsize()
+
+    @property
+    def stats(self) -> TraceWriterStats:
+        return TraceWriterStats(
+            rows_written=self._rows_written,
+            batches_written=self._batches_written,
+            flushes=self._flushes,
+            backlog_max=self._backlog_max,
+            producer_stalls=self._producer_stalls,
+            flush_ms_mean=self._flush_ms_total / self._flushes if self._flushes else 0.0,
+            flush_ms_max=self._flush_ms_max,
+        )
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="qosflow-trace-writer", daemon=True)
+        self._thread.start()
+
+    async def put(self, row: dict[str, Any]) -> None:
+        await self._enqueue(row)
+
+    async def put_deferred(self, encode: Callable[[], list[dict[str, Any]]]) -> None:
+        """Enqueue a callable that builds rows on the writer thread."""
+        await self._enqueue(encode)
+
+    async def _enqueue(self, item: Any) -> None:
+        if self._error is not None:
+            raise RuntimeError("trace writer failed") from self._error
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            # Backpressure: wait for the writer off-loop instead of blocking dispatch.
+            self._producer_stalls += 1
+            await asyncio.to_thread(self._queue.put, item)
+        self._backlog_max = max(self._backlog_max, self._queue.qsize())
+
+    async def close(self) -> TraceWriterStats:
+        """Drain queued rows, flush and close the file, and return final stats."""
+        if self._thread is not None:
+            await asyncio.to_thread(self._queue.put, _STOP)
+            await asyncio.to_thread(self._thread.join)
+            self._thread = None
+        if self._error is not None:
+            raise RuntimeError("trace writer failed") from self._error
+        return self.stats
+
+    def _flush(self) -> None:
+        started = time.perf_counter()
+        for sink in self.sinks:
+            sink.flush()
+        elapsed_ms = (time.perf_counter() - started) * 1000.0
+        self._flushes += 1
+        self._flush_ms_total += elapsed_ms
+        self._flush_ms_max = max(self._flush_ms_max, elapsed_ms)
+
+    def _write_batch(self, batch: list[dict[str, Any]]) -> None:
+        for sink in self.sinks:
+            sink.write(batch)
+        self._rows_written += len(batch)
+        self._batches_written += 1
+
+    def _run(self) -> None:
+        stopping = False
+        try:
+            for sink in self.sinks:
+                sink.open()
+            next_flush = time.monotonic() + self.flush_interval_s
+            while not stopping:
+                batch: list[dict[str, Any]] = []
+                timeout = max(0.0, next_flush - time.monotonic())
+                try:
+                    item = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    item = None
+                while item is not None:
+                    if item is _STOP:
+                        stopping = True
+                        break
+                    if callable(item):
+                        batch.extend(item())
+                    else:
+                        batch.append(item)
+                    if len(batch) >= self.batch_size:
+                        break
+                    try:
+                        item = self._queue.get_nowait()
+                    except queue.Empty:
+                        item = None
+                if batch:
+                    self._write_batch(batch)
+                if stopping or time.monotonic() >= next_flush:
+                    self._flush()
+                    next_flush = time.monotonic() + self.flush_interval_s
+            for sink in self.sinks:
+                sink.close()
+        except BaseException as exc:  # noqa: BLE001
+            self._error = exc
+            for sink in self.sinks:
+                try:
+                    sink.close()
+                except Exception:  # noqa: BLE001
+                    pass
+            # Keep draining so producers blocked on a full queue are released.
+            while not stopping:
+                stopping = self._queue.get() is _STOP
+
+
+__all__ = [
+    "JsonlTraceSink",
+    "RotatingTraceSink",
+    "TraceSink",
+    "TraceWriter",
+    "TraceWriterStats",
+    "trace_file_path",
+]
@@ -0,0 +1,259 @@
+from __future__ import annotations
+
+import math
+from collections.abc import Callable
+
+import numpy as np
+
+from qosflow.common.config import (
+    ArrivalProcessConfig,
+    LoadGenConfig,
+    MMPPArrivalConfig,
+    PiecewiseArrivalConfig,
+    PoissonArrivalConfig,
+    RampArrivalConfig,
+    RenewalArrivalConfig,
+)
+
+_RATE_GRID_POINTS = 4096
+
+
+def default_arrival_process(loadgen_config: LoadGenConfig) -> ArrivalProcessConfig:
+    if loadgen_config.arrival is not None:
+        return loadgen_config.arrival
+    return PoissonArrivalConfig(rate_rps=loadgen_config.arrival_rate_rps)
+
+
+def _renewal_offsets(
+    draw: Callable[[int], np.ndarray],
+    mean_gap_s: float,
+    horizon_s: float,
+) -> np.ndarray:
+    """Cumulative-sum i.i.d. gaps in chunks until the horizon is covered."""
+    expected = horizon_s / mean_gap_s
+    chunk = int(expected + 5.0 * math.sqrt(expected) + 16)
+    parts: list[np.ndarray] = []
+    last = 0.0
+    while last < horizon_s:
+        times = last + np.cumsum(draw(chunk))
+        parts.append(times)
+        last = float(times[-1])
+    offsets = np.concatenate(parts)
+    return offsets[offsets < horizon_s]
+
+
+def _weibull_shape_for_cv(cv: float) -> float:
+    """Solve CV(k)^2 = Gamma(1 + 2/k) / Gamma(1 + 1/k)^2 - 1 for the Weibull shape k."""
+
+    def cv_of(k: float) -> float:
+        log_ratio = math.lgamma(1.0 + 2.0 / k) - 2.0 * math.lgamma(1.0 + 1.0 / k)
+        return math.sqrt(max(math.exp(log_ratio) - 1.0, 0.0))
+
+    low, high = 0.05, 200.0
+    for _ in range(200):
+        mid = math.sqrt(low * high)
+        # CV decreases monotonically with the shape parameter.
+        if cv_of(mid) > cv:
+            low = mid
+        else:
+            high = mid
+    return math.sqrt(low * high)
+
+
+def _inhomogeneous_offsets(
+    grid_t: np.ndarray,
+    grid_rate: np.ndarray,
+    horizon_s: float,
+    rng: np.random.Generator,
+    *,
+    piecewise_constant: bool,
+) -> np.ndarray:
+    """Time-rescale a unit-rate Poisson process through the cumulative rate Lambda(t)."""
+    if not piecewise_constant:
+        # Linear interpolation of Lambda is only exact per step, so refine sloped schedules.
+        fine_t = np.union1d(grid_t, np.linspace(0.0, float(grid_t[-1]), _RATE_GRID_POINTS))
+        grid_rate = np.interp(fine_t, grid_t, grid_rate)
+        grid_t = fine_t
+    widths = np.diff(grid_t)
+    if piecewise_constant:
+        areas = grid_rate[:-1] * widths
+    else:
+        areas = 0.5 * (grid_rate[:-1] + grid_rate[1:]) * widths
+    cumulative = np.concatenate([[0.0], np.cumsum(areas)])
+    total = float(cumulative[-1])
+    if total <= 0:
+        return np.empty(0, dtype=float)
+    unit = _renewal_offsets(lambda n: rng.exponential(1.0, n), 1.0, total)
+    offsets: np.ndarray = np.interp(unit, cumulative, grid_t)
+    return offsets[offsets < horizon_s]
+
+
+def _step_grid(durations: list[float], rates: list[float]) -> tuple[np.ndarray, np.ndarray]:
+    grid_t = np.concatenate([[0.0], np.cumsum(durations)])
+    grid_rate = np.asarray(rates + [rates[-1]], dtype=float)
+    return grid_t, grid_rate
+
+
+def _ramp_grid(config: RampArrivalConfig, horizon_s: float) -> tuple[np.ndarray, np.ndarray]:
+    ramp_s = horizon_s if config.ramp_s is None else min(config.ramp_s, horizon_s)
+    if config.shape == "step":
+        steps = max(1, config.steps)
+        levels = np.linspace(config.start_rps, config.end_rps, steps).tolist()
+        durations = [ramp_s / steps] * steps
+        if horizon_s > ramp_s:
+            durations.append(horizon_s - ramp_s)
+            levels.append(config.end_rps)
+        return _step_grid(durations, levels)
+    grid_t = np.array([0.0, ramp_s])
+    grid_rate = np.array([config.start_rps, config.end_rps])
+    if horizon_s > ramp_s:
+        grid_t = np.append(grid_t, horizon_s)
+        grid_rate = np.append(grid_rate, config.end_rps)
+    return grid_t, grid_rate
+
+
+def _piecewise_grid(
+    config: PiecewiseArrivalConfig,
+    horizon_s: float,
+) -> tuple[np.ndarray, np.ndarray]:
+    durations = [segment.duration_s for segment in config.segments]
+    rates = [segment.rate_rps for segment in config.segments]
+    period_s = sum(durations)
+    if period_s <= 0:
+        raise ValueError("piecewise arrival segments must have positive total duration")
+    if config.repeat:
+        cycles = max(1, math.ceil(horizon_s / period_s))
+        durations, rates = durations * cycles, rates * cycles
+    elif horizon_s > period_s:
+        # Hold the final rate once a non-repeating schedule runs out.
+        durations, rates = durations + [horizon_s - period_s], rates + [rates[-1]]
+    if not config.interpolate:
+        return _step_grid(durations, rates)
+    # Interpolated schedules treat each rate as the value at its segment start.
+    grid_t = np.concatenate([[0.0], np.cumsum(durations)])
+    grid_rate = np.asarray(rates + [rates[0] if config.repeat else rates[-1]], dtype=float)
+    return grid_t, grid_rate
+
+
+def _mmpp_grid(
+    config: MMPPArrivalConfig,
+    horizon_s: float,
+    rng: np.random.Generator,
+) -> tuple[np.ndarray, np.ndarray]:
+    n_states = len(config.states)
+    state = config.initial_state
+    elapsed = 0.0
+    durations: list[float] = []
+    rates: list[float] = []
+    while elapsed < horizon_s:
+        current = config.states[state]
+        dwell_s = float(rng.exponential(current.mean_dwell_s))
+        durations.append(dwell_s)
+        rates.append(current.rate_rps)
+        elapsed += dwell_s
+        if n_states > 1:
+            jump = int(rng.integers(1, n_states))
+            state = (state + jump) % n_states
+    return _step_grid(durations, rates)
+
+
+def _validate(config: ArrivalProcessConfig) -> None:
+    if isinstance(config, (PoissonArrivalConfig, RenewalArrivalConfig)) and config.rate_rps <= 0:
+        raise ValueError("arrival rate_rps must be > 0")
+    if isinstance(config, RenewalArrivalConfig) and config.cv <= 0:
+        raise ValueError("arrival cv must be > 0")
+    if isinstance(config, MMPPArrivalConfig):
+        if not config.states:
+            raise ValueError("mmpp arrival requires at least one state")
+        if not 0 <= config.initial_state < len(config.states):
+            raise ValueError("mmpp initial_state out of range")
+        if any(state.mean_dwell_s <= 0 or state.rate_rps < 0 for state in config.states):
+            raise ValueError("mmpp states need mean_dwell_s > 0 and rate_rps >= 0")
+    if isinstance(config, RampArrivalConfig) and min(config.start_rps, config.end_rps) < 0:
+        raise ValueError("ramp rates must be non-negative")
+    if isinstance(config, PiecewiseArrivalConfig):
+        if not config.segments:
+            raise ValueError("piecewise arrival requires at least one segment")
+        if any(seg.duration_s < 0 or seg.rate_rps < 0 for seg in config.segments):
+            raise ValueError("piecewise segments need non-negative duration_s and rate_rps")
+
+
+def arrival_offsets(
+    config: ArrivalProcessConfig,
+    horizon_s: float,
+    rng: np.random.Generator,
+) -> np.ndarray:
+    """Generate all arrival offsets (seconds from run start) in ``[0, horizon_s)`` up front."""
+    _validate(config)
+    if horizon_s <= 0:
+        return np.empty(0, dtype=float)
+
+    if isinstance(config, PoissonArrivalConfig):
+        mean_gap = 1.0 / config.rate_rps
+        return _renewal_offsets(lambda n: rng.exponential(mean_gap, n), mean_gap, horizon_s)
+    if isinstance(config, RenewalArrivalConfig):
+        mean_gap = 1.0 / config.rate_rps
+        if config.kind == "gamma":
+            shape = 1.0 / (config.cv**2)
+            scale = mean_gap / shape
+            return _renewal_offsets(lambda n: rng.gamma(shape, scale, n), mean_gap, horizon_s)
+        shape = _weibull_shape_for_cv(config.cv)
+        scale = mean_gap / math.gamma(1.0 + 1.0 / shape)
+        return _renewal_offsets(lambda n: scale * rng.weibull(shape, n), mean_gap, horizon_s)
+    if isinstance(config, MMPPArrivalConfig):
+        grid_t, grid_rate = _mmpp_grid(config, horizon_s, rng)
+        return _inhomogeneous_offsets(grid_t, grid_rate, horizon_s, rng, piecewise_constant=True)
+    if isinstance(config, RampArrivalConfig):
+        grid_t, grid_rate = _ramp_grid(config, horizon_s)
+        return _inhomogeneous_offsets(
+            grid_t, grid_rate, horizon_s, rng, piecewise_constant=config.shape == "step"
+        )
+    grid_t, grid_rate = _piecewise_grid(config, horizon_s)
+    return _inhomogeneous_offsets(
+        grid_t, grid_rate, horizon_s, rng, piecewise_constant=not config.interpolate
+    )
+
+
+def mean_rate(config: ArrivalProcessConfig) -> float:
+    """Long-run mean arrival rate in requests per second."""
+    if isinstance(config, (PoissonArrivalConfig, RenewalArrivalConfig)):
+        return config.rate_rps
+    if isinstance(config, MMPPArrivalConfig):
+        total_dwell = sum(state.mean_dwell_s for state in config.states)
+        return sum(state.rate_rps * state.mean_dwell_s for state in config.states) / total_dwell
+    if isinstance(config, RampArrivalConfig):
+        if config.shape == "step":
+            levels = np.linspace(config.start_rps, config.end_rps, max(1, config.steps))
+            return float(levels.mean())
+        return (config.start_rps + config.end_rps) / 2.0
+    total_s = sum(segment.duration_s for segment in config.segments)
+    weighted = sum(segment.duration_s * segment.rate_rps for segment in config.segments)
+    return weighted / total_s if total_s > 0 else 0.0
+
+
+def with_mean_rate(config: ArrivalProcessConfig, rate_rps: float) -> ArrivalProcessConfig:
+    """Rescale a process so its long-run mean rate is `rate_rps`, preserving its shape."""
+    if isinstance(config, (PoissonArrivalConfig, RenewalArrivalConfig)):
+        return config.model_copy(update={"rate_rps": rate_rps})
+    current = mean_rate(config)
+    if current <= 0:
+        raise ValueError("cannot rescale an arrival process with zero mean rate")
+    factor = rate_rps / current
+    if isinstance(config, MMPPArrivalConfig):
+        states = [
+            state.model_copy(update={"rate_rps": state.rate_rps * factor})
+            for state in config.states
+        ]
+        return config.model_copy(update={"states": states})
+    if isinstance(config, RampArrivalConfig):
+        return config.model_copy(
+            update={"start_rps": config.start_rps * factor, "end_rps": config.end_rps * factor}
+        )
+    segments = [
+        segment.model_copy(update={"rate_rps": segment.rate_rps * factor})
+        for segment in config.segments
+    ]
+    return config.model_copy(update={"segments": segments})
+
+
+__all__ = ["arrival_offsets", "default_arrival_process", "mean_rate", "with_mean_rate"]
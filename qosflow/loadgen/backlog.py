@@ -0,0 +1,69 @@
+from __future__ import annotations
+
+from collections import deque
+from dataclasses import dataclass
+from typing import Generic, Literal, TypeVar
+
+from qosflow.common.config import BacklogConfig
+
+T = TypeVar("T")
+
+# Trace `outcome` values for arrivals that never reached the server.
+UnservedOutcome = Literal["dropped", "expired"]
+
+
+@dataclass(frozen=True)
+class Pending(Generic[T]):
+    """An arrival waiting for a free slot; `arrived_s` is on the monotonic clock."""
+
+    item: T
+    arrived_s: float
+    arrived_ns: int
+
+
+class BacklogQueue(Generic[T]):
+    """Bounded FIFO of arrivals waiting for a concurrency slot, applying a `BacklogConfig`.
+
+    Both `offer` and `take` return the arrivals the policy gave up on, so the caller can record
+    them; nothing is discarded silently. `unbounded` never drops or expires anything.
+    """
+
+    def __init__(self, config: BacklogConfig) -> None:
+        self._policy = config.policy
+        self._max_pending = config.max_pending if config.policy != "unbounded" else None
+        self._deadline_s = (
+            config.deadline_ms / 1000.0
+            if config.policy == "deadline" and config.deadline_ms is not None
+            else None
+        )
+        self._pending: deque[Pending[T]] = deque()
+        self.high_water = 0
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def offer(self, entry: Pending[T]) -> Pending[T] | None:
+        """Queue `entry`; return the arrival dropped to respect `max_pending`, if any."""
+        dropped: Pending[T] | None = None
+        if self._max_pending is not None and len(self._pending) >= self._max_pending:
+            if self._policy == "drop_oldest":
+                dropped = self._pending.popleft()
+            else:
+                return entry
+        self._pending.append(entry)
+        self.high_water = max(self.high_water, len(self._pending))
+        return dropped
+
+    def take(self, now_s: float) -> tuple[Pending[T] | None, list[Pending[T]]]:
+        """Pop the oldest arrival still within its deadline, plus any expired ahead of it."""
+        expired: list[Pending[T]] = []
+        while self._pending:
+            entry = self._pending.popleft()
+            if self._deadline_s is not None and now_s - entry.arrived_s > self._deadline_s:
+                expired.append(entry)
+                continue
+            return entry, expired
+        return None, expired
+
+
+__all__ = ["BacklogQueue", "Pending", "UnservedOutcome"]
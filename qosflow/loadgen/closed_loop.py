@@ -0,0 +1,76 @@
+from __future__ import annotations
+
+import asyncio
+import math
+import random
+import time
+from collections.abc import Awaitable, Callable
+
+from qosflow.common.config import ClosedLoopConfig, ThinkTimeConfig
+from qosflow.common.schema import PromptRecord
+from qosflow.loadgen.mix import PromptMixSampler
+
+FireRequest = Callable[[PromptRecord, int, bool], Awaitable[None]]
+
+
+def sample_think_time(config: ThinkTimeConfig, rng: random.Random) -> float:
+    mean_s = max(0.0, config.mean_s)
+    if mean_s == 0.0 or config.distribution == "fixed":
+        return mean_s
+    if config.distribution == "exponential":
+        return rng.expovariate(1.0 / mean_s)
+    if config.distribution == "uniform":
+        return rng.uniform(0.0, 2.0 * mean_s)
+    # Lognormal parameterized so its mean equals mean_s.
+    mu = math.log(mean_s) - (config.sigma**2) / 2.0
+    return rng.lognormvariate(mu, config.sigma)
+
+
+def build_session(
+    sampler: PromptMixSampler,
+    session_length: int,
+    repeats: int,
+) -> list[tuple[PromptRecord, int]]:
+    """Sample one user session; each prompt is sent `repeats` times back to back."""
+    return [
+        (prompt, repeat_idx)
+        for prompt in sampler.sample_many(max(1, session_length))
+        for repeat_idx in range(repeats)
+    ]
+
+
+async def run_virtual_users(
+    config: ClosedLoopConfig,
+    sampler: PromptMixSampler,
+    fire_request: FireRequest,
+    *,
+    repeats: int,
+    warmup_end: float,
+    stop_at: float,
+    seed: int,
+) -> None:
+    """Drive `config.users` closed-loop users until `stop_at` (monotonic seconds).
+
+    Each user sends one request, waits for the response, thinks, and sends the next request of
+    its session. Think times use a per-user RNG so they are reproducible for a given seed.
+    """
+    if config.users <= 0:
+        raise ValueError("closed_loop.users must be > 0")
+
+    async def user(user_idx: int) -> None:
+        rng = random.Random(f"{seed}:{user_idx}")
+        if config.ramp_up_s > 0:
+            await asyncio.sleep(config.ramp_up_s * user_idx / config.users)
+        while time.monotonic() < stop_at:
+            for prompt, repeat_idx in build_session(sampler, config.session_length, repeats):
+                now_monotonic = time.monotonic()
+                if now_monotonic >= stop_at:
+                    return
+                await fire_request(prompt, repeat_idx, now_monotonic >= warmup_end)
+                think_s = sample_think_time(config.think_time, rng)
+                await asyncio.sleep(min(think_s, max(0.0, stop_at - time.monotonic())))
+
+    await asyncio.gather(*(user(user_idx) for user_idx in range(config.users)))
+
+
+__all__ = ["build_session", "run_virtual_users", "sample_think_time"]
@@ -0,0 +1,204 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import time
+from collections import deque
+from collections.abc import Callable
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import TextIO
+
+from qosflow.common.config import AbortRuleConfig, LiveStatsConfig
+from qosflow.common.histogram import LatencyHistogram
+
+
+@dataclass(frozen=True)
+class LiveSnapshot:
+    elapsed_s: float
+    phase: str
+    completed: int
+    errors: int
+    in_flight: int
+    throughput_rps: float
+    window_error_rate: float
+    window_p50_ms: float
+    window_p95_ms: float
+    window_p99_ms: float
+    window_requests: int
+
+
+@dataclass
+class _Interval:
+    histogram: LatencyHistogram
+    completed: int = 0
+    errors: int = 0
+
+
+def format_snapshot(snapshot: LiveSnapshot) -> str:
+    return (
+        f"[{snapshot.elapsed_s:7.1f}s {snapshot.phase:<7}] "
+        f"{snapshot.throughput_rps:7.1f} rps  err {snapshot.window_error_rate:6.1%}  "
+        f"p50 {snapshot.window_p50_ms:8.1f}  p95 {snapshot.window_p95_ms:8.1f}  "
+        f"p99 {snapshot.window_p99_ms:8.1f} ms  in-flight {snapshot.in_flight}"
+    )
+
+
+class AbortRule:
+    """Trip when the rolling window violates the SLO continuously for `sustain_s` seconds."""
+
+    def __init__(self, config: AbortRuleConfig) -> None:
+        self.config = config
+        self._violating_since: float | None = None
+
+    def _violation(self, snapshot: LiveSnapshot) -> str | None:
+        if snapshot.window_requests < self.config.min_requests:
+            return None
+        if self.config.p99_ms is not None and snapshot.window_p99_ms > self.config.p99_ms:
+            return f"p99 {snapshot.window_p99_ms:.1f} ms > {self.config.p99_ms:g} ms"
+        if (
+            self.config.error_rate is not None
+            and snapshot.window_error_rate > self.config.error_rate
+        ):
+            return f"error rate {snapshot.window_error_rate:.3f} > {self.config.error_rate:g}"
+        return None
+
+    def check(self, snapshot: LiveSnapshot) -> str | None:
+        violation = self._violation(snapshot)
+        if violation is None:
+            self._violating_since = None
+            return None
+        if self._violating_since is None:
+            self._violating_since = snapshot.elapsed_s
+        sustained_s = snapshot.elapsed_s - self._violating_since
+        if sustained_s >= self.config.sustain_s:
+            return f"{violation} for {sustained_s:.0f} s"
+        return None
+
+
+class LiveStats:
+    """Per-interval counters plus a rolling latency window, reported while a run is in flight.
+
+    `record_*` calls are cheap and happen on the request path; `tick` folds the current interval
+    into the window and is called once per `interval_s` by `run`.
+    """
+
+    def __init__(
+        self,
+        config: LiveStatsConfig,
+        progress_path: Path | None = None,
+        *,
+        clock: Callable[[], float] = time.monotonic,
+        echo: Callable[[str], None] | None = print,
+    ) -> None:
+        if config.interval_s <= 0:
+            raise ValueError("live.interval_s must be > 0")
+        self.config = config
+        self.progress_path = progress_path
+        self._clock = clock
+        self._echo = echo if config.console else None
+        self._rule = AbortRule(config.abort) if config.abort is not None else None
+        self._window_len = max(1, round(config.window_s / config.interval_s))
+        self._window: deque[_Interval] = deque(maxlen=self._window_len)
+        self._current = _Interval(LatencyHistogram())
+        self._in_flight = 0
+        self._started_at = clock()
+        self._last_tick = self._started_at
+        self._progress: TextIO | None = None
+        self.abort_reason: str | None = None
+
+    def record_start(self) -> None:
+        self._in_flight += 1
+
+    def record_end(self, latency_ms: float, ok: bool) -> None:
+        self._in_flight -= 1
+        self._current.histogram.record(latency_ms)
+        self._current.completed += 1
+        if not ok:
+            self._current.errors += 1
+
+    def tick(self, *, measuring: bool = True) -> LiveSnapshot:
+        now = self._clock()
+        interval_s = max(now - self._last_tick, 1e-9)
+        self._last_tick = now
+        finished, self._current = self._current, _Interval(LatencyHistogram())
+        self._window.append(finished)
+
+        merged = LatencyHistogram()
+        errors = 0
+        for interval in self._window:
+            merged.merge(interval.histogram)
+            errors += interval.errors
+        return LiveSnapshot(
+            elapsed_s=now - self._started_at,
+            phase="measure" if measuring else "warmup",
+            completed=finished.completed,
+            errors=finished.errors,
+            in_flight=self._in_flight,
+            throughput_rps=finished.completed / interval_s,
+            window_error_rate=errors / merged.count if merged.count else 0.0,
+            window_p50_ms=merged.quantile(0.50),
+            window_p95_ms=merged.quantile(0.95),
+            window_p99_ms=merged.quantile(0.99),
+            window_requests=merged.count,
+        )
+
+    def _emit(self, payload: dict[str, object]) -> None:
+        if self.progress_path is None:
+            return
+        if self._progress is None:
+            self._progress = self.progress_path.open("a", encoding="utf-8")
+        self._progress.write(json.dumps(payload, sort_keys=True) + "\n")
+        self._progress.flush()
+
+    def report(self, snapshot: LiveSnapshot) -> str | None:
+        """Publish a snapshot and return an abort reason once the abort rule trips."""
+        self._emit({"event": "tick", **asdict(snapshot)})
+        if self._echo is not None:
+            self._echo(format_snapshot(snapshot))
+        if self._rule is None or snapshot.phase != "measure" or self.abort_reason is not None:
+            return None
+        reason = self._rule.check(snapshot)
+        if reason is not None:
+            self.abort_reason = reason
+            self._emit({"event": "abort", "elapsed_s": snapshot.elapsed_s, "reason": reason})
+            if self._echo is not None:
+                self._echo(f"aborting run: {reason}")
+        return reason
+
+    async def run(self, abort: asyncio.Event, warmup_end: float) -> None:
+        """Report every `interval_s` until cancelled; set `abort` when the abort rule trips."""
+        next_tick = self._started_at + self.config.interval_s
+        while True:
+            await asyncio.sleep(max(0.0, next_tick - self._clock()))
+            next_tick += self.config.interval_s
+            snapshot = self.tick(measuring=self._clock() >= warmup_end)
+            if self.report(snapshot) is not None:
+                abort.set()
+                return
+
+    def close(self) -> None:
+        if self._progress is not None:
+            self._progress.close()
+            self._progress = None
+
+
+def read_abort_reason(progress_path: Path) -> str | None:
+    """Return the abort reason recorded in a progress file, if the run was aborted."""
+    if not progress_path.exists():
+        return None
+    with progress_path.open("r", encoding="utf-8") as handle:
+        for line in handle:
+            event = json.loads(line)
+            if event.get("event") == "abort":
+                return str(event["reason"])
+    return None
+
+
+__all__ = [
+    "AbortRule",
+    "LiveSnapshot",
+    "LiveStats",
+    "format_snapshot",
+    "read_abort_reason",
+]
@@ -1,13 +1,22 @@
 from __future__ import annotations
 
 import random
-from typing import Iterable
+from typing import Iterable, Sequence
+
+import numpy as np
 
 from qosflow.common.schema import PromptRecord
+from qosflow.loadgen.prompt_store import PromptStore
 from qosflow.loadgen.prompts import LengthBucket
 
 
 class PromptMixSampler:
+    """Sample prompts by length-bucket weight.
+
+    Buckets hold catalog indices rather than records, so a `PromptStore` is sampled straight from
+    its offset index and only the chosen prompts are ever parsed.
+    """
+
     def __init__(
         self,
         prompts: Iterable[PromptRecord],
@@ -15,17 +24,23 @@ class PromptMixSampler:
         rng: random.Random | None = None,
     ) -> None:
         self._rng = rng or random.Random()
-        self._groups: dict[LengthBucket, list[PromptRecord]] = {
-            "short": [],
-            "med": [],
-            "long": [],
-        }
-        for prompt in prompts:
-            if prompt.length_bucket is None:
-                raise ValueError(f"Prompt {prompt.prompt_id} missing length_bucket")
-            self._groups[prompt.length_bucket].append(prompt)
-
-        if not any(self._groups.values()):
+        self._prompts: Sequence[PromptRecord]
+        self._groups: dict[LengthBucket, Sequence[int] | np.ndarray]
+        if isinstance(prompts, PromptStore):
+            self._prompts = prompts
+            self._groups = {
+                bucket: prompts.bucket_indices(bucket) for bucket in ("short", "med", "long")
+            }
+        else:
+            self._prompts = list(prompts)
+            groups: dict[LengthBucket, list[int]] = {"short": [], "med": [], "long": []}
+            for idx, prompt in enumerate(self._prompts):
+                if prompt.length_bucket is None:
+                    raise ValueError(f"Prompt {prompt.prompt_id} missing length_bucket")
+                groups[prompt.length_bucket].append(idx)
+            self._groups = dict(groups)
+
+        if not any(len(group) for group in self._groups.values()):
             raise ValueError("No prompts provided")
 
         self._active_buckets: list[LengthBucket] = []
@@ -34,7 +49,7 @@ class PromptMixSampler:
             weight = float(mix_weights.get(bucket, 0.0))
             if weight < 0:
                 raise ValueError("mix weights must be non-negative")
-            if not self._groups[bucket] or weight == 0:
+            if not len(self._groups[bucket]) or weight == 0:
                 continue
             self._active_buckets.append(bucket)
             self._active_weights.append(weight)
@@ -42,9 +57,19 @@ class PromptMixSampler:
         if not self._active_buckets:
             raise ValueError("No non-empty prompt buckets with positive weight")
 
+    def _pick(self, bucket: LengthBucket) -> PromptRecord:
+        # Same RNG draw as choosing from the bucket's record list, so seeds reproduce.
+        return self._prompts[int(self._rng.choice(self._groups[bucket]))]
+
     def sample(self) -> PromptRecord:
         bucket = self._rng.choices(self._active_buckets, weights=self._active_weights, k=1)[0]
-        return self._rng.choice(self._groups[bucket])
+        return self._pick(bucket)
+
+    def sample_bucket(self, bucket: LengthBucket) -> PromptRecord:
+        """Sample uniformly within one length bucket, falling back to the mix if it is empty."""
+        if not len(self._groups[bucket]):
+            return self.sample()
+        return self._pick(bucket)
 
     def sample_many(self, n: int) -> list[PromptRecord]:
         if n < 0:
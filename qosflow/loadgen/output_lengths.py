@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+import hashlib
+import math
+from collections.abc import Mapping
+from statistics import NormalDist
+from typing import Literal
+
+from qosflow.common.config import OutputLengthConfig
+from qosflow.common.schema import PromptRecord
+
+OutputLengthKey = Literal["default", "short", "med", "long"]
+
+_STANDARD_NORMAL = NormalDist()
+
+
+class OutputLengthSampler:
+    """Pick `max_new_tokens` per prompt from the distribution configured for its length bucket.
+
+    Draws are a deterministic function of `(seed, prompt_id)`, so every repeat of a prompt gets
+    the same budget (stability comparisons stay like-for-like) and a rerun or a compiled plan with
+    the same seed reproduces the same lengths without keeping per-prompt state.
+    """
+
+    def __init__(
+        self,
+        configs: Mapping[OutputLengthKey, OutputLengthConfig],
+        default_tokens: int,
+        seed: int,
+    ) -> None:
+        for config in configs.values():
+            if config.min_tokens <= 0 or config.sigma < 0 or config.chars_per_token <= 0:
+                raise ValueError(
+                    "output_lengths need min_tokens > 0, sigma >= 0 and chars_per_token > 0"
+                )
+            bounded = config.max_tokens is not None or config.distribution == "uniform"
+            high = config.max_tokens if config.max_tokens is not None else default_tokens
+            if bounded and high < config.min_tokens:
+                raise ValueError("output_lengths max_tokens must be >= min_tokens")
+        self._configs = dict(configs)
+        self._default_tokens = default_tokens
+        self._salt = f"{seed}:".encode()
+
+    def _uniform(self, prompt_id: str) -> float:
+        digest = hashlib.blake2b(self._salt + prompt_id.encode("utf-8"), digest_size=8).digest()
+        # Midpoint of one of 2**64 equal cells, so the value is strictly inside (0, 1).
+        return (int.from_bytes(digest, "big") + 0.5) / 2.0**64
+
+    def config_for(self, prompt: PromptRecord) -> OutputLengthConfig | None:
+        bucket = prompt.length_bucket
+        if bucket is not None and bucket in self._configs:
+            return self._configs[bucket]
+        return self._configs.get("default")
+
+    def sample(self, prompt: PromptRecord) -> int | None:
+        """Return the budget for `prompt`, or None when no distribution applies to it."""
+        config = self.config_for(prompt)
+        if config is None:
+            return None
+        mean = config.mean_tokens if config.mean_tokens is not None else self._default_tokens
+        if config.distribution == "fixed":
+            tokens = float(mean)
+        elif config.distribution == "uniform":
+            high = config.max_tokens if config.max_tokens is not None else self._default_tokens
+            span = high - config.min_tokens + 1
+            tokens = config.min_tokens + math.floor(self._uniform(prompt.prompt_id) * span)
+        elif config.distribution == "lognormal":
+            # Parameterized so the mean equals mean_tokens, as for lognormal think times.
+            mu = math.log(mean) - (config.sigma**2) / 2.0
+            z = _STANDARD_NORMAL.inv_cdf(self._uniform(prompt.prompt_id))
+            tokens = math.exp(mu + config.sigma * z)
+        elif prompt.expected:
+            tokens = math.ceil(len(prompt.expected) / config.chars_per_token)
+        else:
+            tokens = float(mean)
+        budget = max(round(tokens), config.min_tokens)
+        if config.max_tokens is not None:
+            budget = min(budget, config.max_tokens)
+        return int(budget)
+
+
+__all__ = ["OutputLengthSampler"]
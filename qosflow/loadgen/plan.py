@@ -0,0 +1,256 @@
+from __future__ import annotations
+
+import hashlib
+import random
+from collections.abc import Sequence
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+
+from qosflow.common.config import LoadGenConfig, ServerConfig, TenantConfig
+from qosflow.common.schema import PromptRecord
+from qosflow.loadgen.arrivals import arrival_offsets, default_arrival_process
+from qosflow.loadgen.mix import PromptMixSampler
+from qosflow.loadgen.output_lengths import OutputLengthSampler
+from qosflow.loadgen.prompt_store import PromptStore
+from qosflow.loadgen.replay import load_replay
+from qosflow.loadgen.tenants import TenantPromptStream, tenant_offsets
+
+PLAN_VERSION = 1
+
+
+@dataclass(frozen=True)
+class WorkloadPlan:
+    """A fully materialized request sequence.
+
+    Request ``i`` is sent at ``offsets_s[i]`` seconds after run start with the prompt
+    ``prompt_ids[prompt_index[i]]``, repeat index ``repeat_idx[i]`` and ``max_new_tokens[i]``,
+    on behalf of tenant ``tenant_names[tenant_index[i]]`` (``-1`` for single-tenant runs).
+    Prompts are referenced by id, so a plan stays valid if the catalog file is re-ordered.
+    """
+
+    offsets_s: np.ndarray
+    prompt_index: np.ndarray
+    repeat_idx: np.ndarray
+    max_new_tokens: np.ndarray
+    prompt_ids: np.ndarray
+    tenant_index: np.ndarray
+    tenant_names: np.ndarray
+    warmup_s: float
+    duration_s: float
+    seed: int
+
+    def __len__(self) -> int:
+        return len(self.offsets_s)
+
+    def save(self, path: str | Path) -> Path:
+        target = Path(path)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        with target.open("wb") as handle:
+            np.savez_compressed(
+                handle,
+                version=np.int64(PLAN_VERSION),
+                offsets_s=self.offsets_s,
+                prompt_index=self.prompt_index,
+                repeat_idx=self.repeat_idx,
+                max_new_tokens=self.max_new_tokens,
+                prompt_ids=self.prompt_ids,
+                tenant_index=self.tenant_index,
+                tenant_names=self.tenant_names,
+                window_s=np.array([self.warmup_s, self.duration_s], dtype=np.float64),
+                seed=np.int64(self.seed),
+            )
+        return target
+
+    @classmethod
+    def load(cls, path: str | Path) -> WorkloadPlan:
+        with np.load(Path(path), allow_pickle=False) as data:
+            version = int(data["version"])
+            if version != PLAN_VERSION:
+                raise ValueError(f"unsupported workload plan version {version}")
+            warmup_s, duration_s = (float(value) for value in data["window_s"])
+            return cls(
+                offsets_s=data["offsets_s"],
+                prompt_index=data["prompt_index"],
+                repeat_idx=data["repeat_idx"],
+                max_new_tokens=data["max_new_tokens"],
+                prompt_ids=data["prompt_ids"],
+                tenant_index=data["tenant_index"],
+                tenant_names=data["tenant_names"],
+                warmup_s=warmup_s,
+                duration_s=duration_s,
+                seed=int(data["seed"]),
+            )
+
+    def digest(self) -> str:
+        hasher = hashlib.sha256()
+        for array in (
+            self.offsets_s,
+            self.prompt_index,
+            self.repeat_idx,
+            self.max_new_tokens,
+            self.prompt_ids,
+            self.tenant_index,
+            self.tenant_names,
+        ):
+            hasher.update(np.ascontiguousarray(array).tobytes())
+        hasher.update(f"{self.warmup_s}:{self.duration_s}:{self.seed}".encode())
+        return hasher.hexdigest()
+
+    def resolve_prompts(self, prompts: Sequence[PromptRecord]) -> list[PromptRecord]:
+        """Look up each distinct planned prompt id in the catalog once."""
+        by_id: dict[str, PromptRecord] = {}
+        if not isinstance(prompts, PromptStore):
+            by_id = {prompt.prompt_id: prompt for prompt in prompts}
+        table: list[PromptRecord] = []
+        missing: list[str] = []
+        for raw_id in self.prompt_ids.tolist():
+            prompt_id = raw_id.decode("utf-8")
+            if isinstance(prompts, PromptStore):
+                prompt = prompts.get_by_id(prompt_id)
+            else:
+                prompt = by_id.get(prompt_id)
+            if prompt is None:
+                missing.append(prompt_id)
+            else:
+                table.append(prompt)
+        if missing:
+            raise ValueError(
+                f"{len(missing)} planned prompt_id(s) not in the prompt catalog "
+                f"(e.g. {', '.join(missing[:5])})"
+            )
+        return table
+
+    def resolve_tenants(self, tenants: Sequence[TenantConfig]) -> list[TenantConfig]:
+        """Match the planned tenant names to the run's `loadgen.tenants` (for SLO targets)."""
+        by_name = {tenant.name: tenant for tenant in tenants}
+        names = [raw.decode("utf-8") for raw in self.tenant_names.tolist()]
+        missing = [name for name in names if name not in by_name]
+        if missing:
+            raise ValueError(f"planned tenant(s) not in loadgen.tenants: {', '.join(missing)}")
+        return [by_name[name] for name in names]
+
+
+def _intern(prompt_ids: list[str]) -> tuple[np.ndarray, np.ndarray]:
+    table: dict[str, int] = {}
+    index = np.fromiter(
+        (table.setdefault(prompt_id, len(table)) for prompt_id in prompt_ids),
+        dtype=np.int64,
+        count=len(prompt_ids),
+    )
+    ids = np.asarray([prompt_id.encode("utf-8") for prompt_id in table], dtype=np.bytes_)
+    return index, ids
+
+
+def _budget(
+    prompt: PromptRecord,
+    budget: int | None,
+    output_lengths: OutputLengthSampler | None,
+    default_tokens: int,
+) -> int:
+    if budget is None and output_lengths is not None:
+        budget = output_lengths.sample(prompt)
+    return default_tokens if budget is None else budget
+
+
+def compile_plan(
+    loadgen_config: LoadGenConfig,
+    server_config: ServerConfig,
+    prompts: Sequence[PromptRecord],
+    *,
+    seed: int | None = None,
+) -> WorkloadPlan:
+    """Materialize the open-loop or replay request sequence for a config and seed.
+
+    The same inputs always produce the same plan. Closed-loop workloads depend on response times
+    and cannot be precompiled.
+    """
+    if loadgen_config.mode == "closed":
+        raise ValueError("closed-loop workloads cannot be compiled into a plan")
+    if not prompts:
+        raise ValueError("prompts list must not be empty")
+    if loadgen_config.repeats <= 0:
+        raise ValueError("repeats must be > 0")
+    plan_seed = seed
+    if plan_seed is None:
+        plan_seed = loadgen_config.seed if loadgen_config.seed is not None else server_config.seed
+    sampler = PromptMixSampler(
+        prompts,
+        {
+            "short": loadgen_config.mix.short,
+            "med": loadgen_config.mix.med,
+            "long": loadgen_config.mix.long,
+        },
+        rng=random.Random(plan_seed),
+    )
+
+    tenant_index = np.empty(0, dtype=np.int16)
+    # Per-request budget fixed by the tenant; None falls through to `output_lengths`.
+    budgets: list[int | None]
+    if loadgen_config.mode == "replay":
+        assert loadgen_config.replay is not None
+        schedule, records = load_replay(loadgen_config.replay, prompts, sampler)
+        offsets = schedule.offsets_s
+        repeat_idx = np.asarray(schedule.repeat_idx, dtype=np.int32)
+        budgets = [None] * len(records)
+    elif loadgen_config.tenants:
+        tenants = loadgen_config.tenants
+        offsets, tenant_index = tenant_offsets(
+            tenants, float(loadgen_config.warmup_s + loadgen_config.duration_s), plan_seed
+        )
+        stream = TenantPromptStream(
+            prompts, tenants, loadgen_config.repeats, random.Random(plan_seed)
+        )
+        drawn = [stream.next(int(owner)) for owner in tenant_index]
+        records = [prompt for prompt, _ in drawn]
+        repeat_idx = np.asarray([repeat for _, repeat in drawn], dtype=np.int32)
+        budgets = [tenants[int(owner)].max_new_tokens for owner in tenant_index]
+    else:
+        offsets = arrival_offsets(
+            default_arrival_process(loadgen_config),
+            float(loadgen_config.warmup_s + loadgen_config.duration_s),
+            np.random.default_rng(plan_seed),
+        )
+        # Same order as live dispatch: each sampled prompt is sent `repeats` times in a row.
+        repeats = loadgen_config.repeats
+        n_prompts = -(-len(offsets) // repeats)
+        sampled = sampler.sample_many(n_prompts)
+        records = [prompt for prompt in sampled for _ in range(repeats)][: len(offsets)]
+        repeat_idx = (np.arange(len(offsets)) % repeats).astype(np.int32)
+        budgets = [None] * len(records)
+
+    output_lengths = (
+        OutputLengthSampler(loadgen_config.output_lengths, server_config.max_new_tokens, plan_seed)
+        if loadgen_config.output_lengths
+        else None
+    )
+    max_new_tokens = np.fromiter(
+        (
+            _budget(prompt, budget, output_lengths, server_config.max_new_tokens)
+            for prompt, budget in zip(records, budgets, strict=True)
+        ),
+        dtype=np.int32,
+        count=len(records),
+    )
+    prompt_index, unique_ids = _intern([prompt.prompt_id for prompt in records])
+    if not len(tenant_index):
+        tenant_index = np.full(len(offsets), -1, dtype=np.int16)
+    tenant_names = np.asarray(
+        [tenant.name.encode("utf-8") for tenant in loadgen_config.tenants], dtype=np.bytes_
+    )
+    return WorkloadPlan(
+        offsets_s=np.asarray(offsets, dtype=np.float64),
+        prompt_index=prompt_index,
+        repeat_idx=repeat_idx,
+        max_new_tokens=max_new_tokens,
+        prompt_ids=unique_ids,
+        tenant_index=tenant_index,
+        tenant_names=tenant_names,
+        warmup_s=float(loadgen_config.warmup_s),
+        duration_s=float(loadgen_config.duration_s),
+        seed=int(plan_seed),
+    )
+
+
+__all__ = ["PLAN_VERSION", "WorkloadPlan", "compile_plan"]
@@ -2,23 +2,35 @@ from __future__ import annotations
 
 import argparse
 import asyncio
-import random
+import json
 import time
 
+import numpy as np
+
 from qosflow.common.client import AsyncLLMClient
-from qosflow.common.config import load_yaml
-import json
+from qosflow.common.config import PoissonArrivalConfig, load_yaml
+from qosflow.loadgen.arrivals import arrival_offsets
 
 
 async def worker(client: AsyncLLMClient, duration_s: float, rate: float) -> None:
-    end_at = time.monotonic() + duration_s
-    while time.monotonic() < end_at:
-        await asyncio.sleep(random.expovariate(rate))
+    offsets = arrival_offsets(
+        PoissonArrivalConfig(rate_rps=rate), duration_s, np.random.default_rng()
+    )
+    started = time.monotonic()
+
+    async def fire() -> None:
         text, meta, status = await client.generate("hello", params={"max_new_tokens": 16})
         meta["status_code"] = int(status)
         with open("load.out", "a", encoding="utf-8") as f:
             f.write(json.dumps(meta) + "\n")
 
+    tasks: list[asyncio.Task[None]] = []
+    for offset_s in offsets.tolist():
+        await asyncio.sleep(max(0.0, started + offset_s - time.monotonic()))
+        tasks.append(asyncio.create_task(fire()))
+    if tasks:
+        await asyncio.gather(*tasks)
+
 
 def main() -> None:
     parser = argparse.ArgumentParser()
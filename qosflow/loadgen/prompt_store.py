@@ -0,0 +1,269 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import mmap
+import os
+from collections.abc import Iterator, Sequence
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, overload
+
+import numpy as np
+
+from qosflow.common.schema import PromptRecord
+from qosflow.loadgen.prompts import (
+    LengthBucket,
+    LengthThresholds,
+    TokenThresholds,
+    bucket_for_length,
+    load_prompts,
+)
+
+BUCKETS: tuple[LengthBucket, ...] = ("short", "med", "long")
+_INDEX_VERSION = 1
+
+
+def index_path_for(path: Path) -> Path:
+    return path.with_name(f"{path.name}.idx.npz")
+
+
+def token_counts_path_for(path: Path, tokenizer_id: str) -> Path:
+    digest = hashlib.sha256(tokenizer_id.encode("utf-8")).hexdigest()[:16]
+    return path.with_name(f"{path.name}.tokens-{digest}.npz")
+
+
+def _token_counts_meta(path: Path) -> np.ndarray:
+    stat = path.stat()
+    return np.array([_INDEX_VERSION, stat.st_size, stat.st_mtime_ns], dtype=np.int64)
+
+
+def _index_meta(path: Path, thresholds: LengthThresholds) -> np.ndarray:
+    stat = path.stat()
+    return np.array(
+        [
+            _INDEX_VERSION,
+            stat.st_size,
+            stat.st_mtime_ns,
+            thresholds.short_max_chars,
+            thresholds.med_max_chars,
+        ],
+        dtype=np.int64,
+    )
+
+
+def build_prompt_index(
+    path: Path,
+    thresholds: LengthThresholds,
+) -> dict[str, np.ndarray]:
+    """Scan a prompt JSONL once, recording each line's byte span, length bucket and prompt_id."""
+    offsets: list[int] = []
+    lengths: list[int] = []
+    buckets: list[int] = []
+    prompt_ids: list[bytes] = []
+    position = 0
+    with path.open("rb") as handle:
+        for raw in handle:
+            line = raw.strip()
+            if line:
+                row = json.loads(line)
+                offsets.append(position)
+                lengths.append(len(raw))
+                bucket = bucket_for_length(len(str(row.get("text", ""))), thresholds)
+                buckets.append(BUCKETS.index(bucket))
+                prompt_ids.append(str(row["prompt_id"]).encode("utf-8"))
+            position += len(raw)
+    return {
+        "meta": _index_meta(path, thresholds),
+        "offsets": np.asarray(offsets, dtype=np.int64),
+        "lengths": np.asarray(lengths, dtype=np.int64),
+        "buckets": np.asarray(buckets, dtype=np.int8),
+        "prompt_ids": np.asarray(prompt_ids, dtype=np.bytes_),
+    }
+
+
+def _load_cached_index(
+    index_path: Path,
+    expected_meta: np.ndarray,
+) -> dict[str, np.ndarray] | None:
+    try:
+        with np.load(index_path, allow_pickle=False) as cached:
+            arrays = {name: cached[name] for name in cached.files}
+    except (OSError, ValueError, KeyError):
+        return None
+    meta = arrays.get("meta")
+    if meta is None or not np.array_equal(meta, expected_meta):
+        return None
+    return arrays
+
+
+def _save_index(index_path: Path, arrays: dict[str, Any]) -> None:
+    tmp_path = index_path.with_name(f".{index_path.name}.tmp.npz")
+    try:
+        np.savez(tmp_path, **arrays)
+        os.replace(tmp_path, index_path)
+    except OSError:
+        # A read-only catalog directory only costs a rebuild next time.
+        tmp_path.unlink(missing_ok=True)
+
+
+class PromptStore(Sequence[PromptRecord]):
+    """Read-only, memory-mapped view of a prompt JSONL.
+
+    Only the byte-offset index (offset, length, bucket, prompt_id per line) is held in memory;
+    `PromptRecord`s are parsed on access. The index is cached next to the file as
+    `<name>.idx.npz` and rebuilt when the file size, mtime or bucket thresholds change. Token
+    counts are cached the same way, per tokenizer, as `<name>.tokens-<digest>.npz`.
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        thresholds: LengthThresholds | None = None,
+        *,
+        cache_index: bool = True,
+        record_cache_size: int = 4096,
+    ) -> None:
+        self.path = Path(path)
+        self.thresholds = thresholds or LengthThresholds()
+        self.cache_index = cache_index
+        index_path = index_path_for(self.path)
+        expected_meta = _index_meta(self.path, self.thresholds)
+        arrays = _load_cached_index(index_path, expected_meta) if cache_index else None
+        if arrays is None:
+            arrays = build_prompt_index(self.path, self.thresholds)
+            if cache_index:
+                _save_index(index_path, arrays)
+        self.offsets = arrays["offsets"]
+        self.lengths = arrays["lengths"]
+        self.buckets = arrays["buckets"]
+        self.prompt_ids = arrays["prompt_ids"]
+        self.token_counts: np.ndarray | None = None
+        self._id_order: np.ndarray | None = None
+        self._sorted_ids: np.ndarray | None = None
+        self._handle = self.path.open("rb")
+        self._mmap = (
+            mmap.mmap(self._handle.fileno(), 0, access=mmap.ACCESS_READ)
+            if self.path.stat().st_size
+            else None
+        )
+        self._record = lru_cache(maxsize=record_cache_size)(self._load_record)
+
+    def __len__(self) -> int:
+        return len(self.offsets)
+
+    def _load_record(self, idx: int) -> PromptRecord:
+        assert self._mmap is not None
+        start = int(self.offsets[idx])
+        payload = json.loads(self._mmap[start : start + int(self.lengths[idx])])
+        payload["length_bucket"] = BUCKETS[int(self.buckets[idx])]
+        if self.token_counts is not None:
+            payload["len_tokens"] = int(self.token_counts[idx])
+        return PromptRecord.model_validate(payload)
+
+    def iter_texts(self) -> Iterator[str]:
+        """Yield prompt texts in catalog order without building records or filling the cache."""
+        for start, length in zip(self.offsets.tolist(), self.lengths.tolist(), strict=True):
+            assert self._mmap is not None
+            yield str(json.loads(self._mmap[start : start + length]).get("text", ""))
+
+    def cached_token_counts(self, tokenizer_id: str) -> np.ndarray | None:
+        """Token counts saved by `save_token_counts` for this file version, if any."""
+        if not self.cache_index:
+            return None
+        path = token_counts_path_for(self.path, tokenizer_id)
+        arrays = _load_cached_index(path, _token_counts_meta(self.path))
+        if arrays is None or str(arrays.get("tokenizer")) != tokenizer_id:
+            return None
+        counts = arrays.get("counts")
+        return counts if counts is not None and len(counts) == len(self) else None
+
+    def save_token_counts(self, tokenizer_id: str, token_counts: np.ndarray) -> None:
+        if self.cache_index:
+            _save_index(
+                token_counts_path_for(self.path, tokenizer_id),
+                {
+                    "meta": _token_counts_meta(self.path),
+                    "tokenizer": np.array(tokenizer_id),
+                    "counts": np.asarray(token_counts, dtype=np.int64),
+                },
+            )
+
+    def set_token_counts(
+        self,
+        token_counts: np.ndarray,
+        thresholds: TokenThresholds | None = None,
+    ) -> None:
+        """Attach per-prompt token counts and re-bucket the catalog by tokens."""
+        if len(token_counts) != len(self):
+            raise ValueError("token_counts must have one entry per prompt")
+        limits = thresholds or TokenThresholds()
+        self.token_counts = np.asarray(token_counts, dtype=np.int64)
+        self.buckets = np.select(
+            [
+                self.token_counts <= limits.short_max_tokens,
+                self.token_counts <= limits.med_max_tokens,
+            ],
+            [BUCKETS.index("short"), BUCKETS.index("med")],
+            default=BUCKETS.index("long"),
+        ).astype(np.int8)
+        self._record.cache_clear()
+
+    @overload
+    def __getitem__(self, idx: int) -> PromptRecord: ...
+
+    @overload
+    def __getitem__(self, idx: slice) -> list[PromptRecord]: ...
+
+    def __getitem__(self, idx: int | slice) -> PromptRecord | list[PromptRecord]:
+        if isinstance(idx, slice):
+            return [self._record(i) for i in range(*idx.indices(len(self)))]
+        position = int(idx)
+        if position < 0:
+            position += len(self)
+        if not 0 <= position < len(self):
+            raise IndexError("prompt index out of range")
+        return self._record(position)
+
+    def bucket_indices(self, bucket: LengthBucket) -> np.ndarray:
+        return np.flatnonzero(self.buckets == BUCKETS.index(bucket))
+
+    def index_of(self, prompt_id: str) -> int | None:
+        if self._id_order is None or self._sorted_ids is None:
+            self._id_order = np.argsort(self.prompt_ids, kind="stable")
+            self._sorted_ids = self.prompt_ids[self._id_order]
+        key = np.bytes_(prompt_id.encode("utf-8"))
+        sorted_ids = self._sorted_ids
+        pos = int(np.searchsorted(sorted_ids, key))
+        if pos < len(sorted_ids) and sorted_ids[pos] == key:
+            return int(self._id_order[pos])
+        return None
+
+    def get_by_id(self, prompt_id: str) -> PromptRecord | None:
+        idx = self.index_of(prompt_id)
+        return None if idx is None else self._record(idx)
+
+    def close(self) -> None:
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+        self._handle.close()
+
+
+def open_prompt_catalog(
+    path: str | Path,
+    thresholds: LengthThresholds | None = None,
+) -> Sequence[PromptRecord]:
+    """Open a prompt catalog lazily; compressed JSONL cannot be mapped and is loaded eagerly."""
+    if Path(path).suffix in {".gz", ".zst"}:
+        return load_prompts(path, thresholds)
+    return PromptStore(path, thresholds)
+
+
+__all__ = [
+    "PromptStore",
+    "build_prompt_index",
+    "index_path_for",
+    "open_prompt_catalog",
+    "token_counts_path_for",
+]
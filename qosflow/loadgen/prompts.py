@@ -22,12 +22,35 @@ class LengthThresholds:
             raise ValueError("med_max_chars must be >= short_max_chars")
 
 
-def assign_length_bucket(
-    text: str,
+@dataclass(frozen=True)
+class TokenThresholds:
+    short_max_tokens: int = 64
+    med_max_tokens: int = 256
+
+    def __post_init__(self) -> None:
+        if self.short_max_tokens < 0:
+            raise ValueError("short_max_tokens must be non-negative")
+        if self.med_max_tokens < self.short_max_tokens:
+            raise ValueError("med_max_tokens must be >= short_max_tokens")
+
+
+def bucket_for_tokens(
+    n_tokens: int,
+    thresholds: TokenThresholds | None = None,
+) -> LengthBucket:
+    limits = thresholds or TokenThresholds()
+    if n_tokens <= limits.short_max_tokens:
+        return "short"
+    if n_tokens <= limits.med_max_tokens:
+        return "med"
+    return "long"
+
+
+def bucket_for_length(
+    length: int,
     thresholds: LengthThresholds | None = None,
 ) -> LengthBucket:
     limits = thresholds or LengthThresholds()
-    length = len(text)
     if length <= limits.short_max_chars:
         return "short"
     if length <= limits.med_max_chars:
@@ -35,6 +58,13 @@ def assign_length_bucket(
     return "long"
 
 
+def assign_length_bucket(
+    text: str,
+    thresholds: LengthThresholds | None = None,
+) -> LengthBucket:
+    return bucket_for_length(len(text), thresholds)
+
+
 def load_prompts(
     path: str | Path,
     thresholds: LengthThresholds | None = None,
@@ -52,6 +82,9 @@ def load_prompts(
 __all__ = [
     "LengthBucket",
     "LengthThresholds",
+    "TokenThresholds",
     "assign_length_bucket",
+    "bucket_for_length",
+    "bucket_for_tokens",
     "load_prompts",
 ]
@@ -0,0 +1,135 @@
+from __future__ import annotations
+
+from collections.abc import Iterator, Sequence
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+import pandas as pd
+
+from qosflow.common.config import ReplayConfig
+from qosflow.common.io import iter_jsonl
+from qosflow.common.schema import PromptRecord
+from qosflow.common.trace_parquet import read_parquet_traces
+from qosflow.loadgen.mix import PromptMixSampler
+from qosflow.loadgen.prompt_store import PromptStore
+from qosflow.loadgen.prompts import bucket_for_length
+
+REPLAY_COLUMNS = ("ts_start_ns", "prompt_id", "repeat_idx", "prompt_len_chars")
+
+
+@dataclass(frozen=True)
+class ReplaySchedule:
+    offsets_s: np.ndarray
+    prompt_ids: list[str]
+    repeat_idx: list[int]
+    prompt_len_chars: list[int | None]
+
+    def __len__(self) -> int:
+        return len(self.prompt_ids)
+
+
+def _iter_source_rows(path: Path) -> Iterator[dict[str, Any]]:
+    if path.suffix == ".parquet":
+        frame = read_parquet_traces(path, columns=REPLAY_COLUMNS)
+    elif path.suffix == ".csv":
+        frame = pd.read_csv(path)
+    else:
+        for row in iter_jsonl(path):
+            yield {name: row.get(name) for name in REPLAY_COLUMNS}
+        return
+    frame = frame.astype(object).where(frame.notna(), None)
+    for row in frame.to_dict(orient="records"):
+        yield {name: row.get(name) for name in REPLAY_COLUMNS}
+
+
+def load_replay_schedule(source: str | Path, speed: float = 1.0) -> ReplaySchedule:
+    """Build a dispatch schedule from a trace (JSONL/Parquet) or a CSV request log.
+
+    Rows need `ts_start_ns` and `prompt_id`; offsets are relative to the earliest request and
+    divided by `speed` (2.0 replays twice as fast).
+    """
+    if speed <= 0:
+        raise ValueError("replay speed must be > 0")
+    rows = [
+        row
+        for row in _iter_source_rows(Path(source))
+        if row["ts_start_ns"] is not None and row["prompt_id"] is not None
+    ]
+    if not rows:
+        raise ValueError(f"No replayable rows (ts_start_ns + prompt_id) in {source}")
+    rows.sort(key=lambda row: int(row["ts_start_ns"]))
+
+    start_ns = int(rows[0]["ts_start_ns"])
+    offsets = np.array([int(row["ts_start_ns"]) - start_ns for row in rows], dtype=np.float64)
+    return ReplaySchedule(
+        offsets_s=offsets / 1e9 / speed,
+        prompt_ids=[str(row["prompt_id"]) for row in rows],
+        repeat_idx=[int(row["repeat_idx"] or 0) for row in rows],
+        prompt_len_chars=[
+            int(row["prompt_len_chars"]) if row["prompt_len_chars"] is not None else None
+            for row in rows
+        ],
+    )
+
+
+def resolve_replay_prompts(
+    schedule: ReplaySchedule,
+    prompts: Sequence[PromptRecord],
+    sampler: PromptMixSampler,
+    substitution: str = "none",
+) -> list[PromptRecord]:
+    """Map each scheduled request to a catalog prompt.
+
+    With substitution, replacements come from the catalog bucket matching the recorded
+    `prompt_len_chars` so prefill cost stays comparable to the original traffic.
+    """
+    by_id: dict[str, PromptRecord] = {}
+    if not isinstance(prompts, PromptStore):
+        by_id = {prompt.prompt_id: prompt for prompt in prompts}
+
+    def find(prompt_id: str) -> PromptRecord | None:
+        if isinstance(prompts, PromptStore):
+            return prompts.get_by_id(prompt_id)
+        return by_id.get(prompt_id)
+
+    resolved: list[PromptRecord] = []
+    missing: set[str] = set()
+    for prompt_id, length in zip(schedule.prompt_ids, schedule.prompt_len_chars, strict=True):
+        prompt = find(prompt_id)
+        if substitution == "all" or (prompt is None and substitution == "missing"):
+            if length is not None:
+                prompt = sampler.sample_bucket(bucket_for_length(length))
+            elif prompt is None:
+                prompt = sampler.sample()
+        if prompt is None:
+            missing.add(prompt_id)
+            continue
+        resolved.append(prompt)
+    if missing:
+        sample = ", ".join(sorted(missing)[:5])
+        raise ValueError(
+            f"{len(missing)} replayed prompt_id(s) not in the prompt catalog (e.g. {sample}); "
+            "set replay.prompt_substitution to 'missing' or 'all'"
+        )
+    return resolved
+
+
+def load_replay(
+    config: ReplayConfig,
+    prompts: Sequence[PromptRecord],
+    sampler: PromptMixSampler,
+) -> tuple[ReplaySchedule, list[PromptRecord]]:
+    schedule = load_replay_schedule(config.source, speed=config.speed)
+    return schedule, resolve_replay_prompts(
+        schedule, prompts, sampler, substitution=config.prompt_substitution
+    )
+
+
+__all__ = [
+    "ReplaySchedule",
+    "load_replay",
+    "load_replay_schedule",
+    "resolve_replay_prompts",
+]
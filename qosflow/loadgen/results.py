@@ -0,0 +1,321 @@
+from __future__ import annotations
+
+import json
+import os
+from collections.abc import Iterable
+from dataclasses import dataclass
+from functools import lru_cache
+from itertools import islice
+from pathlib import Path
+from typing import Any
+from uuid import uuid4
+
+import numpy as np
+
+from qosflow.common.clock import ClockModel
+from qosflow.common.config import TenantConfig
+from qosflow.common.hashing import sha256_normalized_text
+from qosflow.common.io import iter_jsonl, open_text
+from qosflow.common.schema import PromptRecord
+from qosflow.common.trace_parquet import rewrite_parquet_trace
+
+# Integer columns; -1 marks a missing value (timestamps and batch sizes are never negative).
+_TS_START, _TS_END, _TS_SEND, _TS_RECV, _TS_DONE, _TS_RESP = range(6)
+_HTTP_STATUS, _BATCH_SIZE, _REPEAT_IDX, _MAX_NEW_TOKENS = range(6, 10)
+_N_INTS = 10
+# Float columns; NaN marks a missing value.
+_TOTAL_MS, _QUEUE_MS, _PREFILL_MS, _DECODE_MS = range(4)
+_N_FLOATS = 4
+
+# Prompts repeat across requests; hash each distinct text once.
+_prompt_hash = lru_cache(maxsize=65_536)(sha256_normalized_text)
+
+
+@dataclass(frozen=True)
+class ResultBatch:
+    """Completed requests in column form, as handed from the event loop to the trace writer."""
+
+    ints: np.ndarray
+    floats: np.ndarray
+    prompts: list[PromptRecord]
+    outputs: list[str]
+    errors: list[str | None]
+    tenants: list[TenantConfig | None]
+    outcomes: list[str]
+
+    def __len__(self) -> int:
+        return len(self.prompts)
+
+
+@dataclass(frozen=True)
+class TraceContext:
+    """Per-run constants shared by every trace row, plus the server clock model if probed."""
+
+    run_id: str
+    params: dict[str, Any]
+    server: dict[str, Any]
+    clock: ClockModel | None = None
+
+
+def _optional_int(value: Any) -> int:
+    return -1 if value is None else int(value)
+
+
+def _optional_float(value: Any) -> float:
+    return np.nan if value is None else float(value)
+
+
+class ResultBuffer:
+    """Preallocated struct-of-arrays store for per-request results on the dispatch hot path.
+
+    `append` only writes scalars into fixed-size arrays; building `TraceRecord`-shaped rows
+    (hashing, derived timings, request ids) is deferred to `trace_rows` on the writer thread.
+    """
+
+    def __init__(self, capacity: int = 512) -> None:
+        if capacity <= 0:
+            raise ValueError("capacity must be > 0")
+        self.capacity = capacity
+        self._reset()
+
+    def _reset(self) -> None:
+        self._ints = np.empty((self.capacity, _N_INTS), dtype=np.int64)
+        self._floats = np.empty((self.capacity, _N_FLOATS), dtype=np.float64)
+        self._prompts: list[PromptRecord] = []
+        self._outputs: list[str] = []
+        self._errors: list[str | None] = []
+        self._tenants: list[TenantConfig | None] = []
+        self._outcomes: list[str] = []
+
+    def __len__(self) -> int:
+        return len(self._prompts)
+
+    def append(
+        self,
+        prompt: PromptRecord,
+        repeat_idx: int,
+        max_new_tokens: int,
+        tenant: TenantConfig | None,
+        *,
+        ts_start_ns: int,
+        ts_end_ns: int,
+        total_ms: float,
+        http_status: int,
+        error: str | None,
+        output_text: str,
+        timings: dict[str, Any],
+        outcome: str | None = None,
+    ) -> bool:
+        """Record one finished request; returns True once the buffer is full.
+
+        `outcome` defaults to `completed`/`failed` from `error`; arrivals the backlog policy
+        gave up on pass `dropped` or `expired`.
+        """
+        row = len(self._prompts)
+        if outcome is None:
+            outcome = "completed" if error is None else "failed"
+        sent = outcome in ("completed", "failed")
+        self._ints[row] = (
+            ts_start_ns,
+            ts_end_ns,
+            ts_start_ns if sent else -1,
+            _optional_int(timings.get("ts_recv_ns")),
+            _optional_int(timings.get("ts_done_ns")),
+            ts_end_ns if sent else -1,
+            http_status,
+            _optional_int(timings.get("batch_size")),
+            repeat_idx,
+            max_new_tokens,
+        )
+        self._floats[row] = (
+            total_ms,
+            _optional_float(timings.get("queue_ms")),
+            _optional_float(timings.get("prefill_ms")),
+            _optional_float(timings.get("decode_ms")),
+        )
+        self._prompts.append(prompt)
+        self._outputs.append(output_text)
+        self._errors.append(error)
+        self._tenants.append(tenant)
+        self._outcomes.append(outcome)
+        return row + 1 >= self.capacity
+
+    def drain(self) -> ResultBatch | None:
+        """Hand over the filled rows and start a fresh buffer; None when empty."""
+        count = len(self._prompts)
+        if not count:
+            return None
+        batch = ResultBatch(
+            ints=self._ints[:count],
+            floats=self._floats[:count],
+            prompts=self._prompts,
+            outputs=self._outputs,
+            errors=self._errors,
+            tenants=self._tenants,
+            outcomes=self._outcomes,
+        )
+        self._reset()
+        return batch
+
+
+def _nullable(values: np.ndarray, present: np.ndarray) -> list[Any]:
+    return [value if keep else None for value, keep in zip(values.tolist(), present, strict=True)]
+
+
+def _clock_fields(
+    send: np.ndarray,
+    recv: np.ndarray,
+    done: np.ndarray,
+    resp: np.ndarray,
+    clock: ClockModel | None,
+) -> tuple[list[Any], list[Any]]:
+    """`clock_offset_ns` and `server_queue_ms` for each row; -1 marks a missing timestamp.
+
+    Server-side durations use one clock; only `recv - send` crosses hosts, so it is the one
+    term corrected by the estimated server-minus-client offset at send time.
+    """
+    has_server = (recv >= 0) & (done >= 0)
+    offset_ns = clock.offset_at(send) if clock is not None else None
+    server_total_ns = np.maximum(done - recv, 0)
+    network_rtt_ns = ((resp - send) - server_total_ns).astype(np.float64)
+    uplink_ns = (recv - send).astype(np.float64)
+    if offset_ns is not None:
+        uplink_ns -= offset_ns
+    server_queue_ns = np.maximum(uplink_ns - network_rtt_ns / 2.0, 0.0)
+    clock_offset_ns: list[Any] = (
+        _nullable(np.rint(offset_ns).astype(np.int64), send >= 0)
+        if offset_ns is not None
+        else [None] * len(send)
+    )
+    return clock_offset_ns, _nullable(server_queue_ns / 1_000_000.0, has_server)
+
+
+def trace_rows(batch: ResultBatch, context: TraceContext) -> list[dict[str, Any]]:
+    """Serialize a batch to dicts matching `TraceRecord.model_dump(mode="json")`.
+
+    Offsets come from the clock model as it stands when the batch is serialized; once the run
+    has finished, `apply_clock_model` rewrites them with the final fit.
+    """
+    ints, floats = batch.ints, batch.floats
+    send, recv = ints[:, _TS_SEND], ints[:, _TS_RECV]
+    done, resp = ints[:, _TS_DONE], ints[:, _TS_RESP]
+
+    has_server = (recv >= 0) & (done >= 0)
+    server_total_ns = np.maximum(done - recv, 0)
+    network_rtt_ns = ((resp - send) - server_total_ns).astype(np.float64)
+    clock_offset_ns, server_queue_ms = _clock_fields(send, recv, done, resp, context.clock)
+
+    network_rtt_ms = _nullable(network_rtt_ns / 1_000_000.0, has_server)
+    server_compute_ms = _nullable(server_total_ns / 1_000_000.0, has_server)
+    send_ns = _nullable(send, send >= 0)
+    resp_ns = _nullable(resp, resp >= 0)
+    recv_ns = _nullable(recv, recv >= 0)
+    done_ns = _nullable(done, done >= 0)
+    batch_size = _nullable(ints[:, _BATCH_SIZE], ints[:, _BATCH_SIZE] >= 0)
+    queue_ms = _nullable(floats[:, _QUEUE_MS], ~np.isnan(floats[:, _QUEUE_MS]))
+    prefill_ms = _nullable(floats[:, _PREFILL_MS], ~np.isnan(floats[:, _PREFILL_MS]))
+    decode_ms = _nullable(floats[:, _DECODE_MS], ~np.isnan(floats[:, _DECODE_MS]))
+    int_rows = ints.tolist()
+    total_ms = floats[:, _TOTAL_MS].tolist()
+
+    rows: list[dict[str, Any]] = []
+    for idx, prompt in enumerate(batch.prompts):
+        values = int_rows[idx]
+        output_text = batch.outputs[idx]
+        tenant = batch.tenants[idx]
+        params = context.params
+        if values[_MAX_NEW_TOKENS] != params["max_new_tokens"]:
+            params = {**params, "max_new_tokens": values[_MAX_NEW_TOKENS]}
+        rows.append(
+            {
+                "version": "v1",
+                "request_id": str(uuid4()),
+                "run_id": context.run_id,
+                "prompt_id": prompt.prompt_id,
+                "repeat_idx": values[_REPEAT_IDX],
+                "ts_start_ns": values[_TS_START],
+                "ts_end_ns": values[_TS_END],
+                "total_ms": total_ms[idx],
+                "params": params,
+                "server": context.server,
+                "system": {
+                    "http_status": values[_HTTP_STATUS],
+                    "error": batch.errors[idx],
+                    "batch_size": batch_size[idx],
+                    "queue_ms": queue_ms[idx],
+                    "prefill_ms": prefill_ms[idx],
+                    "decode_ms": decode_ms[idx],
+                    "ts_send_ns": send_ns[idx],
+                    "ts_recv_ns": recv_ns[idx],
+                    "ts_done_ns": done_ns[idx],
+                    "ts_resp_ns": resp_ns[idx],
+                    "network_rtt_ms": network_rtt_ms[idx],
+                    "server_queue_ms": server_queue_ms[idx],
+                    "server_compute_ms": server_compute_ms[idx],
+                    "clock_offset_ns": clock_offset_ns[idx],
+                },
+                "prompt_hash": _prompt_hash(prompt.text),
+                "output_hash": sha256_normalized_text(output_text),
+                "prompt_len_chars": len(prompt.text),
+                "output_len_chars": len(output_text),
+                "output_text": output_text,
+                "prompt_len_tokens": prompt.len_tokens,
+                "tenant": tenant.name if tenant is not None else None,
+                "slo_ms": tenant.slo_ms if tenant is not None else None,
+                "outcome": batch.outcomes[idx],
+            }
+        )
+    return rows
+
+
+_CLOCK_INPUTS = ("ts_send_ns", "ts_recv_ns", "ts_done_ns", "ts_resp_ns")
+
+
+def _recorrect(systems: list[dict[str, Any]], clock: ClockModel, prefix: str = "") -> None:
+    """Recompute the offset-dependent fields in place; each dict holds `prefix + <field>`."""
+    stamps = np.array(
+        [
+            [_optional_int(system.get(prefix + name)) for name in _CLOCK_INPUTS]
+            for system in systems
+        ],
+        dtype=np.int64,
+    ).reshape(-1, len(_CLOCK_INPUTS))
+    send, recv, done, resp = stamps.T
+    offsets, queues = _clock_fields(send, recv, done, resp, clock)
+    for system, offset, queue in zip(systems, offsets, queues, strict=True):
+        system[prefix + "clock_offset_ns"] = offset
+        system[prefix + "server_queue_ms"] = queue
+
+
+def apply_clock_model(
+    paths: Iterable[Path],
+    clock: ClockModel,
+    chunk_rows: int = 50_000,
+) -> None:
+    """Rewrite `clock_offset_ns` and `server_queue_ms` in finished trace files with `clock`.
+
+    Rows are serialized while the run is still probing, so early rows only saw the first
+    estimates; rewriting with the final fit puts every row of a run on the same model.
+    """
+    for path in paths:
+        if not path.exists():
+            continue
+        if path.suffix == ".parquet":
+            rewrite_parquet_trace(path, lambda rows: _recorrect(rows, clock, "system."))
+            continue
+        tmp_path = path.with_name(f".tmp-{path.name}")
+        with open_text(tmp_path, "w") as handle:
+            source = iter_jsonl(path)
+            while chunk := list(islice(source, chunk_rows)):
+                _recorrect([row["system"] for row in chunk], clock)
+                handle.write("".join(json.dumps(row, ensure_ascii=False) + "\n" for row in chunk))
+        os.replace(tmp_path, path)
+
+
+__all__ = [
+    "ResultBatch",
+    "ResultBuffer",
+    "TraceContext",
+    "apply_clock_model",
+    "trace_rows",
+]
@@ -1,29 +1,70 @@
 from __future__ import annotations
 
 import asyncio
-import json
+import logging
+import math
 import random
 import time
 from collections import deque
-from collections.abc import Callable, Sequence
-from dataclasses import dataclass
-from datetime import UTC, datetime
+from collections.abc import Callable, Iterable, Sequence
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+from functools import lru_cache, partial
 from pathlib import Path
-from uuid import uuid4
-
-from qosflow.common.client import AsyncLLMClient
-from qosflow.common.config import ExperimentConfig, LoadGenConfig, ServerConfig
-from qosflow.common.hashing import sha256_normalized_json, sha256_normalized_text
-from qosflow.common.io import ensure_dir
-from qosflow.common.schema import (
-    PromptRecord,
-    TraceParams,
-    TraceRecord,
-    TraceServerSnapshot,
-    TraceSystem,
+from typing import Any
+
+import numpy as np
+
+from qosflow.common.client import AsyncLLMClient, encode_generate_body
+from qosflow.common.clock import ClockModel, probe_clock
+from qosflow.common.config import ExperimentConfig, LoadGenConfig, ServerConfig, TenantConfig
+from qosflow.common.engine_telemetry import (
+    ENGINE_TELEMETRY_COLUMNS,
+    EngineTelemetryRecorder,
+    engine_telemetry_segment_path,
+)
+from qosflow.common.hashing import sha256_normalized_json
+from qosflow.common.histogram import LatencyAccumulator
+from qosflow.common.host_telemetry import (
+    HOST_TELEMETRY_COLUMNS,
+    HostSampler,
+    HostTelemetryRecorder,
+    LoopLagMonitor,
+    host_telemetry_segment_path,
+)
+from qosflow.common.io import ensure_dir, write_json_atomic
+from qosflow.common.schema import PromptRecord, TraceParams, TraceServerSnapshot
+from qosflow.common.telemetry import (
+    TELEMETRY_COLUMNS,
+    NVMLSampler,
+    RotatingCsvWriter,
+    SamplerStats,
+    telemetry_segment_path,
+)
+from qosflow.common.trace_parquet import ParquetTraceSink, parquet_trace_path
+from qosflow.common.trace_writer import (
+    JsonlTraceSink,
+    RotatingTraceSink,
+    TraceSink,
+    TraceWriter,
+    TraceWriterStats,
+    trace_file_path,
 )
-from qosflow.common.telemetry import NVMLSampler
+from qosflow.loadgen.arrivals import arrival_offsets, default_arrival_process
+from qosflow.loadgen.backlog import BacklogQueue, Pending, UnservedOutcome
+from qosflow.loadgen.closed_loop import run_virtual_users
+from qosflow.loadgen.live import LiveStats
 from qosflow.loadgen.mix import PromptMixSampler
+from qosflow.loadgen.output_lengths import OutputLengthSampler
+from qosflow.loadgen.plan import WorkloadPlan
+from qosflow.loadgen.replay import ReplaySchedule, load_replay
+from qosflow.loadgen.results import ResultBuffer, TraceContext, apply_clock_model, trace_rows
+from qosflow.loadgen.tenants import TenantPromptStream, tenant_offsets
+
+logger = logging.getLogger(__name__)
+
+# (prompt, repeat_idx, max_new_tokens override, tenant) for one scheduled request.
+_Dispatch = tuple[PromptRecord, int, int | None, TenantConfig | None]
 
 
 @dataclass(frozen=True)
@@ -35,6 +76,23 @@ class LoadGenSummary:
     failed: int
     p50_total_ms: float
     p95_total_ms: float
+    writer: TraceWriterStats | None = None
+    telemetry: SamplerStats | None = None
+    dispatch_lag_p50_ms: float = 0.0
+    dispatch_lag_p99_ms: float = 0.0
+    dispatch_lag_max_ms: float = 0.0
+    p99_total_ms: float = 0.0
+    aborted: bool = False
+    abort_reason: str | None = None
+    clock_sync: dict[str, Any] | None = None
+    dropped: int = 0
+    expired: int = 0
+    backlog_max: int = 0
+    offered_rps: float = 0.0
+    admitted_rps: float = 0.0
+    completed_rps: float = 0.0
+    # Rows in the engine telemetry file; None when engine telemetry was not recorded.
+    engine_telemetry_rows: int | None = None
 
 
 def build_run_id(
@@ -43,7 +101,7 @@ def build_run_id(
     loadgen_config: LoadGenConfig,
     experiment_config: ExperimentConfig,
 ) -> str:
-    timestamp_token = timestamp.astimezone(UTC).strftime("%Y%m%dT%H%M%SZ")
+    timestamp_token = timestamp.astimezone(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
     hash_input = {
         "server": server_config.model_dump(mode="json"),
         "loadgen": loadgen_config.model_dump(mode="json"),
@@ -53,13 +111,38 @@ def build_run_id(
     return f"{timestamp_token}-{config_hash}"
 
 
-def _percentile(values: list[float], pct: float) -> float:
-    if not values:
-        return 0.0
-    sorted_values = sorted(values)
-    idx = int(round((len(sorted_values) - 1) * pct))
-    idx = max(0, min(idx, len(sorted_values) - 1))
-    return sorted_values[idx]
+def _trace_sinks(run_dir: Path, loadgen_config: LoadGenConfig) -> list[TraceSink]:
+    trace_cfg = loadgen_config.trace
+    soak_cfg = loadgen_config.soak
+    factories: dict[str, Callable[[int | None], TraceSink]] = {}
+    if trace_cfg.format in ("jsonl", "both"):
+        factories["jsonl"] = lambda segment: JsonlTraceSink(
+            trace_file_path(run_dir, trace_cfg.compression, segment), trace_cfg.compression
+        )
+    if trace_cfg.format in ("parquet", "both"):
+        factories["parquet"] = lambda segment: ParquetTraceSink(
+            parquet_trace_path(run_dir, segment),
+            compression=trace_cfg.compression,
+            row_group_size=trace_cfg.row_group_size,
+        )
+    if soak_cfg is None:
+        return [factory(None) for factory in factories.values()]
+    rotate_s = {"jsonl": soak_cfg.rotate_s, "parquet": soak_cfg.rotate_s}
+    if soak_cfg.checkpoint_interval_s > 0:
+        # A Parquet file has no footer until it is closed, so a crash would lose the whole open
+        # segment; closing one per checkpoint bounds the loss to one checkpoint window.
+        rotate_s["parquet"] = min(soak_cfg.rotate_s or math.inf, soak_cfg.checkpoint_interval_s)
+    return [
+        RotatingTraceSink(factory, rotate_bytes=soak_cfg.rotate_bytes, rotate_s=rotate_s[name])
+        for name, factory in factories.items()
+    ]
+
+
+async def _cancel_all(tasks: Iterable[asyncio.Task[Any]]) -> None:
+    pending = list(tasks)
+    for task in pending:
+        task.cancel()
+    await asyncio.gather(*pending, return_exceptions=True)
 
 
 async def run_load(
@@ -71,23 +154,46 @@ async def run_load(
     now: datetime | None = None,
     rng: random.Random | None = None,
     client_factory: Callable[[], AsyncLLMClient] | None = None,
+    plan: WorkloadPlan | None = None,
 ) -> LoadGenSummary:
+    """Drive one load run and write its trace, telemetry and progress files.
+
+    With `plan`, the precompiled request sequence is dispatched as-is (its warmup/duration
+    window replaces the config's) and no sampling happens during the run.
+    """
     if not prompts:
         raise ValueError("prompts list must not be empty")
-    if loadgen_config.arrival_rate_rps <= 0:
+    if (
+        plan is None
+        and loadgen_config.mode == "open"
+        and not loadgen_config.tenants
+        and loadgen_config.arrival is None
+        and loadgen_config.arrival_rate_rps <= 0
+    ):
         raise ValueError("arrival_rate_rps must be > 0")
     if loadgen_config.repeats <= 0:
         raise ValueError("repeats must be > 0")
 
-    run_ts = now or datetime.now(tz=UTC)
+    run_ts = now or datetime.now(tz=timezone.utc)
     run_id = build_run_id(run_ts, server_config, loadgen_config, experiment_config)
-    trace_path = (
-        ensure_dir(experiment_config.output_dir) / "traces" / f"run_id={run_id}" / "trace.jsonl"
-    )
-    ensure_dir(trace_path.parent)
-    telemetry_path = trace_path.parent / "telemetry.csv"
+    run_dir = ensure_dir(ensure_dir(experiment_config.output_dir) / "traces" / f"run_id={run_id}")
+    trace_sinks = _trace_sinks(run_dir, loadgen_config)
+    trace_path = trace_sinks[0].path
+    telemetry_path = run_dir / "telemetry.csv"
+    soak_cfg = loadgen_config.soak
+    # Samples are appended as they arrive; soak runs also rotate them into segments.
+    if soak_cfg is not None:
+        telemetry_stream = RotatingCsvWriter(
+            lambda segment: telemetry_segment_path(run_dir, segment),
+            TELEMETRY_COLUMNS,
+            rotate_bytes=soak_cfg.rotate_bytes,
+            rotate_s=soak_cfg.rotate_s,
+        )
+    else:
+        telemetry_stream = RotatingCsvWriter(lambda _segment: telemetry_path, TELEMETRY_COLUMNS)
 
     schedule_rng = rng or random.Random()
+    schedule_seed = loadgen_config.seed if loadgen_config.seed is not None else server_config.seed
     sampler = PromptMixSampler(
         prompts,
         {
@@ -97,7 +203,29 @@ async def run_load(
         },
         rng=schedule_rng,
     )
+    output_lengths = (
+        OutputLengthSampler(
+            loadgen_config.output_lengths, server_config.max_new_tokens, schedule_seed
+        )
+        if loadgen_config.output_lengths
+        else None
+    )
     pending_repeats: deque[tuple[PromptRecord, int]] = deque()
+    replay_schedule: ReplaySchedule | None = None
+    replay_prompts: list[PromptRecord] = []
+    plan_prompts: list[PromptRecord] = []
+    plan_tenants: list[TenantConfig] = []
+    tenant_stream: TenantPromptStream | None = None
+    if plan is not None:
+        plan_prompts = plan.resolve_prompts(prompts)
+        plan_tenants = plan.resolve_tenants(loadgen_config.tenants)
+    elif loadgen_config.tenants:
+        tenant_stream = TenantPromptStream(
+            prompts, loadgen_config.tenants, loadgen_config.repeats, schedule_rng
+        )
+    elif loadgen_config.mode == "replay":
+        assert loadgen_config.replay is not None
+        replay_schedule, replay_prompts = load_replay(loadgen_config.replay, prompts, sampler)
 
     concurrency = max(1, loadgen_config.concurrency)
     semaphore = asyncio.Semaphore(concurrency)
@@ -107,6 +235,7 @@ async def run_load(
         client = AsyncLLMClient(base_url=base_url, timeout=60.0)
     else:
         client = client_factory()
+    encoded_client = isinstance(client, AsyncLLMClient)
 
     params = TraceParams(
         temperature=server_config.temperature,
@@ -114,6 +243,7 @@ async def run_load(
         seed=server_config.seed,
         max_new_tokens=server_config.max_new_tokens,
     )
+    params_payload = params.model_dump(mode="json")
     server_snapshot = TraceServerSnapshot(
         model=server_config.model,
         dtype=server_config.dtype,
@@ -124,64 +254,148 @@ async def run_load(
         },
     )
 
-    stats = {"sent": 0, "success": 0, "failed": 0}
-    latencies_ms: list[float] = []
-    write_lock = asyncio.Lock()
+    stats = {"sent": 0, "success": 0, "failed": 0, "dropped": 0, "expired": 0}
+    # Soak runs keep only fixed-size histograms; normal runs keep exact samples.
+    exact_limit = 0 if soak_cfg is not None else None
+    latencies_ms = LatencyAccumulator(exact_limit)
+    dispatch_lags_ms = LatencyAccumulator(exact_limit)
+    trace_writer = TraceWriter(
+        trace_sinks,
+        queue_size=loadgen_config.trace.queue_size,
+        batch_size=loadgen_config.trace.batch_size,
+        flush_interval_s=loadgen_config.trace.flush_interval_s,
+    )
+    trace_writer.start()
+    clock_sync_cfg = loadgen_config.clock_sync
+    clock_model = ClockModel()
+    clock_sync_enabled = clock_sync_cfg.enabled and isinstance(client, AsyncLLMClient)
+
+    async def probe_server_clock(phase: str) -> None:
+        nonlocal clock_sync_enabled
+        if not clock_sync_enabled:
+            return
+        assert isinstance(client, AsyncLLMClient)
+        try:
+            estimate = await probe_clock(
+                client.server_time, samples=clock_sync_cfg.samples, phase=phase
+            )
+        except Exception as exc:  # noqa: BLE001
+            # Servers without `/time` still run; derived timings stay uncorrected.
+            logger.warning(
+                "clock sync unavailable, server timings are not offset-corrected: %s", exc
+            )
+            clock_sync_enabled = False
+            return
+        clock_model.add(estimate)
 
-    warmup_end = time.monotonic() + float(loadgen_config.warmup_s)
-    stop_at = warmup_end + float(loadgen_config.duration_s)
-    telemetry_sampler = NVMLSampler(telemetry_interval_s=loadgen_config.telemetry_interval_s)
-    telemetry_sampler.start()
+    async def clock_sync_loop(interval_s: float) -> None:
+        while True:
+            await asyncio.sleep(interval_s)
+            await probe_server_clock("during")
+
+    await probe_server_clock("before")
+    results = ResultBuffer(loadgen_config.trace.batch_size)
+    trace_context = TraceContext(
+        run_id=run_id,
+        params=params_payload,
+        server=server_snapshot.model_dump(mode="json"),
+        clock=clock_model,
+    )
 
-    async def fire_request(prompt: PromptRecord, repeat_idx: int, should_record: bool) -> None:
+    warmup_s = float(loadgen_config.warmup_s if plan is None else plan.warmup_s)
+    duration_s = float(loadgen_config.duration_s if plan is None else plan.duration_s)
+    run_start = time.monotonic()
+    warmup_end = run_start + warmup_s
+    stop_at = warmup_end + duration_s
+    host_cfg = loadgen_config.host_telemetry
+    loop_lag: LoopLagMonitor | None = None
+    host_recorder: HostTelemetryRecorder | None = None
+    if host_cfg.enabled:
+        loop_lag = LoopLagMonitor(host_cfg.loop_lag_interval_s)
+        host_recorder = HostTelemetryRecorder(
+            RotatingCsvWriter(
+                (lambda segment: host_telemetry_segment_path(run_dir, segment))
+                if soak_cfg is not None
+                else (lambda _segment: run_dir / "host_telemetry.csv"),
+                HOST_TELEMETRY_COLUMNS,
+                rotate_bytes=soak_cfg.rotate_bytes if soak_cfg is not None else None,
+                rotate_s=soak_cfg.rotate_s if soak_cfg is not None else None,
+            ),
+            HostSampler("loadgen", loop_lag=loop_lag),
+            server_url=base_url if host_cfg.server and encoded_client else None,
+            timeout_s=loadgen_config.telemetry_interval_s / 2,
+        )
+    engine_recorder: EngineTelemetryRecorder | None = None
+    if loadgen_config.engine_telemetry.enabled and encoded_client:
+        engine_recorder = EngineTelemetryRecorder(
+            RotatingCsvWriter(
+                (lambda segment: engine_telemetry_segment_path(run_dir, segment))
+                if soak_cfg is not None
+                else (lambda _segment: run_dir / "engine_telemetry.csv"),
+                ENGINE_TELEMETRY_COLUMNS,
+                rotate_bytes=soak_cfg.rotate_bytes if soak_cfg is not None else None,
+                rotate_s=soak_cfg.rotate_s if soak_cfg is not None else None,
+            ),
+            base_url,
+            timeout_s=loadgen_config.telemetry_interval_s / 2,
+        )
+    tick_recorders = [
+        recorder for recorder in (host_recorder, engine_recorder) if recorder is not None
+    ]
+
+    def on_tick(timestamp: str) -> None:
+        for recorder in tick_recorders:
+            recorder(timestamp)
+
+    telemetry_sampler = NVMLSampler(
+        telemetry_interval_s=loadgen_config.telemetry_interval_s,
+        stream=telemetry_stream,
+        on_tick=on_tick if tick_recorders else None,
+    )
+    telemetry_sampler.start()
+    live_stats = LiveStats(loadgen_config.live, run_dir / "progress.jsonl")
+    abort = asyncio.Event()
+
+    @lru_cache(maxsize=4096)
+    def request_body(text: str, max_new_tokens: int) -> bytes:
+        return encode_generate_body(text, {**params_payload, "max_new_tokens": max_new_tokens})
+
+    def resolve_max_new_tokens(prompt: PromptRecord, max_new_tokens: int | None) -> int:
+        if max_new_tokens is None and output_lengths is not None:
+            max_new_tokens = output_lengths.sample(prompt)
+        return params.max_new_tokens if max_new_tokens is None else max_new_tokens
+
+    async def fire_request(
+        prompt: PromptRecord,
+        repeat_idx: int,
+        should_record: bool,
+        max_new_tokens: int | None = None,
+        tenant: TenantConfig | None = None,
+    ) -> None:
+        max_new_tokens = resolve_max_new_tokens(prompt, max_new_tokens)
         async with semaphore:
+            live_stats.record_start()
             ts_start_ns = time.time_ns()
-            ts_send_ns = ts_start_ns
             output_text = ""
             status_code = 0
             err_msg: str | None = None
-            batch_size: int | None = None
-            queue_ms: float | None = None
-            prefill_ms: float | None = None
-            decode_ms: float | None = None
-            ts_recv_ns: int | None = None
-            ts_done_ns: int | None = None
+            timings: dict[str, Any] = {}
 
             try:
-                output_text, timings, status_code = await client.generate(
-                    prompt.text,
-                    params=params.model_dump(mode="json"),
-                )
-                batch_size = timings.get("batch_size")
-                queue_ms = timings.get("queue_ms")
-                prefill_ms = timings.get("prefill_ms")
-                decode_ms = timings.get("decode_ms")
-                ts_recv_ns = timings.get("ts_recv_ns")
-                ts_done_ns = timings.get("ts_done_ns")
+                if encoded_client:
+                    output_text, timings, status_code = await client.generate_encoded(
+                        request_body(prompt.text, max_new_tokens)
+                    )
+                else:
+                    output_text, timings, status_code = await client.generate(
+                        prompt.text,
+                        params={**params_payload, "max_new_tokens": max_new_tokens},
+                    )
             except Exception as exc:  # noqa: BLE001
                 err_msg = str(exc)
             ts_end_ns = time.time_ns()
-            ts_resp_ns = ts_end_ns
             total_ms = (ts_end_ns - ts_start_ns) / 1_000_000.0
-
-            server_total_ns: int | None = None
-            if ts_recv_ns is not None and ts_done_ns is not None:
-                server_total_ns = max(0, ts_done_ns - ts_recv_ns)
-
-            network_rtt_ms: float | None = None
-            network_rtt_ns: float | None = None
-            if server_total_ns is not None:
-                network_rtt_ns = float((ts_resp_ns - ts_send_ns) - server_total_ns)
-                network_rtt_ms = network_rtt_ns / 1_000_000.0
-
-            server_queue_ms: float | None = None
-            if ts_recv_ns is not None and network_rtt_ns is not None:
-                queue_ns = max(0.0, float(ts_recv_ns - ts_send_ns) - (network_rtt_ns / 2.0))
-                server_queue_ms = queue_ns / 1_000_000.0
-
-            server_compute_ms: float | None = None
-            if server_total_ns is not None:
-                server_compute_ms = server_total_ns / 1_000_000.0
+            live_stats.record_end(total_ms, ok=err_msg is None)
 
             if not should_record:
                 return
@@ -191,74 +405,292 @@ async def run_load(
                 stats["success"] += 1
             else:
                 stats["failed"] += 1
-            latencies_ms.append(total_ms)
+            latencies_ms.add(total_ms)
 
-            trace = TraceRecord(
-                request_id=str(uuid4()),
-                run_id=run_id,
-                prompt_id=prompt.prompt_id,
-                repeat_idx=repeat_idx,
+            full = results.append(
+                prompt,
+                repeat_idx,
+                max_new_tokens,
+                tenant,
                 ts_start_ns=ts_start_ns,
                 ts_end_ns=ts_end_ns,
                 total_ms=total_ms,
-                params=params,
-                server=server_snapshot,
-                system=TraceSystem(
-                    http_status=status_code,
-                    error=err_msg,
-                    batch_size=batch_size,
-                    queue_ms=queue_ms,
-                    prefill_ms=prefill_ms,
-                    decode_ms=decode_ms,
-                    ts_send_ns=ts_send_ns,
-                    ts_recv_ns=ts_recv_ns,
-                    ts_done_ns=ts_done_ns,
-                    ts_resp_ns=ts_resp_ns,
-                    network_rtt_ms=network_rtt_ms,
-                    server_queue_ms=server_queue_ms,
-                    server_compute_ms=server_compute_ms,
-                ),
-                prompt_hash=sha256_normalized_text(prompt.text),
-                output_hash=sha256_normalized_text(output_text),
-                prompt_len_chars=len(prompt.text),
-                output_len_chars=len(output_text),
+                http_status=status_code,
+                error=err_msg,
                 output_text=output_text,
+                timings=timings,
             )
+            if full:
+                await drain_results()
+
+    async def record_unserved(
+        entry: Pending[tuple[_Dispatch, bool]], outcome: UnservedOutcome
+    ) -> None:
+        (prompt, repeat_idx, max_new_tokens, tenant), should_record = entry.item
+        if not should_record:
+            return
+        stats[outcome] += 1
+        ts_end_ns = time.time_ns()
+        full = results.append(
+            prompt,
+            repeat_idx,
+            resolve_max_new_tokens(prompt, max_new_tokens),
+            tenant,
+            ts_start_ns=entry.arrived_ns,
+            ts_end_ns=max(ts_end_ns, entry.arrived_ns),
+            total_ms=max(ts_end_ns - entry.arrived_ns, 0) / 1_000_000.0,
+            http_status=0,
+            error=None,
+            output_text="",
+            timings={},
+            outcome=outcome,
+        )
+        if full:
+            await drain_results()
+
+    async def drain_results() -> None:
+        batch = results.drain()
+        if batch is not None:
+            await trace_writer.put_deferred(partial(trace_rows, batch, trace_context))
+
+    async def drain_loop(interval_s: float) -> None:
+        # Low-rate runs may never fill the buffer; keep rows reaching disk on the flush cadence.
+        while True:
+            await asyncio.sleep(interval_s)
+            await drain_results()
+
+    def next_open_loop_request(_idx: int) -> _Dispatch:
+        if not pending_repeats:
+            chosen = sampler.sample()
+            for repeat_idx in range(loadgen_config.repeats):
+                pending_repeats.append((chosen, repeat_idx))
+        prompt, repeat_idx = pending_repeats.popleft()
+        return prompt, repeat_idx, None, None
+
+    def next_replay_request(idx: int) -> _Dispatch:
+        assert replay_schedule is not None
+        return replay_prompts[idx], replay_schedule.repeat_idx[idx], None, None
+
+    def next_plan_request(idx: int) -> _Dispatch:
+        assert plan is not None
+        tenant_idx = int(plan.tenant_index[idx])
+        return (
+            plan_prompts[plan.prompt_index[idx]],
+            int(plan.repeat_idx[idx]),
+            int(plan.max_new_tokens[idx]),
+            plan_tenants[tenant_idx] if tenant_idx >= 0 else None,
+        )
+
+    backlog_cfg = loadgen_config.backlog
+    backlog: BacklogQueue[tuple[_Dispatch, bool]] | None = (
+        BacklogQueue(backlog_cfg) if backlog_cfg.policy != "unbounded" else None
+    )
 
-            async with write_lock:
-                with trace_path.open("a", encoding="utf-8") as handle:
-                    payload = json.dumps(trace.model_dump(mode="json"), ensure_ascii=False)
-                    handle.write(payload + "\n")
-
-    tasks: list[asyncio.Task[None]] = []
-
-    try:
+    async def backlog_worker(
+        queue: BacklogQueue[tuple[_Dispatch, bool]], wake: asyncio.Event, closed: asyncio.Event
+    ) -> None:
         while True:
-            now_monotonic = time.monotonic()
-            if now_monotonic >= stop_at:
-                break
-
-            wait_s = schedule_rng.expovariate(loadgen_config.arrival_rate_rps)
-            await asyncio.sleep(wait_s)
-            now_monotonic = time.monotonic()
-            if now_monotonic >= stop_at:
-                break
-
-            if not pending_repeats:
-                chosen = sampler.sample()
-                for repeat_idx in range(loadgen_config.repeats):
-                    pending_repeats.append((chosen, repeat_idx))
-
-            prompt, repeat_idx = pending_repeats.popleft()
-            should_record = now_monotonic >= warmup_end
-            tasks.append(asyncio.create_task(fire_request(prompt, repeat_idx, should_record)))
-
-        if tasks:
-            await asyncio.gather(*tasks)
+            entry, expired = queue.take(time.monotonic())
+            for stale in expired:
+                await record_unserved(stale, "expired")
+            if entry is None:
+                if closed.is_set():
+                    return
+                wake.clear()
+                await wake.wait()
+                continue
+            (prompt, repeat_idx, max_new_tokens, tenant), should_record = entry.item
+            await fire_request(prompt, repeat_idx, should_record, max_new_tokens, tenant)
+
+    async def dispatch_schedule(
+        offsets: Iterable[float],
+        next_request: Callable[[int], _Dispatch],
+    ) -> None:
+        if backlog is not None:
+            await dispatch_with_backlog(offsets, next_request, backlog)
+            return
+        # Offsets are precomputed; dispatch only sleeps, fires and records how late it fired.
+        # Finished tasks drop out of `tasks` immediately so long runs do not accumulate them.
+        tasks: set[asyncio.Task[None]] = set()
+        try:
+            for idx, offset in enumerate(offsets):
+                offset_s = float(offset)
+                scheduled = run_start + offset_s
+                await asyncio.sleep(max(0.0, scheduled - time.monotonic()))
+                now_monotonic = time.monotonic()
+                if now_monotonic >= stop_at:
+                    break
+                dispatch_lags_ms.add((now_monotonic - scheduled) * 1000.0)
+
+                prompt, repeat_idx, max_new_tokens, tenant = next_request(idx)
+                should_record = offset_s >= warmup_s
+                task = asyncio.create_task(
+                    fire_request(prompt, repeat_idx, should_record, max_new_tokens, tenant)
+                )
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+
+            if tasks:
+                await asyncio.gather(*tasks)
+        finally:
+            # On abort, in-flight requests must finish before the client and trace writer close.
+            await _cancel_all(tasks)
+
+    async def dispatch_with_backlog(
+        offsets: Iterable[float],
+        next_request: Callable[[int], _Dispatch],
+        queue: BacklogQueue[tuple[_Dispatch, bool]],
+    ) -> None:
+        # A fixed pool of `concurrency` workers serves a bounded backlog, so overload turns
+        # into dropped/expired rows instead of an ever-growing set of parked tasks.
+        wake = asyncio.Event()
+        closed = asyncio.Event()
+        workers = [
+            asyncio.create_task(backlog_worker(queue, wake, closed)) for _ in range(concurrency)
+        ]
+        try:
+            for idx, offset in enumerate(offsets):
+                offset_s = float(offset)
+                scheduled = run_start + offset_s
+                await asyncio.sleep(max(0.0, scheduled - time.monotonic()))
+                now_monotonic = time.monotonic()
+                if now_monotonic >= stop_at:
+                    break
+                dispatch_lags_ms.add((now_monotonic - scheduled) * 1000.0)
+
+                entry = Pending(
+                    (next_request(idx), offset_s >= warmup_s), now_monotonic, time.time_ns()
+                )
+                dropped = queue.offer(entry)
+                if dropped is not None:
+                    await record_unserved(dropped, "dropped")
+                wake.set()
+            closed.set()
+            wake.set()
+            await asyncio.gather(*workers)
+        finally:
+            await _cancel_all(workers)
+
+    def checkpoint(complete: bool) -> None:
+        write_json_atomic(
+            run_dir / "checkpoint.json",
+            {
+                "run_id": run_id,
+                "updated_at": datetime.now(tz=timezone.utc).isoformat(),
+                "elapsed_s": time.monotonic() - run_start,
+                "complete": complete,
+                **stats,
+                "latency_ms": latencies_ms.to_histogram().to_dict(),
+                "dispatch_lag_ms": dispatch_lags_ms.to_histogram().to_dict(),
+                "p50_total_ms": latencies_ms.quantile(0.50),
+                "p95_total_ms": latencies_ms.quantile(0.95),
+                "p99_total_ms": latencies_ms.quantile(0.99),
+                "writer": asdict(trace_writer.stats),
+                "trace_segments": [
+                    str(path) for sink in trace_sinks for path in getattr(sink, "paths", [])
+                ],
+                "telemetry_segments": [str(path) for path in telemetry_stream.paths],
+                "host_telemetry_segments": [
+                    str(path) for path in (host_recorder.stream.paths if host_recorder else [])
+                ],
+                "engine_telemetry_segments": [
+                    str(path) for path in (engine_recorder.stream.paths if engine_recorder else [])
+                ],
+                "abort_reason": live_stats.abort_reason,
+            },
+        )
+
+    async def checkpoint_loop(interval_s: float) -> None:
+        while True:
+            await asyncio.sleep(interval_s)
+            checkpoint(complete=False)
+
+    async def run_workload() -> None:
+        if plan is not None:
+            await dispatch_schedule(plan.offsets_s, next_plan_request)
+        elif loadgen_config.mode == "closed":
+            assert loadgen_config.closed_loop is not None
+            await run_virtual_users(
+                loadgen_config.closed_loop,
+                sampler,
+                fire_request,
+                repeats=loadgen_config.repeats,
+                warmup_end=warmup_end,
+                stop_at=stop_at,
+                seed=schedule_seed,
+            )
+        elif replay_schedule is not None:
+            await dispatch_schedule(replay_schedule.offsets_s, next_replay_request)
+        elif tenant_stream is not None:
+            tenants = loadgen_config.tenants
+            offsets, owners = tenant_offsets(tenants, warmup_s + duration_s, schedule_seed)
+
+            def next_tenant_request(idx: int) -> _Dispatch:
+                tenant_idx = int(owners[idx])
+                tenant = tenants[tenant_idx]
+                assert tenant_stream is not None
+                prompt, repeat_idx = tenant_stream.next(tenant_idx)
+                return prompt, repeat_idx, tenant.max_new_tokens, tenant
+
+            await dispatch_schedule(offsets, next_tenant_request)
+        else:
+            offsets = arrival_offsets(
+                default_arrival_process(loadgen_config),
+                warmup_s + duration_s,
+                np.random.default_rng(schedule_seed),
+            )
+            await dispatch_schedule(offsets, next_open_loop_request)
+
+    workload = asyncio.create_task(run_workload())
+    watchers: list[asyncio.Task[object]] = []
+    if loadgen_config.live.enabled:
+        watchers.append(asyncio.create_task(live_stats.run(abort, warmup_end)))
+        watchers.append(asyncio.create_task(abort.wait()))
+    watchers.append(asyncio.create_task(drain_loop(loadgen_config.trace.flush_interval_s)))
+    if loop_lag is not None:
+        watchers.append(asyncio.create_task(loop_lag.run()))
+    if clock_sync_enabled and clock_sync_cfg.interval_s > 0:
+        watchers.append(asyncio.create_task(clock_sync_loop(clock_sync_cfg.interval_s)))
+    if soak_cfg is not None and soak_cfg.checkpoint_interval_s > 0:
+        watchers.append(asyncio.create_task(checkpoint_loop(soak_cfg.checkpoint_interval_s)))
+    try:
+        await asyncio.wait([workload, *watchers], return_when=asyncio.FIRST_COMPLETED)
+        if abort.is_set() and not workload.done():
+            # Stop dispatching and cancel in-flight requests; the abort is recorded in the summary.
+            workload.cancel()
+        await asyncio.gather(workload, return_exceptions=abort.is_set())
     finally:
+        for watcher in watchers:
+            watcher.cancel()
+        await asyncio.gather(*watchers, return_exceptions=True)
+        live_stats.close()
         await telemetry_sampler.stop()
-        telemetry_sampler.write_csv(telemetry_path)
+        if host_recorder is not None:
+            host_recorder.close()
+        if engine_recorder is not None:
+            engine_recorder.close()
+        await probe_server_clock("after")
         await client.aclose()
+        await drain_results()
+        writer_stats = await trace_writer.close()
+        ended = time.monotonic()
+        if clock_model.estimates:
+            # Rows were serialized against the model as it stood; put them all on the final fit.
+            trace_files = [
+                path for sink in trace_sinks for path in getattr(sink, "paths", [sink.path])
+            ]
+            await asyncio.to_thread(apply_clock_model, trace_files, clock_model)
+            write_json_atomic(run_dir / "clock.json", clock_model.to_dict())
+        if soak_cfg is not None:
+            checkpoint(complete=True)
+
+    # Rates cover the measured window only, like the recorded rows they are counted from.
+    measured_s = max(min(ended, stop_at) - warmup_end, 0.0)
+    admitted = stats["sent"]
+    offered = admitted + stats["dropped"] + stats["expired"]
+
+    def rate(count: int) -> float:
+        return count / measured_s if measured_s > 0 else 0.0
 
     return LoadGenSummary(
         run_id=run_id,
@@ -266,8 +698,24 @@ async def run_load(
         sent=stats["sent"],
         success=stats["success"],
         failed=stats["failed"],
-        p50_total_ms=_percentile(latencies_ms, 0.50),
-        p95_total_ms=_percentile(latencies_ms, 0.95),
+        p50_total_ms=latencies_ms.quantile(0.50),
+        p95_total_ms=latencies_ms.quantile(0.95),
+        writer=writer_stats,
+        telemetry=telemetry_sampler.stats,
+        dispatch_lag_p50_ms=dispatch_lags_ms.quantile(0.50),
+        dispatch_lag_p99_ms=dispatch_lags_ms.quantile(0.99),
+        dispatch_lag_max_ms=dispatch_lags_ms.max,
+        p99_total_ms=latencies_ms.quantile(0.99),
+        aborted=live_stats.abort_reason is not None,
+        abort_reason=live_stats.abort_reason,
+        clock_sync=clock_model.to_dict() if clock_model.estimates else None,
+        dropped=stats["dropped"],
+        expired=stats["expired"],
+        backlog_max=backlog.high_water if backlog is not None else 0,
+        offered_rps=rate(offered),
+        admitted_rps=rate(admitted),
+        completed_rps=rate(stats["success"]),
+        engine_telemetry_rows=engine_recorder.rows if engine_recorder is not None else None,
     )
 
 
@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+import random
+from collections import deque
+from collections.abc import Sequence
+
+import numpy as np
+
+from qosflow.common.config import ArrivalProcessConfig, PoissonArrivalConfig, TenantConfig
+from qosflow.common.schema import PromptRecord
+from qosflow.loadgen.arrivals import arrival_offsets, mean_rate, with_mean_rate
+from qosflow.loadgen.mix import PromptMixSampler
+
+
+def tenant_arrival_process(tenant: TenantConfig) -> ArrivalProcessConfig:
+    if tenant.arrival is not None:
+        return tenant.arrival
+    if tenant.arrival_rate_rps <= 0:
+        raise ValueError(f"tenant {tenant.name!r} needs arrival or arrival_rate_rps > 0")
+    return PoissonArrivalConfig(rate_rps=tenant.arrival_rate_rps)
+
+
+def with_total_rate(tenants: Sequence[TenantConfig], rate_rps: float) -> list[TenantConfig]:
+    """Rescale every tenant by one factor so their combined mean rate is `rate_rps`.
+
+    Each tenant keeps its share of the traffic and the shape of its arrival process.
+    """
+    processes = [tenant_arrival_process(tenant) for tenant in tenants]
+    total = sum(mean_rate(process) for process in processes)
+    if total <= 0:
+        raise ValueError("cannot rescale tenants with zero combined mean rate")
+    factor = rate_rps / total
+    scaled: list[TenantConfig] = []
+    for tenant, process in zip(tenants, processes, strict=True):
+        target = mean_rate(process) * factor
+        if tenant.arrival is None:
+            scaled.append(tenant.model_copy(update={"arrival_rate_rps": target}))
+        else:
+            arrival = with_mean_rate(tenant.arrival, target)
+            scaled.append(tenant.model_copy(update={"arrival": arrival}))
+    return scaled
+
+
+def tenant_offsets(
+    tenants: Sequence[TenantConfig],
+    horizon_s: float,
+    seed: int,
+) -> tuple[np.ndarray, np.ndarray]:
+    """Generate each tenant's arrivals independently and merge them into one schedule.
+
+    Returns the sorted offsets and, for each offset, the index of the tenant it belongs to.
+    Tenant `i` draws from its own stream seeded by `(seed, i)`.
+    """
+    if not tenants:
+        return np.empty(0, dtype=float), np.empty(0, dtype=np.int16)
+    parts = [
+        arrival_offsets(
+            tenant_arrival_process(tenant), horizon_s, np.random.default_rng([seed, idx])
+        )
+        for idx, tenant in enumerate(tenants)
+    ]
+    offsets = np.concatenate(parts)
+    owners = np.concatenate(
+        [np.full(len(part), idx, dtype=np.int16) for idx, part in enumerate(parts)]
+    )
+    order = np.argsort(offsets, kind="stable")
+    return offsets[order], owners[order]
+
+
+class TenantPromptStream:
+    """Draw prompts per tenant, sending each sampled prompt `repeats` times in a row."""
+
+    def __init__(
+        self,
+        prompts: Sequence[PromptRecord],
+        tenants: Sequence[TenantConfig],
+        repeats: int,
+        rng: random.Random,
+    ) -> None:
+        self._repeats = repeats
+        self._samplers = [
+            PromptMixSampler(
+                prompts,
+                {"short": tenant.mix.short, "med": tenant.mix.med, "long": tenant.mix.long},
+                rng=rng,
+            )
+            for tenant in tenants
+        ]
+        self._pending: list[deque[tuple[PromptRecord, int]]] = [deque() for _ in tenants]
+
+    def next(self, tenant_idx: int) -> tuple[PromptRecord, int]:
+        pending = self._pending[tenant_idx]
+        if not pending:
+            chosen = self._samplers[tenant_idx].sample()
+            for repeat_idx in range(self._repeats):
+                pending.append((chosen, repeat_idx))
+        return pending.popleft()
+
+
+__all__ = [
+    "TenantPromptStream",
+    "tenant_arrival_process",
+    "tenant_offsets",
+    "with_total_rate",
+]
@@ -0,0 +1,258 @@
+from __future__ import annotations
+
+import hashlib
+import sqlite3
+from collections.abc import Callable, Iterable, Sequence
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+
+from qosflow.common.config import LengthBucketConfig, ServerConfig
+from qosflow.common.schema import PromptRecord
+from qosflow.loadgen.prompt_store import PromptStore, open_prompt_catalog
+from qosflow.loadgen.prompts import (
+    LengthThresholds,
+    TokenThresholds,
+    bucket_for_tokens,
+)
+
+CountBatch = Callable[[Sequence[str]], list[int]]
+
+DEFAULT_CACHE_PATH = Path.home() / ".cache" / "qosflow" / "token_counts.sqlite"
+_SQLITE_MAX_PARAMS = 900
+
+
+def prompt_text_hash(text: str) -> bytes:
+    # Exact (not normalized) text: whitespace changes the token count.
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+
+
+class TokenCountCache:
+    """Token counts persisted in SQLite, keyed by (tokenizer id, prompt text hash)."""
+
+    def __init__(self, path: str | Path = DEFAULT_CACHE_PATH) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(self.path)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS token_counts ("
+            "tokenizer TEXT NOT NULL, prompt_hash BLOB NOT NULL, n_tokens INTEGER NOT NULL, "
+            "PRIMARY KEY (tokenizer, prompt_hash)) WITHOUT ROWID"
+        )
+        self._conn.commit()
+
+    def get_many(self, tokenizer_id: str, hashes: Sequence[bytes]) -> dict[bytes, int]:
+        found: dict[bytes, int] = {}
+        unique = list(dict.fromkeys(hashes))
+        for start in range(0, len(unique), _SQLITE_MAX_PARAMS):
+            chunk = unique[start : start + _SQLITE_MAX_PARAMS]
+            placeholders = ",".join("?" * len(chunk))
+            rows = self._conn.execute(
+                "SELECT prompt_hash, n_tokens FROM token_counts "
+                f"WHERE tokenizer = ? AND prompt_hash IN ({placeholders})",
+                [tokenizer_id, *chunk],
+            )
+            found.update((bytes(key), int(count)) for key, count in rows)
+        return found
+
+    def put_many(self, tokenizer_id: str, counts: Iterable[tuple[bytes, int]]) -> None:
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO token_counts (tokenizer, prompt_hash, n_tokens) "
+            "VALUES (?, ?, ?)",
+            ((tokenizer_id, key, count) for key, count in counts),
+        )
+        self._conn.commit()
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+class TokenCounter:
+    """Count tokens for many texts in parallel batches, consulting the cache first."""
+
+    def __init__(
+        self,
+        count_batch: CountBatch,
+        tokenizer_id: str,
+        *,
+        cache: TokenCountCache | None = None,
+        batch_size: int = 1024,
+        workers: int = 4,
+    ) -> None:
+        if batch_size <= 0:
+            raise ValueError("batch_size must be > 0")
+        self.count_batch = count_batch
+        self.tokenizer_id = tokenizer_id
+        self.cache = cache
+        self.batch_size = batch_size
+        self.workers = max(1, workers)
+
+    def count(self, texts: Sequence[str]) -> np.ndarray:
+        hashes = [prompt_text_hash(text) for text in texts]
+        known = self.cache.get_many(self.tokenizer_id, hashes) if self.cache is not None else {}
+
+        pending: dict[bytes, str] = {}
+        for key, text in zip(hashes, texts, strict=True):
+            if key not in known and key not in pending:
+                pending[key] = text
+        if pending:
+            keys = list(pending)
+            batches = [
+                keys[start : start + self.batch_size]
+                for start in range(0, len(keys), self.batch_size)
+            ]
+            with ThreadPoolExecutor(max_workers=self.workers) as pool:
+                results = pool.map(
+                    lambda batch: self.count_batch([pending[key] for key in batch]), batches
+                )
+                computed = {
+                    key: int(count)
+                    for batch, counts in zip(batches, results, strict=True)
+                    for key, count in zip(batch, counts, strict=True)
+                }
+            if self.cache is not None:
+                self.cache.put_many(self.tokenizer_id, computed.items())
+            known.update(computed)
+        return np.fromiter((known[key] for key in hashes), dtype=np.int64, count=len(hashes))
+
+    def count_stream(self, texts: Iterable[str], chunk_size: int = 65_536) -> np.ndarray:
+        """Count an arbitrarily long text stream while holding only `chunk_size` texts."""
+        iterator = iter(texts)
+        parts: list[np.ndarray] = []
+        while chunk := list(islice(iterator, chunk_size)):
+            parts.append(self.count(chunk))
+        return np.concatenate(parts) if parts else np.empty(0, dtype=np.int64)
+
+
+def _file_digest(path: Path) -> str:
+    return hashlib.sha256(path.read_bytes()).hexdigest()[:16]
+
+
+def hf_token_counter(
+    source: str,
+    *,
+    cache: TokenCountCache | None = None,
+    batch_size: int = 1024,
+    workers: int = 4,
+) -> TokenCounter:
+    """Build a counter from a local tokenizer.json or a Hugging Face tokenizer name/path.
+
+    The tokenizer identity in the cache key includes a digest of the tokenizer definition, so
+    counts are recomputed when the vocabulary or normalization changes.
+    """
+    local = Path(source)
+    if local.is_file():
+        try:
+            from tokenizers import Tokenizer  # type: ignore
+        except ImportError as exc:
+            raise RuntimeError("Token buckets from a tokenizer file require 'tokenizers'") from exc
+        tokenizer = Tokenizer.from_file(str(local))
+
+        def count_file_batch(texts: Sequence[str]) -> list[int]:
+            return [len(encoding.ids) for encoding in tokenizer.encode_batch(list(texts))]
+
+        tokenizer_id = f"file:{local.name}@{_file_digest(local)}"
+        return TokenCounter(
+            count_file_batch, tokenizer_id, cache=cache, batch_size=batch_size, workers=workers
+        )
+
+    try:
+        from transformers import AutoTokenizer  # type: ignore
+    except ImportError as exc:
+        raise RuntimeError("Token buckets from a model tokenizer require 'transformers'") from exc
+    hf_tokenizer: Any = AutoTokenizer.from_pretrained(source)
+    backend = getattr(hf_tokenizer, "backend_tokenizer", None)
+    definition = backend.to_str() if backend is not None else str(hf_tokenizer.get_vocab())
+    digest = hashlib.sha256(definition.encode("utf-8")).hexdigest()[:16]
+
+    def count_hf_batch(texts: Sequence[str]) -> list[int]:
+        return [len(ids) for ids in hf_tokenizer(list(texts))["input_ids"]]
+
+    return TokenCounter(
+        count_hf_batch, f"hf:{source}@{digest}", cache=cache, batch_size=batch_size, workers=workers
+    )
+
+
+def token_thresholds(config: LengthBucketConfig) -> TokenThresholds:
+    defaults = TokenThresholds()
+    short = defaults.short_max_tokens if config.short_max is None else config.short_max
+    med = defaults.med_max_tokens if config.med_max is None else config.med_max
+    return TokenThresholds(short_max_tokens=short, med_max_tokens=med)
+
+
+def char_thresholds(config: LengthBucketConfig) -> LengthThresholds:
+    defaults = LengthThresholds()
+    short = defaults.short_max_chars if config.short_max is None else config.short_max
+    med = defaults.med_max_chars if config.med_max is None else config.med_max
+    return LengthThresholds(short_max_chars=short, med_max_chars=med)
+
+
+def apply_token_buckets(
+    prompts: Sequence[PromptRecord],
+    counter: TokenCounter,
+    thresholds: TokenThresholds | None = None,
+) -> Sequence[PromptRecord]:
+    """Attach `len_tokens` and re-bucket prompts by token count.
+
+    A `PromptStore` reuses the counts cached next to its index for this tokenizer; only when
+    those are missing or stale is the catalog re-read and counted through `counter`.
+    """
+    if isinstance(prompts, PromptStore):
+        counts = prompts.cached_token_counts(counter.tokenizer_id)
+        if counts is None:
+            counts = counter.count_stream(prompts.iter_texts())
+            prompts.save_token_counts(counter.tokenizer_id, counts)
+        prompts.set_token_counts(counts, thresholds)
+        return prompts
+    counts = counter.count([prompt.text for prompt in prompts])
+    return [
+        prompt.model_copy(
+            update={
+                "len_tokens": int(count),
+                "length_bucket": bucket_for_tokens(int(count), thresholds),
+            }
+        )
+        for prompt, count in zip(prompts, counts, strict=True)
+    ]
+
+
+def open_loadgen_prompts(
+    prompt_source: str | Path,
+    length_buckets: LengthBucketConfig,
+    server_config: ServerConfig,
+    *,
+    counter: TokenCounter | None = None,
+) -> Sequence[PromptRecord]:
+    """Open the prompt catalog and bucket it the way `loadgen.length_buckets` asks."""
+    if length_buckets.unit == "chars":
+        return open_prompt_catalog(prompt_source, char_thresholds(length_buckets))
+    prompts = open_prompt_catalog(prompt_source)
+    if counter is not None:
+        return apply_token_buckets(prompts, counter, token_thresholds(length_buckets))
+    cache = TokenCountCache(length_buckets.cache_path or DEFAULT_CACHE_PATH)
+    try:
+        counter = hf_token_counter(
+            length_buckets.tokenizer or server_config.model,
+            cache=cache,
+            batch_size=length_buckets.batch_size,
+            workers=length_buckets.workers,
+        )
+        return apply_token_buckets(prompts, counter, token_thresholds(length_buckets))
+    finally:
+        cache.close()
+
+
+__all__ = [
+    "DEFAULT_CACHE_PATH",
+    "TokenCountCache",
+    "TokenCounter",
+    "apply_token_buckets",
+    "char_thresholds",
+    "hf_token_counter",
+    "open_loadgen_prompts",
+    "prompt_text_hash",
+    "token_thresholds",
+]
@@ -0,0 +1,214 @@
+from __future__ import annotations
+
+import math
+from typing import Any
+
+import numpy as np
+import pandas as pd
+
+from qosflow.common.histogram import RowSample
+from qosflow.metrics.latency import EXACT_QUANTILE_LIMIT, UNSERVED_OUTCOMES
+
+ENERGY_COLUMNS = (
+    "ts_start_ns",
+    "ts_end_ns",
+    "output_len_chars",
+    "output_text",
+    "outcome",
+    "system.error",
+    "error",
+)
+
+
+def output_token_counts(df: pd.DataFrame) -> pd.Series:
+    """Whitespace tokens per output, the same tokenization the task metrics use.
+
+    A precomputed `output_tokens` column is used as is.
+    """
+    if "output_tokens" in df.columns:
+        return pd.to_numeric(df["output_tokens"], errors="coerce")
+    for column in ("output_text", "output"):
+        if column in df.columns:
+            return df[column].fillna("").astype(str).str.split().str.len()
+    return pd.Series(np.nan, index=df.index)
+
+
+def _ratio(numerator: float, denominator: float) -> float | None:
+    return numerator / denominator if denominator > 0 else None
+
+
+class EnergyMetricsAccumulator:
+    """Incremental form of `compute_energy_metrics` for traces read in chunks.
+
+    Power (summed over GPUs) is interpolated linearly between samples and integrated exactly
+    over a grid of `resolution_s` cells spanning the telemetry (coarser if that would exceed
+    `max_bins` cells). Each chunk adds the time its requests spend in every cell. A cell's
+    energy is split between requests in proportion to that time, and the part of the cell not
+    covered by any request counts as idle. This treats concurrency as constant within a cell,
+    so attribution is exact when requests start and end on cell edges. Memory depends on the
+    run's length, not its request count. `joules_per_request_p95` comes from a uniform
+    `RowSample` of at most `sample_size` completed requests (`None` keeps all).
+    """
+
+    def __init__(
+        self,
+        telemetry: pd.DataFrame,
+        *,
+        resolution_s: float = 0.01,
+        max_bins: int = 1_000_000,
+        sample_size: int | None = EXACT_QUANTILE_LIMIT,
+    ) -> None:
+        self._power_ts = np.empty(0, dtype=np.int64)
+        if not telemetry.empty and "power_w_mean" in telemetry.columns:
+            power = telemetry[["ts_ns", "power_w_mean"]].dropna().sort_values("ts_ns")
+            self._power_ts = power["ts_ns"].to_numpy(dtype=np.int64)
+            self._power_w = power["power_w_mean"].to_numpy(dtype=np.float64)
+        self.enabled = len(self._power_ts) >= 2 and self._power_ts[-1] > self._power_ts[0]
+        if not self.enabled:
+            return
+        origin, last = int(self._power_ts[0]), int(self._power_ts[-1])
+        self._bin_ns = max(int(resolution_s * 1e9), math.ceil((last - origin) / max_bins))
+        nbins = math.ceil((last - origin) / self._bin_ns)
+        edges_ns = np.minimum(origin + np.arange(nbins + 1, dtype=np.int64) * self._bin_ns, last)
+        # Cell edges in cell units; only the last cell may be shorter than one unit.
+        self._edges = (edges_ns - origin) / self._bin_ns
+        self._cell_j = np.diff(self._cumulative_j(edges_ns))
+        self._cell_s = np.diff(edges_ns) / 1e9
+        self._busy_s = np.zeros(nbins)
+        self._completed_s = np.zeros(nbins)
+        self._sample = RowSample(2, sample_size)
+        self._start_ns: int | None = None
+        self._end_ns: int | None = None
+        self._completed = 0
+        self._chars = 0.0
+        self._tokens = 0.0
+
+    def _cumulative_j(self, at_ns: np.ndarray) -> np.ndarray:
+        """Energy from the first power sample to each time in `at_ns`, exact for linear power."""
+        ts = self._power_ts
+        seg_s = np.diff(ts) / 1e9
+        prefix = np.concatenate(
+            [[0.0], np.cumsum((self._power_w[:-1] + self._power_w[1:]) / 2 * seg_s)]
+        )
+        at_ns = np.clip(at_ns, ts[0], ts[-1])
+        idx = np.clip(np.searchsorted(ts, at_ns, side="right") - 1, 0, len(ts) - 2)
+        dt_s = (at_ns - ts[idx]) / 1e9
+        slope = (self._power_w[idx + 1] - self._power_w[idx]) / seg_s[idx]
+        energy_j: np.ndarray = prefix[idx] + self._power_w[idx] * dt_s + slope * dt_s**2 / 2
+        return energy_j
+
+    def _occupancy_s(self, start_ns: np.ndarray, end_ns: np.ndarray) -> np.ndarray:
+        """Seconds of request time inside each cell, summed over the given requests."""
+        origin = self._power_ts[0]
+        events = np.concatenate([start_ns, end_ns])
+        x = np.clip((events - origin) / self._bin_ns, 0.0, self._edges[-1])
+        sign = np.concatenate([np.ones(len(start_ns)), -np.ones(len(end_ns))])
+        # Request time before x is sum(sign * max(x - event, 0)): piecewise linear in x.
+        first = np.searchsorted(self._edges, x, side="left")
+        slope = np.zeros(len(self._edges) + 1)
+        offset = np.zeros(len(self._edges) + 1)
+        np.add.at(slope, first, sign)
+        np.add.at(offset, first, -sign * x)
+        before = self._edges * np.cumsum(slope)[:-1] + np.cumsum(offset)[:-1]
+        occupancy: np.ndarray = np.diff(before) * self._bin_ns / 1e9
+        return occupancy
+
+    def update(self, traces: pd.DataFrame) -> None:
+        if not self.enabled or traces.empty:
+            return
+        if "ts_start_ns" not in traces.columns or "ts_end_ns" not in traces.columns:
+            return
+        df = traces
+        if "outcome" in df.columns:
+            df = df[~df["outcome"].isin(UNSERVED_OUTCOMES)]
+        start = pd.to_numeric(df["ts_start_ns"], errors="coerce")
+        end = pd.to_numeric(df["ts_end_ns"], errors="coerce")
+        timed = (start.notna() & end.notna()).to_numpy()
+        if not timed.any():
+            return
+        df = df[timed]
+        start_ns = start[timed].to_numpy(dtype=np.int64)
+        end_ns = end[timed].to_numpy(dtype=np.int64)
+        chunk_start, chunk_end = int(start_ns.min()), int(end_ns.max())
+        if self._start_ns is None or chunk_start < self._start_ns:
+            self._start_ns = chunk_start
+        if self._end_ns is None or chunk_end > self._end_ns:
+            self._end_ns = chunk_end
+
+        error_col = "system.error" if "system.error" in df.columns else "error"
+        completed = (
+            df[error_col].isna().to_numpy()
+            if error_col in df.columns
+            else np.ones(len(df), dtype=bool)
+        )
+        self._busy_s += self._occupancy_s(start_ns, end_ns)
+        self._completed_s += self._occupancy_s(start_ns[completed], end_ns[completed])
+        self._sample.add(np.column_stack([start_ns[completed], end_ns[completed]]))
+        self._completed += int(completed.sum())
+        if "output_len_chars" in df.columns:
+            chars = pd.to_numeric(df["output_len_chars"], errors="coerce")[completed]
+            self._chars += float(chars.sum())
+        self._tokens += float(output_token_counts(df)[completed].sum())
+
+    def result(self) -> dict[str, Any]:
+        if not self.enabled or self._start_ns is None or self._end_ns is None:
+            return {}
+        window_lo = max(self._start_ns, int(self._power_ts[0]))
+        window_hi = min(self._end_ns, int(self._power_ts[-1]))
+        if window_hi <= window_lo:
+            total_j = 0.0
+            window_s = 0.0
+        else:
+            bounds = self._cumulative_j(np.array([window_lo, window_hi], dtype=np.int64))
+            total_j = float(bounds[1] - bounds[0])
+            window_s = (window_hi - window_lo) / 1e9
+
+        # Energy per second of request time in each cell, for the covered share of the cell.
+        busy_j = self._cell_j * np.minimum(self._busy_s / self._cell_s, 1.0)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            rate = np.where(self._busy_s > 0, busy_j / self._busy_s, 0.0)
+        completed_j = float((rate * self._completed_s).sum())
+        idle_j = max(total_j - float(busy_j.sum()), 0.0)
+
+        per_request: np.ndarray = np.empty(0)
+        sample = self._sample.rows
+        if len(sample):
+            charged = np.concatenate([[0.0], np.cumsum(rate * self._cell_s)])
+            x = np.clip((sample - self._power_ts[0]) / self._bin_ns, 0.0, self._edges[-1])
+            at = np.interp(x, self._edges, charged)
+            per_request = at[:, 1] - at[:, 0]
+
+        return {
+            "energy_j": total_j,
+            "energy_idle_j": idle_j,
+            # Over the part of the run that telemetry covers, where `energy_j` was integrated.
+            "mean_power_w": _ratio(total_j, window_s),
+            "joules_per_request": _ratio(completed_j, self._completed),
+            "joules_per_request_p95": (
+                float(np.quantile(per_request, 0.95)) if len(per_request) else None
+            ),
+            "joules_per_output_char": _ratio(completed_j, self._chars),
+            "joules_per_output_token": _ratio(completed_j, self._tokens),
+            # Output tokens per second per watt of mean power, i.e. tokens per joule of the run.
+            "tokens_per_watt": _ratio(self._tokens, total_j),
+        }
+
+
+def compute_energy_metrics(traces: pd.DataFrame, telemetry: pd.DataFrame) -> dict[str, Any]:
+    """Energy efficiency of the run from telemetry power (summed over GPUs) and the traces.
+
+    Failed requests still occupy the GPU, so they receive their share of energy, but the
+    per-request and per-output figures are normalized by completed requests and their outputs.
+    See `EnergyMetricsAccumulator` for how energy is attributed.
+    """
+    accumulator = EnergyMetricsAccumulator(telemetry, sample_size=None)
+    accumulator.update(traces)
+    return accumulator.result()
+
+
+__all__ = [
+    "ENERGY_COLUMNS",
+    "EnergyMetricsAccumulator",
+    "compute_energy_metrics",
+    "output_token_counts",
+]
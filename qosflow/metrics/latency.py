@@ -4,49 +4,184 @@ from typing import Any
 
 import pandas as pd
 
+from qosflow.common.histogram import LatencyAccumulator
 
-def compute_latency_metrics(df: pd.DataFrame) -> tuple[dict[str, Any], pd.DataFrame]:
-    if df.empty:
-        empty = {
-            "count": 0,
-            "latency_ms_p50": 0.0,
-            "latency_ms_p95": 0.0,
-            "latency_ms_p99": 0.0,
-            "error_rate": 0.0,
-            "throughput_rps": 0.0,
-        }
-        return empty, pd.DataFrame([empty])
+LATENCY_COLUMNS = (
+    "total_ms",
+    "latency_ms",
+    "system.error",
+    "error",
+    "ts_start_ns",
+    "ts_end_ns",
+    "tenant",
+    "slo_ms",
+    "outcome",
+)
 
-    latency_col = "total_ms" if "total_ms" in df.columns else "latency_ms"
-    latencies = pd.to_numeric(df.get(latency_col, pd.Series(dtype=float)), errors="coerce")
-    latencies = latencies.dropna()
+# Arrivals the loadgen backlog policy gave up on; they were offered but never sent.
+UNSERVED_OUTCOMES = ("dropped", "expired")
 
+
+def _failed_mask(df: pd.DataFrame) -> pd.Series:
     if "system.error" in df.columns:
-        failed = df["system.error"].notna().sum()
-    elif "error" in df.columns:
-        failed = df["error"].notna().sum()
-    else:
-        failed = 0
-
-    count = int(len(df))
-    duration_seconds = 0.0
-    if "ts_start_ns" in df.columns and "ts_end_ns" in df.columns and not df.empty:
-        start_ns = pd.to_numeric(df["ts_start_ns"], errors="coerce").dropna()
-        end_ns = pd.to_numeric(df["ts_end_ns"], errors="coerce").dropna()
-        if not start_ns.empty and not end_ns.empty:
-            duration_seconds = max((end_ns.max() - start_ns.min()) / 1_000_000_000.0, 0.0)
-
-    throughput = count / duration_seconds if duration_seconds > 0 else 0.0
-
-    metrics = {
-        "count": count,
-        "latency_ms_p50": float(latencies.quantile(0.5)) if not latencies.empty else 0.0,
-        "latency_ms_p95": float(latencies.quantile(0.95)) if not latencies.empty else 0.0,
-        "latency_ms_p99": float(latencies.quantile(0.99)) if not latencies.empty else 0.0,
-        "error_rate": float(failed / count) if count else 0.0,
-        "throughput_rps": float(throughput),
-    }
-    return metrics, pd.DataFrame([metrics])
-
-
-__all__ = ["compute_latency_metrics"]
+        return df["system.error"].notna()
+    if "error" in df.columns:
+        return df["error"].notna()
+    return pd.Series(False, index=df.index)
+
+
+def _admitted_mask(df: pd.DataFrame) -> pd.Series:
+    if "outcome" not in df.columns:
+        return pd.Series(True, index=df.index)
+    return ~df["outcome"].isin(UNSERVED_OUTCOMES)
+
+
+# Exact latency samples kept per group before quantiles switch to the fixed-size histogram.
+EXACT_QUANTILE_LIMIT = 100_000
+
+
+class _GroupState:
+    """Counts and latency samples for one group: the whole run or one tenant."""
+
+    def __init__(self, exact_limit: int | None) -> None:
+        self.latencies = LatencyAccumulator(exact_limit)
+        self.offered = 0
+        self.admitted = 0
+        self.failed = 0
+        self.completed = 0
+        self.dropped = 0
+        self.expired = 0
+        self.slo_targets = 0
+        self.slo_met = 0
+
+    def update(self, df: pd.DataFrame, latency_col: str) -> None:
+        admitted = _admitted_mask(df)
+        failed = _failed_mask(df)
+        self.offered += int(len(df))
+        self.admitted += int(admitted.sum())
+        self.failed += int((admitted & failed).sum())
+        self.completed += int((admitted & ~failed).sum())
+        if "outcome" in df.columns:
+            self.dropped += int((df["outcome"] == "dropped").sum())
+            self.expired += int((df["outcome"] == "expired").sum())
+
+        latencies = pd.to_numeric(df.get(latency_col, pd.Series(dtype=float)), errors="coerce")
+        self.latencies.add_many(latencies[admitted].dropna().to_numpy(dtype=float))
+
+        # Dropped and expired arrivals count as SLO misses.
+        if "slo_ms" in df.columns and latency_col in df.columns:
+            targets = pd.to_numeric(df["slo_ms"], errors="coerce")
+            has_target = targets.notna()
+            met = (latencies <= targets) & ~failed & admitted
+            self.slo_targets += int(has_target.sum())
+            self.slo_met += int((met & has_target).sum())
+
+    def summary(self, duration_seconds: float, with_admission: bool) -> dict[str, Any]:
+        def rate(count: int) -> float:
+            return float(count / duration_seconds) if duration_seconds > 0 else 0.0
+
+        metrics: dict[str, Any] = {
+            "count": self.admitted,
+            "latency_ms_p50": self.latencies.quantile(0.50, interpolate=True),
+            "latency_ms_p95": self.latencies.quantile(0.95, interpolate=True),
+            "latency_ms_p99": self.latencies.quantile(0.99, interpolate=True),
+            "error_rate": float(self.failed / self.admitted) if self.admitted else 0.0,
+            "throughput_rps": rate(self.admitted),
+        }
+        if with_admission:
+            # Offered (all arrivals), admitted (sent) and completed (succeeded) rates.
+            metrics.update(
+                {
+                    "offered_rps": rate(self.offered),
+                    "admitted_rps": rate(self.admitted),
+                    "completed_rps": rate(self.completed),
+                    "dropped": self.dropped,
+                    "expired": self.expired,
+                }
+            )
+        if self.slo_targets:
+            metrics["slo_attainment"] = float(self.slo_met / self.slo_targets)
+        return metrics
+
+
+class LatencyMetricsAccumulator:
+    """Incremental form of `compute_latency_metrics` for traces read in chunks.
+
+    Memory is bounded per group (the run and each tenant): counters, the run window and a
+    `LatencyAccumulator` that keeps exact samples up to `exact_limit` and then falls back to
+    the mergeable log histogram (~1% relative error). `None` keeps every sample.
+    """
+
+    def __init__(self, exact_limit: int | None = EXACT_QUANTILE_LIMIT) -> None:
+        self.exact_limit = exact_limit
+        self._overall = _GroupState(exact_limit)
+        self._tenants: dict[Any, _GroupState] = {}
+        self._start_ns: int | None = None
+        self._end_ns: int | None = None
+        self._has_outcome = False
+
+    def update(self, df: pd.DataFrame) -> None:
+        if df.empty:
+            return
+        latency_col = "total_ms" if "total_ms" in df.columns else "latency_ms"
+        if "ts_start_ns" in df.columns and "ts_end_ns" in df.columns:
+            start_ns = pd.to_numeric(df["ts_start_ns"], errors="coerce").min()
+            end_ns = pd.to_numeric(df["ts_end_ns"], errors="coerce").max()
+            if pd.notna(start_ns) and (self._start_ns is None or start_ns < self._start_ns):
+                self._start_ns = int(start_ns)
+            if pd.notna(end_ns) and (self._end_ns is None or end_ns > self._end_ns):
+                self._end_ns = int(end_ns)
+        self._has_outcome |= "outcome" in df.columns and bool(df["outcome"].notna().any())
+        self._overall.update(df, latency_col)
+        if "tenant" in df.columns and df["tenant"].notna().any():
+            for tenant, group in df.groupby("tenant", sort=False):
+                state = self._tenants.get(tenant)
+                if state is None:
+                    state = self._tenants[tenant] = _GroupState(self.exact_limit)
+                state.update(group, latency_col)
+
+    def result(self) -> tuple[dict[str, Any], pd.DataFrame]:
+        if self._overall.offered == 0:
+            empty = {
+                "count": 0,
+                "latency_ms_p50": 0.0,
+                "latency_ms_p95": 0.0,
+                "latency_ms_p99": 0.0,
+                "error_rate": 0.0,
+                "throughput_rps": 0.0,
+            }
+            return empty, pd.DataFrame([empty])
+
+        # Per-tenant throughput is measured over the whole run window so tenants are comparable.
+        duration_seconds = 0.0
+        if self._start_ns is not None and self._end_ns is not None:
+            duration_seconds = max(float(self._end_ns - self._start_ns) / 1_000_000_000.0, 0.0)
+        metrics = self._overall.summary(duration_seconds, self._has_outcome)
+        for tenant in sorted(self._tenants):
+            tenant_metrics = self._tenants[tenant].summary(duration_seconds, self._has_outcome)
+            metrics.update(
+                {f"tenant.{tenant}.{key}": value for key, value in tenant_metrics.items()}
+            )
+        return metrics, pd.DataFrame([metrics])
+
+
+def compute_latency_metrics(df: pd.DataFrame) -> tuple[dict[str, Any], pd.DataFrame]:
+    """Overall latency, error rate and throughput, plus a `tenant.<name>.*` block per tenant.
+
+    Per-tenant throughput is measured over the whole run window so tenants are comparable.
+    Latency, error rate and throughput cover admitted requests; traces with an `outcome` column
+    also get offered/admitted/completed rates and dropped/expired counts. Percentiles are exact
+    (linearly interpolated); use `LatencyMetricsAccumulator` to evaluate traces in chunks.
+    """
+    accumulator = LatencyMetricsAccumulator(exact_limit=None)
+    accumulator.update(df)
+    return accumulator.result()
+
+
+__all__ = [
+    "EXACT_QUANTILE_LIMIT",
+    "LATENCY_COLUMNS",
+    "LatencyMetricsAccumulator",
+    "UNSERVED_OUTCOMES",
+    "compute_latency_metrics",
+]
@@ -1,29 +1,63 @@
 from __future__ import annotations
 
-from itertools import combinations
+from array import array
+from collections.abc import Sequence
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from itertools import chain, combinations
 from typing import Any
 
+import numpy as np
 import pandas as pd
 
+STABILITY_COLUMNS = ("prompt_id", "output_text", "output")
+
 
 def _levenshtein_distance(a: str, b: str) -> int:
+    """Levenshtein distance via Myers' bit-parallel algorithm (Hyyro's formulation).
+
+    One DP column is held as vertical +1/-1 delta bitmasks over the shorter string, so each
+    character of the longer one costs a few big-int operations instead of a Python loop over
+    the column: O(ceil(m / word) * n) rather than O(m * n). The shared prefix and suffix are
+    stripped first since they never contribute edits.
+    """
     if a == b:
         return 0
+    if len(a) > len(b):
+        a, b = b, a
+    start = 0
+    while start < len(a) and a[start] == b[start]:
+        start += 1
+    end_a, end_b = len(a), len(b)
+    while end_a > start and a[end_a - 1] == b[end_b - 1]:
+        end_a -= 1
+        end_b -= 1
+    a, b = a[start:end_a], b[start:end_b]
     if not a:
         return len(b)
-    if not b:
-        return len(a)
 
-    prev = list(range(len(b) + 1))
-    for i, ca in enumerate(a, start=1):
-        curr = [i]
-        for j, cb in enumerate(b, start=1):
-            insertion = curr[j - 1] + 1
-            deletion = prev[j] + 1
-            substitution = prev[j - 1] + (0 if ca == cb else 1)
-            curr.append(min(insertion, deletion, substitution))
-        prev = curr
-    return prev[-1]
+    # Bit i of `peq[c]` is set where a[i] == c.
+    peq: dict[str, int] = {}
+    for i, char in enumerate(a):
+        peq[char] = peq.get(char, 0) | (1 << i)
+    mask = (1 << len(a)) - 1
+    last = 1 << (len(a) - 1)
+    pv, mv, score = mask, 0, len(a)
+    for char in b:
+        eq = peq.get(char, 0)
+        xv = eq | mv
+        xh = (((eq & pv) + pv) ^ pv) | eq
+        ph = mv | ~(xh | pv)
+        mh = pv & xh
+        if ph & last:
+            score += 1
+        elif mh & last:
+            score -= 1
+        ph = (ph << 1) | 1
+        mh <<= 1
+        pv = (mh | ~(xv | ph)) & mask
+        mv = ph & xv & mask
+    return score
 
 
 def _normalized_edit_similarity(a: str, b: str) -> float:
@@ -33,61 +67,144 @@ def _normalized_edit_similarity(a: str, b: str) -> float:
     return 1.0 - (_levenshtein_distance(a, b) / denom)
 
 
-def _group_exact_match_rate(outputs: list[str]) -> float:
-    if not outputs:
-        return 0.0
-    first = outputs[0]
-    matches = sum(1 for item in outputs if item == first)
-    return matches / len(outputs)
-
-
-def _group_edit_similarity(outputs: list[str]) -> float:
-    if len(outputs) < 2:
-        return 1.0
-    similarities = [_normalized_edit_similarity(a, b) for a, b in combinations(outputs, 2)]
-    if not similarities:
-        return 1.0
-    return float(sum(similarities) / len(similarities))
-
-
-def compute_stability_metrics(df: pd.DataFrame) -> tuple[dict[str, Any], pd.DataFrame]:
-    if df.empty:
-        empty = {
-            "stability_prompt_groups": 0,
-            "stability_exact_match_rate": 0.0,
-            "stability_edit_similarity": 0.0,
-        }
-        return empty, pd.DataFrame(columns=["prompt_id", "exact_match_rate", "edit_similarity"])
-
-    output_col = "output_text" if "output_text" in df.columns else "output"
-    if output_col not in df.columns or "prompt_id" not in df.columns:
-        return {}, pd.DataFrame()
-
-    work = df[["prompt_id", output_col]].copy()
-    work[output_col] = work[output_col].fillna("").astype(str)
-
-    rows: list[dict[str, Any]] = []
-    for prompt_id, group in work.groupby("prompt_id"):
-        outputs = list(group[output_col])
-        rows.append(
-            {
-                "prompt_id": prompt_id,
-                "exact_match_rate": _group_exact_match_rate(outputs),
-                "edit_similarity": _group_edit_similarity(outputs),
+@dataclass
+class _PromptOutputs:
+    """Outputs seen for one prompt: each distinct text once, plus the arrival order as indexes."""
+
+    texts: dict[str, int] = field(default_factory=dict)
+    order: array[int] = field(default_factory=lambda: array("I"))
+
+
+def _score_prompt(texts: list[str], order: Sequence[int]) -> tuple[float, float]:
+    """Exact-match rate against the first output and mean pairwise edit similarity.
+
+    Similarity is computed once per pair of distinct texts, then looked up for every output
+    pair in `combinations` order and summed in that order, so the mean is bit-for-bit the one
+    the full pairwise comparison gives.
+    """
+    total = len(order)
+    exact_match_rate = order.count(order[0]) / total
+    if total < 2 or len(texts) == 1:
+        return exact_match_rate, 1.0
+    similarity = np.ones((len(texts), len(texts)))
+    for i, j in combinations(range(len(texts)), 2):
+        similarity[i, j] = similarity[j, i] = _normalized_edit_similarity(texts[i], texts[j])
+    ids = np.asarray(order, dtype=np.intp)
+    pairs = chain.from_iterable(similarity[ids[i], ids[i + 1 :]].tolist() for i in range(total - 1))
+    return exact_match_rate, float(sum(pairs) / (total * (total - 1) // 2))
+
+
+def _score_prompts(prompts: list[tuple[list[str], array[int]]]) -> list[tuple[float, float]]:
+    # Module-level so worker processes can unpickle it.
+    return [_score_prompt(texts, order) for texts, order in prompts]
+
+
+def _partition(costs: list[int], parts: int) -> list[tuple[int, int]]:
+    """Split indexes into contiguous `[start, end)` ranges of roughly equal total cost."""
+    target = sum(costs) / parts
+    bounds: list[tuple[int, int]] = []
+    start, running = 0, 0
+    for idx, cost in enumerate(costs):
+        running += cost
+        if running >= target and len(bounds) < parts - 1:
+            bounds.append((start, idx + 1))
+            start, running = idx + 1, 0
+    if start < len(costs):
+        bounds.append((start, len(costs)))
+    return bounds
+
+
+class StabilityMetricsAccumulator:
+    """Incremental form of `compute_stability_metrics` for traces read in chunks.
+
+    Each prompt keeps its distinct output texts once and a 4-byte index per output, so memory
+    grows with distinct outputs rather than with repeats while the arrival order, which fixes
+    the exact-match reference and the summation order, is preserved.
+
+    With `workers > 1`, `result` scores prompts in a process pool: prompts are split into
+    contiguous chunks of similar estimated cost (a few per worker), only the distinct output
+    strings and index arrays are sent, and rows come back in prompt order, so the result is
+    identical to the serial one.
+    """
+
+    def __init__(self, workers: int = 1) -> None:
+        self.workers = max(1, workers)
+        self._prompts: dict[Any, _PromptOutputs] = {}
+        self._rows = 0
+        self._has_columns = False
+
+    def update(self, df: pd.DataFrame) -> None:
+        self._rows += int(len(df))
+        output_col = "output_text" if "output_text" in df.columns else "output"
+        if df.empty or output_col not in df.columns or "prompt_id" not in df.columns:
+            return
+        self._has_columns = True
+        outputs = df[output_col].fillna("").astype(str)
+        for prompt_id, output in zip(df["prompt_id"], outputs, strict=True):
+            if pd.isna(prompt_id):
+                continue
+            state = self._prompts.get(prompt_id)
+            if state is None:
+                state = self._prompts[prompt_id] = _PromptOutputs()
+            state.order.append(state.texts.setdefault(output, len(state.texts)))
+
+    def _score(self, work: list[tuple[list[str], array[int]]]) -> list[tuple[float, float]]:
+        if self.workers == 1:
+            return _score_prompts(work)
+        # Each distinct pair costs about the product of their lengths; each output pair a lookup.
+        costs = [
+            1
+            + sum(len(a) * len(b) for a, b in combinations(texts, 2))
+            + len(order) * (len(order) - 1) // 2
+            for texts, order in work
+        ]
+        chunks = _partition(costs, self.workers * 4)
+        if len(chunks) < 2:
+            return _score_prompts(work)
+        with ProcessPoolExecutor(max_workers=min(self.workers, len(chunks))) as pool:
+            results = pool.map(_score_prompts, [work[start:end] for start, end in chunks])
+            return [score for chunk in results for score in chunk]
+
+    def result(self) -> tuple[dict[str, Any], pd.DataFrame]:
+        if not self._rows:
+            empty = {
+                "stability_prompt_groups": 0,
+                "stability_exact_match_rate": 0.0,
+                "stability_edit_similarity": 0.0,
             }
+            return empty, pd.DataFrame(columns=["prompt_id", "exact_match_rate", "edit_similarity"])
+        if not self._has_columns:
+            return {}, pd.DataFrame()
+
+        prompt_ids = list(self._prompts)
+        work = [(list(state.texts), state.order) for state in self._prompts.values()]
+        rows = [
+            {"prompt_id": prompt_id, "exact_match_rate": rate, "edit_similarity": similarity}
+            for prompt_id, (rate, similarity) in zip(prompt_ids, self._score(work), strict=True)
+        ]
+        per_prompt = (
+            pd.DataFrame(rows).sort_values("prompt_id").reset_index(drop=True)
+            if rows
+            else pd.DataFrame(columns=["prompt_id", "exact_match_rate", "edit_similarity"])
         )
+        metrics = {
+            "stability_prompt_groups": int(len(per_prompt)),
+            "stability_exact_match_rate": float(per_prompt["exact_match_rate"].mean())
+            if not per_prompt.empty
+            else 0.0,
+            "stability_edit_similarity": float(per_prompt["edit_similarity"].mean())
+            if not per_prompt.empty
+            else 0.0,
+        }
+        return metrics, per_prompt
+
 
-    per_prompt = pd.DataFrame(rows).sort_values("prompt_id").reset_index(drop=True)
-    metrics = {
-        "stability_prompt_groups": int(len(per_prompt)),
-        "stability_exact_match_rate": float(per_prompt["exact_match_rate"].mean())
-        if not per_prompt.empty
-        else 0.0,
-        "stability_edit_similarity": float(per_prompt["edit_similarity"].mean())
-        if not per_prompt.empty
-        else 0.0,
-    }
-    return metrics, per_prompt
+def compute_stability_metrics(
+    df: pd.DataFrame, workers: int = 1
+) -> tuple[dict[str, Any], pd.DataFrame]:
+    accumulator = StabilityMetricsAccumulator(workers=workers)
+    accumulator.update(df)
+    return accumulator.result()
 
 
-__all__ = ["compute_stability_metrics"]
+__all__ = ["STABILITY_COLUMNS", "StabilityMetricsAccumulator", "compute_stability_metrics"]
@@ -5,6 +5,8 @@ from typing import Any
 
 import pandas as pd
 
+TASK_COLUMNS = ("prompt_id", "repeat_idx", "expected", "output_text", "output")
+
 
 def _normalize_text(value: Any) -> str:
     if value is None:
@@ -34,13 +36,14 @@ def _token_f1(pred: str, ref: str) -> float:
     return 2 * precision * recall / (precision + recall)
 
 
-def compute_task_metrics(df: pd.DataFrame) -> tuple[dict[str, Any], pd.DataFrame]:
+def _score_rows(df: pd.DataFrame) -> pd.DataFrame:
+    """Exact match and token F1 for each row that has an `expected` answer."""
     if "expected" not in df.columns:
-        return {}, pd.DataFrame()
+        return pd.DataFrame()
 
     eval_df = df[df["expected"].notna()].copy()
     if eval_df.empty:
-        return {}, pd.DataFrame()
+        return pd.DataFrame()
 
     output_col = "output_text" if "output_text" in eval_df.columns else "output"
     eval_df["expected_norm"] = eval_df["expected"].apply(_normalize_text)
@@ -53,14 +56,40 @@ def compute_task_metrics(df: pd.DataFrame) -> tuple[dict[str, Any], pd.DataFrame
     eval_df["token_f1"] = eval_df.apply(
         lambda row: _token_f1(row["output_norm"], row["expected_norm"]), axis=1
     )
+    return eval_df[["prompt_id", "repeat_idx", "exact_match", "token_f1"]].reset_index(drop=True)
+
+
+class TaskMetricsAccumulator:
+    """Incremental form of `compute_task_metrics`: keeps running sums, not the scored rows."""
+
+    def __init__(self) -> None:
+        self.count = 0
+        self._exact_match = 0.0
+        self._token_f1 = 0.0
 
-    metrics = {
-        "task_count": int(len(eval_df)),
-        "task_exact_match": float(eval_df["exact_match"].mean()),
-        "task_token_f1": float(eval_df["token_f1"].mean()),
-    }
-    per_row = eval_df[["prompt_id", "repeat_idx", "exact_match", "token_f1"]].reset_index(drop=True)
-    return metrics, per_row
+    def update(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Score `df`, fold it into the totals and return its per-row scores."""
+        per_row = _score_rows(df)
+        if not per_row.empty:
+            self.count += int(len(per_row))
+            self._exact_match += float(per_row["exact_match"].sum())
+            self._token_f1 += float(per_row["token_f1"].sum())
+        return per_row
+
+    def result(self) -> dict[str, Any]:
+        if not self.count:
+            return {}
+        return {
+            "task_count": self.count,
+            "task_exact_match": self._exact_match / self.count,
+            "task_token_f1": self._token_f1 / self.count,
+        }
+
+
+def compute_task_metrics(df: pd.DataFrame) -> tuple[dict[str, Any], pd.DataFrame]:
+    accumulator = TaskMetricsAccumulator()
+    per_row = accumulator.update(df)
+    return accumulator.result(), per_row
 
 
-__all__ = ["compute_task_metrics"]
+__all__ = ["TASK_COLUMNS", "TaskMetricsAccumulator", "compute_task_metrics"]
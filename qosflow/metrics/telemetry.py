@@ -0,0 +1,238 @@
+from __future__ import annotations
+
+from collections.abc import Iterable, Sequence
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+import pandas as pd
+
+from qosflow.common.histogram import LatencyAccumulator, RowSample
+from qosflow.metrics.latency import EXACT_QUANTILE_LIMIT, UNSERVED_OUTCOMES
+
+# Utilization band edges (percent) for latency-by-utilization breakdowns.
+GPU_UTIL_BANDS = (0.0, 25.0, 50.0, 75.0, 90.0, 100.0)
+
+# Per-tick aggregates over all devices: (source column, aggregation, joined column).
+_TICK_AGGREGATES = (
+    ("gpu_util", "mean", "gpu_util_mean"),
+    ("mem_util", "mean", "mem_util_mean"),
+    ("mem_used_mb", "sum", "mem_used_mb_mean"),
+    ("power_w", "sum", "power_w_mean"),
+    ("throttled", "max", "throttled"),
+)
+
+
+def load_telemetry(paths: Iterable[str | Path]) -> pd.DataFrame:
+    """Read telemetry CSVs into one row per tick, indexed by `ts_ns` (wall-clock ns).
+
+    Multi-GPU (long-format) files are collapsed per timestamp: utilization is averaged across
+    devices, memory and power are summed, and a tick is `throttled` if any device reports a
+    throttle reason other than idle.
+    """
+    frames = [pd.read_csv(path) for path in paths]
+    frames = [frame for frame in frames if not frame.empty]
+    if not frames:
+        return pd.DataFrame(columns=["ts_ns", *(name for _, _, name in _TICK_AGGREGATES)])
+    df = pd.concat(frames, ignore_index=True)
+    stamps = pd.to_datetime(df["timestamp"], utc=True, format="ISO8601")
+    df["ts_ns"] = stamps.dt.as_unit("ns").astype("int64")
+    if "throttle_reasons" in df.columns:
+        reasons = pd.to_numeric(df["throttle_reasons"], errors="coerce")
+        throttled = (reasons.fillna(0).astype("int64") & ~0x1) != 0
+        df["throttled"] = throttled.astype(float).where(reasons.notna())
+    for source, _, _ in _TICK_AGGREGATES:
+        if source in df.columns:
+            df[source] = pd.to_numeric(df[source], errors="coerce")
+    grouped = df.groupby("ts_ns", sort=True)
+    ticks = pd.DataFrame({"ts_ns": grouped.size().index.to_numpy()})
+    for source, how, name in _TICK_AGGREGATES:
+        if source not in df.columns:
+            ticks[name] = np.nan
+            continue
+        column = grouped[source]
+        # min_count keeps an all-missing sum (e.g. unsupported power) as NaN rather than 0.
+        values = column.sum(min_count=1) if how == "sum" else column.agg(how)
+        ticks[name] = values.to_numpy()
+    return ticks
+
+
+def join_telemetry(traces: pd.DataFrame, telemetry: pd.DataFrame) -> pd.DataFrame:
+    """Attach telemetry averaged over each request's `[ts_start_ns, ts_end_ns]` lifetime.
+
+    Requests shorter than the sampling interval often contain no sample; they take the last
+    sample at or before `ts_end_ns` (an as-of join) if it is at most two sampling intervals old.
+    `telemetry_samples` counts the samples inside the lifetime.
+    """
+    joined = traces.copy()
+    names = [name for _, _, name in _TICK_AGGREGATES]
+    if telemetry.empty or "ts_start_ns" not in joined.columns or "ts_end_ns" not in joined:
+        for name in names:
+            joined[name] = np.nan
+        joined["telemetry_samples"] = 0
+        return joined
+
+    ticks = telemetry.sort_values("ts_ns")
+    ts = ticks["ts_ns"].to_numpy(dtype=np.int64)
+    start = pd.to_numeric(joined["ts_start_ns"], errors="coerce").to_numpy(dtype=np.float64)
+    end = pd.to_numeric(joined["ts_end_ns"], errors="coerce").to_numpy(dtype=np.float64)
+    left = np.searchsorted(ts, start, side="left")
+    right = np.searchsorted(ts, end, side="right")
+    tolerance = 2.0 * float(np.median(np.diff(ts))) if len(ts) > 1 else np.inf
+    asof = right - 1
+    asof_ok = (asof >= 0) & (end - ts[np.clip(asof, 0, None)] <= tolerance)
+    joined["telemetry_samples"] = right - left
+
+    for name in names:
+        values = ticks[name].to_numpy(dtype=np.float64)
+        present = ~np.isnan(values)
+        sums = np.concatenate([[0.0], np.cumsum(np.where(present, values, 0.0))])
+        counts = np.concatenate([[0], np.cumsum(present)])
+        in_window = counts[right] - counts[left]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = (sums[right] - sums[left]) / in_window
+        fallback = np.where(asof_ok, values[np.clip(asof, 0, None)], np.nan)
+        joined[name] = np.where(in_window > 0, mean, fallback)
+    # Any throttled sample during the lifetime marks the request as throttled.
+    joined["throttled"] = np.where(
+        np.isnan(joined["throttled"]), np.nan, (joined["throttled"] > 0).astype(float)
+    )
+    return joined
+
+
+# Joined telemetry columns correlated with latency, and their metric names.
+_CORRELATED = (
+    ("gpu_util_mean", "gpu_util"),
+    ("mem_used_mb_mean", "mem_used_mb"),
+    ("power_w_mean", "power_w"),
+)
+
+
+def _percentiles(latencies: LatencyAccumulator) -> dict[str, float | None]:
+    if latencies.count == 0:
+        return {"latency_ms_p50": None, "latency_ms_p95": None, "latency_ms_p99": None}
+    return {
+        "latency_ms_p50": latencies.quantile(0.50, interpolate=True),
+        "latency_ms_p95": latencies.quantile(0.95, interpolate=True),
+        "latency_ms_p99": latencies.quantile(0.99, interpolate=True),
+    }
+
+
+def _spearman(latency: np.ndarray, values: np.ndarray) -> float | None:
+    pairs = pd.DataFrame({"latency": latency, "value": values}).dropna()
+    # A constant column (e.g. a saturated GPU) has no defined rank correlation.
+    if len(pairs) <= 2 or not (pairs.nunique() > 1).all():
+        return None
+    corr = pairs["latency"].corr(pairs["value"], method="spearman")
+    return None if np.isnan(corr) else float(corr)
+
+
+class TelemetryMetricsAccumulator:
+    """Incremental form of `compute_telemetry_metrics` for traces read in chunks.
+
+    Each chunk is joined to `telemetry` (small and already in memory) and folded into per-band
+    and throttled/unthrottled `LatencyAccumulator`s that keep exact samples up to `exact_limit`.
+    Rank correlations need every row at once, so they are computed on a uniform `RowSample` of
+    at most `sample_size` requests; both limits are exact below their size and `None` keeps all.
+    """
+
+    def __init__(
+        self,
+        telemetry: pd.DataFrame,
+        bands: Sequence[float] = GPU_UTIL_BANDS,
+        *,
+        exact_limit: int | None = EXACT_QUANTILE_LIMIT,
+        sample_size: int | None = EXACT_QUANTILE_LIMIT,
+    ) -> None:
+        self.telemetry = telemetry
+        self.bands = list(bands)
+        self._band_latency = [LatencyAccumulator(exact_limit) for _ in range(len(self.bands) - 1)]
+        self._throttled = {
+            name: LatencyAccumulator(exact_limit) for name in ("throttled", "unthrottled")
+        }
+        self._sample = RowSample(1 + len(_CORRELATED), sample_size)
+        self._rows = 0
+        self._covered = 0
+        self._seen = False
+
+    def update(self, traces: pd.DataFrame) -> None:
+        if traces.empty or self.telemetry.empty:
+            return
+        self._seen = True
+        df = traces
+        if "outcome" in df.columns:
+            df = df[~df["outcome"].isin(UNSERVED_OUTCOMES)]
+        latency_col = "total_ms" if "total_ms" in df.columns else "latency_ms"
+        keep = [name for name in ("ts_start_ns", "ts_end_ns", latency_col) if name in df.columns]
+        joined = join_telemetry(df[keep], self.telemetry)
+        latency = pd.to_numeric(joined[latency_col], errors="coerce")
+        self._rows += len(joined)
+        self._covered += int(joined["gpu_util_mean"].notna().sum())
+
+        band = pd.cut(joined["gpu_util_mean"], bins=self.bands, include_lowest=True)
+        for code, accumulator in enumerate(self._band_latency):
+            accumulator.add_many(latency[band.cat.codes == code].dropna())
+        for name, flag in (("throttled", 1), ("unthrottled", 0)):
+            self._throttled[name].add_many(latency[joined["throttled"] == flag].dropna())
+        self._sample.add(
+            np.column_stack(
+                [
+                    latency.to_numpy(dtype=np.float64),
+                    *(joined[column].to_numpy(dtype=np.float64) for column, _ in _CORRELATED),
+                ]
+            )
+        )
+
+    def result(self) -> tuple[dict[str, Any], pd.DataFrame]:
+        if not self._seen:
+            return {}, pd.DataFrame()
+        metrics: dict[str, Any] = {
+            "telemetry_coverage": self._covered / self._rows if self._rows else 0.0
+        }
+        rows: list[dict[str, Any]] = []
+        for lo, hi, accumulator in zip(
+            self.bands[:-1], self.bands[1:], self._band_latency, strict=True
+        ):
+            label = f"{lo:g}-{hi:g}"
+            row = {"gpu_util_band": label, "count": accumulator.count, **_percentiles(accumulator)}
+            rows.append(row)
+            metrics.update(
+                {
+                    f"gpu_util_band.{label}.{key}": value
+                    for key, value in row.items()
+                    if key != "gpu_util_band"
+                }
+            )
+        for name, accumulator in self._throttled.items():
+            metrics[f"{name}.count"] = accumulator.count
+            metrics[f"{name}.latency_ms_p99"] = _percentiles(accumulator)["latency_ms_p99"]
+
+        sample = self._sample.rows
+        for offset, (_, name) in enumerate(_CORRELATED, start=1):
+            metrics[f"latency_corr.{name}"] = _spearman(sample[:, 0], sample[:, offset])
+        return metrics, pd.DataFrame(rows)
+
+
+def compute_telemetry_metrics(
+    traces: pd.DataFrame,
+    telemetry: pd.DataFrame,
+    bands: Sequence[float] = GPU_UTIL_BANDS,
+) -> tuple[dict[str, Any], pd.DataFrame]:
+    """Latency percentiles conditioned on GPU utilization bands and on throttling.
+
+    Returns flat `gpu_util_band.<lo>-<hi>.*` / `throttled.*` / `unthrottled.*` metrics, rank
+    correlations of latency with utilization and memory, and the per-band table. Everything is
+    exact here; use `TelemetryMetricsAccumulator` to evaluate traces in chunks.
+    """
+    accumulator = TelemetryMetricsAccumulator(telemetry, bands, exact_limit=None, sample_size=None)
+    accumulator.update(traces)
+    return accumulator.result()
+
+
+__all__ = [
+    "GPU_UTIL_BANDS",
+    "TelemetryMetricsAccumulator",
+    "compute_telemetry_metrics",
+    "join_telemetry",
+    "load_telemetry",
+]
@@ -1,11 +1,16 @@
 from __future__ import annotations
 
+import asyncio
+import contextlib
 import time
+from typing import Any
 
 from fastapi import FastAPI
 from pydantic import BaseModel, Field
 
 from qosflow.common.config import ServerConfig
+from qosflow.common.engine_telemetry import EngineStatsSampler
+from qosflow.common.host_telemetry import HostSampler, LoopLagMonitor
 from qosflow.server.validate import BatchingMode, log_effective_batching
 from qosflow.server.vllm_backend import VLLMBackend
 
@@ -22,6 +27,11 @@ class GenerateRequest(BaseModel):
     params: GenerateParams = Field(default_factory=GenerateParams)
 
 
+class TimeResponse(BaseModel):
+    ts_recv_ns: int
+    ts_send_ns: int
+
+
 class GenerateResponse(BaseModel):
     text: str
     total_ms: float
@@ -42,6 +52,43 @@ def create_app(config: ServerConfig) -> FastAPI:
         app.state.batching_mode = batching_mode
         app.state.backend = VLLMBackend(effective_config)
 
+    @app.on_event("startup")
+    async def start_host_telemetry() -> None:
+        loop_lag = LoopLagMonitor()
+        app.state.loop_lag_task = asyncio.create_task(loop_lag.run())
+        app.state.host_sampler = HostSampler("server", loop_lag=loop_lag)
+        # Backends without an `engine_stats` reader leave `/telemetry/engine` empty.
+        engine_stats = EngineStatsSampler(
+            getattr(app.state.backend, "engine_stats", None), config.engine_stats_interval_s
+        )
+        app.state.engine_stats = engine_stats
+        app.state.engine_stats_task = asyncio.create_task(engine_stats.run())
+
+    @app.on_event("shutdown")
+    async def stop_host_telemetry() -> None:
+        for task in (app.state.loop_lag_task, app.state.engine_stats_task):
+            task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await task
+
+    @app.get("/time", response_model=TimeResponse)
+    async def server_time() -> TimeResponse:
+        # Async so the handler runs on the event loop without a threadpool hop between the
+        # socket and the timestamps; clients use it for NTP-style offset estimation.
+        ts_recv_ns = time.time_ns()
+        return TimeResponse(ts_recv_ns=ts_recv_ns, ts_send_ns=time.time_ns())
+
+    @app.get("/telemetry/host")
+    async def host_telemetry() -> dict[str, Any]:
+        # Rates cover the time since the previous call; empty where /proc is unavailable.
+        return app.state.host_sampler.sample() or {}
+
+    @app.get("/telemetry/engine")
+    async def engine_telemetry() -> dict[str, Any]:
+        # Latest scheduler/KV-cache read plus peaks since the previous call; empty until the
+        # engine has reported.
+        return app.state.engine_stats.take() or {}
+
     @app.post("/generate", response_model=GenerateResponse)
     def generate(req: GenerateRequest) -> GenerateResponse:
         params = req.params
@@ -1,13 +1,18 @@
 from __future__ import annotations
 
+import logging
 from typing import Any
 
 from qosflow.common.config import ServerConfig
+from qosflow.common.engine_telemetry import EngineStats
+
+logger = logging.getLogger(__name__)
 
 
 class VLLMBackend:
     def __init__(self, config: ServerConfig) -> None:
         self._config = config
+        self._engine_stats_warned = False
 
         from vllm import LLM
 
@@ -43,3 +48,40 @@ class VLLMBackend:
         if not completion.outputs:
             return ""
         return completion.outputs[0].text
+
+    def engine_stats(self) -> EngineStats | None:
+        """Scheduler queue depths and KV-cache usage from the engine, read without locking.
+
+        Uses the V0 engine's scheduler objects; engines that do not expose them (the V1 engine)
+        return None, which is logged once so an empty engine telemetry file is not read as idle.
+        """
+        engine = getattr(self._llm, "llm_engine", None)
+        schedulers = getattr(engine, "scheduler", None)
+        if engine is None or not schedulers:
+            if not self._engine_stats_warned:
+                self._engine_stats_warned = True
+                logger.warning(
+                    "engine stats unsupported: the vLLM engine exposes no V0 scheduler, "
+                    "so /telemetry/engine stays empty"
+                )
+            return None
+        cache_config = engine.cache_config
+        running = waiting = preempted = 0
+        free_gpu = free_cpu = 0
+        for scheduler in schedulers:
+            running += len(scheduler.running)
+            waiting += len(scheduler.waiting)
+            preempted += getattr(scheduler, "num_cumulative_preemption", 0)
+            free_gpu += scheduler.block_manager.get_num_free_gpu_blocks()
+            free_cpu += scheduler.block_manager.get_num_free_cpu_blocks()
+
+        def usage(free: int, total: int | None) -> float | None:
+            return 1.0 - free / total if total else None
+
+        return EngineStats(
+            num_running=running,
+            num_waiting=waiting,
+            num_preempted_total=preempted,
+            gpu_kv_cache_usage=usage(free_gpu, cache_config.num_gpu_blocks),
+            cpu_kv_cache_usage=usage(free_cpu, cache_config.num_cpu_blocks),
+        )
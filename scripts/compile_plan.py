@@ -0,0 +1,40 @@
+from __future__ import annotations
+
+import argparse
+from pathlib import Path
+
+from qosflow.common.config import QoSFlowConfig
+from qosflow.loadgen.plan import compile_plan
+from qosflow.loadgen.tokens import open_loadgen_prompts
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Precompile the request sequence of an open-loop or replay run"
+    )
+    parser.add_argument("--config", required=True, help="Path to qosflow YAML config")
+    parser.add_argument("--output", required=True, help="Plan file to write (.npz)")
+    parser.add_argument(
+        "--seed",
+        type=int,
+        default=None,
+        help="Plan seed (defaults to loadgen.seed, then server.seed)",
+    )
+    args = parser.parse_args()
+
+    config = QoSFlowConfig.from_yaml(args.config)
+    prompts = open_loadgen_prompts(
+        config.loadgen.prompt_source, config.loadgen.length_buckets, config.server
+    )
+    plan = compile_plan(config.loadgen, config.server, prompts, seed=args.seed)
+    path = plan.save(Path(args.output))
+    print(f"plan_path={path}")
+    print(
+        f"requests={len(plan)} prompts={len(plan.prompt_ids)} seed={plan.seed} "
+        f"window_s={plan.warmup_s:g}+{plan.duration_s:g}"
+    )
+    print(f"digest={plan.digest()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,34 @@
+from __future__ import annotations
+
+import argparse
+from glob import glob
+
+from qosflow.common.trace_parquet import convert_jsonl_to_parquet
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Convert trace JSONL files to columnar Parquet")
+    parser.add_argument("--traces", required=True, help="Glob for trace JSONL files")
+    parser.add_argument(
+        "--compression",
+        choices=["none", "gzip", "zstd"],
+        default="zstd",
+        help="Parquet column compression codec",
+    )
+    parser.add_argument("--row-group-size", type=int, default=10_000)
+    args = parser.parse_args()
+
+    paths = sorted(glob(args.traces))
+    if not paths:
+        parser.error(f"No files matched: {args.traces}")
+    for path in paths:
+        out_path = convert_jsonl_to_parquet(
+            path,
+            compression=args.compression,
+            row_group_size=args.row_group_size,
+        )
+        print(f"{path} -> {out_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+import argparse
+from pathlib import Path
+
+from qosflow.analysis.capacity import run_capacity_search
+from qosflow.common.config import CapacitySearchConfig, QoSFlowConfig, SLOConfig
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Search for the maximum arrival rate that meets an SLO"
+    )
+    parser.add_argument("--config", required=True, help="Path to qosflow YAML config")
+    parser.add_argument("--p95-ms", type=float, default=None, help="SLO on p95 latency (ms)")
+    parser.add_argument("--p99-ms", type=float, default=None, help="SLO on p99 latency (ms)")
+    parser.add_argument("--error-rate", type=float, default=None, help="SLO on error rate")
+    parser.add_argument("--start-rps", type=float, default=None, help="First ramp rate")
+    parser.add_argument("--max-rps", type=float, default=None, help="Upper limit on the search")
+    parser.add_argument(
+        "--step-duration-s", type=int, default=None, help="Measured window per step"
+    )
+    parser.add_argument(
+        "--output-dir",
+        default=None,
+        help="Search output directory (defaults to <experiment.output_dir>/capacity)",
+    )
+    args = parser.parse_args()
+
+    config = QoSFlowConfig.from_yaml(args.config)
+    search = config.capacity or CapacitySearchConfig(slo=SLOConfig())
+    slo_overrides = {
+        key: value
+        for key, value in {
+            "p95_ms": args.p95_ms,
+            "p99_ms": args.p99_ms,
+            "error_rate": args.error_rate,
+        }.items()
+        if value is not None
+    }
+    overrides = {
+        key: value
+        for key, value in {
+            "start_rps": args.start_rps,
+            "max_rps": args.max_rps,
+            "step_duration_s": args.step_duration_s,
+        }.items()
+        if value is not None
+    }
+    overrides["slo"] = search.slo.model_copy(update=slo_overrides)
+    search = search.model_copy(update=overrides)
+    if search.slo == SLOConfig():
+        parser.error("an SLO is required (config `capacity.slo` or --p95-ms/--p99-ms/--error-rate)")
+
+    report = run_capacity_search(
+        config_path=args.config,
+        output_dir=Path(args.output_dir) if args.output_dir else None,
+        search=search,
+    )
+    bracket_high = (
+        f"{report.bracket_high_rps:.3f}" if report.bracket_high_rps is not None else "none"
+    )
+    print(
+        f"max_rate_rps={report.max_rate_rps:.3f} "
+        f"max_rate_confident_rps={report.max_rate_confident_rps:.3f} "
+        f"(confidence={report.confidence:g})"
+    )
+    print(f"bracket_rps=[{report.bracket_low_rps:.3f}, {bracket_high}]")
+    print(f"steps={len(report.steps)} elapsed_s={report.elapsed_s:.1f}")
+
+
+if __name__ == "__main__":
+    main()
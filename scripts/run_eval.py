@@ -3,70 +3,136 @@ from __future__ import annotations
 import argparse
 import json
 from glob import glob
+from itertools import islice
 from pathlib import Path
-from typing import Any
+from typing import Any, Iterable, Iterator
 
 import pandas as pd
 
-from qosflow.common.io import ensure_dir, read_jsonl
-from qosflow.metrics.latency import compute_latency_metrics
-from qosflow.metrics.stability import compute_stability_metrics
-from qosflow.metrics.task import compute_task_metrics
-
-
-def _load_traces(path_glob: str) -> pd.DataFrame:
-    paths = sorted(glob(path_glob))
-    rows: list[dict[str, Any]] = []
-    for path in paths:
-        for row in read_jsonl(path):
-            rows.append(row)
-    if not rows:
-        return pd.DataFrame()
-    return pd.json_normalize(rows)
-
-
-def run_eval(traces_glob: str, output_dir: str | Path) -> tuple[dict[str, Any], pd.DataFrame]:
-    df = _load_traces(traces_glob)
+from qosflow.common.io import ensure_dir, iter_jsonl
+from qosflow.common.trace_parquet import iter_parquet_traces
+from qosflow.metrics.energy import ENERGY_COLUMNS, EnergyMetricsAccumulator
+from qosflow.metrics.latency import (
+    LATENCY_COLUMNS,
+    UNSERVED_OUTCOMES,
+    LatencyMetricsAccumulator,
+)
+from qosflow.metrics.stability import STABILITY_COLUMNS, StabilityMetricsAccumulator
+from qosflow.metrics.task import TASK_COLUMNS, TaskMetricsAccumulator
+from qosflow.metrics.telemetry import TelemetryMetricsAccumulator, load_telemetry
+
+# Trace rows held in memory at once; aggregators carry everything else between chunks.
+DEFAULT_CHUNK_ROWS = 50_000
+
+EVAL_COLUMNS = tuple(
+    dict.fromkeys(LATENCY_COLUMNS + TASK_COLUMNS + STABILITY_COLUMNS + ENERGY_COLUMNS)
+)
+
+
+def _iter_traces(
+    path_glob: str, columns: Iterable[str] | None = None, chunk_rows: int = DEFAULT_CHUNK_ROWS
+) -> Iterator[pd.DataFrame]:
+    """Yield trace files (JSONL or Parquet) as flat frames of at most `chunk_rows` rows, keeping
+    only `columns`, so no more than one chunk of raw rows is in memory at a time."""
+    wanted = list(columns) if columns is not None else None
+    for path in sorted(glob(path_glob)):
+        if Path(path).suffix == ".parquet":
+            yield from iter_parquet_traces(path, columns=wanted, batch_rows=chunk_rows)
+            continue
+        rows = iter_jsonl(path)
+        while batch := list(islice(rows, chunk_rows)):
+            frame = pd.json_normalize(batch)
+            if wanted is not None:
+                frame = frame[[name for name in wanted if name in frame.columns]]
+            yield frame
+
+
+def _telemetry_paths(traces_glob: str, telemetry_glob: str | None) -> list[str]:
+    """Explicit telemetry files, or the `telemetry*.csv` written next to each trace file."""
+    if telemetry_glob is not None:
+        return sorted(glob(telemetry_glob))
+    run_dirs = sorted({Path(path).parent for path in glob(traces_glob)})
+    return [str(path) for run_dir in run_dirs for path in sorted(run_dir.glob("telemetry*.csv"))]
+
+
+def run_eval(
+    traces_glob: str,
+    output_dir: str | Path,
+    telemetry_glob: str | None = None,
+    chunk_rows: int = DEFAULT_CHUNK_ROWS,
+    workers: int = 1,
+) -> tuple[dict[str, Any], pd.DataFrame]:
+    """Evaluate traces in chunks of `chunk_rows`, folding each into incremental aggregators.
+
+    `workers > 1` scores stability prompt groups in that many processes.
+    """
+    telemetry = load_telemetry(_telemetry_paths(traces_glob, telemetry_glob))
+    latency = LatencyMetricsAccumulator()
+    task = TaskMetricsAccumulator()
+    stability = StabilityMetricsAccumulator(workers=workers)
+    gpu_state = TelemetryMetricsAccumulator(telemetry)
+    energy = EnergyMetricsAccumulator(telemetry)
+    trace_rows = 0
+
+    for chunk in _iter_traces(traces_glob, columns=EVAL_COLUMNS, chunk_rows=chunk_rows):
+        trace_rows += len(chunk)
+        latency.update(chunk)
+        # Dropped/expired arrivals have no output; only latency metrics account for them.
+        if "outcome" in chunk.columns:
+            chunk = chunk[~chunk["outcome"].isin(UNSERVED_OUTCOMES)]
+        task.update(chunk)
+        stability.update(chunk)
+        gpu_state.update(chunk)
+        energy.update(chunk)
 
     all_metrics: dict[str, Any] = {
         "trace_files": len(glob(traces_glob)),
-        "trace_rows": int(len(df)),
+        "trace_rows": trace_rows,
     }
     table_parts: list[pd.DataFrame] = []
 
-    latency_metrics, latency_df = compute_latency_metrics(df)
+    latency_metrics, latency_df = latency.result()
     all_metrics.update(latency_metrics)
     if not latency_df.empty:
         table_parts.append(latency_df)
 
-    task_metrics, task_df = compute_task_metrics(df)
+    output_eval_dir = ensure_dir(Path(output_dir) / "eval")
+    telemetry_metrics, by_gpu_util = gpu_state.result()
+    all_metrics.update(telemetry_metrics)
+    if not by_gpu_util.empty:
+        by_gpu_util.to_csv(output_eval_dir / "latency_by_gpu_util.csv", index=False)
+    all_metrics.update(energy.result())
+
+    task_metrics = task.result()
     all_metrics.update(task_metrics)
-    if not task_df.empty:
-        task_summary = (
-            task_df[["exact_match", "token_f1"]]
-            .mean()
-            .to_frame()
-            .T.rename(columns={"exact_match": "task_exact_match", "token_f1": "task_token_f1"})
+    if task_metrics:
+        table_parts.append(
+            pd.DataFrame(
+                [
+                    {
+                        "task_exact_match": task_metrics["task_exact_match"],
+                        "task_token_f1": task_metrics["task_token_f1"],
+                    }
+                ]
+            )
         )
-        table_parts.append(task_summary)
 
-    stability_metrics, stability_df = compute_stability_metrics(df)
+    stability_metrics, stability_df = stability.result()
     all_metrics.update(stability_metrics)
     if not stability_df.empty:
-        stability_summary = (
-            stability_df[["exact_match_rate", "edit_similarity"]]
-            .mean()
-            .to_frame()
-            .T.rename(
-                columns={
-                    "exact_match_rate": "stability_exact_match_rate",
-                    "edit_similarity": "stability_edit_similarity",
-                }
+        table_parts.append(
+            pd.DataFrame(
+                [
+                    {
+                        "stability_exact_match_rate": stability_metrics[
+                            "stability_exact_match_rate"
+                        ],
+                        "stability_edit_similarity": stability_metrics["stability_edit_similarity"],
+                    }
+                ]
             )
         )
-        table_parts.append(stability_summary)
 
-    output_eval_dir = ensure_dir(Path(output_dir) / "eval")
     metrics_json_path = output_eval_dir / "metrics.json"
     metrics_csv_path = output_eval_dir / "metrics.csv"
 
@@ -84,10 +150,33 @@ def run_eval(traces_glob: str, output_dir: str | Path) -> tuple[dict[str, Any],
 
 def main() -> None:
     parser = argparse.ArgumentParser()
-    parser.add_argument("--traces", required=True, help="Glob for trace JSONL files")
+    parser.add_argument("--traces", required=True, help="Glob for trace JSONL or Parquet files")
     parser.add_argument("--output-dir", required=True)
+    parser.add_argument(
+        "--telemetry",
+        default=None,
+        help="Glob for telemetry CSVs (default: telemetry*.csv next to each trace file)",
+    )
+    parser.add_argument(
+        "--chunk-rows",
+        type=int,
+        default=DEFAULT_CHUNK_ROWS,
+        help="Trace rows read and aggregated at a time (bounds peak memory)",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Processes for per-prompt stability scoring (default: serial)",
+    )
     args = parser.parse_args()
-    metrics, _ = run_eval(traces_glob=args.traces, output_dir=args.output_dir)
+    metrics, _ = run_eval(
+        traces_glob=args.traces,
+        output_dir=args.output_dir,
+        telemetry_glob=args.telemetry,
+        chunk_rows=args.chunk_rows,
+        workers=args.workers,
+    )
     print(json.dumps(metrics, indent=2, ensure_ascii=False))
 
 
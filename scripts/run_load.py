@@ -2,12 +2,13 @@ from __future__ import annotations
 
 import argparse
 import asyncio
-from datetime import UTC, datetime
+from datetime import datetime, timezone
 
-from qosflow.common.config import QoSFlowConfig
-from qosflow.common.repro import set_reproducible, write_manifest
-from qosflow.loadgen.prompts import load_prompts
+from qosflow.common.config import QoSFlowConfig, ReplayConfig
+from qosflow.common.repro import set_reproducible, update_manifest, write_manifest
+from qosflow.loadgen.plan import WorkloadPlan
 from qosflow.loadgen.runner import build_run_id, run_load
+from qosflow.loadgen.tokens import open_loadgen_prompts
 
 
 def main() -> None:
@@ -33,6 +34,22 @@ def main() -> None:
         default=None,
         help="Override loadgen.duration_s from the config",
     )
+    parser.add_argument(
+        "--replay",
+        default=None,
+        help="Replay a recorded trace/request log instead of generating arrivals",
+    )
+    parser.add_argument(
+        "--replay-speed",
+        type=float,
+        default=1.0,
+        help="Replay time scaling (2.0 replays twice as fast)",
+    )
+    parser.add_argument(
+        "--plan",
+        default=None,
+        help="Dispatch a plan written by scripts/compile_plan.py instead of sampling live",
+    )
     args = parser.parse_args()
 
     config = QoSFlowConfig.from_yaml(args.config)
@@ -42,16 +59,29 @@ def main() -> None:
         config.loadgen.concurrency = args.concurrency
     if args.duration_s is not None:
         config.loadgen.duration_s = args.duration_s
+    if args.replay is not None:
+        config.loadgen.mode = "replay"
+        config.loadgen.replay = ReplayConfig(source=args.replay, speed=args.replay_speed)
+
+    if "console" not in config.loadgen.live.model_fields_set:
+        config.loadgen.live.console = True
+
+    plan = WorkloadPlan.load(args.plan) if args.plan is not None else None
 
     print(f"effective_loadgen_config={config.loadgen.model_dump(mode='json')}")
     set_reproducible(config.server.seed)
 
-    run_ts = datetime.now(tz=UTC)
+    run_ts = datetime.now(tz=timezone.utc)
     run_id = build_run_id(run_ts, config.server, config.loadgen, config.experiment)
     run_dir = config.experiment.output_dir / "traces" / f"run_id={run_id}"
-    write_manifest(path=run_dir / "manifest.json", config=config.model_dump(mode="json"))
+    manifest_config = config.model_dump(mode="json")
+    if plan is not None:
+        manifest_config["plan"] = {"path": args.plan, "digest": plan.digest(), "seed": plan.seed}
+    write_manifest(path=run_dir / "manifest.json", config=manifest_config)
 
-    prompts = load_prompts(config.loadgen.prompt_source)
+    prompts = open_loadgen_prompts(
+        config.loadgen.prompt_source, config.loadgen.length_buckets, config.server
+    )
     summary = asyncio.run(
         run_load(
             config.server,
@@ -59,16 +89,64 @@ def main() -> None:
             config.experiment,
             prompts,
             now=run_ts,
+            plan=plan,
         )
     )
 
+    if summary.clock_sync is not None:
+        update_manifest(run_dir / "manifest.json", clock_sync=summary.clock_sync)
+        print(
+            "clock_sync "
+            f"offset_ms={summary.clock_sync['offset_ns'] / 1e6:.3f} "
+            f"uncertainty_ms={summary.clock_sync['uncertainty_ns'] / 1e6:.3f} "
+            f"drift_ppm={summary.clock_sync['drift_ppm']:.2f}"
+        )
+
+    if summary.engine_telemetry_rows == 0:
+        note = "server reported no engine stats; its engine does not expose them (e.g. vLLM V1)"
+        update_manifest(
+            run_dir / "manifest.json",
+            engine_telemetry={"rows": 0, "supported": False, "note": note},
+        )
+        print(f"engine_telemetry {note}")
+
     print(f"run_id={summary.run_id}")
     print(f"trace_path={summary.trace_path}")
     print(
         "summary "
         f"sent={summary.sent} success={summary.success} failed={summary.failed} "
-        f"p50_total_ms={summary.p50_total_ms:.2f} p95_total_ms={summary.p95_total_ms:.2f}"
+        f"p50_total_ms={summary.p50_total_ms:.2f} p95_total_ms={summary.p95_total_ms:.2f} "
+        f"p99_total_ms={summary.p99_total_ms:.2f}"
     )
+    if summary.aborted:
+        print(f"aborted reason={summary.abort_reason!r}")
+    print(
+        "dispatch_lag "
+        f"p50_ms={summary.dispatch_lag_p50_ms:.3f} p99_ms={summary.dispatch_lag_p99_ms:.3f} "
+        f"max_ms={summary.dispatch_lag_max_ms:.3f}"
+    )
+    print(
+        "admission "
+        f"offered_rps={summary.offered_rps:.2f} admitted_rps={summary.admitted_rps:.2f} "
+        f"completed_rps={summary.completed_rps:.2f} dropped={summary.dropped} "
+        f"expired={summary.expired} backlog_max={summary.backlog_max}"
+    )
+    if summary.telemetry is not None:
+        print(
+            "telemetry "
+            f"backend={summary.telemetry.backend} samples={summary.telemetry.samples} "
+            f"overruns={summary.telemetry.overruns} "
+            f"lag_ms_mean={summary.telemetry.lag_ms_mean:.3f} "
+            f"lag_ms_max={summary.telemetry.lag_ms_max:.3f}"
+        )
+    if summary.writer is not None:
+        print(
+            "trace_writer "
+            f"rows={summary.writer.rows_written} backlog_max={summary.writer.backlog_max} "
+            f"stalls={summary.writer.producer_stalls} "
+            f"flush_ms_mean={summary.writer.flush_ms_mean:.3f} "
+            f"flush_ms_max={summary.writer.flush_ms_max:.3f}"
+        )
 
 
 if __name__ == "__main__":
@@ -17,12 +17,17 @@ def _parse_rates(raw_values: list[str]) -> list[float]:
 def main() -> None:
     parser = argparse.ArgumentParser(description="Run multi-load sweep and aggregate eval metrics")
     parser.add_argument("--config", required=True, help="Path to qosflow YAML config")
-    parser.add_argument(
+    points = parser.add_mutually_exclusive_group(required=True)
+    points.add_argument(
         "--arrival-rates",
         nargs="+",
-        required=True,
         help="Arrival rates in req/s (supports repeated values or comma-separated lists)",
     )
+    points.add_argument(
+        "--users",
+        nargs="+",
+        help="Closed-loop virtual user counts (supports repeated values or comma-separated lists)",
+    )
     parser.add_argument(
         "--output-dir",
         default=None,
@@ -31,14 +36,14 @@ def main() -> None:
     parser.add_argument(
         "--no-resume",
         action="store_true",
-        help="Do not skip lambdas that already have eval/metrics.json",
+        help="Do not skip sweep points that already have eval/metrics.json",
     )
     args = parser.parse_args()
 
-    arrival_rates = _parse_rates(args.arrival_rates)
     summary_df = run_sweep(
         config_path=args.config,
-        arrival_rates=arrival_rates,
+        arrival_rates=_parse_rates(args.arrival_rates) if args.arrival_rates else None,
+        users=[int(count) for count in _parse_rates(args.users)] if args.users else None,
         output_dir=Path(args.output_dir) if args.output_dir else None,
         resume=not args.no_resume,
     )
@@ -38,6 +38,22 @@ def summarize_telemetry(
         "max_mem_used_mb": max(mem_used) if mem_used else None,
     }
 
+    # Long-format files carry one row per device per tick; older files have no gpu_index.
+    devices = sorted({row["gpu_index"] for row in rows if (row.get("gpu_index") or "").strip()})
+    if devices:
+        summary["gpus"] = len(devices)
+        for device in devices:
+            device_rows = [row for row in rows if row.get("gpu_index") == device]
+            device_util = _collect_numeric(device_rows, "gpu_util")
+            sm_clock = _collect_numeric(device_rows, "sm_clock_mhz")
+            # Bit 0 (GPU idle) is not a slowdown; any other active reason is.
+            reasons = [int(value) for value in _collect_numeric(device_rows, "throttle_reasons")]
+            summary[f"gpu{device}.mean_gpu_util"] = fmean(device_util) if device_util else None
+            summary[f"gpu{device}.mean_sm_clock_mhz"] = fmean(sm_clock) if sm_clock else None
+            summary[f"gpu{device}.throttled_fraction"] = (
+                sum(1 for value in reasons if value & ~0x1) / len(reasons) if reasons else None
+            )
+
     out_path = Path(output_json)
     out_path.parent.mkdir(parents=True, exist_ok=True)
     with out_path.open("w", encoding="utf-8") as handle:
@@ -0,0 +1,138 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from qosflow.analysis.capacity import (
+    CapacityStep,
+    _next_step_index,
+    _step_loadgen,
+    _step_samples,
+    error_rate_upper_bound,
+    evaluate_step,
+    quantile_upper_bound,
+    search_capacity,
+)
+from qosflow.common.config import (
+    CapacitySearchConfig,
+    LoadGenConfig,
+    LoadMixConfig,
+    PoissonArrivalConfig,
+    SLOConfig,
+    TenantConfig,
+)
+from qosflow.common.io import write_jsonl
+
+
+def test_quantile_upper_bound_covers_true_quantile() -> None:
+    rng = np.random.default_rng(0)
+    true_p95 = float(-np.log(0.05) * 100.0)
+    covered = 0
+    for _ in range(400):
+        sample = np.sort(rng.exponential(100.0, size=300))
+        covered += quantile_upper_bound(sample, 0.95, 0.9) >= true_p95
+
+    # Order-statistic bounds are conservative, so coverage is at least the nominal level.
+    assert covered / 400 >= 0.87
+    assert quantile_upper_bound(np.arange(10.0), 0.99, 0.95) == float("inf")
+
+
+def test_evaluate_step_separates_point_pass_from_confident_pass() -> None:
+    slo = SLOConfig(p95_ms=100.0, error_rate=0.01)
+    latencies = [50.0] * 94 + [99.0] + [150.0] * 5
+
+    step = evaluate_step(10.0, latencies, failed=0, slo=slo)
+
+    assert step.passed
+    assert not step.confident
+    assert step.p95_upper_ms == 150.0
+    assert error_rate_upper_bound(0, 100, 0.95) == pytest.approx(1 - 0.05 ** (1 / 100))
+
+
+def test_unserved_rows_count_as_slo_misses(tmp_path: Path) -> None:
+    served = [{"total_ms": 20.0, "system": {"error": None}} for _ in range(18)]
+    # Dropped arrivals record only their (short) backlog wait and no error.
+    dropped = [{"total_ms": 0.5, "system": {"error": None}, "outcome": "dropped"}] * 2
+    write_jsonl(tmp_path / "trace.jsonl", served + dropped)
+
+    latencies, failed, unserved = _step_samples(tmp_path / "trace.jsonl")
+    step = evaluate_step(
+        10.0, latencies, failed, SLOConfig(p95_ms=100.0, error_rate=0.05), unserved=unserved
+    )
+
+    assert (len(latencies), failed, unserved) == (18, 0, 2)
+    assert step.requests == 20
+    assert step.error_rate == pytest.approx(0.1)
+    assert step.p95_ms == float("inf")
+    assert not step.passed
+
+
+def test_search_capacity_brackets_the_true_limit() -> None:
+    rates: list[float] = []
+
+    def evaluate(rate_rps: float, phase: str) -> CapacityStep:
+        rates.append(rate_rps)
+        latency = 50.0 if rate_rps <= 37.0 else 500.0
+        return evaluate_step(rate_rps, [latency] * 2_000, 0, SLOConfig(p99_ms=100.0), phase=phase)
+
+    report = search_capacity(
+        evaluate, CapacitySearchConfig(slo=SLOConfig(p99_ms=100.0), rel_tolerance=0.02)
+    )
+
+    assert rates[:7] == [1.0, 2.0, 4.0, 8.0, 16.0, 32.0, 64.0]
+    assert report.bracket_high_rps is not None
+    assert report.bracket_low_rps <= 37.0 < report.bracket_high_rps
+    assert report.bracket_high_rps - report.bracket_low_rps <= 0.02 * report.bracket_high_rps
+    assert report.max_rate_confident_rps == report.max_rate_rps
+    assert len(report.steps) < 15
+
+
+def test_step_loadgen_scales_tenant_rates_to_the_step_rate() -> None:
+    mix = LoadMixConfig(short=1.0, med=0.0, long=0.0)
+    base = LoadGenConfig(
+        arrival_rate_rps=1.0,
+        concurrency=4,
+        duration_s=10,
+        warmup_s=0,
+        repeats=1,
+        prompt_source=Path("prompts.jsonl"),
+        mix=mix,
+        tenants=[
+            TenantConfig(name="chat", arrival_rate_rps=3.0, mix=mix),
+            TenantConfig(name="batch", arrival=PoissonArrivalConfig(rate_rps=1.0), mix=mix),
+        ],
+    )
+
+    step = _step_loadgen(base, CapacitySearchConfig(slo=SLOConfig(p99_ms=100.0)), 20.0)
+
+    assert step.tenants[0].arrival_rate_rps == pytest.approx(15.0)
+    assert isinstance(step.tenants[1].arrival, PoissonArrivalConfig)
+    assert step.tenants[1].arrival.rate_rps == pytest.approx(5.0)
+
+
+def test_step_loadgen_installs_abort_rule_for_zero_error_rate() -> None:
+    mix = LoadMixConfig(short=1.0, med=0.0, long=0.0)
+    base = LoadGenConfig(
+        arrival_rate_rps=1.0,
+        concurrency=4,
+        duration_s=10,
+        warmup_s=0,
+        repeats=1,
+        prompt_source=Path("prompts.jsonl"),
+        mix=mix,
+    )
+
+    step = _step_loadgen(base, CapacitySearchConfig(slo=SLOConfig(error_rate=0.0)), 5.0)
+
+    assert step.live.abort is not None
+    assert step.live.abort.error_rate == 0.0
+
+
+def test_next_step_index_skips_past_leftover_step_dirs(tmp_path: Path) -> None:
+    assert _next_step_index(tmp_path) == 0
+    (tmp_path / "step=00_lambda=1").mkdir()
+    (tmp_path / "step=03_lambda=8").mkdir()
+
+    assert _next_step_index(tmp_path) == 4
@@ -28,6 +28,18 @@ def test_async_client_generate_success() -> None:
     assert timings["attempts"] == 1
 
 
+def test_async_client_server_time() -> None:
+    def handler(request: httpx.Request) -> httpx.Response:
+        assert request.url.path == "/time"
+        return httpx.Response(200, json={"ts_recv_ns": 10, "ts_send_ns": 12})
+
+    transport = httpx.MockTransport(handler)
+    inner = httpx.AsyncClient(base_url="http://test", transport=transport, timeout=1.0)
+    client = AsyncLLMClient("http://test", timeout=1.0, client=inner)
+
+    assert asyncio.run(client.server_time()) == (10, 12)
+
+
 def test_async_client_retries_503() -> None:
     calls = {"count": 0}
 
@@ -0,0 +1,91 @@
+from __future__ import annotations
+
+import asyncio
+import random
+
+import numpy as np
+import pytest
+
+from qosflow.common.clock import (
+    ClockEstimate,
+    ClockModel,
+    ClockSample,
+    estimate_offset,
+    probe_clock,
+)
+
+
+class _SkewedServer:
+    """Server clock = client clock + offset (+ drift), with random one-way delays."""
+
+    def __init__(self, offset_ns: float, drift_ppm: float = 0.0, seed: int = 0) -> None:
+        self.offset_ns = offset_ns
+        self.drift = drift_ppm * 1e-6
+        self.now_ns = 1_000_000_000_000
+        self._rng = random.Random(seed)
+
+    def client_clock(self) -> int:
+        return self.now_ns
+
+    def _server_ns(self) -> int:
+        return round(self.now_ns + self.offset_ns + self.drift * self.now_ns)
+
+    async def fetch(self) -> tuple[int, int]:
+        # 200 us base one-way latency plus occasional queueing on either leg.
+        self.now_ns += 200_000 + int(self._rng.expovariate(1 / 2_000_000))
+        t1 = self._server_ns()
+        self.now_ns += 50_000
+        t2 = self._server_ns()
+        self.now_ns += 200_000 + int(self._rng.expovariate(1 / 2_000_000))
+        return t1, t2
+
+
+def test_sample_offset_and_delay_for_symmetric_path() -> None:
+    sample = ClockSample(t0_ns=0, t1_ns=5_001_000, t2_ns=5_002_000, t3_ns=3_000)
+
+    assert sample.delay_ns == 2_000
+    assert sample.offset_ns == 5_000_000
+
+
+def test_probe_recovers_offset_within_uncertainty() -> None:
+    server = _SkewedServer(offset_ns=-37_500_000)
+
+    estimate = asyncio.run(probe_clock(server.fetch, samples=16, clock=server.client_clock))
+
+    assert abs(estimate.offset_ns - server.offset_ns) <= estimate.uncertainty_ns
+    assert estimate.uncertainty_ns < 2_000_000
+    assert estimate.samples == 16
+
+
+def test_estimate_prefers_low_delay_samples() -> None:
+    fast = ClockSample(0, 1_000_100, 1_000_200, 300)
+    slow = ClockSample(0, 9_000_000, 9_000_100, 9_000_000)
+
+    estimate = estimate_offset([slow, fast, slow, slow])
+
+    assert estimate.offset_ns == pytest.approx(fast.offset_ns)
+    assert estimate.uncertainty_ns == fast.delay_ns / 2
+
+
+def test_model_fits_drift_across_probes() -> None:
+    server = _SkewedServer(offset_ns=10_000_000, drift_ppm=50.0, seed=1)
+    model = ClockModel()
+    for phase in ("before", "during", "after"):
+        estimate = asyncio.run(probe_clock(server.fetch, samples=16, clock=server.client_clock))
+        model.add(ClockEstimate(**{**estimate.__dict__, "phase": phase}))
+        server.now_ns += 600_000_000_000
+
+    assert model.drift_ppm == pytest.approx(50.0, rel=0.05)
+    probe_time = np.array([model.estimates[1].at_ns])
+    expected = server.offset_ns + server.drift * probe_time[0]
+    offset = model.offset_at(probe_time)
+    assert offset is not None
+    assert offset[0] == pytest.approx(expected, abs=1_000_000)
+    assert [item["phase"] for item in model.to_dict()["estimates"]] == ["before", "during", "after"]
+
+
+def test_empty_model_has_no_offset() -> None:
+    model = ClockModel()
+
+    assert model.offset_at(np.array([0])) is None
+    assert model.uncertainty_ns is None
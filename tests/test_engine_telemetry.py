@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+import csv
+import threading
+from functools import partial
+from pathlib import Path
+
+import httpx
+import pytest
+
+from qosflow.common.engine_telemetry import (
+    ENGINE_TELEMETRY_COLUMNS,
+    EngineStats,
+    EngineStatsSampler,
+    EngineTelemetryRecorder,
+    FakeEngineStats,
+)
+from qosflow.common.telemetry import RotatingCsvWriter
+
+
+def test_sampler_reports_latest_read_with_peaks_since_previous_take() -> None:
+    sampler = EngineStatsSampler(
+        FakeEngineStats(
+            [
+                EngineStats(num_running=4, num_waiting=9, gpu_kv_cache_usage=0.9),
+                EngineStats(num_running=8, num_waiting=2, gpu_kv_cache_usage=0.5),
+            ]
+        )
+    )
+    assert sampler.take() is None
+
+    sampler.sample()
+    sampler.sample()
+    first = sampler.take()
+    sampler.sample()
+    second = sampler.take()
+
+    assert first is not None and second is not None
+    assert (first["num_running"], first["num_waiting"], first["num_waiting_max"]) == (8, 2, 9)
+    assert first["gpu_kv_cache_usage_max"] == 0.9
+    # Peaks restart from the latest read, so the earlier burst is not reported twice.
+    assert (second["num_waiting_max"], second["gpu_kv_cache_usage_max"]) == (2, 0.5)
+
+
+def test_sampler_treats_failed_engine_reads_as_gaps() -> None:
+    def broken() -> EngineStats:
+        raise AttributeError("scheduler moved")
+
+    sampler = EngineStatsSampler(broken)
+    sampler.sample()
+
+    assert sampler.take() is None
+    assert EngineStatsSampler(None).take() is None
+
+
+def test_recorder_writes_engine_rows_until_the_endpoint_fails(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    responses = iter(
+        [
+            httpx.Response(200, json={}),
+            httpx.Response(200, json={"num_running": 3, "num_waiting": 1, "extra": "ignored"}),
+            httpx.Response(404),
+        ]
+    )
+    fetched = threading.Semaphore(0)
+
+    def respond(_request: httpx.Request) -> httpx.Response:
+        fetched.release()
+        return next(responses)
+
+    transport = httpx.MockTransport(respond)
+    monkeypatch.setattr(httpx, "Client", partial(httpx.Client, transport=transport))
+    path = tmp_path / "engine_telemetry.csv"
+    recorder = EngineTelemetryRecorder(
+        RotatingCsvWriter(lambda _segment: path, ENGINE_TELEMETRY_COLUMNS), "http://server"
+    )
+
+    for second in range(3):
+        recorder(f"2025-01-01T00:00:0{second}+00:00")
+        # Fetches run on the poller thread; wait for each so no tick is coalesced.
+        assert fetched.acquire(timeout=5.0)
+    # Polling stopped after the 404, so this tick is not fetched.
+    recorder("2025-01-01T00:00:03+00:00")
+    recorder.close()
+    assert not fetched.acquire(blocking=False)
+
+    with path.open(encoding="utf-8") as handle:
+        rows = list(csv.DictReader(handle))
+    assert len(rows) == recorder.rows == 1
+    assert rows[0]["timestamp"] == "2025-01-01T00:00:01+00:00"
+    assert (rows[0]["num_running"], rows[0]["num_waiting"]) == ("3", "1")
@@ -0,0 +1,57 @@
+from __future__ import annotations
+
+import numpy as np
+import pytest
+
+from qosflow.common.histogram import LatencyAccumulator, LatencyHistogram
+
+
+def test_quantiles_are_within_relative_error() -> None:
+    values = np.random.default_rng(0).lognormal(mean=5.0, sigma=1.0, size=20_000)
+    hist = LatencyHistogram()
+    hist.record_many(values)
+
+    for q in (0.5, 0.95, 0.99):
+        assert hist.quantile(q) == pytest.approx(float(np.quantile(values, q)), rel=0.02)
+    assert hist.count == len(values)
+    assert hist.mean == pytest.approx(float(values.mean()))
+
+
+def test_merge_matches_single_histogram_and_round_trips() -> None:
+    values = np.random.default_rng(1).exponential(100.0, size=5_000)
+    whole = LatencyHistogram()
+    whole.record_many(values)
+    left, right = LatencyHistogram(), LatencyHistogram()
+    for value in values[:2_000]:
+        left.record(float(value))
+    right.record_many(values[2_000:])
+    left.merge(right)
+
+    assert np.array_equal(left.counts, whole.counts)
+    restored = LatencyHistogram.from_dict(left.to_dict())
+    assert restored.quantile(0.99) == whole.quantile(0.99)
+    assert (restored.min, restored.max) == (whole.min, whole.max)
+
+
+def test_accumulator_is_exact_until_its_limit() -> None:
+    exact = LatencyAccumulator(exact_limit=None)
+    bounded = LatencyAccumulator(exact_limit=10)
+    for value in range(1, 101):
+        exact.add(float(value))
+        bounded.add(float(value))
+
+    assert exact.exact and exact.quantile(0.5) == 51.0
+    assert not bounded.exact
+    assert bounded.count == 100 and bounded.max == 100.0
+    assert bounded.quantile(0.5) == pytest.approx(51.0, rel=0.02)
+
+
+def test_accumulator_interpolates_like_pandas_while_exact() -> None:
+    values = [10.0, 20.0, 30.0]
+    accumulator = LatencyAccumulator(exact_limit=5)
+    accumulator.add_many(values)
+
+    assert accumulator.quantile(0.95, interpolate=True) == pytest.approx(29.0)
+    assert accumulator.quantile(0.95) == 30.0
+    accumulator.add_many(range(100))
+    assert not accumulator.exact and accumulator.count == 103
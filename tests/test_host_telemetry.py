@@ -0,0 +1,159 @@
+from __future__ import annotations
+
+import asyncio
+import csv
+import time
+from functools import partial
+from pathlib import Path
+
+import httpx
+import pytest
+
+from qosflow.common.host_telemetry import (
+    HOST_TELEMETRY_COLUMNS,
+    HostSampler,
+    HostTelemetryRecorder,
+    LoopLagMonitor,
+    read_proc_counters,
+)
+from qosflow.common.telemetry import NVMLSampler, RotatingCsvWriter
+
+
+def _fake_proc(root: Path, *, cpu_ticks: int, voluntary: int, rx_bytes: int, tx_bytes: int) -> None:
+    process = root / "4242"
+    process.mkdir(parents=True, exist_ok=True)
+    # Fields 4..52 after "pid (comm) state"; utime/stime are fields 14/15, num_threads is 20.
+    fields = ["0"] * 49
+    fields[10], fields[11], fields[16] = str(cpu_ticks), "0", "7"
+    (process / "stat").write_text(f"4242 (uvicorn (worker)) S {' '.join(fields)}\n")
+    (process / "status").write_text(
+        "Name:\tuvicorn\nVmRSS:\t  204800 kB\n"
+        f"voluntary_ctxt_switches:\t{voluntary}\nnonvoluntary_ctxt_switches:\t5\n"
+    )
+    (root / "loadavg").write_text("1.50 1.00 0.50 2/300 4242\n")
+    (root / "net").mkdir(exist_ok=True)
+    (root / "net" / "dev").write_text(
+        "Inter-|   Receive                            |  Transmit\n"
+        " face |bytes    packets errs drop fifo frame compressed multicast|bytes ...\n"
+        f"    lo: 999999 1 0 0 0 0 0 0 999999 1 0 0 0 0 0 0\n"
+        f"  eth0: {rx_bytes} 10 0 0 0 0 0 0 {tx_bytes} 10 0 0 0 0 0 0\n"
+    )
+
+
+def test_read_proc_counters_parses_stat_status_and_net(tmp_path: Path) -> None:
+    _fake_proc(tmp_path, cpu_ticks=300, voluntary=40, rx_bytes=1000, tx_bytes=2000)
+
+    counters = read_proc_counters(4242, tmp_path)
+
+    assert counters.pid == 4242
+    assert counters.cpu_ticks == 300
+    assert counters.threads == 7
+    assert counters.rss_kb == 204800
+    assert (counters.ctx_voluntary, counters.ctx_involuntary) == (40, 5)
+    assert counters.load_1m == 1.5
+    assert (counters.net_rx_bytes, counters.net_tx_bytes) == (1000, 2000)
+
+
+def test_host_sampler_reports_rates_between_samples(tmp_path: Path) -> None:
+    _fake_proc(tmp_path, cpu_ticks=100, voluntary=10, rx_bytes=0, tx_bytes=0)
+    sampler = HostSampler("server", pid=4242, proc_root=tmp_path, clock_ticks=100)
+
+    first = sampler.sample("t0")
+    time.sleep(0.1)
+    _fake_proc(tmp_path, cpu_ticks=105, voluntary=20, rx_bytes=10_000, tx_bytes=5_000)
+    second = sampler.sample("t1")
+
+    assert first is not None and second is not None
+    assert list(second) == HOST_TELEMETRY_COLUMNS
+    assert first["cpu_pct"] is None and first["rss_mb"] == 200.0
+    # 5 ticks at 100 Hz over ~0.1 s is about half a core.
+    assert second["cpu_pct"] == pytest.approx(50.0, rel=0.3)
+    assert second["ctx_voluntary_s"] == pytest.approx(100.0, rel=0.3)
+    assert second["net_rx_bytes_s"] > second["net_tx_bytes_s"] > 0
+
+
+def test_host_sampler_without_proc_returns_none(tmp_path: Path) -> None:
+    assert HostSampler("loadgen", proc_root=tmp_path / "missing").sample() is None
+
+
+def test_loop_lag_monitor_sees_blocked_loop() -> None:
+    monitor = LoopLagMonitor(interval_s=0.01)
+
+    async def block() -> float | None:
+        task = asyncio.create_task(monitor.run())
+        await asyncio.sleep(0.02)
+        time.sleep(0.1)
+        await asyncio.sleep(0.02)
+        task.cancel()
+        return monitor.take_peak_ms()
+
+    peak_ms = asyncio.run(block())
+
+    assert peak_ms is not None and peak_ms >= 50.0
+    assert monitor.take_peak_ms() is None
+
+
+def test_host_rows_share_gpu_tick_timestamps_without_a_gpu(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    import sys
+
+    monkeypatch.setitem(sys.modules, "pynvml", None)
+    _fake_proc(tmp_path, cpu_ticks=100, voluntary=10, rx_bytes=0, tx_bytes=0)
+    path = tmp_path / "host_telemetry.csv"
+    recorder = HostTelemetryRecorder(
+        RotatingCsvWriter(lambda _segment: path, HOST_TELEMETRY_COLUMNS),
+        HostSampler("loadgen", pid=4242, proc_root=tmp_path),
+    )
+    sampler = NVMLSampler(0.02, nvidia_smi="/nonexistent/nvidia-smi", on_tick=recorder)
+
+    async def run() -> None:
+        sampler.start()
+        await asyncio.sleep(0.15)
+        await sampler.stop()
+
+    asyncio.run(run())
+    recorder.close()
+
+    lines = path.read_text(encoding="utf-8").splitlines()
+    assert sampler.stats.backend == "none"
+    assert sampler.stats.samples == 0
+    assert len(lines) >= 4
+    assert all(",loadgen,4242," in line for line in lines[1:])
+
+
+def test_slow_server_fetch_does_not_stall_the_tick(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    def slow_server(_request: httpx.Request) -> httpx.Response:
+        time.sleep(0.3)
+        return httpx.Response(200, json={"process": "server", "pid": 7, "threads": 3})
+
+    transport = httpx.MockTransport(slow_server)
+    monkeypatch.setattr(httpx, "Client", partial(httpx.Client, transport=transport))
+    _fake_proc(tmp_path, cpu_ticks=100, voluntary=10, rx_bytes=0, tx_bytes=0)
+    path = tmp_path / "host_telemetry.csv"
+    recorder = HostTelemetryRecorder(
+        RotatingCsvWriter(lambda _segment: path, HOST_TELEMETRY_COLUMNS),
+        HostSampler("loadgen", pid=4242, proc_root=tmp_path),
+        server_url="http://server",
+        timeout_s=1.0,
+    )
+
+    ticks = [f"2025-01-01T00:00:0{second}+00:00" for second in range(3)]
+    tick_s = []
+    for timestamp in ticks:
+        started = time.monotonic()
+        recorder(timestamp)
+        tick_s.append(time.monotonic() - started)
+        # Let the first fetch start; the next two ticks then land while it is in flight.
+        time.sleep(0.05)
+    recorder.close()
+
+    with path.open(encoding="utf-8", newline="") as handle:
+        rows = list(csv.DictReader(handle))
+    assert max(tick_s) < 0.1
+    assert [row["timestamp"] for row in rows if row["process"] == "loadgen"] == ticks
+    server_rows = [row for row in rows if row["process"] == "server"]
+    # The tick that arrived mid-fetch was superseded; the others keep their tick timestamp.
+    assert [row["timestamp"] for row in server_rows] == [ticks[0], ticks[2]]
@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+import numpy as np
+import pytest
+from pydantic import TypeAdapter
+
+from qosflow.common.config import (
+    ArrivalProcessConfig,
+    MMPPArrivalConfig,
+    PiecewiseArrivalConfig,
+    PoissonArrivalConfig,
+    RampArrivalConfig,
+    RenewalArrivalConfig,
+)
+from qosflow.loadgen.arrivals import arrival_offsets, mean_rate, with_mean_rate
+
+
+def _cv(offsets: np.ndarray) -> float:
+    gaps = np.diff(offsets)
+    return float(gaps.std() / gaps.mean())
+
+
+def test_arrival_config_parses_from_yaml_mapping() -> None:
+    adapter = TypeAdapter(ArrivalProcessConfig)
+    config = adapter.validate_python(
+        {
+            "kind": "mmpp",
+            "states": [
+                {"rate_rps": 5.0, "mean_dwell_s": 10.0},
+                {"rate_rps": 50.0, "mean_dwell_s": 2.0},
+            ],
+        }
+    )
+
+    assert isinstance(config, MMPPArrivalConfig)
+    assert mean_rate(config) == pytest.approx((5.0 * 10.0 + 50.0 * 2.0) / 12.0)
+
+
+def test_poisson_offsets_are_sorted_within_horizon_and_match_rate() -> None:
+    offsets = arrival_offsets(PoissonArrivalConfig(rate_rps=200.0), 50.0, np.random.default_rng(1))
+
+    assert np.all(np.diff(offsets) >= 0)
+    assert offsets.min() >= 0.0 and offsets.max() < 50.0
+    assert len(offsets) / 50.0 == pytest.approx(200.0, rel=0.03)
+    assert _cv(offsets) == pytest.approx(1.0, rel=0.05)
+
+
+@pytest.mark.parametrize("kind", ["gamma", "weibull"])
+@pytest.mark.parametrize("cv", [0.5, 2.0])
+def test_renewal_offsets_hit_target_rate_and_cv(kind: str, cv: float) -> None:
+    config = RenewalArrivalConfig(kind=kind, rate_rps=100.0, cv=cv)
+    offsets = arrival_offsets(config, 400.0, np.random.default_rng(2))
+
+    assert len(offsets) / 400.0 == pytest.approx(100.0, rel=0.05)
+    assert _cv(offsets) == pytest.approx(cv, rel=0.08)
+
+
+def test_mmpp_is_burstier_than_poisson_at_same_mean() -> None:
+    config = MMPPArrivalConfig(
+        states=[{"rate_rps": 10.0, "mean_dwell_s": 5.0}, {"rate_rps": 200.0, "mean_dwell_s": 1.0}]
+    )
+    offsets = arrival_offsets(config, 600.0, np.random.default_rng(3))
+    counts = np.bincount(offsets.astype(int), minlength=600)
+
+    assert len(offsets) / 600.0 == pytest.approx(mean_rate(config), rel=0.15)
+    assert counts.var() / counts.mean() > 5.0
+
+
+def test_linear_ramp_increases_rate() -> None:
+    config = RampArrivalConfig(start_rps=10.0, end_rps=90.0)
+    offsets = arrival_offsets(config, 100.0, np.random.default_rng(4))
+
+    first_half = int((offsets < 50.0).sum())
+    second_half = int((offsets >= 50.0).sum())
+    # Expected 50 s * 30 rps = 1500 vs 50 s * 70 rps = 3500.
+    assert first_half == pytest.approx(1500, rel=0.08)
+    assert second_half == pytest.approx(3500, rel=0.08)
+
+
+def test_piecewise_schedule_repeats_and_respects_zero_rate() -> None:
+    config = PiecewiseArrivalConfig(
+        segments=[{"duration_s": 1.0, "rate_rps": 100.0}, {"duration_s": 1.0, "rate_rps": 0.0}]
+    )
+    offsets = arrival_offsets(config, 6.0, np.random.default_rng(5))
+
+    assert np.all(np.floor(offsets).astype(int) % 2 == 0)
+    assert len(offsets) == pytest.approx(300, rel=0.2)
+
+
+def test_with_mean_rate_preserves_shape() -> None:
+    config = PiecewiseArrivalConfig(
+        segments=[{"duration_s": 3.0, "rate_rps": 2.0}, {"duration_s": 1.0, "rate_rps": 6.0}]
+    )
+    scaled = with_mean_rate(config, 15.0)
+
+    assert mean_rate(scaled) == pytest.approx(15.0)
+    assert [seg.rate_rps for seg in scaled.segments] == pytest.approx([10.0, 30.0])
@@ -0,0 +1,53 @@
+from __future__ import annotations
+
+from qosflow.common.config import BacklogConfig
+from qosflow.loadgen.backlog import BacklogQueue, Pending
+
+
+def _entry(name: str, arrived_s: float = 0.0) -> Pending[str]:
+    return Pending(name, arrived_s, int(arrived_s * 1e9))
+
+
+def test_drop_newest_rejects_arrivals_once_full() -> None:
+    queue: BacklogQueue[str] = BacklogQueue(BacklogConfig(policy="drop_newest", max_pending=2))
+
+    assert queue.offer(_entry("a")) is None
+    assert queue.offer(_entry("b")) is None
+    rejected = queue.offer(_entry("c"))
+
+    assert rejected is not None and rejected.item == "c"
+    assert [queue.take(0.0)[0].item for _ in range(2)] == ["a", "b"]  # type: ignore[union-attr]
+    assert queue.high_water == 2
+
+
+def test_drop_oldest_evicts_longest_waiting() -> None:
+    queue: BacklogQueue[str] = BacklogQueue(BacklogConfig(policy="drop_oldest", max_pending=2))
+    for name in ("a", "b"):
+        queue.offer(_entry(name))
+
+    evicted = queue.offer(_entry("c"))
+
+    assert evicted is not None and evicted.item == "a"
+    assert [queue.take(0.0)[0].item for _ in range(2)] == ["b", "c"]  # type: ignore[union-attr]
+
+
+def test_deadline_expires_stale_arrivals_on_take() -> None:
+    queue: BacklogQueue[str] = BacklogQueue(
+        BacklogConfig(policy="deadline", max_pending=10, deadline_ms=100.0)
+    )
+    queue.offer(_entry("old", arrived_s=0.0))
+    queue.offer(_entry("older", arrived_s=0.05))
+    queue.offer(_entry("fresh", arrived_s=0.2))
+
+    entry, expired = queue.take(0.25)
+
+    assert entry is not None and entry.item == "fresh"
+    assert [item.item for item in expired] == ["old", "older"]
+    assert queue.take(0.25) == (None, [])
+
+
+def test_unbounded_never_drops() -> None:
+    queue: BacklogQueue[int] = BacklogQueue(BacklogConfig(max_pending=1))
+
+    assert all(queue.offer(Pending(idx, 0.0, 0)) is None for idx in range(5))
+    assert len(queue) == 5
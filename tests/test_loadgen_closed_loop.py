@@ -0,0 +1,32 @@
+from __future__ import annotations
+
+import random
+
+import pytest
+
+from qosflow.common.config import ThinkTimeConfig
+from qosflow.common.schema import PromptRecord
+from qosflow.loadgen.closed_loop import build_session, sample_think_time
+from qosflow.loadgen.mix import PromptMixSampler
+
+
+@pytest.mark.parametrize("distribution", ["exponential", "uniform", "lognormal"])
+def test_think_time_distributions_match_configured_mean(distribution: str) -> None:
+    config = ThinkTimeConfig(distribution=distribution, mean_s=0.5, sigma=0.5)
+    rng = random.Random(11)
+    samples = [sample_think_time(config, rng) for _ in range(4000)]
+
+    assert min(samples) >= 0.0
+    assert sum(samples) / len(samples) == pytest.approx(0.5, rel=0.06)
+
+
+def test_build_session_expands_repeats_per_prompt() -> None:
+    prompts = [
+        PromptRecord(prompt_id=f"p{idx}", text="x", length_bucket="short") for idx in range(5)
+    ]
+    sampler = PromptMixSampler(prompts, {"short": 1.0}, rng=random.Random(3))
+
+    session = build_session(sampler, session_length=2, repeats=3)
+
+    assert [repeat_idx for _, repeat_idx in session] == [0, 1, 2, 0, 1, 2]
+    assert session[0][0] is session[2][0]
@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+import json
+from pathlib import Path
+
+import pytest
+
+from qosflow.common.config import AbortRuleConfig, LiveStatsConfig
+from qosflow.loadgen.live import LiveStats, read_abort_reason
+
+
+class _Clock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_live_stats_reports_interval_throughput_and_window_percentiles(tmp_path: Path) -> None:
+    clock = _Clock()
+    progress_path = tmp_path / "progress.jsonl"
+    live = LiveStats(
+        LiveStatsConfig(window_s=2.0, console=False), progress_path, clock=clock, echo=None
+    )
+
+    for latency_ms in (10.0, 20.0, 1000.0):
+        live.record_start()
+        live.record_end(latency_ms, ok=True)
+    clock.now = 1.0
+    first = live.tick()
+    live.report(first)
+    live.record_start()
+    live.record_end(30.0, ok=False)
+    clock.now = 2.0
+    second = live.tick()
+    live.report(second)
+    live.close()
+
+    assert first.throughput_rps == 3.0
+    assert second.completed == 1 and second.window_requests == 4
+    assert second.window_error_rate == 0.25
+    assert second.window_p99_ms == pytest.approx(1000.0, rel=0.02)
+    lines = [json.loads(line) for line in progress_path.read_text().splitlines()]
+    assert [line["event"] for line in lines] == ["tick", "tick"]
+
+
+def test_abort_rule_requires_sustained_violation(tmp_path: Path) -> None:
+    clock = _Clock()
+    progress_path = tmp_path / "progress.jsonl"
+    config = LiveStatsConfig(
+        window_s=1.0,
+        console=False,
+        abort=AbortRuleConfig(p99_ms=100.0, sustain_s=2.0, min_requests=1),
+    )
+    live = LiveStats(config, progress_path, clock=clock, echo=None)
+
+    reasons = []
+    for second, latency_ms in enumerate((500.0, 50.0, 500.0, 500.0, 500.0), start=1):
+        live.record_start()
+        live.record_end(latency_ms, ok=True)
+        clock.now = float(second)
+        reasons.append(live.report(live.tick()))
+    live.close()
+
+    # The dip at t=2 resets the streak; the rule trips two seconds after it restarts at t=3.
+    assert reasons[:4] == [None, None, None, None]
+    assert reasons[4] is not None and reasons[4].startswith("p99")
+    assert read_abort_reason(progress_path) == reasons[4]
+
+
+def test_abort_rule_ignores_warmup_ticks() -> None:
+    clock = _Clock()
+    config = LiveStatsConfig(
+        console=False, abort=AbortRuleConfig(error_rate=0.1, sustain_s=0.0, min_requests=1)
+    )
+    live = LiveStats(config, clock=clock, echo=None)
+    live.record_start()
+    live.record_end(5.0, ok=False)
+    clock.now = 1.0
+
+    assert live.report(live.tick(measuring=False)) is None
+    assert live.report(live.tick(measuring=True)) is not None
@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+import numpy as np
+import pytest
+
+from qosflow.common.config import OutputLengthConfig
+from qosflow.common.schema import PromptRecord
+from qosflow.loadgen.output_lengths import OutputLengthSampler
+
+
+def _prompt(idx: int, bucket: str = "short", expected: str | None = None) -> PromptRecord:
+    return PromptRecord(prompt_id=f"p-{idx}", text="x", length_bucket=bucket, expected=expected)
+
+
+def test_fixed_default_and_per_bucket_override() -> None:
+    sampler = OutputLengthSampler(
+        {
+            "default": OutputLengthConfig(distribution="fixed", mean_tokens=64),
+            "long": OutputLengthConfig(distribution="fixed", mean_tokens=16),
+        },
+        default_tokens=128,
+        seed=1,
+    )
+
+    assert sampler.sample(_prompt(0, "short")) == 64
+    assert sampler.sample(_prompt(1, "long")) == 16
+    assert OutputLengthSampler({}, 128, seed=1).sample(_prompt(2)) is None
+
+
+def test_draws_are_per_prompt_and_seeded() -> None:
+    config = {"default": OutputLengthConfig(distribution="uniform", min_tokens=8, max_tokens=512)}
+    first = OutputLengthSampler(config, 128, seed=3)
+    again = OutputLengthSampler(config, 128, seed=3)
+    other = OutputLengthSampler(config, 128, seed=4)
+    prompts = [_prompt(idx) for idx in range(2000)]
+
+    draws = [first.sample(prompt) for prompt in prompts]
+    assert draws == [again.sample(prompt) for prompt in prompts]
+    assert draws == [first.sample(prompt) for prompt in prompts]
+    assert draws != [other.sample(prompt) for prompt in prompts]
+    assert min(draws) == 8 and max(draws) == 512
+
+
+def test_lognormal_matches_mean_and_is_clamped() -> None:
+    sampler = OutputLengthSampler(
+        {
+            "default": OutputLengthConfig(
+                distribution="lognormal", mean_tokens=200, sigma=0.6, max_tokens=4096
+            )
+        },
+        128,
+        seed=0,
+    )
+    draws = np.array([sampler.sample(_prompt(idx)) for idx in range(20_000)], dtype=float)
+
+    assert draws.mean() == pytest.approx(200, rel=0.03)
+    assert draws.min() >= 1 and draws.max() <= 4096
+
+
+def test_expected_length_falls_back_to_mean() -> None:
+    sampler = OutputLengthSampler(
+        {"default": OutputLengthConfig(distribution="expected", mean_tokens=32)}, 128, seed=0
+    )
+
+    assert sampler.sample(_prompt(0, expected="a" * 400)) == 100
+    assert sampler.sample(_prompt(1)) == 32
+
+
+def test_rejects_inverted_bounds() -> None:
+    with pytest.raises(ValueError, match="max_tokens"):
+        OutputLengthSampler(
+            {"default": OutputLengthConfig(min_tokens=64, max_tokens=8)}, 128, seed=0
+        )
@@ -0,0 +1,155 @@
+from __future__ import annotations
+
+import asyncio
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from qosflow.common.config import (
+    ClosedLoopConfig,
+    ExperimentConfig,
+    LoadGenConfig,
+    LoadMixConfig,
+    ServerConfig,
+    TenantConfig,
+)
+from qosflow.common.io import read_jsonl
+from qosflow.common.schema import PromptRecord
+from qosflow.loadgen.plan import WorkloadPlan, compile_plan
+from qosflow.loadgen.runner import run_load
+
+
+class _FakeClient:
+    async def generate(self, prompt: str, params=None):  # noqa: ANN001, ANN201
+        return f"ok:{prompt}", {"prefill_ms": 1.0, "decode_ms": 1.0}, 200
+
+    async def aclose(self) -> None:
+        return None
+
+
+def _server_config() -> ServerConfig:
+    return ServerConfig(
+        host="127.0.0.1",
+        port=8000,
+        model="test-model",
+        dtype="float16",
+        max_new_tokens=12,
+        temperature=0.1,
+        top_p=0.9,
+        seed=42,
+        dynamic_batching=True,
+        max_num_seqs=8,
+        max_num_batched_tokens=1024,
+        scheduler_delay_ms=0,
+    )
+
+
+def _loadgen(tmp_path: Path, **overrides: object) -> LoadGenConfig:
+    settings: dict[str, object] = {
+        "arrival_rate_rps": 40.0,
+        "concurrency": 4,
+        "duration_s": 1,
+        "warmup_s": 0,
+        "repeats": 2,
+        "prompt_source": tmp_path / "prompts.jsonl",
+        "mix": LoadMixConfig(short=0.5, med=0.5, long=0.0),
+    }
+    settings.update(overrides)
+    return LoadGenConfig(**settings)
+
+
+def _prompts() -> list[PromptRecord]:
+    return [
+        PromptRecord(prompt_id=f"p-{bucket}-{idx}", text=f"{bucket} {idx}", length_bucket=bucket)
+        for bucket in ("short", "med")
+        for idx in range(5)
+    ]
+
+
+def test_compile_plan_is_deterministic_and_round_trips(tmp_path: Path) -> None:
+    loadgen = _loadgen(tmp_path)
+    first = compile_plan(loadgen, _server_config(), _prompts(), seed=7)
+    second = compile_plan(loadgen, _server_config(), list(reversed(_prompts())), seed=7)
+    other = compile_plan(loadgen, _server_config(), _prompts(), seed=8)
+
+    assert len(first) > 0
+    assert np.all(np.diff(first.offsets_s) >= 0)
+    assert first.repeat_idx.tolist()[:4] == [0, 1, 0, 1]
+    assert first.prompt_index[0] == first.prompt_index[1]
+    assert set(first.max_new_tokens.tolist()) == {12}
+    assert first.digest() != other.digest()
+
+    path = first.save(tmp_path / "plan.npz")
+    loaded = WorkloadPlan.load(path)
+    assert loaded.digest() == first.digest()
+    assert loaded.seed == 7
+    assert [p.prompt_id for p in loaded.resolve_prompts(_prompts())] == [
+        p.prompt_id for p in first.resolve_prompts(list(reversed(_prompts())))
+    ]
+    # Catalog order does not change sampling because groups are built per bucket in file order.
+    assert first.offsets_s.tolist() == second.offsets_s.tolist()
+
+
+def test_compile_plan_rejects_closed_loop(tmp_path: Path) -> None:
+    with pytest.raises(ValueError, match="closed-loop"):
+        compile_plan(
+            _loadgen(tmp_path, mode="closed", closed_loop=ClosedLoopConfig(users=2)),
+            _server_config(),
+            _prompts(),
+        )
+
+
+def test_resolve_prompts_reports_missing_ids(tmp_path: Path) -> None:
+    plan = compile_plan(_loadgen(tmp_path), _server_config(), _prompts(), seed=1)
+    with pytest.raises(ValueError, match="not in the prompt catalog"):
+        plan.resolve_prompts(_prompts()[:1])
+
+
+def test_compile_plan_tags_requests_with_tenants(tmp_path: Path) -> None:
+    tenants = [
+        TenantConfig(name="chat", arrival_rate_rps=30.0, mix=LoadMixConfig(short=1, med=0, long=0)),
+        TenantConfig(
+            name="batch",
+            arrival_rate_rps=10.0,
+            mix=LoadMixConfig(short=0, med=1, long=0),
+            max_new_tokens=256,
+        ),
+    ]
+    plan = compile_plan(
+        _loadgen(tmp_path, tenants=tenants, repeats=1), _server_config(), _prompts(), seed=5
+    )
+
+    assert set(plan.tenant_index.tolist()) == {0, 1}
+    assert [tenant.name for tenant in plan.resolve_tenants(tenants)] == ["chat", "batch"]
+    batch = plan.tenant_index == 1
+    assert set(plan.max_new_tokens[batch].tolist()) == {256}
+    assert set(plan.max_new_tokens[~batch].tolist()) == {12}
+    with pytest.raises(ValueError, match="not in loadgen.tenants"):
+        plan.resolve_tenants(tenants[:1])
+
+
+def test_run_load_dispatches_planned_requests(tmp_path: Path) -> None:
+    loadgen = _loadgen(tmp_path)
+    plan = compile_plan(loadgen, _server_config(), _prompts(), seed=3)
+    expected = [
+        (plan.prompt_ids[index].decode(), int(repeat))
+        for index, repeat in zip(plan.prompt_index, plan.repeat_idx, strict=True)
+    ]
+
+    summary = asyncio.run(
+        run_load(
+            _server_config(),
+            loadgen.model_copy(update={"arrival_rate_rps": 1.0}),
+            ExperimentConfig(name="exp", output_dir=tmp_path),
+            _prompts(),
+            now=datetime(2025, 1, 2, 3, 4, 5, tzinfo=timezone.utc),
+            client_factory=lambda: _FakeClient(),
+            plan=plan,
+        )
+    )
+
+    rows = read_jsonl(summary.trace_path)
+    assert summary.sent == len(plan)
+    assert sorted((row["prompt_id"], row["repeat_idx"]) for row in rows) == sorted(expected)
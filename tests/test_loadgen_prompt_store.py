@@ -0,0 +1,54 @@
+from __future__ import annotations
+
+import json
+import random
+from pathlib import Path
+
+from qosflow.loadgen.mix import PromptMixSampler
+from qosflow.loadgen.prompt_store import PromptStore, index_path_for
+from qosflow.loadgen.prompts import LengthThresholds, load_prompts
+
+_THRESHOLDS = LengthThresholds(short_max_chars=10, med_max_chars=40)
+
+
+def _write_catalog(path: Path, count: int) -> None:
+    lines = []
+    for idx in range(count):
+        text = "é" * (idx % 60 + 1)
+        lines.append(json.dumps({"prompt_id": f"p{idx}", "text": text, "tags": ["t"]}))
+        if idx % 7 == 0:
+            lines.append("")
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+
+def test_prompt_store_matches_eager_loader_and_caches_index(tmp_path: Path) -> None:
+    path = tmp_path / "prompts.jsonl"
+    _write_catalog(path, 50)
+
+    store = PromptStore(path, _THRESHOLDS)
+
+    assert list(store) == load_prompts(path, _THRESHOLDS)
+    assert index_path_for(path).exists()
+    assert store.get_by_id("p17") == store[17]
+    assert store.index_of("missing") is None
+    store.close()
+
+    _write_catalog(path, 20)
+    rebuilt = PromptStore(path, _THRESHOLDS)
+    assert len(rebuilt) == 20
+    rebuilt.close()
+
+
+def test_sampler_over_store_reproduces_list_sampling(tmp_path: Path) -> None:
+    path = tmp_path / "prompts.jsonl"
+    _write_catalog(path, 200)
+    weights = {"short": 0.2, "med": 0.5, "long": 0.3}
+    store = PromptStore(path, _THRESHOLDS)
+
+    from_store = PromptMixSampler(store, weights, rng=random.Random(11)).sample_many(100)
+    from_list = PromptMixSampler(
+        load_prompts(path, _THRESHOLDS), weights, rng=random.Random(11)
+    ).sample_many(100)
+
+    assert [p.prompt_id for p in from_store] == [p.prompt_id for p in from_list]
+    store.close()
@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+import random
+from pathlib import Path
+
+import pytest
+
+from qosflow.common.io import write_jsonl
+from qosflow.common.schema import PromptRecord
+from qosflow.loadgen.mix import PromptMixSampler
+from qosflow.loadgen.replay import load_replay_schedule, resolve_replay_prompts
+
+
+def _catalog() -> tuple[list[PromptRecord], PromptMixSampler]:
+    prompts = [
+        PromptRecord(prompt_id="short-1", text="a" * 10, length_bucket="short"),
+        PromptRecord(prompt_id="long-1", text="b" * 600, length_bucket="long"),
+    ]
+    sampler = PromptMixSampler(prompts, {"short": 1.0, "long": 1.0}, rng=random.Random(0))
+    return prompts, sampler
+
+
+def test_replay_schedule_sorts_and_scales_offsets(tmp_path: Path) -> None:
+    source = tmp_path / "trace.jsonl"
+    write_jsonl(
+        source,
+        [
+            {"ts_start_ns": 3_000_000_000, "prompt_id": "long-1", "repeat_idx": 1},
+            {"ts_start_ns": 1_000_000_000, "prompt_id": "short-1"},
+            {"ts_start_ns": 2_000_000_000, "prompt_id": "short-1", "repeat_idx": 2},
+        ],
+    )
+
+    schedule = load_replay_schedule(source, speed=2.0)
+
+    assert schedule.offsets_s.tolist() == [0.0, 0.5, 1.0]
+    assert schedule.prompt_ids == ["short-1", "short-1", "long-1"]
+    assert schedule.repeat_idx == [0, 2, 1]
+
+
+def test_replay_reads_csv_request_logs(tmp_path: Path) -> None:
+    source = tmp_path / "requests.csv"
+    source.write_text("ts_start_ns,prompt_id\n5000000000,short-1\n5250000000,long-1\n")
+
+    schedule = load_replay_schedule(source)
+
+    assert schedule.offsets_s.tolist() == [0.0, 0.25]
+    assert schedule.prompt_len_chars == [None, None]
+
+
+def test_resolve_replay_prompts_substitution_modes(tmp_path: Path) -> None:
+    prompts, sampler = _catalog()
+    source = tmp_path / "trace.jsonl"
+    write_jsonl(
+        source,
+        [
+            {"ts_start_ns": 0, "prompt_id": "prod-9", "prompt_len_chars": 900},
+            {"ts_start_ns": 1, "prompt_id": "short-1", "prompt_len_chars": 10},
+        ],
+    )
+    schedule = load_replay_schedule(source)
+
+    with pytest.raises(ValueError, match="not in the prompt catalog"):
+        resolve_replay_prompts(schedule, prompts, sampler)
+
+    resolved = resolve_replay_prompts(schedule, prompts, sampler, substitution="missing")
+    assert [prompt.prompt_id for prompt in resolved] == ["long-1", "short-1"]
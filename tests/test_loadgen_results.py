@@ -0,0 +1,189 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import pytest
+
+from qosflow.common.clock import ClockEstimate, ClockModel
+from qosflow.common.config import LoadMixConfig, TenantConfig
+from qosflow.common.hashing import sha256_normalized_text
+from qosflow.common.io import read_jsonl
+from qosflow.common.schema import PromptRecord, TraceRecord
+from qosflow.common.trace_parquet import ParquetTraceSink, read_parquet_traces
+from qosflow.common.trace_writer import JsonlTraceSink
+from qosflow.loadgen.results import (
+    ResultBatch,
+    ResultBuffer,
+    TraceContext,
+    apply_clock_model,
+    trace_rows,
+)
+
+_CONTEXT = TraceContext(
+    run_id="run-1",
+    params={"temperature": 0.1, "top_p": 0.9, "seed": 42, "max_new_tokens": 12},
+    server={"model": "m", "dtype": "float16", "batching_knobs": {"max_num_seqs": 8}},
+)
+
+
+def _fill(buffer: ResultBuffer) -> None:
+    prompt = PromptRecord(prompt_id="p-1", text="Hello  world", length_bucket="short")
+    tenant = TenantConfig(name="chat", mix=LoadMixConfig(short=1, med=0, long=0), slo_ms=250.0)
+    buffer.append(
+        prompt,
+        0,
+        12,
+        None,
+        ts_start_ns=1_000_000_000,
+        ts_end_ns=1_004_000_000,
+        total_ms=4.0,
+        http_status=200,
+        error=None,
+        output_text="hi",
+        timings={
+            "ts_recv_ns": 1_001_000_000,
+            "ts_done_ns": 1_003_000_000,
+            "prefill_ms": 0.5,
+            "decode_ms": 1.5,
+            "batch_size": 3,
+        },
+    )
+    buffer.append(
+        prompt.model_copy(update={"len_tokens": 3}),
+        1,
+        64,
+        tenant,
+        ts_start_ns=2_000_000_000,
+        ts_end_ns=2_010_000_000,
+        total_ms=10.0,
+        http_status=0,
+        error="boom",
+        output_text="",
+        timings={},
+    )
+
+
+def test_trace_rows_match_trace_record_schema() -> None:
+    buffer = ResultBuffer(capacity=8)
+    _fill(buffer)
+    batch = buffer.drain()
+    assert batch is not None and len(batch) == 2
+    assert buffer.drain() is None
+
+    rows = trace_rows(batch, _CONTEXT)
+
+    for row in rows:
+        assert TraceRecord.model_validate(row).model_dump(mode="json") == row
+    first, second = rows
+    assert first["system"]["server_compute_ms"] == 2.0
+    assert first["system"]["network_rtt_ms"] == 2.0
+    assert first["system"]["server_queue_ms"] == 0.0
+    assert first["system"]["batch_size"] == 3
+    assert first["prompt_hash"] == sha256_normalized_text("Hello  world")
+    assert first["params"]["max_new_tokens"] == 12
+    assert second["system"]["ts_recv_ns"] is None
+    assert second["system"]["network_rtt_ms"] is None
+    assert second["params"]["max_new_tokens"] == 64
+    assert (second["tenant"], second["slo_ms"], second["prompt_len_tokens"]) == ("chat", 250.0, 3)
+    assert first["request_id"] != second["request_id"]
+
+
+def test_result_buffer_reports_full_and_starts_fresh() -> None:
+    buffer = ResultBuffer(capacity=2)
+    prompt = PromptRecord(prompt_id="p", text="t", length_bucket="short")
+    kwargs = {
+        "ts_start_ns": 0,
+        "ts_end_ns": 1,
+        "total_ms": 0.0,
+        "http_status": 200,
+        "error": None,
+        "output_text": "",
+        "timings": {},
+    }
+
+    assert not buffer.append(prompt, 0, 12, None, **kwargs)
+    assert buffer.append(prompt, 1, 12, None, **kwargs)
+    batch = buffer.drain()
+    assert batch is not None and batch.ints[:, 8].tolist() == [0, 1]
+    assert len(buffer) == 0
+
+
+def test_trace_rows_correct_cross_host_timing_with_clock_offset() -> None:
+    # Server clock runs 50 ms ahead; uncorrected, queue time would absorb the skew.
+    clock = ClockModel([ClockEstimate(0, 50_000_000.0, 100_000.0, 200_000, 8)])
+    context = TraceContext(run_id="r", params=_CONTEXT.params, server=_CONTEXT.server, clock=clock)
+    buffer = ResultBuffer()
+    prompt = PromptRecord(prompt_id="p", text="t", length_bucket="short")
+    buffer.append(
+        prompt,
+        0,
+        12,
+        None,
+        ts_start_ns=1_000_000_000,
+        ts_end_ns=1_010_000_000,
+        total_ms=10.0,
+        http_status=200,
+        error=None,
+        output_text="x",
+        timings={"ts_recv_ns": 1_053_000_000, "ts_done_ns": 1_059_000_000},
+    )
+    batch = buffer.drain()
+    assert batch is not None
+
+    (row,) = trace_rows(batch, context)
+    (raw,) = trace_rows(batch, _CONTEXT)
+
+    assert row["system"]["clock_offset_ns"] == 50_000_000
+    assert row["system"]["server_queue_ms"] == 1.0
+    assert row["system"]["network_rtt_ms"] == raw["system"]["network_rtt_ms"] == 4.0
+    assert raw["system"]["server_queue_ms"] == 51.0
+    assert raw["system"]["clock_offset_ns"] is None
+
+
+def _sent_batch(send_ns: int) -> ResultBatch:
+    buffer = ResultBuffer()
+    buffer.append(
+        PromptRecord(prompt_id="p", text="t", length_bucket="short"),
+        0,
+        12,
+        None,
+        ts_start_ns=send_ns,
+        ts_end_ns=send_ns + 200_000_000,
+        total_ms=200.0,
+        http_status=200,
+        error=None,
+        output_text="x",
+        timings={"ts_recv_ns": send_ns + 150_000_000, "ts_done_ns": send_ns + 190_000_000},
+    )
+    batch = buffer.drain()
+    assert batch is not None
+    return batch
+
+
+@pytest.mark.parametrize("suffix", [".jsonl", ".parquet"])
+def test_apply_clock_model_puts_every_batch_on_the_final_fit(tmp_path: Path, suffix: str) -> None:
+    if suffix == ".parquet":
+        pytest.importorskip("pyarrow")
+    path = tmp_path / f"trace{suffix}"
+    sink = ParquetTraceSink(path) if suffix == ".parquet" else JsonlTraceSink(path)
+    clock = ClockModel([ClockEstimate(0, 50_000_000.0, 100_000.0, 200_000, 8, "before")])
+    context = TraceContext(run_id="r", params=_CONTEXT.params, server=_CONTEXT.server, clock=clock)
+    sink.open()
+    sink.write(trace_rows(_sent_batch(10_000_000_000), context))
+    # A later probe reveals 1 ms/s of drift after the first batch was already serialized.
+    clock.add(ClockEstimate(100_000_000_000, 150_000_000.0, 100_000.0, 200_000, 8, "after"))
+    sink.write(trace_rows(_sent_batch(90_000_000_000), context))
+    sink.close()
+
+    apply_clock_model([path], clock)
+
+    if suffix == ".parquet":
+        frame = read_parquet_traces(path)
+        offsets = frame["system.clock_offset_ns"].tolist()
+        queues = frame["system.server_queue_ms"].tolist()
+    else:
+        systems = [row["system"] for row in read_jsonl(path)]
+        offsets = [system["clock_offset_ns"] for system in systems]
+        queues = [system["server_queue_ms"] for system in systems]
+    assert offsets == [60_000_000, 140_000_000]
+    assert queues == pytest.approx([10.0, 0.0])
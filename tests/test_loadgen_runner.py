@@ -1,15 +1,36 @@
 from __future__ import annotations
 
 import asyncio
-from datetime import UTC, datetime
+import csv
+import json
+import time
+from collections.abc import Callable
+from datetime import datetime, timezone
 from pathlib import Path
 
 import pytest
 
-from qosflow.common.config import ExperimentConfig, LoadGenConfig, LoadMixConfig, ServerConfig
-from qosflow.common.io import read_jsonl
+from qosflow.common.config import (
+    AbortRuleConfig,
+    BacklogConfig,
+    ClosedLoopConfig,
+    ExperimentConfig,
+    LiveStatsConfig,
+    LoadGenConfig,
+    LoadMixConfig,
+    OutputLengthConfig,
+    ReplayConfig,
+    ServerConfig,
+    SoakConfig,
+    TenantConfig,
+    ThinkTimeConfig,
+    TraceSinkConfig,
+)
+from qosflow.common.io import read_jsonl, write_jsonl
 from qosflow.common.schema import PromptRecord
-from qosflow.loadgen.runner import build_run_id, run_load
+from qosflow.common.telemetry import RotatingCsvWriter, SamplerStats
+from qosflow.common.trace_writer import RotatingTraceSink
+from qosflow.loadgen.runner import _trace_sinks, build_run_id, run_load
 
 
 class _DeterministicRng:
@@ -23,24 +44,49 @@ class _DeterministicRng:
         return population[0]
 
 
+def _read_csv_rows(path: Path) -> list[dict[str, str]]:
+    with path.open(encoding="utf-8", newline="") as handle:
+        return list(csv.DictReader(handle))
+
+
 class _FakeSampler:
-    def __init__(self, telemetry_interval_s: float = 0.5) -> None:
+    def __init__(
+        self,
+        telemetry_interval_s: float = 0.5,
+        stream: object | None = None,
+        on_tick: Callable[[str], None] | None = None,
+    ) -> None:
         self.telemetry_interval_s = telemetry_interval_s
+        self.stream = stream
+        self.on_tick = on_tick
         self.started = False
         self.stopped = False
 
     def start(self) -> None:
         self.started = True
+        assert isinstance(self.stream, RotatingCsvWriter)
+        self.stream.write_row(
+            {
+                "timestamp": "2025-01-01T00:00:00+00:00",
+                "gpu_util": 50,
+                "mem_used_mb": 1000,
+                "mem_total_mb": 2000,
+                "power_w": 120,
+                "temp_c": 70,
+                "sample_lag_ms": 0.0,
+            }
+        )
+        if self.on_tick is not None:
+            self.on_tick("2025-01-01T00:00:00+00:00")
 
     async def stop(self) -> None:
         self.stopped = True
+        assert isinstance(self.stream, RotatingCsvWriter)
+        self.stream.close()
 
-    def write_csv(self, path: Path) -> None:
-        path.write_text(
-            "timestamp,gpu_util,mem_used_mb,mem_total_mb,power_w,temp_c\n"
-            "2025-01-01T00:00:00+00:00,50,1000,2000,120,70\n",
-            encoding="utf-8",
-        )
+    @property
+    def stats(self) -> SamplerStats:
+        return SamplerStats("fake", 1, 0, 0.0, 0.0)
 
 
 class _FakeClient:
@@ -78,7 +124,7 @@ def _server_config() -> ServerConfig:
 
 
 def test_build_run_id_is_deterministic() -> None:
-    timestamp = datetime(2025, 1, 2, 3, 4, 5, tzinfo=UTC)
+    timestamp = datetime(2025, 1, 2, 3, 4, 5, tzinfo=timezone.utc)
     loadgen = LoadGenConfig(
         arrival_rate_rps=5.0,
         concurrency=2,
@@ -115,7 +161,7 @@ def test_run_load_respects_warmup_and_repeats(tmp_path: Path) -> None:
             loadgen,
             experiment,
             prompts,
-            now=datetime(2025, 1, 2, 3, 4, 5, tzinfo=UTC),
+            now=datetime(2025, 1, 2, 3, 4, 5, tzinfo=timezone.utc),
             rng=_DeterministicRng(),
             client_factory=lambda: _FakeClient(),
         )
@@ -160,7 +206,7 @@ def test_run_load_writes_telemetry_csv(tmp_path: Path, monkeypatch: pytest.Monke
             loadgen,
             experiment,
             prompts,
-            now=datetime(2025, 1, 2, 3, 4, 5, tzinfo=UTC),
+            now=datetime(2025, 1, 2, 3, 4, 5, tzinfo=timezone.utc),
             rng=_DeterministicRng(),
             client_factory=lambda: _FakeClient(),
         )
@@ -170,3 +216,383 @@ def test_run_load_writes_telemetry_csv(tmp_path: Path, monkeypatch: pytest.Monke
     assert telemetry_path.exists()
     lines = telemetry_path.read_text(encoding="utf-8").strip().splitlines()
     assert len(lines) == 2
+    assert summary.telemetry is not None and summary.telemetry.samples == 1
+    host_rows = _read_csv_rows(summary.trace_path.parent / "host_telemetry.csv")
+    assert [row["process"] for row in host_rows] == ["loadgen"]
+    assert host_rows[0]["timestamp"] == "2025-01-01T00:00:00+00:00"
+
+
+class _InFlightClient(_FakeClient):
+    def __init__(self) -> None:
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def generate(self, prompt: str, params=None):  # noqa: ANN001, ANN201
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(0.01)
+        self.in_flight -= 1
+        return await super().generate(prompt, params)
+
+
+def test_run_load_closed_loop_bounds_in_flight_by_users(tmp_path: Path) -> None:
+    loadgen = LoadGenConfig(
+        arrival_rate_rps=0.0,
+        concurrency=16,
+        duration_s=1,
+        warmup_s=0,
+        repeats=2,
+        prompt_source=tmp_path / "prompts.jsonl",
+        mix=LoadMixConfig(short=1.0, med=0.0, long=0.0),
+        mode="closed",
+        closed_loop=ClosedLoopConfig(
+            users=3,
+            think_time=ThinkTimeConfig(distribution="fixed", mean_s=0.05),
+            session_length=2,
+        ),
+    )
+    experiment = ExperimentConfig(name="exp", output_dir=tmp_path)
+    prompts = [PromptRecord(prompt_id="p-short", text="tiny", length_bucket="short")]
+    client = _InFlightClient()
+
+    summary = asyncio.run(
+        run_load(
+            _server_config(),
+            loadgen,
+            experiment,
+            prompts,
+            now=datetime(2025, 1, 2, 3, 4, 5, tzinfo=timezone.utc),
+            rng=_DeterministicRng(),
+            client_factory=lambda: client,
+        )
+    )
+
+    rows = read_jsonl(summary.trace_path)
+    assert client.max_in_flight == 3
+    # Each user waits ~60ms per request/think cycle, so the run stays far below open-loop volume.
+    assert 3 <= summary.sent <= 3 * 20
+    assert len(rows) == summary.sent
+    assert {row["repeat_idx"] for row in rows} == {0, 1}
+
+
+class _SlowClient(_InFlightClient):
+    async def generate(self, prompt: str, params=None):  # noqa: ANN001, ANN201
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(0.05)
+        self.in_flight -= 1
+        return await _FakeClient.generate(self, prompt, params)
+
+
+@pytest.mark.parametrize(
+    ("backlog", "unserved"),
+    [
+        (BacklogConfig(policy="drop_newest", max_pending=2), "dropped"),
+        (BacklogConfig(policy="drop_oldest", max_pending=2), "dropped"),
+        (BacklogConfig(policy="deadline", max_pending=100, deadline_ms=60.0), "expired"),
+    ],
+)
+def test_run_load_bounded_backlog_records_unserved_arrivals(
+    tmp_path: Path, backlog: BacklogConfig, unserved: str
+) -> None:
+    # ~100 rps offered against one slot serving 20 rps.
+    loadgen = LoadGenConfig(
+        arrival_rate_rps=100.0,
+        concurrency=1,
+        duration_s=1,
+        warmup_s=0,
+        repeats=1,
+        seed=3,
+        prompt_source=tmp_path / "prompts.jsonl",
+        mix=LoadMixConfig(short=1.0, med=0.0, long=0.0),
+        live=LiveStatsConfig(enabled=False, console=False),
+        clock_sync={"enabled": False},
+        backlog=backlog,
+    )
+    experiment = ExperimentConfig(name="exp", output_dir=tmp_path)
+    prompts = [PromptRecord(prompt_id="p-short", text="tiny", length_bucket="short")]
+    client = _SlowClient()
+
+    started = time.monotonic()
+    summary = asyncio.run(
+        run_load(
+            _server_config(),
+            loadgen,
+            experiment,
+            prompts,
+            now=datetime(2025, 1, 2, 3, 4, 5, tzinfo=timezone.utc),
+            client_factory=lambda: client,
+        )
+    )
+    elapsed = time.monotonic() - started
+
+    rows = read_jsonl(summary.trace_path)
+    outcomes = [row["outcome"] for row in rows]
+    assert client.max_in_flight == 1
+    # The backlog holds at most a few requests, so draining cannot run far past duration_s.
+    assert elapsed < 1.6
+    assert outcomes.count("completed") == summary.sent == summary.success
+    assert outcomes.count(unserved) == getattr(summary, unserved) > 0
+    assert summary.offered_rps > summary.admitted_rps >= summary.completed_rps > 0
+    skipped = [row for row in rows if row["outcome"] == unserved]
+    assert all(row["system"]["ts_send_ns"] is None for row in skipped)
+    assert all(row["output_text"] == "" for row in skipped)
+
+
+def test_run_load_replays_recorded_offsets(tmp_path: Path) -> None:
+    source = tmp_path / "recorded.jsonl"
+    write_jsonl(
+        source,
+        [
+            {"ts_start_ns": 10_000_000_000 + idx * 100_000_000, "prompt_id": "p-short"}
+            for idx in range(4)
+        ],
+    )
+    loadgen = LoadGenConfig(
+        arrival_rate_rps=1.0,
+        concurrency=4,
+        duration_s=2,
+        warmup_s=0,
+        repeats=1,
+        prompt_source=tmp_path / "prompts.jsonl",
+        mix=LoadMixConfig(short=1.0, med=0.0, long=0.0),
+        mode="replay",
+        replay=ReplayConfig(source=source, speed=2.0),
+    )
+    experiment = ExperimentConfig(name="exp", output_dir=tmp_path)
+    prompts = [PromptRecord(prompt_id="p-short", text="tiny", length_bucket="short")]
+
+    summary = asyncio.run(
+        run_load(
+            _server_config(),
+            loadgen,
+            experiment,
+            prompts,
+            now=datetime(2025, 1, 2, 3, 4, 5, tzinfo=timezone.utc),
+            rng=_DeterministicRng(),
+            client_factory=lambda: _FakeClient(),
+        )
+    )
+
+    rows = sorted(read_jsonl(summary.trace_path), key=lambda row: row["ts_start_ns"])
+    assert summary.sent == 4
+    starts = [row["ts_start_ns"] for row in rows]
+    gaps_ms = [
+        (later - earlier) / 1e6 for earlier, later in zip(starts[:-1], starts[1:], strict=True)
+    ]
+    assert all(40.0 <= gap <= 100.0 for gap in gaps_ms)
+    assert 0.0 <= summary.dispatch_lag_p50_ms <= summary.dispatch_lag_max_ms < 50.0
+
+
+def test_run_load_merges_tenant_schedules(tmp_path: Path) -> None:
+    loadgen = LoadGenConfig(
+        arrival_rate_rps=0.0,
+        concurrency=8,
+        duration_s=1,
+        warmup_s=0,
+        repeats=1,
+        prompt_source=tmp_path / "prompts.jsonl",
+        mix=LoadMixConfig(short=1.0, med=0.0, long=0.0),
+        tenants=[
+            TenantConfig(
+                name="chat",
+                arrival_rate_rps=40.0,
+                mix=LoadMixConfig(short=1.0, med=0.0, long=0.0),
+                slo_ms=500.0,
+            ),
+            TenantConfig(
+                name="batch",
+                arrival_rate_rps=10.0,
+                mix=LoadMixConfig(short=0.0, med=1.0, long=0.0),
+                max_new_tokens=64,
+            ),
+        ],
+        output_lengths={"default": OutputLengthConfig(distribution="fixed", mean_tokens=20)},
+    )
+    experiment = ExperimentConfig(name="exp", output_dir=tmp_path)
+    prompts = [
+        PromptRecord(prompt_id="p-short", text="tiny", length_bucket="short"),
+        PromptRecord(prompt_id="p-med", text="medium prompt", length_bucket="med"),
+    ]
+
+    summary = asyncio.run(
+        run_load(
+            _server_config(),
+            loadgen,
+            experiment,
+            prompts,
+            now=datetime(2025, 1, 2, 3, 4, 5, tzinfo=timezone.utc),
+            client_factory=lambda: _FakeClient(),
+        )
+    )
+
+    rows = read_jsonl(summary.trace_path)
+    by_tenant = {name: [row for row in rows if row["tenant"] == name] for name in ("chat", "batch")}
+    assert len(rows) == summary.sent
+    assert len(by_tenant["chat"]) > len(by_tenant["batch"]) > 0
+    assert {row["prompt_id"] for row in by_tenant["chat"]} == {"p-short"}
+    assert {row["prompt_id"] for row in by_tenant["batch"]} == {"p-med"}
+    assert {row["slo_ms"] for row in by_tenant["chat"]} == {500.0}
+    assert {row["params"]["max_new_tokens"] for row in by_tenant["batch"]} == {64}
+    assert {row["params"]["max_new_tokens"] for row in by_tenant["chat"]} == {20}
+
+
+class _FailingClient(_FakeClient):
+    async def generate(self, prompt: str, params=None):  # noqa: ANN001, ANN201
+        await asyncio.sleep(0.005)
+        raise RuntimeError("upstream unavailable")
+
+
+def test_run_load_aborts_early_when_error_rate_slo_is_violated(tmp_path: Path) -> None:
+    loadgen = LoadGenConfig(
+        arrival_rate_rps=50.0,
+        concurrency=4,
+        duration_s=30,
+        warmup_s=0,
+        repeats=1,
+        prompt_source=tmp_path / "prompts.jsonl",
+        mix=LoadMixConfig(short=1.0, med=0.0, long=0.0),
+        live=LiveStatsConfig(
+            interval_s=0.1,
+            console=False,
+            abort=AbortRuleConfig(error_rate=0.5, sustain_s=0.2, min_requests=1),
+        ),
+    )
+    experiment = ExperimentConfig(name="exp", output_dir=tmp_path)
+    prompts = [PromptRecord(prompt_id="p-short", text="tiny", length_bucket="short")]
+
+    started = time.monotonic()
+    summary = asyncio.run(
+        run_load(
+            _server_config(),
+            loadgen,
+            experiment,
+            prompts,
+            now=datetime(2025, 1, 2, 3, 4, 5, tzinfo=timezone.utc),
+            rng=_DeterministicRng(),
+            client_factory=lambda: _FailingClient(),
+        )
+    )
+
+    assert time.monotonic() - started < 5.0
+    assert summary.aborted
+    assert summary.abort_reason is not None and "error rate" in summary.abort_reason
+    progress = read_jsonl(summary.trace_path.parent / "progress.jsonl")
+    assert progress[-1]["event"] == "abort"
+
+
+class _HangingClient(_FakeClient):
+    """Fails every other request and leaves the rest in flight until cancelled."""
+
+    def __init__(self) -> None:
+        self.calls = 0
+
+    async def generate(self, prompt: str, params=None):  # noqa: ANN001, ANN201
+        self.calls += 1
+        if self.calls % 2:
+            raise RuntimeError("upstream unavailable")
+        await asyncio.sleep(60)
+        return await super().generate(prompt, params)
+
+
+@pytest.mark.parametrize(
+    "backlog",
+    [BacklogConfig(), BacklogConfig(policy="drop_newest", max_pending=8)],
+    ids=["unbounded", "bounded"],
+)
+def test_run_load_abort_cancels_in_flight_requests(tmp_path: Path, backlog: BacklogConfig) -> None:
+    loadgen = LoadGenConfig(
+        arrival_rate_rps=50.0,
+        concurrency=4,
+        duration_s=30,
+        warmup_s=0,
+        repeats=1,
+        prompt_source=tmp_path / "prompts.jsonl",
+        mix=LoadMixConfig(short=1.0, med=0.0, long=0.0),
+        backlog=backlog,
+        live=LiveStatsConfig(
+            interval_s=0.1,
+            console=False,
+            abort=AbortRuleConfig(error_rate=0.2, sustain_s=0.2, min_requests=1),
+        ),
+    )
+    experiment = ExperimentConfig(name="exp", output_dir=tmp_path)
+    prompts = [PromptRecord(prompt_id="p-short", text="tiny", length_bucket="short")]
+
+    async def run() -> None:
+        summary = await run_load(
+            _server_config(),
+            loadgen,
+            experiment,
+            prompts,
+            now=datetime(2025, 1, 2, 3, 4, 5, tzinfo=timezone.utc),
+            rng=_DeterministicRng(),
+            client_factory=lambda: _HangingClient(),
+        )
+        assert summary.aborted
+        # Only the test's own task is left: no request outlives the aborted run.
+        assert asyncio.all_tasks() == {asyncio.current_task()}
+
+    started = time.monotonic()
+    asyncio.run(run())
+    assert time.monotonic() - started < 10.0
+
+
+def test_run_load_soak_rotates_traces_and_checkpoints(tmp_path: Path) -> None:
+    loadgen = LoadGenConfig(
+        arrival_rate_rps=100.0,
+        concurrency=4,
+        duration_s=1,
+        warmup_s=0,
+        repeats=1,
+        prompt_source=tmp_path / "prompts.jsonl",
+        mix=LoadMixConfig(short=1.0, med=0.0, long=0.0),
+        trace=TraceSinkConfig(flush_interval_s=0.05),
+        live=LiveStatsConfig(console=False),
+        soak=SoakConfig(rotate_bytes=2_000, checkpoint_interval_s=0.2),
+    )
+    experiment = ExperimentConfig(name="exp", output_dir=tmp_path)
+    prompts = [PromptRecord(prompt_id="p-short", text="tiny", length_bucket="short")]
+
+    summary = asyncio.run(
+        run_load(
+            _server_config(),
+            loadgen,
+            experiment,
+            prompts,
+            now=datetime(2025, 1, 2, 3, 4, 5, tzinfo=timezone.utc),
+            rng=_DeterministicRng(),
+            client_factory=lambda: _FakeClient(),
+        )
+    )
+
+    run_dir = summary.trace_path.parent
+    segments = sorted(run_dir.glob("trace-*.jsonl"))
+    assert len(segments) > 1
+    assert sum(len(read_jsonl(path)) for path in segments) == summary.sent
+    checkpoint = json.loads((run_dir / "checkpoint.json").read_text(encoding="utf-8"))
+    assert checkpoint["complete"] is True
+    assert checkpoint["sent"] == summary.sent
+    assert checkpoint["latency_ms"]["count"] == summary.sent
+    assert len(checkpoint["trace_segments"]) == len(segments)
+    assert summary.p50_total_ms > 0.0
+
+
+def test_soak_parquet_segments_close_every_checkpoint(tmp_path: Path) -> None:
+    loadgen = LoadGenConfig(
+        arrival_rate_rps=1.0,
+        concurrency=1,
+        duration_s=1,
+        warmup_s=0,
+        repeats=1,
+        prompt_source=tmp_path / "prompts.jsonl",
+        mix=LoadMixConfig(short=1.0, med=0.0, long=0.0),
+        trace=TraceSinkConfig(format="both"),
+        soak=SoakConfig(rotate_s=3600.0, checkpoint_interval_s=60.0),
+    )
+
+    jsonl, parquet = _trace_sinks(tmp_path, loadgen)
+
+    assert isinstance(jsonl, RotatingTraceSink) and isinstance(parquet, RotatingTraceSink)
+    assert jsonl.path.name == "trace-00000.jsonl"
+    assert (jsonl.rotate_s, parquet.rotate_s) == (3600.0, 60.0)
@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+import json
+from collections.abc import Sequence
+from pathlib import Path
+
+from qosflow.common.config import LengthBucketConfig, ServerConfig
+from qosflow.loadgen.prompt_store import PromptStore
+from qosflow.loadgen.tokens import TokenCountCache, TokenCounter, open_loadgen_prompts
+
+
+class _WhitespaceCounter:
+    def __init__(self) -> None:
+        self.counted = 0
+
+    def __call__(self, texts: Sequence[str]) -> list[int]:
+        self.counted += len(texts)
+        return [len(text.split()) for text in texts]
+
+
+def _server_config() -> ServerConfig:
+    return ServerConfig(
+        host="127.0.0.1",
+        port=8000,
+        model="test-model",
+        dtype="float16",
+        max_new_tokens=12,
+        temperature=0.1,
+        top_p=0.9,
+        seed=42,
+        dynamic_batching=True,
+        max_num_seqs=8,
+        max_num_batched_tokens=1024,
+        scheduler_delay_ms=0,
+    )
+
+
+def _write_catalog(path: Path) -> None:
+    texts = ["one", "a b c d e", "x " * 30, "a b c d e"]
+    path.write_text(
+        "".join(
+            json.dumps({"prompt_id": f"p{idx}", "text": text}) + "\n"
+            for idx, text in enumerate(texts)
+        ),
+        encoding="utf-8",
+    )
+
+
+def test_token_counter_batches_dedupes_and_caches(tmp_path: Path) -> None:
+    count_fn = _WhitespaceCounter()
+    cache = TokenCountCache(tmp_path / "tokens.sqlite")
+    counter = TokenCounter(count_fn, "ws", cache=cache, batch_size=2, workers=2)
+
+    first = counter.count(["a b", "c", "a b", "d e f"])
+    second = counter.count(["d e f", "a b"])
+
+    assert first.tolist() == [2, 1, 2, 3]
+    assert second.tolist() == [3, 2]
+    assert count_fn.counted == 3
+    other_tokenizer = TokenCounter(count_fn, "other", cache=cache)
+    other_tokenizer.count(["a b"])
+    assert count_fn.counted == 4
+    cache.close()
+
+
+def test_open_loadgen_prompts_buckets_store_by_tokens(tmp_path: Path) -> None:
+    path = tmp_path / "prompts.jsonl"
+    _write_catalog(path)
+    counter = TokenCounter(_WhitespaceCounter(), "ws")
+    config = LengthBucketConfig(unit="tokens", short_max=1, med_max=5)
+
+    prompts = open_loadgen_prompts(path, config, _server_config(), counter=counter)
+
+    assert isinstance(prompts, PromptStore)
+    assert [prompt.length_bucket for prompt in prompts] == ["short", "med", "long", "med"]
+    assert [prompt.len_tokens for prompt in prompts] == [1, 5, 30, 5]
+    prompts.close()
+
+
+def test_reopened_store_loads_cached_token_counts(tmp_path: Path) -> None:
+    path = tmp_path / "prompts.jsonl"
+    _write_catalog(path)
+    count_fn = _WhitespaceCounter()
+    config = LengthBucketConfig(unit="tokens", short_max=1, med_max=5)
+
+    first = open_loadgen_prompts(
+        path, config, _server_config(), counter=TokenCounter(count_fn, "ws")
+    )
+    assert isinstance(first, PromptStore)
+    first.close()
+    counted = count_fn.counted
+    reopened = open_loadgen_prompts(
+        path, config, _server_config(), counter=TokenCounter(count_fn, "ws")
+    )
+    other = open_loadgen_prompts(
+        path, config, _server_config(), counter=TokenCounter(count_fn, "other")
+    )
+
+    assert count_fn.counted == counted + 3
+    assert [prompt.len_tokens for prompt in reopened] == [1, 5, 30, 5]
+    assert [prompt.len_tokens for prompt in other] == [1, 5, 30, 5]
+    assert isinstance(reopened, PromptStore) and isinstance(other, PromptStore)
+    reopened.close()
+    other.close()
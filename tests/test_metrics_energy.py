@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from qosflow.metrics.energy import EnergyMetricsAccumulator, compute_energy_metrics
+
+_S = 1_000_000_000
+
+
+def test_energy_is_split_by_concurrency_share() -> None:
+    # Constant 100 W for 4 s. Request A runs 0-2 s alone for the first second, B overlaps 1-3 s.
+    traces = pd.DataFrame({"ts_start_ns": [0, 1 * _S], "ts_end_ns": [2 * _S, 4 * _S]})
+    telemetry = pd.DataFrame({"ts_ns": [0, 4 * _S], "power_w_mean": [100.0, 100.0]})
+
+    metrics = compute_energy_metrics(traces, telemetry)
+
+    assert metrics["energy_j"] == pytest.approx(400.0)
+    assert metrics["energy_idle_j"] == pytest.approx(0.0)
+    # A: 100 J alone + 50 J shared; B: 50 J shared + 200 J alone.
+    assert metrics["joules_per_request"] == pytest.approx(200.0)
+    assert metrics["joules_per_request_p95"] == pytest.approx(float(np.quantile([150, 250], 0.95)))
+
+
+def test_energy_metrics_normalize_by_completed_output() -> None:
+    traces = pd.DataFrame(
+        {
+            "ts_start_ns": [0, 2 * _S, 4 * _S],
+            "ts_end_ns": [1 * _S, 3 * _S, 5 * _S],
+            "output_text": ["a b c d", "e f g h", None],
+            "output_len_chars": [7, 7, 0],
+            "system.error": [None, None, "timeout"],
+            "outcome": ["completed", "completed", "failed"],
+        }
+    )
+    # Power ramps linearly 0 -> 500 W over the 5 s window.
+    telemetry = pd.DataFrame({"ts_ns": [0, 5 * _S], "power_w_mean": [0.0, 500.0]})
+
+    metrics = compute_energy_metrics(traces, telemetry)
+
+    assert metrics["energy_j"] == pytest.approx(1250.0)
+    # Idle gaps 1-2 s and 3-4 s: 150 J + 350 J.
+    assert metrics["energy_idle_j"] == pytest.approx(500.0)
+    assert metrics["mean_power_w"] == pytest.approx(250.0)
+    # Completed requests get 50 J and 250 J; the failed one's 450 J is not normalized in.
+    assert metrics["joules_per_request"] == pytest.approx(150.0)
+    assert metrics["joules_per_output_char"] == pytest.approx(300.0 / 14)
+    assert metrics["joules_per_output_token"] == pytest.approx(300.0 / 8)
+    assert metrics["tokens_per_watt"] == pytest.approx(8 / 1250.0)
+
+
+def test_mean_power_covers_only_the_telemetry_window() -> None:
+    traces = pd.DataFrame({"ts_start_ns": [0], "ts_end_ns": [4 * _S], "output_text": ["x"]})
+    # Power is only sampled between 1 s and 3 s of the 4 s run.
+    telemetry = pd.DataFrame({"ts_ns": [1 * _S, 3 * _S], "power_w_mean": [100.0, 100.0]})
+
+    metrics = compute_energy_metrics(traces, telemetry)
+
+    assert metrics["energy_j"] == pytest.approx(200.0)
+    assert metrics["mean_power_w"] == pytest.approx(100.0)
+
+
+def test_energy_metrics_need_power_samples() -> None:
+    traces = pd.DataFrame({"ts_start_ns": [0], "ts_end_ns": [_S], "output_text": ["x"]})
+    no_power = pd.DataFrame({"ts_ns": [0, _S], "power_w_mean": [np.nan, np.nan]})
+
+    assert compute_energy_metrics(traces, no_power) == {}
+
+
+def test_chunked_energy_matches_one_shot() -> None:
+    rng = np.random.default_rng(0)
+    starts = np.sort(rng.integers(0, 9 * _S, size=200))
+    traces = pd.DataFrame(
+        {
+            "ts_start_ns": starts,
+            "ts_end_ns": starts + rng.integers(_S // 100, _S, size=200),
+            "output_len_chars": rng.integers(1, 50, size=200),
+            "system.error": np.where(rng.random(200) < 0.1, "boom", None),
+        }
+    )
+    telemetry = pd.DataFrame(
+        {"ts_ns": np.arange(0, 11) * _S, "power_w_mean": rng.uniform(100, 300, size=11)}
+    )
+    accumulator = EnergyMetricsAccumulator(telemetry, sample_size=None)
+    # Trace files are not sorted by start time; chunks interleave in time.
+    for part in np.array_split(rng.permutation(len(traces)), 7):
+        accumulator.update(traces.iloc[part])
+
+    chunked = accumulator.result()
+
+    assert chunked == pytest.approx(compute_energy_metrics(traces, telemetry))
@@ -1,10 +1,18 @@
 from __future__ import annotations
 
 import json
+from itertools import combinations
 from pathlib import Path
 
-from qosflow.metrics.latency import compute_latency_metrics
-from qosflow.metrics.stability import compute_stability_metrics
+import pytest
+
+from qosflow.metrics.latency import LatencyMetricsAccumulator, compute_latency_metrics
+from qosflow.metrics.stability import (
+    StabilityMetricsAccumulator,
+    _levenshtein_distance,
+    _partition,
+    compute_stability_metrics,
+)
 from qosflow.metrics.task import compute_task_metrics
 from scripts.run_eval import run_eval
 
@@ -38,6 +46,69 @@ def test_latency_metrics() -> None:
     assert metrics["throughput_rps"] == 100.0
 
 
+def test_latency_metrics_break_down_by_tenant() -> None:
+    import pandas as pd
+
+    rows = [
+        ("chat", 50.0, 100.0, None, 1),
+        ("chat", 150.0, 100.0, None, 1),
+        ("batch", 900.0, 5000.0, None, 2),
+        ("batch", 10.0, 5000.0, "boom", 2),
+    ]
+    df = pd.DataFrame(
+        [
+            {
+                "tenant": tenant,
+                "total_ms": total_ms,
+                "slo_ms": slo_ms,
+                "system.error": error,
+                "ts_start_ns": 0,
+                "ts_end_ns": end_s * 1_000_000_000,
+            }
+            for tenant, total_ms, slo_ms, error, end_s in rows
+        ]
+    )
+
+    metrics, _ = compute_latency_metrics(df)
+    assert metrics["count"] == 4
+    assert metrics["slo_attainment"] == 0.5
+    assert metrics["tenant.chat.count"] == 2
+    assert metrics["tenant.chat.slo_attainment"] == 0.5
+    assert metrics["tenant.chat.throughput_rps"] == 1.0
+    assert metrics["tenant.batch.error_rate"] == 0.5
+    assert metrics["tenant.batch.slo_attainment"] == 0.5
+
+
+def test_latency_metrics_separate_offered_admitted_and_completed() -> None:
+    import pandas as pd
+
+    outcomes = ["completed", "completed", "failed", "dropped", "expired"]
+    df = pd.DataFrame(
+        [
+            {
+                "total_ms": 5.0 if outcome in ("dropped", "expired") else 100.0,
+                "slo_ms": 200.0,
+                "system.error": "boom" if outcome == "failed" else None,
+                "outcome": outcome,
+                "ts_start_ns": 0,
+                "ts_end_ns": 1_000_000_000,
+            }
+            for outcome in outcomes
+        ]
+    )
+
+    metrics, _ = compute_latency_metrics(df)
+    assert metrics["count"] == 3
+    assert metrics["error_rate"] == 1 / 3
+    assert metrics["latency_ms_p50"] == 100.0
+    assert metrics["offered_rps"] == 5.0
+    assert metrics["admitted_rps"] == 3.0
+    assert metrics["completed_rps"] == 2.0
+    assert (metrics["dropped"], metrics["expired"]) == (1, 1)
+    # Unserved arrivals miss their SLO even though their recorded wait was short.
+    assert metrics["slo_attainment"] == 2 / 5
+
+
 def test_task_metrics() -> None:
     import pandas as pd
 
@@ -118,3 +189,168 @@ def test_run_eval_writes_outputs(tmp_path: Path) -> None:
     out_dir = tmp_path / "eval"
     assert (out_dir / "metrics.json").exists()
     assert (out_dir / "metrics.csv").exists()
+
+
+def _write_mixed_traces(root: Path) -> None:
+    outcomes = ["completed", "completed", "failed", "dropped", "completed", "expired"]
+    for run in range(2):
+        rows = []
+        for idx, outcome in enumerate(outcomes):
+            served = outcome in ("completed", "failed")
+            rows.append(
+                {
+                    "prompt_id": f"p{idx % 3}",
+                    "repeat_idx": run,
+                    "tenant": "chat" if idx % 2 else "batch",
+                    "slo_ms": 100.0,
+                    "ts_start_ns": (run * 10 + idx) * 1_000_000,
+                    "ts_end_ns": (run * 10 + idx + 2) * 1_000_000,
+                    "total_ms": float(20 * idx + run),
+                    "output_text": f"out {idx % 2} {run}" if served else "",
+                    "expected": "out 0 0",
+                    "outcome": outcome,
+                    "system": {"error": "boom" if outcome == "failed" else None},
+                }
+            )
+        run_dir = root / f"run_id=r{run}"
+        run_dir.mkdir(parents=True)
+        (run_dir / "trace.jsonl").write_text(
+            "\n".join(json.dumps(row) for row in rows) + "\n", encoding="utf-8"
+        )
+    # GPU samples every 2 ms over both runs, with utilization and power rising over time.
+    lines = ["timestamp,gpu_index,gpu_util,mem_used_mb,power_w,throttle_reasons"]
+    for tick in range(13):
+        stamp = f"1970-01-01T00:00:00.{2 * tick:03d}+00:00"
+        lines.append(f"{stamp},0,{tick * 8},1000,{100 + 10 * tick},{4 if tick > 6 else 0}")
+    (root / "run_id=r0" / "telemetry.csv").write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+
+def test_run_eval_metrics_do_not_depend_on_chunk_size_or_workers(tmp_path: Path) -> None:
+    _write_mixed_traces(tmp_path / "traces")
+    traces = str(tmp_path / "traces" / "run_id=*" / "trace.jsonl")
+
+    whole, _ = run_eval(traces, tmp_path / "whole")
+    chunked, _ = run_eval(traces, tmp_path / "chunked", chunk_rows=4, workers=2)
+
+    assert chunked["trace_rows"] == whole["trace_rows"] == 12
+    assert chunked.keys() == whole.keys()
+    for key, value in whole.items():
+        assert chunked[key] == pytest.approx(value), key
+    assert whole["tenant.chat.count"] > 0 and whole["stability_prompt_groups"] == 3
+    assert whole["throttled.count"] > 0 and whole["energy_j"] > 0
+
+
+def test_latency_accumulator_falls_back_to_bounded_sketch() -> None:
+    import numpy as np
+    import pandas as pd
+
+    values = np.random.default_rng(3).lognormal(mean=4.0, sigma=0.8, size=20_000)
+    accumulator = LatencyMetricsAccumulator(exact_limit=1_000)
+    for chunk in np.array_split(values, 20):
+        accumulator.update(pd.DataFrame({"total_ms": chunk}))
+    metrics, _ = accumulator.result()
+
+    assert metrics["count"] == len(values)
+    for q, key in ((0.5, "latency_ms_p50"), (0.99, "latency_ms_p99")):
+        assert metrics[key] == pytest.approx(float(np.quantile(values, q)), rel=0.02)
+
+
+def test_stability_counts_distinct_outputs_like_pairwise_comparison() -> None:
+    import pandas as pd
+
+    outputs = ["abc", "abc", "abd", "xyz", "abc", "abd"]
+    df = pd.DataFrame({"prompt_id": "p", "output_text": outputs})
+    accumulator = StabilityMetricsAccumulator()
+    accumulator.update(df.iloc[:2])
+    accumulator.update(df.iloc[2:])
+    metrics, _ = accumulator.result()
+
+    pairs = [
+        1.0 - _levenshtein_distance(a, b) / max(len(a), len(b)) for a, b in combinations(outputs, 2)
+    ]
+    assert metrics["stability_edit_similarity"] == sum(pairs) / len(pairs)
+    assert metrics["stability_exact_match_rate"] == 3 / 6
+
+
+def test_stability_is_bit_identical_to_full_pairwise_mean() -> None:
+    import random
+
+    import pandas as pd
+
+    rng = random.Random(11)
+    forms = ["".join(rng.choice("abcde ") for _ in range(rng.randint(0, 30))) for _ in range(5)]
+    rows = [
+        {"prompt_id": f"p{prompt}", "output_text": rng.choice(forms[: 1 + prompt % 5])}
+        for prompt in range(40)
+        for _ in range(rng.randint(1, 25))
+    ]
+    rng.shuffle(rows)
+    df = pd.DataFrame(rows)
+
+    metrics, per_prompt = compute_stability_metrics(df)
+
+    expected: dict[str, float] = {}
+    for prompt_id, group in df.groupby("prompt_id"):
+        outputs = list(group["output_text"])
+        similarities = [
+            1.0 - _reference_levenshtein(a, b) / max(len(a), len(b), 1)
+            for a, b in combinations(outputs, 2)
+        ]
+        expected[prompt_id] = sum(similarities) / len(similarities) if similarities else 1.0
+    observed = dict(zip(per_prompt["prompt_id"], per_prompt["edit_similarity"], strict=True))
+    assert observed == expected
+    assert metrics["stability_edit_similarity"] == pd.Series(list(expected.values())).mean()
+
+
+def _reference_levenshtein(a: str, b: str) -> int:
+    prev = list(range(len(b) + 1))
+    for i, ca in enumerate(a, start=1):
+        curr = [i]
+        for j, cb in enumerate(b, start=1):
+            curr.append(min(curr[j - 1] + 1, prev[j] + 1, prev[j - 1] + (ca != cb)))
+        prev = curr
+    return prev[-1]
+
+
+def test_bit_parallel_levenshtein_matches_dynamic_programming() -> None:
+    import random
+
+    rng = random.Random(7)
+    pairs = [("", "abc"), ("kitten", "sitting"), ("flaw", "lawn"), ("ab" * 70, "ba" * 70)]
+    for _ in range(300):
+        alphabet = rng.choice(["ab", "abcd ", "xyzé😀"])
+        a = "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 150)))
+        b = "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 150)))
+        pairs.append((a, b))
+        # Shared prefixes and suffixes exercise the trimming path.
+        pairs.append((a + b, a + b[::-1]))
+
+    for a, b in pairs:
+        assert _levenshtein_distance(a, b) == _reference_levenshtein(a, b), (a, b)
+
+
+def test_parallel_stability_is_identical_to_serial() -> None:
+    import random
+
+    import pandas as pd
+
+    rng = random.Random(11)
+    rows = [
+        {"prompt_id": f"p{prompt:02d}", "output_text": rng.choice(["alpha beta", "alpha bet", "x"])}
+        for prompt in range(40)
+        for _ in range(rng.randint(1, 6))
+    ]
+    df = pd.DataFrame(rows).sample(frac=1.0, random_state=3)
+
+    serial_metrics, serial = compute_stability_metrics(df)
+    parallel_metrics, parallel = compute_stability_metrics(df, workers=3)
+
+    assert parallel_metrics == serial_metrics
+    pd.testing.assert_frame_equal(parallel, serial)
+
+
+def test_partition_balances_cost_in_contiguous_ranges() -> None:
+    assert _partition([1] * 8, 4) == [(0, 2), (2, 4), (4, 6), (6, 8)]
+    # A chunk closes once it reaches its share of the total cost.
+    assert _partition([1, 100, 1, 1], 3) == [(0, 2), (2, 4)]
+    assert _partition([5], 4) == [(0, 1)]
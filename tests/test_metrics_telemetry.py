@@ -0,0 +1,111 @@
+from __future__ import annotations
+
+import json
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from qosflow.metrics.telemetry import compute_telemetry_metrics, join_telemetry, load_telemetry
+from scripts.run_eval import run_eval
+
+_BASE_NS = 1_735_689_600_000_000_000  # 2025-01-01T00:00:00Z
+
+
+def _write_telemetry(path: Path, ticks: list[tuple[float, list[tuple[float, float, int]]]]) -> None:
+    """ticks: (seconds after base, [(gpu_util, power_w, throttle_reasons) per device])."""
+    lines = ["timestamp,gpu_index,gpu_util,mem_used_mb,power_w,throttle_reasons"]
+    for offset_s, devices in ticks:
+        stamp = pd.Timestamp(_BASE_NS + int(offset_s * 1e9), tz="UTC").isoformat()
+        for index, (util, power, reasons) in enumerate(devices):
+            lines.append(f"{stamp},{index},{util},1000,{power},{reasons}")
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+
+def _request(start_s: float, end_s: float, total_ms: float) -> dict[str, float]:
+    return {
+        "ts_start_ns": _BASE_NS + int(start_s * 1e9),
+        "ts_end_ns": _BASE_NS + int(end_s * 1e9),
+        "total_ms": total_ms,
+    }
+
+
+def test_load_telemetry_collapses_devices_per_tick(tmp_path: Path) -> None:
+    path = tmp_path / "telemetry.csv"
+    _write_telemetry(
+        path, [(0.0, [(20, 100, 1), (40, 150, 4)]), (0.5, [(60, 100, 0), (80, 100, 0)])]
+    )
+
+    ticks = load_telemetry([path])
+
+    assert list(ticks["ts_ns"]) == [_BASE_NS, _BASE_NS + 500_000_000]
+    assert list(ticks["gpu_util_mean"]) == [30.0, 70.0]
+    assert list(ticks["mem_used_mb_mean"]) == [2000.0, 2000.0]
+    assert list(ticks["power_w_mean"]) == [250.0, 200.0]
+    assert list(ticks["throttled"]) == [1.0, 0.0]
+
+
+def test_join_averages_samples_in_lifetime_and_falls_back_as_of(tmp_path: Path) -> None:
+    path = tmp_path / "telemetry.csv"
+    _write_telemetry(path, [(offset, [(offset * 100, 100, 0)]) for offset in (0.0, 0.5, 1.0)])
+    traces = pd.DataFrame(
+        [
+            _request(0.4, 1.1, 700.0),  # spans the 0.5 and 1.0 samples
+            _request(0.6, 0.7, 100.0),  # no sample inside: as-of the 0.5 sample
+            _request(5.0, 5.1, 100.0),  # last sample is too old to stand in
+        ]
+    )
+
+    joined = join_telemetry(traces, load_telemetry([path]))
+
+    assert list(joined["telemetry_samples"]) == [2, 0, 0]
+    assert joined["gpu_util_mean"].iloc[0] == 75.0
+    assert joined["gpu_util_mean"].iloc[1] == 50.0
+    assert pd.isna(joined["gpu_util_mean"].iloc[2])
+
+
+def test_latency_is_conditioned_on_util_bands_and_throttling(tmp_path: Path) -> None:
+    path = tmp_path / "telemetry.csv"
+    # Low utilization for the first second, saturated and throttled for the next.
+    _write_telemetry(
+        path,
+        [(step / 10, [(10, 100, 0)]) for step in range(10)]
+        + [(1 + step / 10, [(95, 300, 4)]) for step in range(10)],
+    )
+    traces = pd.DataFrame(
+        [_request(step / 10 + 0.01, step / 10 + 0.05, 20.0) for step in range(10)]
+        + [_request(1 + step / 10 + 0.01, 1 + step / 10 + 0.05, 400.0) for step in range(10)]
+    )
+
+    metrics, table = compute_telemetry_metrics(traces, load_telemetry([path]))
+
+    assert metrics["telemetry_coverage"] == 1.0
+    assert metrics["gpu_util_band.0-25.count"] == 10
+    assert metrics["gpu_util_band.0-25.latency_ms_p99"] == 20.0
+    assert metrics["gpu_util_band.90-100.latency_ms_p99"] == 400.0
+    assert metrics["gpu_util_band.50-75.latency_ms_p99"] is None
+    assert (metrics["throttled.count"], metrics["unthrottled.count"]) == (10, 10)
+    assert metrics["latency_corr.gpu_util"] == pytest.approx(1.0)
+    assert list(table["gpu_util_band"]) == ["0-25", "25-50", "50-75", "75-90", "90-100"]
+
+
+def test_run_eval_joins_telemetry_next_to_traces(tmp_path: Path) -> None:
+    run_dir = tmp_path / "traces" / "run_id=r1"
+    run_dir.mkdir(parents=True)
+    _write_telemetry(run_dir / "telemetry.csv", [(step / 10, [(95, 300, 0)]) for step in range(5)])
+    rows = [
+        {**_request(step / 10, step / 10 + 0.05, 50.0), "system": {"error": None}}
+        for step in range(5)
+    ]
+    (run_dir / "trace.jsonl").write_text(
+        "\n".join(json.dumps(row) for row in rows) + "\n", encoding="utf-8"
+    )
+
+    metrics, _ = run_eval(str(run_dir / "trace*.jsonl"), tmp_path)
+
+    assert metrics["gpu_util_band.90-100.count"] == 5
+    # 300 W until the last sample at 0.4 s; requests are in flight for 0.2 s of that.
+    assert metrics["energy_j"] == pytest.approx(120.0)
+    assert metrics["energy_idle_j"] == pytest.approx(60.0)
+    assert metrics["joules_per_request"] == pytest.approx(12.0)
+    assert (tmp_path / "eval" / "latency_by_gpu_util.csv").exists()
@@ -54,3 +54,71 @@ def test_generate_response_contains_batching_mode(monkeypatch) -> None:  # noqa:
     assert res.json()["batching_mode"] == "off"
     assert isinstance(res.json()["ts_recv_ns"], int)
     assert isinstance(res.json()["ts_done_ns"], int)
+
+
+def test_time_endpoint_reports_receive_and_send(monkeypatch) -> None:  # noqa: ANN001
+    import qosflow.server.app as app_module
+
+    monkeypatch.setattr(app_module, "VLLMBackend", _FakeBackend)
+    app = create_app(_cfg(dynamic_batching=True))
+
+    with TestClient(app) as client:
+        res = client.get("/time")
+
+    assert res.status_code == 200
+    body = res.json()
+    assert 0 < body["ts_recv_ns"] <= body["ts_send_ns"]
+
+
+def test_host_telemetry_endpoint_reports_server_process(monkeypatch) -> None:  # noqa: ANN001
+    import os
+
+    import qosflow.server.app as app_module
+
+    monkeypatch.setattr(app_module, "VLLMBackend", _FakeBackend)
+    app = create_app(_cfg(dynamic_batching=True))
+
+    with TestClient(app) as client:
+        first = client.get("/telemetry/host").json()
+        second = client.get("/telemetry/host").json()
+
+    assert first["process"] == "server"
+    assert first["pid"] == os.getpid()
+    assert first["cpu_pct"] is None
+    assert second["cpu_pct"] is not None
+    assert second["rss_mb"] > 0
+
+
+def test_engine_telemetry_endpoint_reports_fake_engine(monkeypatch) -> None:  # noqa: ANN001
+    import qosflow.server.app as app_module
+    from qosflow.common.engine_telemetry import EngineStats, FakeEngineStats
+
+    class _EngineBackend(_FakeBackend):
+        engine_stats = FakeEngineStats(
+            [
+                EngineStats(
+                    num_running=2, num_waiting=5, num_preempted_total=1, gpu_kv_cache_usage=0.75
+                )
+            ]
+        )
+
+    monkeypatch.setattr(app_module, "VLLMBackend", _EngineBackend)
+    app = create_app(_cfg(dynamic_batching=True))
+
+    with TestClient(app) as client:
+        body = client.get("/telemetry/engine").json()
+
+    assert body["num_running"] == 2
+    assert body["num_waiting"] == 5
+    assert body["num_preempted_total"] == 1
+    assert body["gpu_kv_cache_usage"] == 0.75
+    assert body["cpu_kv_cache_usage"] is None
+
+
+def test_engine_telemetry_endpoint_is_empty_without_engine_stats(monkeypatch) -> None:  # noqa: ANN001
+    import qosflow.server.app as app_module
+
+    monkeypatch.setattr(app_module, "VLLMBackend", _FakeBackend)
+
+    with TestClient(create_app(_cfg(dynamic_batching=True))) as client:
+        assert client.get("/telemetry/engine").json() == {}
@@ -24,3 +24,23 @@ def test_summarize_telemetry_outputs_expected_stats(tmp_path: Path) -> None:
     assert summary["mean_mem_used_mb"] == 1100.0
     assert summary["max_mem_used_mb"] == 1200.0
     assert json.loads(output.read_text(encoding="utf-8"))["max_gpu_util"] == 40.0
+
+
+def test_summarize_telemetry_breaks_down_long_format_by_device(tmp_path: Path) -> None:
+    telemetry = tmp_path / "telemetry.csv"
+    telemetry.write_text(
+        "timestamp,gpu_index,gpu_util,mem_used_mb,sm_clock_mhz,throttle_reasons\n"
+        "2025-01-01T00:00:00+00:00,0,20,1000,1980,1\n"
+        "2025-01-01T00:00:00+00:00,1,60,1000,1410,4\n"
+        "2025-01-01T00:00:01+00:00,0,40,1200,1980,0\n"
+        "2025-01-01T00:00:01+00:00,1,80,1200,1410,0\n",
+        encoding="utf-8",
+    )
+
+    summary = summarize_telemetry(telemetry, tmp_path / "summary.json")
+
+    assert summary["gpus"] == 2
+    assert summary["gpu0.mean_gpu_util"] == 30.0
+    assert summary["gpu1.mean_sm_clock_mhz"] == 1410.0
+    assert summary["gpu0.throttled_fraction"] == 0.0
+    assert summary["gpu1.throttled_fraction"] == 0.5
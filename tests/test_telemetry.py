@@ -0,0 +1,172 @@
+from __future__ import annotations
+
+import asyncio
+import csv
+import sys
+import time
+import types
+from pathlib import Path
+
+import pytest
+
+from qosflow.common.telemetry import TELEMETRY_COLUMNS, NVMLSampler, RotatingCsvWriter
+
+
+def _fake_pynvml(delay_s: float = 0.0, devices: int = 1) -> types.ModuleType:
+    module = types.ModuleType("pynvml")
+    module.NVML_TEMPERATURE_GPU = 0  # type: ignore[attr-defined]
+    module.NVML_CLOCK_SM, module.NVML_CLOCK_MEM = 1, 2  # type: ignore[attr-defined]
+    module.NVML_PCIE_UTIL_TX_BYTES, module.NVML_PCIE_UTIL_RX_BYTES = 0, 1  # type: ignore[attr-defined]
+    module.nvmlInit = lambda: None  # type: ignore[attr-defined]
+    module.nvmlShutdown = lambda: None  # type: ignore[attr-defined]
+    module.nvmlDeviceGetCount = lambda: devices  # type: ignore[attr-defined]
+    module.nvmlDeviceGetHandleByIndex = lambda index: index  # type: ignore[attr-defined]
+
+    def utilization(handle: int) -> types.SimpleNamespace:
+        time.sleep(delay_s)
+        return types.SimpleNamespace(gpu=75 + handle, memory=40)
+
+    def clock(handle: int, kind: int) -> int:
+        return 1980 if kind == module.NVML_CLOCK_SM else 2619  # type: ignore[attr-defined]
+
+    def pcie(handle: int, counter: int) -> int:
+        if handle == 1:
+            raise RuntimeError("NVML_ERROR_NOT_SUPPORTED")
+        return 250_000 if counter == module.NVML_PCIE_UTIL_TX_BYTES else 50_000  # type: ignore[attr-defined]
+
+    module.nvmlDeviceGetUtilizationRates = utilization  # type: ignore[attr-defined]
+    module.nvmlDeviceGetMemoryInfo = lambda _handle: types.SimpleNamespace(  # type: ignore[attr-defined]
+        used=512 * 1024 * 1024, total=1024 * 1024 * 1024
+    )
+    module.nvmlDeviceGetTemperature = lambda _handle, _sensor: 65  # type: ignore[attr-defined]
+    module.nvmlDeviceGetPowerUsage = lambda _handle: 150_000  # type: ignore[attr-defined]
+    module.nvmlDeviceGetClockInfo = clock  # type: ignore[attr-defined]
+    module.nvmlDeviceGetCurrentClocksThrottleReasons = lambda _handle: 0x4  # type: ignore[attr-defined]
+    module.nvmlDeviceGetPcieThroughput = pcie  # type: ignore[attr-defined]
+    module.nvmlDeviceGetEncoderUtilization = lambda _handle: [3, 167_000]  # type: ignore[attr-defined]
+    module.nvmlDeviceGetDecoderUtilization = lambda _handle: [0, 167_000]  # type: ignore[attr-defined]
+    return module
+
+
+def _read_rows(path: Path) -> list[dict[str, str]]:
+    with path.open(encoding="utf-8", newline="") as handle:
+        return list(csv.DictReader(handle))
+
+
+async def _sample_for(sampler: NVMLSampler, seconds: float) -> None:
+    sampler.start()
+    # A busy event loop must not hold the sampler back.
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        time.sleep(0.01)
+        await asyncio.sleep(0)
+    await sampler.stop()
+
+
+def test_pynvml_samples_stream_to_csv_from_thread(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setitem(sys.modules, "pynvml", _fake_pynvml())
+    path = tmp_path / "telemetry.csv"
+    sampler = NVMLSampler(0.02, stream=RotatingCsvWriter(lambda _segment: path, TELEMETRY_COLUMNS))
+
+    asyncio.run(_sample_for(sampler, 0.2))
+
+    rows = _read_rows(path)
+    assert sampler.stats.backend == "pynvml"
+    assert len(rows) == sampler.stats.samples >= 5
+    assert rows[0]["gpu_index"] == "0"
+    assert rows[0]["gpu_util"] == "75.0"
+    assert rows[0]["mem_used_mb"] == "512.0"
+    assert rows[0]["power_w"] == "150.0"
+    assert sampler.samples == []
+
+
+def test_pynvml_samples_every_device_with_extended_counters(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    monkeypatch.setitem(sys.modules, "pynvml", _fake_pynvml(devices=2))
+    sampler = NVMLSampler(0.02)
+
+    asyncio.run(_sample_for(sampler, 0.1))
+
+    rows = sampler.samples
+    assert len(rows) == 2 * sampler.stats.samples
+    first, second = rows[0], rows[1]
+    assert (first["gpu_index"], second["gpu_index"]) == (0, 1)
+    assert first["timestamp"] == second["timestamp"]
+    assert (first["gpu_util"], second["gpu_util"]) == (75.0, 76.0)
+    assert first["mem_util"] == 40.0
+    assert (first["sm_clock_mhz"], first["mem_clock_mhz"]) == (1980.0, 2619.0)
+    assert first["throttle_reasons"] == 0x4
+    assert (first["pcie_tx_mbps"], first["pcie_rx_mbps"]) == (250.0, 50.0)
+    assert (first["enc_util"], first["dec_util"]) == (3.0, 0.0)
+    # An unsupported counter on one board leaves a gap instead of stopping the sampler.
+    assert second["pcie_tx_mbps"] is None
+    assert list(first) == TELEMETRY_COLUMNS
+
+
+def test_gpu_index_restricts_sampling_to_one_device(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setitem(sys.modules, "pynvml", _fake_pynvml(devices=2))
+    sampler = NVMLSampler(0.02, gpu_index=1)
+
+    asyncio.run(_sample_for(sampler, 0.05))
+
+    assert {row["gpu_index"] for row in sampler.samples} == {1}
+
+
+def test_slow_samples_are_counted_as_overruns(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setitem(sys.modules, "pynvml", _fake_pynvml(delay_s=0.05))
+    sampler = NVMLSampler(0.02)
+
+    asyncio.run(_sample_for(sampler, 0.2))
+
+    assert sampler.stats.samples >= 2
+    assert sampler.stats.overruns >= sampler.stats.samples - 1
+    # Skipped ticks are not replayed in a burst, so each sample starts on schedule.
+    assert sampler.stats.lag_ms_max < 20.0
+
+
+def test_nvidia_smi_loop_is_parsed_incrementally(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setitem(sys.modules, "pynvml", None)
+    script = tmp_path / "nvidia-smi"
+    script.write_text(
+        f"#!{sys.executable}\n"
+        "import sys, time\n"
+        "args = sys.argv[1:]\n"
+        "assert '--loop-ms=20' in args and not any(a.startswith('--id') for a in args), args\n"
+        "for idx in range(1000):\n"
+        "    for gpu in (0, 1):\n"
+        "        print(f'{gpu}, {idx % 100}, 30, 1000, 2000, [Not Supported], 70, 1410, 1215, '\n"
+        "              '0x0000000000000001', flush=True)\n"
+        "    time.sleep(0.02)\n",
+        encoding="utf-8",
+    )
+    script.chmod(0o755)
+    sampler = NVMLSampler(0.02, nvidia_smi=str(script))
+
+    asyncio.run(_sample_for(sampler, 0.3))
+
+    samples = sampler.samples
+    assert sampler.stats.backend == "nvidia-smi"
+    assert sampler.stats.samples >= 3
+    assert len(samples) >= 2 * sampler.stats.samples - 1
+    assert [sample["gpu_index"] for sample in samples[:4]] == [0, 1, 0, 1]
+    assert samples[0]["timestamp"] == samples[1]["timestamp"] != samples[2]["timestamp"]
+    assert samples[0]["gpu_util"] == 0.0
+    assert samples[0]["power_w"] is None
+    assert samples[0]["sm_clock_mhz"] == 1410.0
+    assert samples[0]["throttle_reasons"] == 1
+    assert samples[0]["pcie_tx_mbps"] is None
+    assert all(sample["sample_lag_ms"] is not None for sample in samples)
+
+
+def test_missing_nvidia_smi_yields_no_samples(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setitem(sys.modules, "pynvml", None)
+    sampler = NVMLSampler(0.02, nvidia_smi="/nonexistent/nvidia-smi")
+
+    asyncio.run(_sample_for(sampler, 0.05))
+
+    assert sampler.stats.samples == 0
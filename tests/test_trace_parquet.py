@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+import json
+from pathlib import Path
+
+import pytest
+
+from qosflow.common.io import write_jsonl
+from qosflow.common.trace_parquet import (
+    TRACE_COLUMNS,
+    ParquetTraceSink,
+    convert_jsonl_to_parquet,
+    flatten_trace_row,
+    read_parquet_traces,
+)
+from qosflow.common.trace_writer import trace_file_path
+from scripts.run_eval import run_eval
+
+pytest.importorskip("pyarrow")
+
+
+def _trace_row(idx: int, output_text: str) -> dict[str, object]:
+    return {
+        "version": "v1",
+        "request_id": f"req-{idx}",
+        "run_id": "run-1",
+        "prompt_id": "p1",
+        "repeat_idx": idx,
+        "ts_start_ns": idx * 1_000_000,
+        "ts_end_ns": (idx + 1) * 1_000_000,
+        "total_ms": 1.0 + idx,
+        "params": {"temperature": 0.0, "top_p": 1.0, "seed": 7, "max_new_tokens": 8},
+        "server": {"model": "m", "dtype": "float16", "batching_knobs": {"max_num_seqs": 4}},
+        "system": {"http_status": 200, "error": None},
+        "prompt_hash": "abc",
+        "output_hash": "def",
+        "prompt_len_chars": 3,
+        "output_len_chars": len(output_text),
+        "output_text": output_text,
+    }
+
+
+def test_flatten_trace_row_matches_normalized_column_names() -> None:
+    flat = flatten_trace_row(_trace_row(0, "ok"))
+
+    assert flat["system.http_status"] == 200
+    assert flat["params.max_new_tokens"] == 8
+    assert json.loads(flat["server.batching_knobs"]) == {"max_num_seqs": 4}
+    assert set(flat).issubset(TRACE_COLUMNS)
+
+
+def test_parquet_sink_writes_row_groups_and_projects_columns(tmp_path: Path) -> None:
+    import pyarrow.parquet as pq
+
+    path = tmp_path / "trace.parquet"
+    sink = ParquetTraceSink(path, row_group_size=2)
+    sink.open()
+    sink.write([_trace_row(idx, "out") for idx in range(5)])
+    sink.close()
+
+    assert pq.ParquetFile(path).num_row_groups == 3
+    frame = read_parquet_traces(path, columns=["total_ms", "system.error", "missing"])
+    assert list(frame.columns) == ["total_ms", "system.error"]
+    assert frame["total_ms"].tolist() == [1.0, 2.0, 3.0, 4.0, 5.0]
+
+
+def test_converted_parquet_evaluates_like_jsonl(tmp_path: Path) -> None:
+    jsonl_dir = tmp_path / "jsonl"
+    rows = [_trace_row(0, "alpha"), _trace_row(1, "alpha"), _trace_row(2, "alpha beta")]
+    rows[1]["system"] = {"http_status": 500, "error": "boom"}
+    write_jsonl(jsonl_dir / "trace.jsonl", rows)
+
+    parquet_path = convert_jsonl_to_parquet(jsonl_dir / "trace.jsonl", row_group_size=2)
+
+    jsonl_metrics, _ = run_eval(str(jsonl_dir / "trace.jsonl"), tmp_path / "out_jsonl")
+    # Small chunks exercise batched Parquet reads against one-shot JSONL reads.
+    parquet_metrics, _ = run_eval(str(parquet_path), tmp_path / "out_parquet", chunk_rows=2)
+    assert parquet_metrics == jsonl_metrics
+    assert parquet_metrics["error_rate"] == pytest.approx(1 / 3)
+
+
+def test_rotated_segments_convert_to_one_parquet_file_each(tmp_path: Path) -> None:
+    for segment in range(2):
+        rows = [_trace_row(3 * segment + idx, "out") for idx in range(3)]
+        write_jsonl(trace_file_path(tmp_path, "gzip", segment=segment), rows)
+
+    outputs = [
+        convert_jsonl_to_parquet(trace_file_path(tmp_path, "gzip", segment=segment))
+        for segment in range(2)
+    ]
+
+    assert [path.name for path in outputs] == ["trace-00000.parquet", "trace-00001.parquet"]
+    frames = [read_parquet_traces(path, columns=["request_id"]) for path in outputs]
+    assert [row for frame in frames for row in frame["request_id"]] == [
+        f"req-{idx}" for idx in range(6)
+    ]
@@ -0,0 +1,76 @@
+from __future__ import annotations
+
+import asyncio
+from pathlib import Path
+
+from qosflow.common.io import read_jsonl
+from qosflow.common.trace_writer import (
+    JsonlTraceSink,
+    RotatingTraceSink,
+    TraceWriter,
+    trace_file_path,
+)
+
+
+def _write_rows(writer: TraceWriter, count: int):  # noqa: ANN202
+    async def run():  # noqa: ANN202
+        writer.start()
+        for idx in range(count):
+            await writer.put({"idx": idx, "text": f"row-{idx}"})
+        return await writer.close()
+
+    return asyncio.run(run())
+
+
+def test_trace_writer_drains_all_rows_in_order(tmp_path: Path) -> None:
+    path = trace_file_path(tmp_path)
+    writer = TraceWriter(JsonlTraceSink(path), queue_size=4, batch_size=3, flush_interval_s=0.01)
+
+    stats = _write_rows(writer, 50)
+
+    rows = read_jsonl(path)
+    assert [row["idx"] for row in rows] == list(range(50))
+    assert stats.rows_written == 50
+    assert stats.flushes >= 1
+    assert 1 <= stats.backlog_max <= 4
+    assert stats.flush_ms_max >= stats.flush_ms_mean >= 0.0
+
+
+def test_trace_writer_gzip_round_trip(tmp_path: Path) -> None:
+    path = trace_file_path(tmp_path, "gzip")
+    assert path.name == "trace.jsonl.gz"
+
+    _write_rows(TraceWriter(JsonlTraceSink(path, compression="gzip")), 10)
+
+    assert path.read_bytes()[:2] == b"\x1f\x8b"
+    assert [row["text"] for row in read_jsonl(path)] == [f"row-{idx}" for idx in range(10)]
+
+
+def test_rotating_sink_splits_segments_by_size(tmp_path: Path) -> None:
+    sink = RotatingTraceSink(
+        lambda segment: JsonlTraceSink(trace_file_path(tmp_path, "none", segment)),
+        rotate_bytes=200,
+    )
+
+    _write_rows(TraceWriter(sink, batch_size=4, flush_interval_s=0.0), 40)
+
+    assert len(sink.paths) > 1
+    assert sink.path.name == "trace-00000.jsonl"
+    rows = [row for path in sink.paths for row in read_jsonl(path)]
+    assert [row["idx"] for row in rows] == list(range(40))
+
+
+def test_trace_writer_encodes_deferred_batches_on_writer_thread(tmp_path: Path) -> None:
+    path = trace_file_path(tmp_path)
+    writer = TraceWriter(JsonlTraceSink(path), batch_size=4, flush_interval_s=0.01)
+
+    async def run():  # noqa: ANN202
+        writer.start()
+        await writer.put({"idx": 0})
+        await writer.put_deferred(lambda: [{"idx": idx} for idx in range(1, 6)])
+        return await writer.close()
+
+    stats = asyncio.run(run())
+
+    assert [row["idx"] for row in read_jsonl(path)] == list(range(6))
+    assert stats.rows_written == 6
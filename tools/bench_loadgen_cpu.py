@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""Loadgen CPU cost per request: the old per-request trace path vs the buffered one.
+
+Usage: python tools/bench_loadgen_cpu.py [--requests N] [--prompt-chars N]
+
+`legacy` repeats the work `fire_request` used to do for every request (params dump, JSON
+request body, prompt hash, pydantic `TraceRecord` build and dump). `hot path` is what the event
+loop does now (cached body, one `ResultBuffer.append`); `off loop` is the deferred `trace_rows`
+serialization that now runs on the trace writer thread. `run_load` drives the real runner
+against an instant in-process client and reports process CPU per request.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import tempfile
+import time
+from functools import lru_cache
+from pathlib import Path
+from typing import Any
+from uuid import uuid4
+
+from qosflow.common.client import encode_generate_body
+from qosflow.common.config import (
+    ExperimentConfig,
+    LiveStatsConfig,
+    LoadGenConfig,
+    LoadMixConfig,
+    ServerConfig,
+)
+from qosflow.common.hashing import sha256_normalized_text
+from qosflow.common.schema import (
+    PromptRecord,
+    TraceParams,
+    TraceRecord,
+    TraceServerSnapshot,
+    TraceSystem,
+)
+from qosflow.loadgen.results import ResultBuffer, TraceContext, trace_rows
+from qosflow.loadgen.runner import run_load
+
+TIMINGS = {"ts_recv_ns": 1_000_000, "ts_done_ns": 2_000_000, "prefill_ms": 1.0, "decode_ms": 2.0}
+
+
+def _server_config() -> ServerConfig:
+    return ServerConfig(
+        host="127.0.0.1",
+        port=8000,
+        model="bench",
+        dtype="float16",
+        max_new_tokens=64,
+        temperature=0.0,
+        top_p=1.0,
+        seed=0,
+        dynamic_batching=True,
+        max_num_seqs=64,
+        max_num_batched_tokens=8192,
+        scheduler_delay_ms=0,
+    )
+
+
+def _legacy_request(prompt: PromptRecord, params: TraceParams, server: TraceServerSnapshot) -> Any:
+    body = json.dumps({"prompt": prompt.text, "params": params.model_dump(mode="json")})
+    ts = time.time_ns()
+    record = TraceRecord(
+        request_id=str(uuid4()),
+        run_id="bench",
+        prompt_id=prompt.prompt_id,
+        repeat_idx=0,
+        ts_start_ns=ts,
+        ts_end_ns=ts + 3_000_000,
+        total_ms=3.0,
+        params=params,
+        server=server,
+        system=TraceSystem(
+            http_status=200,
+            prefill_ms=1.0,
+            decode_ms=2.0,
+            ts_send_ns=ts,
+            ts_recv_ns=ts + 500_000,
+            ts_done_ns=ts + 2_500_000,
+            ts_resp_ns=ts + 3_000_000,
+            network_rtt_ms=1.0,
+            server_queue_ms=0.0,
+            server_compute_ms=2.0,
+        ),
+        prompt_hash=sha256_normalized_text(prompt.text),
+        output_hash=sha256_normalized_text("output"),
+        prompt_len_chars=len(prompt.text),
+        prompt_len_tokens=prompt.len_tokens,
+        output_len_chars=6,
+        output_text="output",
+    )
+    return body, record.model_dump(mode="json")
+
+
+def _per_request_us(label: str, requests: int, fn: Any) -> float:
+    started = time.process_time()
+    fn()
+    per_request_us = (time.process_time() - started) / requests * 1e6
+    print(f"{label:<12} {per_request_us:8.2f} us/request")
+    return per_request_us
+
+
+class _InstantClient:
+    async def generate(self, prompt: str, params: Any = None) -> tuple[str, dict[str, Any], int]:
+        return "output", dict(TIMINGS), 200
+
+    async def aclose(self) -> None:
+        return None
+
+
+def _bench_run_load(requests: int, prompts: list[PromptRecord]) -> None:
+    rate = 2000.0
+    loadgen = LoadGenConfig(
+        arrival_rate_rps=rate,
+        concurrency=256,
+        duration_s=max(1, round(requests / rate)),
+        warmup_s=0,
+        repeats=1,
+        prompt_source=Path("bench.jsonl"),
+        mix=LoadMixConfig(short=1.0, med=0.0, long=0.0),
+        live=LiveStatsConfig(enabled=False, console=False),
+    )
+    with tempfile.TemporaryDirectory() as tmp:
+        started = time.process_time()
+        summary = asyncio.run(
+            run_load(
+                _server_config(),
+                loadgen,
+                ExperimentConfig(name="bench", output_dir=Path(tmp)),
+                prompts,
+                client_factory=lambda: _InstantClient(),  # type: ignore[arg-type,return-value]
+            )
+        )
+        elapsed = time.process_time() - started
+    print(
+        f"{'run_load':<12} {elapsed / max(summary.sent, 1) * 1e6:8.2f} us/request "
+        f"(process CPU incl. writer thread, {summary.sent} requests)"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=20_000)
+    parser.add_argument("--prompt-chars", type=int, default=2_000)
+    parser.add_argument("--prompts", type=int, default=200, help="Distinct prompts in the catalog")
+    args = parser.parse_args()
+
+    prompts = [
+        PromptRecord(
+            prompt_id=f"p-{idx}",
+            text=(f"prompt {idx} " * args.prompt_chars)[: args.prompt_chars],
+            length_bucket="short",
+        )
+        for idx in range(args.prompts)
+    ]
+    server = _server_config()
+    params = TraceParams(
+        temperature=server.temperature,
+        top_p=server.top_p,
+        seed=server.seed,
+        max_new_tokens=server.max_new_tokens,
+    )
+    snapshot = TraceServerSnapshot(model=server.model, dtype=server.dtype)
+    params_payload = params.model_dump(mode="json")
+    sequence = [prompts[idx % len(prompts)] for idx in range(args.requests)]
+
+    def legacy() -> None:
+        for prompt in sequence:
+            _legacy_request(prompt, params, snapshot)
+
+    @lru_cache(maxsize=4096)
+    def request_body(text: str, max_new_tokens: int) -> bytes:
+        return encode_generate_body(text, {**params_payload, "max_new_tokens": max_new_tokens})
+
+    buffer = ResultBuffer(512)
+    batches = []
+
+    def hot_path() -> None:
+        for prompt in sequence:
+            request_body(prompt.text, server.max_new_tokens)
+            ts = time.time_ns()
+            full = buffer.append(
+                prompt,
+                0,
+                server.max_new_tokens,
+                None,
+                ts_start_ns=ts,
+                ts_end_ns=ts + 3_000_000,
+                total_ms=3.0,
+                http_status=200,
+                error=None,
+                output_text="output",
+                timings=TIMINGS,
+            )
+            if full:
+                batches.append(buffer.drain())
+        batches.append(buffer.drain())
+
+    context = TraceContext(
+        run_id="bench", params=params_payload, server=snapshot.model_dump(mode="json")
+    )
+
+    def off_loop() -> None:
+        for batch in batches:
+            if batch is not None:
+                trace_rows(batch, context)
+
+    print(f"requests={args.requests} prompt_chars={args.prompt_chars} prompts={args.prompts}")
+    before = _per_request_us("legacy", args.requests, legacy)
+    after = _per_request_us("hot path", args.requests, hot_path)
+    _per_request_us("off loop", args.requests, off_loop)
+    print(f"event-loop CPU per request reduced {before / max(after, 1e-9):.1f}x")
+    _bench_run_load(args.requests, prompts)
+
+
+if __name__ == "__main__":
+    main()
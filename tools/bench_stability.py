@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""Stability-metric cost: the old DP over every output pair vs the current implementation.
+
+Usage: python tools/bench_stability.py [--prompts N] [--repeats N] [--output-chars N]
+
+`legacy` is the pure-Python O(n*m) Levenshtein DP run over `combinations(outputs, 2)` for each
+prompt, as `compute_stability_metrics` used to do. `current` is `compute_stability_metrics`
+itself: each distinct pair goes through the bit-parallel distance once and output pairs look it
+up. Outputs mimic sampled generations: most repeats reproduce one of a few variants that differ
+by small edits. The two results are checked for exact (bit-for-bit) equality.
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import time
+from itertools import combinations
+
+import pandas as pd
+
+from qosflow.metrics.stability import compute_stability_metrics
+
+
+def _legacy_distance(a: str, b: str) -> int:
+    if a == b:
+        return 0
+    if not a:
+        return len(b)
+    if not b:
+        return len(a)
+    prev = list(range(len(b) + 1))
+    for i, ca in enumerate(a, start=1):
+        curr = [i]
+        for j, cb in enumerate(b, start=1):
+            insertion = curr[j - 1] + 1
+            deletion = prev[j] + 1
+            substitution = prev[j - 1] + (0 if ca == cb else 1)
+            curr.append(min(insertion, deletion, substitution))
+        prev = curr
+    return prev[-1]
+
+
+def _legacy_edit_similarity(outputs: list[str]) -> float:
+    if len(outputs) < 2:
+        return 1.0
+    similarities = [
+        1.0 - _legacy_distance(a, b) / max(len(a), len(b), 1) for a, b in combinations(outputs, 2)
+    ]
+    return sum(similarities) / len(similarities)
+
+
+def _outputs(rng: random.Random, repeats: int, chars: int, variants: int) -> list[str]:
+    words = "the model output token stream of text with some variation across repeats".split()
+    base = " ".join(rng.choice(words) for _ in range(chars // 5))[:chars]
+    forms = [base]
+    for _ in range(variants - 1):
+        edited = list(base)
+        for _ in range(max(1, chars // 50)):
+            edited[rng.randrange(len(edited))] = rng.choice("abcdefghij ")
+        forms.append("".join(edited))
+    return [forms[0] if rng.random() < 0.6 else rng.choice(forms) for _ in range(repeats)]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--prompts", type=int, default=10)
+    parser.add_argument("--repeats", type=int, default=10)
+    parser.add_argument("--output-chars", type=int, default=500)
+    parser.add_argument("--variants", type=int, default=4, help="Distinct outputs per prompt")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    rows = [
+        {"prompt_id": f"p{prompt:04d}", "output_text": text}
+        for prompt in range(args.prompts)
+        for text in _outputs(rng, args.repeats, args.output_chars, args.variants)
+    ]
+    df = pd.DataFrame(rows)
+    print(
+        f"prompts={args.prompts} repeats={args.repeats} output_chars={args.output_chars} "
+        f"variants={args.variants}"
+    )
+
+    started = time.perf_counter()
+    legacy = [
+        _legacy_edit_similarity(list(group["output_text"]))
+        for _, group in df.groupby("prompt_id", sort=True)
+    ]
+    legacy_s = time.perf_counter() - started
+    print(f"{'legacy':<8} {legacy_s:8.3f} s")
+
+    started = time.perf_counter()
+    _, per_prompt = compute_stability_metrics(df)
+    current_s = time.perf_counter() - started
+    print(f"{'current':<8} {current_s:8.3f} s")
+
+    current = list(per_prompt["edit_similarity"])
+    mismatches = sum(x != y for x, y in zip(legacy, current, strict=True))
+    print(f"mismatched prompts: {mismatches}")
+    print(f"stability eval reduced {legacy_s / max(current_s, 1e-9):.1f}x")
+
+
+if __name__ == "__main__":
+    main()